@@ -5,10 +5,11 @@ from flask import Blueprint, jsonify, request
 from flask_login import login_required, current_user
 from functools import wraps
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from sqlalchemy import func, select
 
 from models import User, UserPrediction, Subscription
 from extensions import db
+from services.json_response import stream_json
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -262,25 +263,28 @@ def get_subscriptions():
     Получить список всех подписок
     """
     try:
-        # Получить пользователей с Premium подписками
-        premium_users = User.query.filter_by(is_premium=True).order_by(User.created_at.desc()).all()
+        # Получить пользователей с Premium подписками (строки читаются пачками)
+        premium_users = db.session.scalars(
+            select(User)
+            .where(User.is_premium.is_(True))
+            .order_by(User.created_at.desc())
+            .execution_options(yield_per=500)
+        )
+        now = datetime.utcnow()
         
-        subscriptions = []
-        for user in premium_users:
-            subscriptions.append({
+        def serialize(user):
+            return {
                 'id': user.id,
                 'username': user.username,
                 'email': user.email,
                 'subscription_id': user.subscription_id,
                 'subscription_end': user.subscription_end.isoformat() if user.subscription_end else None,
                 'created_at': user.created_at.isoformat() if user.created_at else None,
-                'is_active': user.subscription_end > datetime.utcnow() if user.subscription_end else True
-            })
+                'is_active': user.subscription_end > now if user.subscription_end else True
+            }
         
-        return jsonify({
-            'success': True,
-            'subscriptions': subscriptions
-        })
+        # Список не собирается целиком - ответ уходит частями
+        return stream_json('subscriptions', (serialize(user) for user in premium_users))
         
     except Exception as e:
         return jsonify({
@@ -324,3 +328,33 @@ def get_daily_analytics():
             'success': False,
             'error': str(e)
         }), 500
+
+
+@admin_bp.route('/models')
+@admin_required
+def get_model_stats():
+    """
+    Загруженные ML модели этого воркера: время загрузки, размер, прирост RSS
+    """
+    from services.model_registry import model_registry
+    from services.model_watcher import model_watcher
+    
+    return jsonify({
+        'success': True,
+        'registry': model_registry.stats(),
+        'watcher': model_watcher.stats()
+    })
+
+
+@admin_bp.route('/memory')
+@admin_required
+def get_memory_stats():
+    """
+    Память воркеров: общая (страницы master, copy-on-write) и собственная
+    """
+    from services.preload import worker_memory
+    
+    return jsonify({
+        'success': True,
+        'memory': worker_memory()
+    })
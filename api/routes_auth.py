@@ -8,6 +8,7 @@ from datetime import datetime
 
 from models import User
 from extensions import db
+from services.quota import prediction_quota
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -161,7 +162,7 @@ def get_current_user():
             'username': current_user.username,
             'email': current_user.email,
             'is_premium': current_user.is_premium,
-            'daily_predictions_count': current_user.daily_predictions_count,
+            'daily_predictions_count': prediction_quota.used(current_user),
             'subscription_end': current_user.subscription_end.isoformat() if current_user.subscription_end else None
         }
     })
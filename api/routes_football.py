@@ -5,7 +5,9 @@ Endpoints for football matches and predictions
 from flask import Blueprint, jsonify, request
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
+from services.async_io import UpstreamTimeout, upstream_timeout_response, wait_result
 from services.football_data_org import FootballDataOrgAPI
+from services.response_cache import response_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,6 +16,7 @@ football_bp = Blueprint('football', __name__, url_prefix='/api/football')
 
 
 @football_bp.route('/matches', methods=['GET'])
+@response_cache.cached(ttl=300, max_age=60, vary_tier=False)
 def get_matches():
     """
     Get upcoming football matches
@@ -65,7 +68,8 @@ def get_matches():
             'dateTo': date_to
         }
         
-        data = football_api._make_request(endpoint, params)
+        # Non-blocking call: the thread waits at most UPSTREAM_WAIT_SECONDS
+        data = wait_result(football_api.make_request_async(endpoint, params))
         
         if not data or 'matches' not in data:
             return jsonify({
@@ -106,6 +110,10 @@ def get_matches():
             'count': len(formatted_matches)
         })
         
+    except UpstreamTimeout as e:
+        logger.warning(f"⏳ Football-Data.org is slow: {e}")
+        return upstream_timeout_response(e, matches=[])
+    
     except Exception as e:
         logger.error(f"❌ Error fetching football matches: {e}")
         return jsonify({
@@ -140,10 +148,10 @@ def get_prediction(match_id):
         date_from = datetime.now().strftime('%Y-%m-%d')
         date_to = (datetime.now() + timedelta(days=10)).strftime('%Y-%m-%d')
         
-        data = football_api._make_request('matches', {
+        data = wait_result(football_api.make_request_async('matches', {
             'dateFrom': date_from,
             'dateTo': date_to
-        })
+        }))
         
         if not data or 'matches' not in data:
             logger.error(f"❌ Failed to fetch matches from API")
@@ -207,6 +215,10 @@ def get_prediction(match_id):
             'prediction': prediction
         })
         
+    except UpstreamTimeout as e:
+        logger.warning(f"⏳ Football-Data.org is slow: {e}")
+        return upstream_timeout_response(e)
+    
     except Exception as e:
         logger.error(f"❌ Error getting prediction for match {match_id}: {e}")
         return jsonify({
@@ -216,6 +228,7 @@ def get_prediction(match_id):
 
 
 @football_bp.route('/competitions', methods=['GET'])
+@response_cache.cached(ttl=3600, max_age=600, vary_tier=False)
 def get_competitions():
     """
     Get list of available competitions
@@ -227,10 +240,10 @@ def get_competitions():
         date_from = datetime.now().strftime('%Y-%m-%d')
         date_to = (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
         
-        data = football_api._make_request('matches', {
+        data = wait_result(football_api.make_request_async('matches', {
             'dateFrom': date_from,
             'dateTo': date_to
-        })
+        }))
         
         if not data or 'matches' not in data:
             return jsonify({
@@ -256,6 +269,10 @@ def get_competitions():
             'competitions': list(competitions.values())
         })
         
+    except UpstreamTimeout as e:
+        logger.warning(f"⏳ Football-Data.org is slow: {e}")
+        return upstream_timeout_response(e, competitions=[])
+    
     except Exception as e:
         logger.error(f"❌ Error fetching competitions: {e}")
         return jsonify({
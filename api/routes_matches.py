@@ -8,6 +8,14 @@ from datetime import datetime
 from models import Match, Prediction, Team, User
 from ml.predict import PredictionService
 from services.football_api import FootballAPIService
+from services.cache import team_form_cache
+from services.quota import prediction_quota
+from services.prediction_store import predictions_version, todays_predictions
+from services.response_cache import response_cache
+from services.listings import (
+    InvalidCursor, league_predictions, page_size, serialize_match,
+    serialize_match_prediction, upcoming_matches
+)
 from extensions import db
 
 matches_bp = Blueprint('matches', __name__)
@@ -16,6 +24,7 @@ football_api = FootballAPIService()
 
 
 @matches_bp.route('/today', methods=['GET'])
+@response_cache.cached(ttl=300, max_age=30, version=predictions_version)
 def get_todays_matches():
     """
     Получить прогнозы на сегодняшние матчи
@@ -23,8 +32,9 @@ def get_todays_matches():
     try:
         league = request.args.get('league')
         
-        # Получить прогнозы
-        predictions = prediction_service.predict_todays_matches(league)
+        # Прогнозы заранее посчитаны планировщиком (services/prediction_store.py):
+        # один запрос к БД, без внешних API и инференса
+        predictions = todays_predictions(league)
         
         # Если сегодня нет матчей, получить ближайшие (только из БД, без API запросов)
         upcoming_matches = []
@@ -59,18 +69,16 @@ def get_upcoming_matches_from_db():
     """
     try:
         from datetime import datetime, timedelta
-        from sqlalchemy import and_
         
         today = datetime.now().date()
         next_week = today + timedelta(days=7)
         
-        # Получить ближайшие матчи из БД
-        upcoming = Match.query.filter(
-            and_(
-                Match.match_date > datetime.now(),
-                Match.match_date <= datetime.combine(next_week, datetime.max.time())
-            )
-        ).order_by(Match.match_date).limit(10).all()
+        # Получить ближайшие матчи из БД (команды - тем же запросом)
+        upcoming = upcoming_matches(
+            datetime.now(),
+            datetime.combine(next_week, datetime.max.time()),
+            limit=10
+        )
         
         if not upcoming:
             # Если в БД нет будущих матчей, вернуть заглушку с информацией
@@ -83,17 +91,7 @@ def get_upcoming_matches_from_db():
         # Группировать по дате
         matches_by_date = {}
         for match in upcoming:
-            date_key = match.match_date.date()
-            if date_key not in matches_by_date:
-                matches_by_date[date_key] = []
-            
-            matches_by_date[date_key].append({
-                'id': match.id,
-                'date': match.match_date.isoformat(),
-                'home_team': match.home_team.name if match.home_team else 'Unknown',
-                'away_team': match.away_team.name if match.away_team else 'Unknown',
-                'league': match.league
-            })
+            matches_by_date.setdefault(match.match_date.date(), []).append(serialize_match(match))
         
         # Найти ближайшую дату
         if matches_by_date:
@@ -119,14 +117,8 @@ def get_match_details(match_id):
     """
     Получить детали конкретного матча с прогнозом
     """
+    consumed = False
     try:
-        # Проверить лимит пользователя
-        if not current_user.can_view_prediction():
-            return jsonify({
-                'success': False,
-                'error': 'Достигнут дневной лимит прогнозов. Оформите Premium подписку.'
-            }), 403
-        
         # Получить матч
         match = Match.query.get(match_id)
         
@@ -136,12 +128,21 @@ def get_match_details(match_id):
                 'error': 'Матч не найден'
             }), 404
         
+        # Проверить лимит и засчитать просмотр (одна атомарная операция, без commit)
+        consumed = prediction_quota.consume(current_user)
+        if not consumed:
+            return jsonify({
+                'success': False,
+                'error': 'Достигнут дневной лимит прогнозов. Оформите Premium подписку.'
+            }), 403
+        
         # Получить прогноз
         prediction = Prediction.query.filter_by(match_id=match_id).first()
         
         if not prediction:
             # Создать прогноз если его нет
             match_data = {
+                'match_id': match.id,  # объяснение от LLM допишется в фоне
                 'home_team_id': match.home_team_id,
                 'away_team_id': match.away_team_id,
                 'home_team_name': match.home_team.name,
@@ -165,17 +166,8 @@ def get_match_details(match_id):
             db.session.add(prediction)
             db.session.commit()
         
-        # Увеличить счетчик просмотров
-        current_user.increment_prediction_count()
-        
-        # Записать просмотр
-        from models import UserPrediction
-        user_pred = UserPrediction(
-            user_id=current_user.id,
-            prediction_id=prediction.id
-        )
-        db.session.add(user_pred)
-        db.session.commit()
+        # Записать просмотр (UserPrediction пишется в БД пачками)
+        prediction_quota.record_view(current_user, prediction.id)
         
         return jsonify({
             'success': True,
@@ -197,6 +189,8 @@ def get_match_details(match_id):
         })
         
     except Exception as e:
+        if consumed:
+            prediction_quota.refund(current_user)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -209,34 +203,28 @@ def get_league_predictions(league_name):
     Получить прогнозы по конкретной лиге
     """
     try:
-        # Получить матчи лиги
-        matches = Match.query.filter_by(
-            league=league_name,
-            status='scheduled'
-        ).order_by(Match.match_date).limit(20).all()
+        # Матчи лиги с прогнозом: один запрос, keyset-пагинация по (match_date, id)
+        rows, next_cursor = league_predictions(
+            league_name,
+            limit=page_size(request.args.get('limit', type=int)),
+            cursor=request.args.get('cursor')
+        )
         
-        predictions = []
-        
-        for match in matches:
-            prediction = Prediction.query.filter_by(match_id=match.id).first()
-            
-            if prediction:
-                predictions.append({
-                    'match_id': match.id,
-                    'home_team': match.home_team.name,
-                    'away_team': match.away_team.name,
-                    'date': match.match_date.isoformat(),
-                    'probability': prediction.probability,
-                    'confidence': prediction.confidence
-                })
+        predictions = [serialize_match_prediction(match, prediction) for match, prediction in rows]
         
         return jsonify({
             'success': True,
             'league': league_name,
             'count': len(predictions),
-            'predictions': predictions
+            'predictions': predictions,
+            'next_cursor': next_cursor
         })
         
+    except InvalidCursor as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -312,6 +300,11 @@ def update_match_results():
                 match.total_goals = result['total_goals']
                 match.status = result['status']
                 
+                # Новый завершенный матч - сбросить кэш формы команд
+                for team in (match.home_team, match.away_team):
+                    if team is not None:
+                        team_form_cache.invalidate(team.api_id, match.match_date)
+                
                 # Проверить правильность прогноза
                 prediction = Prediction.query.filter_by(match_id=match.id).first()
                 
@@ -5,8 +5,10 @@ Endpoints for tennis matches and predictions
 from flask import Blueprint, jsonify, request
 from flask_login import login_required, current_user
 from datetime import datetime
+from services.async_io import UpstreamTimeout, upstream_timeout_response, wait_result
 from services.tennis_api import get_tennis_api_service
 from tennis.predict import get_tennis_prediction_service
+from services.response_cache import response_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,6 +17,7 @@ tennis_bp = Blueprint('tennis', __name__, url_prefix='/api/tennis')
 
 
 @tennis_bp.route('/matches', methods=['GET'])
+@response_cache.cached(ttl=600, max_age=120, vary_tier=False)
 def get_matches():
     """
     Get upcoming tennis matches
@@ -55,7 +58,8 @@ def get_matches():
         
         # Get matches from API
         tennis_api = get_tennis_api_service()
-        matches = tennis_api.get_upcoming_matches(days=days)
+        # Days are fetched in parallel, the thread waits at most UPSTREAM_WAIT_SECONDS
+        matches = wait_result(tennis_api.get_upcoming_matches_async(days=days))
         
         # Format for frontend
         formatted_matches = []
@@ -91,6 +95,10 @@ def get_matches():
             'count': len(formatted_matches)
         })
         
+    except UpstreamTimeout as e:
+        logger.warning(f"⏳ Tennis API is slow: {e}")
+        return upstream_timeout_response(e, matches=[])
+    
     except Exception as e:
         logger.error(f"❌ Error fetching matches: {e}")
         return jsonify({
@@ -7,6 +7,8 @@ from datetime import datetime
 
 from models import User, UserPrediction, Prediction
 from extensions import db
+from services.quota import prediction_quota
+from services.listings import InvalidCursor, page_size, prediction_history, serialize_history_entry
 
 users_bp = Blueprint('users', __name__)
 
@@ -46,7 +48,7 @@ def get_profile():
             'statistics': {
                 'total_predictions_viewed': total_viewed,
                 'predictions_accuracy': round(accuracy, 2),
-                'daily_predictions_used': user.daily_predictions_count
+                'daily_predictions_used': prediction_quota.used(user)
             }
         }
     })
@@ -168,55 +170,31 @@ def get_prediction_history():
     Получить историю просмотренных прогнозов
     """
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        
-        # Получить историю
-        history_query = db.session.query(
-            Prediction,
-            UserPrediction.viewed_at
-        ).join(
-            UserPrediction,
-            Prediction.id == UserPrediction.prediction_id
-        ).filter(
-            UserPrediction.user_id == current_user.id
-        ).order_by(
-            UserPrediction.viewed_at.desc()
+        # Keyset-пагинация по (viewed_at, id): ?cursor=<next_cursor предыдущей страницы>
+        per_page = page_size(request.args.get('per_page', type=int))
+        rows, next_cursor = prediction_history(
+            current_user.id,
+            limit=per_page,
+            cursor=request.args.get('cursor')
         )
         
-        pagination = history_query.paginate(page=page, per_page=per_page)
-        
-        history = []
-        for prediction, viewed_at in pagination.items:
-            match = prediction.match
-            
-            history.append({
-                'match': {
-                    'home_team': match.home_team.name,
-                    'away_team': match.away_team.name,
-                    'league': match.league,
-                    'date': match.match_date.isoformat()
-                },
-                'prediction': {
-                    'probability': prediction.probability,
-                    'confidence': prediction.confidence,
-                    'is_correct': prediction.is_correct,
-                    'actual_result': prediction.actual_result
-                },
-                'viewed_at': viewed_at.isoformat()
-            })
+        history = [serialize_history_entry(view, prediction) for view, prediction in rows]
         
         return jsonify({
             'success': True,
             'history': history,
             'pagination': {
-                'page': page,
                 'per_page': per_page,
-                'total': pagination.total,
-                'pages': pagination.pages
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
             }
         })
         
+    except InvalidCursor as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -240,13 +218,14 @@ def get_user_limits():
         else Config.FREE_PREDICTIONS_PER_DAY
     )
     
-    remaining = max_predictions - user.daily_predictions_count
+    used = prediction_quota.used(user)
+    remaining = max_predictions - used
     
     return jsonify({
         'success': True,
         'limits': {
             'is_premium': user.is_premium,
-            'daily_predictions_used': user.daily_predictions_count,
+            'daily_predictions_used': used,
             'daily_predictions_max': max_predictions,
             'daily_predictions_remaining': max(0, remaining),
             'can_view_more': user.can_view_prediction()
@@ -19,12 +19,35 @@ def create_app(config_name=None):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     
+    # Быстрый JSON (orjson, NumPy типы) для jsonify и потоковых ответов
+    from services.json_response import FastJSONProvider
+    app.json = FastJSONProvider(app)
+    
     # Инициализация расширений
     db.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
     CORS(app)
     
+    # Статистика команд обновляется при каждой записи результата матча
+    from services.team_stats import install_team_stats_listener
+    install_team_stats_listener()
+    
+    # Лимиты прогнозов: счетчики вне транзакции запроса, история просмотров пачками
+    from services.quota import prediction_quota
+    prediction_quota.init_app(app)
+    
+    # Объяснения прогнозов от OpenAI генерируются в фоне
+    from services.explanation_queue import explanation_queue
+    explanation_queue.init_app(app)
+    
+    # Готовые JSON ответы публичных эндпоинтов: общий кэш + ETag
+    from services.response_cache import response_cache
+    response_cache.init_app(app)
+    
+    from services.compression import compression
+    compression.init_app(app)
+    
     # Настройка Flask-Login
     login_manager.login_view = 'login'
     login_manager.login_message = 'Пожалуйста, войдите для доступа к этой странице.'
@@ -37,8 +60,11 @@ def create_app(config_name=None):
     
     # Импорт моделей базы данных
     with app.app_context():
-        from models import User, Prediction, Match, Team, Subscription
+        from models import User, Prediction, Match, Team, Subscription, ensure_columns, ensure_indexes
         db.create_all()
+        with db.engine.begin() as conn:
+            ensure_columns(conn)
+            ensure_indexes(conn)
     
     # Регистрация blueprints (API маршрутов)
     from api.routes_matches import matches_bp
@@ -65,6 +91,7 @@ def create_app(config_name=None):
     
     # API эндпоинты для прогнозов
     @app.route('/api/predictions/upcoming')
+    @response_cache.cached(ttl=300, max_age=60, vary_tier=False)
     def get_upcoming_predictions():
         """Получить прогнозы для предстоящих матчей"""
         from services.prediction_service import get_prediction_service
@@ -76,14 +103,13 @@ def create_app(config_name=None):
             # Получить расписание
             upcoming_matches = service.get_upcoming_matches(days_ahead=days)
             
-            # Добавить прогнозы
-            predictions = []
-            for match in upcoming_matches[:20]:  # Ограничение на 20 матчей
-                prediction = service.predict_match(match)
-                predictions.append({
-                    'match': match,
-                    'prediction': prediction
-                })
+            # Добавить прогнозы (одним батчем)
+            matches = upcoming_matches[:20]  # Ограничение на 20 матчей
+            match_predictions = service.predict_matches(matches)
+            predictions = [
+                {'match': match, 'prediction': prediction}
+                for match, prediction in zip(matches, match_predictions)
+            ]
             
             return jsonify({
                 'success': True,
@@ -242,6 +268,10 @@ if __name__ == '__main__':
     from services.scheduler import start_scheduler
     start_scheduler(app)
     
+    # Hot reload переобученных моделей
+    from services.model_watcher import model_watcher
+    model_watcher.start()
+    
     # Запуск Flask приложения
     app.run(
         host='0.0.0.0',
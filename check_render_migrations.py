@@ -212,6 +212,19 @@ def check_and_migrate():
                 conn.commit()
                 print("✅ is_premium column added")
             
+            # Новые nullable-колонки (predictions.feature_hash, ...)
+            from models import ensure_columns, ensure_indexes
+            added_columns = ensure_columns(conn)
+            conn.commit()
+            if added_columns:
+                print(f"✅ Columns added: {', '.join(added_columns)}")
+            
+            # Индексы для горячих запросов (matches, predictions, user_predictions, subscriptions)
+            created_indexes = ensure_indexes(conn)
+            conn.commit()
+            if created_indexes:
+                print(f"✅ Indexes created: {', '.join(created_indexes)}")
+            
             print("\n✅ Database schema is up to date!\n")
             return True
             
@@ -56,6 +56,14 @@ class Config:
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
     OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4-turbo-preview')
     
+    # Фоновая очередь объяснений прогнозов (services/explanation_queue.py)
+    EXPLANATION_QUEUE_ENABLED = os.getenv('EXPLANATION_QUEUE_ENABLED', 'true').lower() == 'true'
+    EXPLANATION_CLIENT = os.getenv('EXPLANATION_CLIENT', 'openai')  # openai или fake (без API ключа)
+    EXPLANATION_BATCH_SIZE = int(os.getenv('EXPLANATION_BATCH_SIZE', 5))  # матчей в одном промпте
+    EXPLANATION_CONCURRENCY = int(os.getenv('EXPLANATION_CONCURRENCY', 2))  # одновременных запросов
+    EXPLANATION_MAX_RETRIES = int(os.getenv('EXPLANATION_MAX_RETRIES', 3))
+    EXPLANATION_RETRY_BACKOFF = float(os.getenv('EXPLANATION_RETRY_BACKOFF', 2.0))  # секунд, удваивается
+    
     # Stripe
     STRIPE_PUBLIC_KEY = os.getenv('STRIPE_PUBLIC_KEY')
     STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY')
@@ -74,6 +82,45 @@ class Config:
     # Redis
     REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
     
+    # Cache backend for API responses: memory (per process), sqlite or redis (shared by workers)
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+    CACHE_SQLITE_PATH = os.getenv('CACHE_SQLITE_PATH', os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else '/tmp', 'goalpredictor_cache.sqlite3'))
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 1000))
+    RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'  # ETag + общий кэш JSON ответов
+    
+    # Сжатие ответов (br, если установлен brotli, иначе gzip)
+    COMPRESS_ENABLED = os.getenv('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 500))  # байт
+    
+    # Rate limit for Football-Data.org (token bucket shared by all workers)
+    FOOTBALL_API_REQUESTS_PER_MINUTE = int(os.getenv('FOOTBALL_API_REQUESTS_PER_MINUTE', 10))
+    FOOTBALL_API_MAX_WAIT = float(os.getenv('FOOTBALL_API_MAX_WAIT', 15))  # секунд для интерактивных запросов
+    FOOTBALL_API_MAX_CONCURRENCY = int(os.getenv('FOOTBALL_API_MAX_CONCURRENCY', 5))  # параллельных запросов (5 лиг)
+    RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'sqlite')
+    RATE_LIMIT_SQLITE_PATH = os.getenv('RATE_LIMIT_SQLITE_PATH', os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else '/tmp', 'goalpredictor_ratelimit.sqlite3'))
+    
+    # Дневные счетчики просмотров прогнозов (общие для воркеров) и отложенная запись истории
+    QUOTA_BACKEND = os.getenv('QUOTA_BACKEND', 'sqlite')
+    QUOTA_SQLITE_PATH = os.getenv('QUOTA_SQLITE_PATH', os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else '/tmp', 'goalpredictor_quota.sqlite3'))
+    VIEW_LOG_FLUSH_INTERVAL = float(os.getenv('VIEW_LOG_FLUSH_INTERVAL', 5))  # секунд
+    VIEW_LOG_BATCH_SIZE = int(os.getenv('VIEW_LOG_BATCH_SIZE', 200))
+    
+    # Ответы внешних API на диске (переживают деплой/перезапуск воркеров)
+    HTTP_CACHE_PATH = os.getenv('HTTP_CACHE_PATH', os.path.join(os.path.dirname(__file__), 'data', 'http_cache.sqlite3'))
+    HTTP_CACHE_STALE_SECONDS = int(os.getenv('HTTP_CACHE_STALE_SECONDS', 3600))  # stale-while-revalidate
+    
+    # Outbound HTTP (общий пул keep-alive соединений, services/http_client.py)
+    HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 3))
+    HTTP_BACKOFF_FACTOR = float(os.getenv('HTTP_BACKOFF_FACTOR', 0.5))
+    HTTP_BACKOFF_JITTER = float(os.getenv('HTTP_BACKOFF_JITTER', 0.5))
+    HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 10))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 3.05))
+    HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 30))
+    
+    # Неблокирующие вызовы внешних API (services/async_io.py, для gthread воркеров)
+    IO_POOL_SIZE = int(os.getenv('IO_POOL_SIZE', 10))  # потоков на воркер (не больше HTTP_POOL_MAXSIZE)
+    UPSTREAM_WAIT_SECONDS = float(os.getenv('UPSTREAM_WAIT_SECONDS', 10))  # дальше 503 + Retry-After
+    
     # Application
     APP_NAME = os.getenv('APP_NAME', 'GoalPredictor.AI')
     APP_URL = os.getenv('APP_URL', 'http://localhost:5000')
@@ -92,9 +139,17 @@ class Config:
     
     # ML Model Settings
     MODEL_PATH = os.path.join(os.path.dirname(__file__), 'ml', 'models')
+    MODEL_PRELOAD = os.getenv('MODEL_PRELOAD', 'True') == 'True'  # загрузить модели в Gunicorn master до fork
+    MODEL_WATCH_INTERVAL = int(os.getenv('MODEL_WATCH_INTERVAL', 60))  # секунд; 0 = без hot reload
+    MODEL_MMAP_MODE = os.getenv('MODEL_MMAP_MODE', 'r')  # '' = загружать массивы в память воркера
     MODEL_RETRAIN_DAYS = int(os.getenv('MODEL_RETRAIN_DAYS', 7))
+    TRAINING_FEATURES_MODE = os.getenv('TRAINING_FEATURES_MODE', 'auto')  # sql, pandas, rows (по запросу на матч)
     PREDICTION_THRESHOLD = float(os.getenv('PREDICTION_THRESHOLD', 0.65))
     MIN_MATCHES_FOR_PREDICTION = int(os.getenv('MIN_MATCHES_FOR_PREDICTION', 5))
+    PREDICTION_HORIZON_DAYS = int(os.getenv('PREDICTION_HORIZON_DAYS', 7))  # прогнозы считаются заранее на N дней
+    PREDICTION_REFRESH_MINUTES = int(os.getenv('PREDICTION_REFRESH_MINUTES', 60))
+    SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', 'True') == 'True'  # планировщик в одном из воркеров Gunicorn
+    SCHEDULER_LOCK_FILE = os.getenv('SCHEDULER_LOCK_FILE', '/tmp/goalpredictor-scheduler.lock')
     
     # Subscription Limits
     FREE_PREDICTIONS_PER_DAY = int(os.getenv('FREE_PREDICTIONS_PER_DAY', 3))
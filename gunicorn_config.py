@@ -9,7 +9,18 @@ backlog = 2048
 # Worker processes - Optimized for Render $7/month plan (512MB RAM)
 # Use 4 workers for better performance while staying within memory limits
 workers = int(os.getenv('WEB_CONCURRENCY', 4))
-worker_class = 'sync'
+
+# Worker mode: sync (default) or gthread. gthread threads share the worker's
+# memory (models are loaded once) and a request waiting for Football-Data.org,
+# RapidAPI or OpenAI holds only its thread, for at most UPSTREAM_WAIT_SECONDS
+# (services/async_io.py)
+SUPPORTED_WORKER_CLASSES = ('sync', 'gthread')
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+if worker_class not in SUPPORTED_WORKER_CLASSES:
+    # gevent/eventlet: monkey patching после preload_app ломает уже импортированные ssl/requests
+    print(f"⚠️  Unsupported GUNICORN_WORKER_CLASS={worker_class}, using sync")
+    worker_class = 'sync'
+threads = int(os.getenv('GUNICORN_THREADS', 8 if worker_class == 'gthread' else 1))
 worker_connections = 500  # Balanced for 4 workers
 max_requests = 500  # Restart workers after 500 requests to prevent memory leaks
 max_requests_jitter = 50
@@ -60,15 +71,37 @@ def on_reload(server):
 
 def when_ready(server):
     """Called just after the server is started."""
+    # Модели загружаются один раз в master и наследуются воркерами (copy-on-write),
+    # в т.ч. воркерами, перезапущенными после max_requests
+    from config import Config
+    from services.preload import warm_up, freeze_heap
+    from services.model_watcher import model_watcher
+    
+    if Config.MODEL_PRELOAD:
+        warm_up()
+    # Версии файлов, загруженные в master, - точка отсчета для hot reload в воркерах
+    model_watcher.snapshot()
+    freeze_heap()
     print("✅ Server is ready. Waiting for requests...")
 
 def pre_fork(server, worker):
     """Called just before a worker is forked."""
-    pass
+    import gc
+    # Объекты, созданные в master после when_ready, тоже не трогаем GC в воркерах
+    gc.freeze()
 
 def post_fork(server, worker):
     """Called just after a worker has been forked."""
     print(f"👷 Worker spawned (pid: {worker.pid})")
+    from services.model_watcher import model_watcher
+    model_watcher.start()
+    
+    # Планировщик (расписание, прогнозы, результаты) - только в одном воркере
+    from config import Config
+    if Config.SCHEDULER_ENABLED:
+        from app import app
+        from services.scheduler import start_scheduler_leader
+        start_scheduler_leader(app)
 
 def pre_exec(server):
     """Called just before a new master process is forked."""
@@ -2,13 +2,12 @@
 Загрузка дополнительных датасетов с football-data.co.uk
 Бесплатные CSV файлы с историческими данными о матчах
 """
-import requests
 import pandas as pd
 import io
-from datetime import datetime
-from extensions import db
 from app import create_app
 from models import Team, Match
+from services.http_client import get_session
+from services.match_ingest import csv_match_rows, ingest_matches
 
 app = create_app()
 
@@ -65,7 +64,7 @@ def download_csv_dataset(url):
     Скачать CSV датасет
     """
     try:
-        response = requests.get(url, timeout=30)
+        response = get_session('datasets').get(url)
         response.raise_for_status()
         
         # Прочитать CSV
@@ -77,119 +76,16 @@ def download_csv_dataset(url):
         return None
 
 
-def parse_date(date_str):
-    """
-    Парсить дату из разных форматов
-    """
-    formats = ['%d/%m/%Y', '%d/%m/%y', '%Y-%m-%d']
-    
-    for fmt in formats:
-        try:
-            return datetime.strptime(date_str, fmt)
-        except:
-            continue
-    
-    return None
-
-
 def process_csv_matches(df, league_code, season):
     """
     Обработать матчи из CSV файла
-    """
-    if df is None or df.empty:
-        return 0
-    
-    matches_added = 0
     
+    Команды и существующие матчи проверяются одним запросом на батч,
+    новые матчи пишутся пачками (services/match_ingest.py)
+    """
     # Основные колонки в football-data.co.uk CSV
     # Date, HomeTeam, AwayTeam, FTHG (Full Time Home Goals), FTAG, FTR (Full Time Result)
-    
-    for _, row in df.iterrows():
-        try:
-            # Пропустить пустые строки
-            if pd.isna(row.get('HomeTeam')) or pd.isna(row.get('AwayTeam')):
-                continue
-            
-            # Пропустить матчи без результата
-            if pd.isna(row.get('FTHG')) or pd.isna(row.get('FTAG')):
-                continue
-            
-            home_team_name = str(row['HomeTeam']).strip()
-            away_team_name = str(row['AwayTeam']).strip()
-            
-            # Создать/найти домашнюю команду
-            home_team = Team.query.filter_by(
-                name=home_team_name,
-                league=league_code
-            ).first()
-            
-            if not home_team:
-                # Создать с фейковым api_id (отрицательный для CSV данных)
-                home_team = Team(
-                    api_id=-abs(hash(home_team_name + league_code)) % 1000000,
-                    name=home_team_name,
-                    league=league_code,
-                    country='Unknown'
-                )
-                db.session.add(home_team)
-            
-            # Создать/найти гостевую команду
-            away_team = Team.query.filter_by(
-                name=away_team_name,
-                league=league_code
-            ).first()
-            
-            if not away_team:
-                away_team = Team(
-                    api_id=-abs(hash(away_team_name + league_code)) % 1000000,
-                    name=away_team_name,
-                    league=league_code,
-                    country='Unknown'
-                )
-                db.session.add(away_team)
-            
-            db.session.flush()
-            
-            # Парсить дату
-            match_date = parse_date(str(row['Date']))
-            if not match_date:
-                continue
-            
-            # Результаты
-            home_goals = int(row['FTHG'])
-            away_goals = int(row['FTAG'])
-            total_goals = home_goals + away_goals
-            
-            # Проверить существование матча
-            existing = Match.query.filter_by(
-                home_team_id=home_team.id,
-                away_team_id=away_team.id,
-                match_date=match_date
-            ).first()
-            
-            if not existing:
-                new_match = Match(
-                    api_id=-abs(hash(f"{home_team_name}{away_team_name}{match_date}")) % 1000000,
-                    home_team_id=home_team.id,
-                    away_team_id=away_team.id,
-                    match_date=match_date,
-                    league=league_code,
-                    status='FINISHED',
-                    home_goals=home_goals,
-                    away_goals=away_goals,
-                    total_goals=total_goals,
-                    result='1' if home_goals > away_goals else ('X' if home_goals == away_goals else '2'),
-                    over_2_5=total_goals > 2.5,
-                    btts=(home_goals > 0 and away_goals > 0)
-                )
-                db.session.add(new_match)
-                matches_added += 1
-        
-        except Exception as e:
-            continue
-    
-    db.session.commit()
-    return matches_added
+    return ingest_matches(csv_match_rows(df), league_code)
 
 
 def main():
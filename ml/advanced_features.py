@@ -2,10 +2,16 @@
 Улучшенная генерация признаков (feature engineering) для модели прогнозирования
 Использует детальную статистику: удары, корнеры, карточки, форму команд
 """
+import os
+import sys
 import pandas as pd
 import numpy as np
 from datetime import datetime
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml.rolling_features import RollingFeatureBuilder
+
 
 class AdvancedFeatureEngineering:
     """Продвинутый генератор признаков для модели"""
@@ -175,18 +181,19 @@ class AdvancedFeatureEngineering:
         
         return stats
     
-    def create_advanced_features(self, df, match_idx):
+    def create_advanced_features(self, df, match_idx, min_history=20):
         """
         Создать продвинутые признаки для конкретного матча
         
         Args:
             df: DataFrame со всеми матчами
             match_idx: Индекс текущего матча
+            min_history: Минимум матчей в истории для надежной статистики
         """
         match = df.iloc[match_idx]
         history = df.iloc[:match_idx]  # История до этого матча
         
-        if len(history) < 20:  # Минимум 20 матчей для надежной статистики
+        if len(history) < min_history:
             return None
         
         features = {}
@@ -260,16 +267,39 @@ class AdvancedFeatureEngineering:
         return features
     
     def prepare_training_dataset(self, df, min_history=20):
-        """Подготовить полный датасет для обучения"""
+        """
+        Подготовить полный датасет для обучения
+        
+        Все признаки считаются за один проход (RollingFeatureBuilder),
+        результат совпадает с prepare_training_dataset_rowwise
+        """
         print("\n🔄 Генерация продвинутых признаков...")
         
+        features_df = RollingFeatureBuilder().build(df, min_history=min_history)
+        
+        # Заполнить NaN нулями
+        features_df = features_df.fillna(0)
+        
+        self._report(features_df)
+        
+        return features_df
+    
+    def prepare_training_dataset_rowwise(self, df, min_history=20):
+        """
+        Построчная генерация признаков через create_advanced_features
+        
+        Медленная (история пересчитывается для каждого матча),
+        оставлена как эталон для проверки векторизованной версии
+        """
+        print("\n🔄 Генерация продвинутых признаков (построчно)...")
+        
         all_features = []
         
         for idx in range(len(df)):
             if idx % 1000 == 0 and idx > 0:
                 print(f"   Обработано {idx}/{len(df)} матчей...")
             
-            features = self.create_advanced_features(df, idx)
+            features = self.create_advanced_features(df, idx, min_history=min_history)
             if features is not None:
                 all_features.append(features)
         
@@ -278,13 +308,17 @@ class AdvancedFeatureEngineering:
         # Заполнить NaN нулями
         features_df = features_df.fillna(0)
         
+        self._report(features_df)
+        
+        return features_df
+    
+    def _report(self, features_df):
+        """Вывести сводку по построенным признакам"""
         print(f"\n✅ Создано признаков: {len(features_df.columns) - 2}")  # -2 для over_2_5 и btts
         print(f"   Образцов для обучения: {len(features_df)}")
         print(f"   Over 2.5: {features_df['over_2_5'].mean():.1%}")
         
         self.features_count = len(features_df.columns) - 2
-        
-        return features_df
 
 
 def main():
@@ -0,0 +1,478 @@
+"""
+Скомпилированный инференс ансамбля (LightGBM, XGBoost, CatBoost, Random Forest)
+
+Деревья всех моделей выгружаются в плоские numpy массивы (признак, порог,
+левый/правый потомок, значение листа). Прогноз - один векторизованный проход
+по всем деревьям сразу вместо отдельного predict_proba каждой модели:
+- для одной строки это доли мс вместо ~10 мс (Python обертки, пул
+  потоков RandomForest, повторный вызов каждой модели)
+- массивы сохраняются в файл ансамбля и при mmap_mode='r' общие для воркеров
+
+Все условия приведены к виду `x <= threshold` -> левый потомок:
+- sklearn / CatBoost / XGBoost сравнивают float32 признаки
+- XGBoost ветвится по `x < t`, это `x <= предыдущее float32 перед t`
+- LightGBM сравнивает float64
+
+Модели, которые не удалось выгрузить (категориальные сплиты, неизвестный
+тип), считаются своим predict_proba в том же вызове.
+"""
+import json
+import os
+import tempfile
+
+import numpy as np
+
+# Обработка пропусков (NaN) в узле
+MISSING_DEFAULT = 0   # NaN -> default_left
+MISSING_AS_ZERO = 1   # NaN -> 0.0 (LightGBM missing_type=None)
+MISSING_ZERO = 2      # 0.0 и NaN -> default_left (LightGBM missing_type=Zero)
+
+# Как листья деревьев модели превращаются в вероятность
+OUTPUT_MEAN = 'mean'        # среднее по деревьям (Random Forest)
+OUTPUT_SIGMOID = 'sigmoid'  # sigmoid(scale * сумма + bias) (бустинги)
+
+ARRAY_FIELDS = ('feature', 'threshold', 'left', 'right', 'value', 'default_left', 'missing', 'use_f32')
+
+
+class UnsupportedModel(Exception):
+    """Модель (или ее часть) нельзя выгрузить в массивы - остается в fallback"""
+
+
+class _Tree:
+    """Одно дерево в плоском виде; лист - feature == -1"""
+
+    def __init__(self, use_f32):
+        self.use_f32 = use_f32
+        self.feature = []
+        self.threshold = []
+        self.left = []
+        self.right = []
+        self.value = []
+        self.default_left = []
+        self.missing = []
+
+    def add(self, feature=-1, threshold=0.0, value=0.0, default_left=True, missing=MISSING_DEFAULT):
+        self.feature.append(feature)
+        self.threshold.append(threshold)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.value.append(value)
+        self.default_left.append(default_left)
+        self.missing.append(missing)
+        return len(self.feature) - 1
+
+    def __len__(self):
+        return len(self.feature)
+
+
+# --- Выгрузка моделей ---
+
+def _export_sklearn_forest(model):
+    if list(model.classes_) != [0, 1]:
+        raise UnsupportedModel('only binary 0/1 classifiers are supported')
+
+    trees = []
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        value = tree.value[:, 0, :]
+        positive = value[:, 1] / value.sum(axis=1)
+        missing_left = getattr(tree, 'missing_go_to_left', None)
+
+        exported = _Tree(use_f32=True)
+        for node in range(tree.node_count):
+            if tree.children_left[node] == -1:
+                exported.add(value=float(positive[node]))
+            else:
+                exported.add(
+                    feature=int(tree.feature[node]),
+                    threshold=float(tree.threshold[node]),
+                    default_left=bool(missing_left[node]) if missing_left is not None else True,
+                )
+                exported.left[node] = int(tree.children_left[node])
+                exported.right[node] = int(tree.children_right[node])
+        trees.append(exported)
+
+    return trees, OUTPUT_MEAN, 1.0, 0.0
+
+
+def _xgboost_feature_index(split, feature_names):
+    if feature_names:
+        return feature_names.index(split)
+    return int(split[1:])  # 'f12'
+
+
+def _export_xgboost(model):
+    booster = model.get_booster()
+    config = json.loads(booster.save_config())
+    objective = config['learner']['objective']['name']
+    if objective != 'binary:logistic':
+        raise UnsupportedModel(f'objective {objective}')
+
+    # base_score хранится как '5E-1' или '[5E-1]' (XGBoost >= 3)
+    base_score = float(str(config['learner']['learner_model_param']['base_score']).strip('[]'))
+    bias = float(np.log(base_score / (1 - base_score)))
+
+    iteration_range = (0, 0)
+    try:
+        iteration_range = (0, model.best_iteration + 1)
+    except AttributeError:
+        pass
+    if iteration_range != (0, 0):
+        booster = booster[iteration_range[0]:iteration_range[1]]
+
+    feature_names = booster.feature_names
+    trees = []
+    for dump in booster.get_dump(dump_format='json'):
+        exported = _Tree(use_f32=True)
+
+        def visit(node):
+            if 'leaf' in node:
+                return exported.add(value=float(node['leaf']))
+            if 'split_condition' not in node:
+                raise UnsupportedModel('categorical splits')
+            threshold = np.nextafter(np.float32(node['split_condition']), np.float32(-np.inf))
+            index = exported.add(
+                feature=_xgboost_feature_index(node['split'], feature_names),
+                threshold=float(threshold),
+                default_left=node['missing'] == node['yes'],
+            )
+            children = {child['nodeid']: child for child in node['children']}
+            exported.left[index] = visit(children[node['yes']])
+            exported.right[index] = visit(children[node['no']])
+            return index
+
+        visit(json.loads(dump))
+        trees.append(exported)
+
+    return trees, OUTPUT_SIGMOID, 1.0, bias
+
+
+LIGHTGBM_MISSING = {'None': MISSING_AS_ZERO, 'Zero': MISSING_ZERO, 'NaN': MISSING_DEFAULT}
+
+
+def _export_lightgbm(model):
+    booster = model.booster_
+    dump = booster.dump_model()
+    if dump['num_tree_per_iteration'] != 1 or not dump['objective'].startswith('binary'):
+        raise UnsupportedModel(f"objective {dump['objective']}")
+    if dump.get('average_output'):
+        raise UnsupportedModel('average_output (rf boosting)')
+
+    # 'binary sigmoid:1' - коэффициент sigmoid
+    scale = 1.0
+    for part in dump['objective'].split():
+        if part.startswith('sigmoid:'):
+            scale = float(part.split(':')[1])
+
+    trees = []
+    for info in dump['tree_info']:
+        exported = _Tree(use_f32=False)
+
+        def visit(node):
+            if 'leaf_value' in node:
+                return exported.add(value=float(node['leaf_value']))
+            if node['decision_type'] != '<=':
+                raise UnsupportedModel('categorical splits')
+            index = exported.add(
+                feature=int(node['split_feature']),
+                threshold=float(node['threshold']),
+                default_left=bool(node['default_left']),
+                missing=LIGHTGBM_MISSING[node['missing_type']],
+            )
+            exported.left[index] = visit(node['left_child'])
+            exported.right[index] = visit(node['right_child'])
+            return index
+
+        visit(info['tree_structure'])
+        trees.append(exported)
+
+    return trees, OUTPUT_SIGMOID, scale, 0.0
+
+
+def _export_catboost(model):
+    handle, path = tempfile.mkstemp(suffix='.json')
+    os.close(handle)
+    try:
+        model.save_model(path, format='json')
+        with open(path) as f:
+            dump = json.load(f)
+    finally:
+        os.remove(path)
+
+    features_info = dump['features_info']
+    if features_info.get('categorical_features') or 'oblivious_trees' not in dump:
+        raise UnsupportedModel('categorical features / non-oblivious trees')
+    flat_index = {
+        feature['feature_index']: feature.get('flat_feature_index', feature['feature_index'])
+        for feature in features_info['float_features']
+    }
+    nan_left = {
+        feature['feature_index']: feature.get('nan_value_treatment', 'AsIs') != 'AsTrue'
+        for feature in features_info['float_features']
+    }
+
+    scale, bias = dump.get('scale_and_bias', [1.0, [0.0]])
+    if isinstance(bias, list):
+        bias = bias[0]
+
+    trees = []
+    for oblivious in dump['oblivious_trees']:
+        splits = oblivious['splits']
+        leaf_values = oblivious['leaf_values']
+        exported = _Tree(use_f32=True)
+
+        # Уровень k проверяет split k; бит k индекса листа = (x > border)
+        def build(level, leaf_index):
+            if level == len(splits):
+                return exported.add(value=float(leaf_values[leaf_index]))
+            split = splits[level]
+            if 'float_feature_index' not in split:
+                raise UnsupportedModel(f"{split.get('split_type')} splits")
+            feature = split['float_feature_index']
+            index = exported.add(
+                feature=flat_index[feature],
+                threshold=float(np.float32(split['border'])),
+                default_left=nan_left[feature],
+            )
+            exported.left[index] = build(level + 1, leaf_index)
+            exported.right[index] = build(level + 1, leaf_index | (1 << level))
+            return index
+
+        build(0, 0)
+        trees.append(exported)
+
+    return trees, OUTPUT_SIGMOID, float(scale), float(bias)
+
+
+def export_model(model):
+    """
+    Выгрузить деревья модели
+
+    Returns:
+        (trees, output, scale, bias)
+
+    Raises:
+        UnsupportedModel: модель не поддерживается
+    """
+    kind = type(model).__name__
+    if kind in ('RandomForestClassifier', 'ExtraTreesClassifier'):
+        return _export_sklearn_forest(model)
+    if kind == 'XGBClassifier':
+        return _export_xgboost(model)
+    if kind == 'LGBMClassifier':
+        return _export_lightgbm(model)
+    if kind == 'CatBoostClassifier':
+        return _export_catboost(model)
+    raise UnsupportedModel(kind)
+
+
+# --- Вычисление ---
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class CompiledEnsemble:
+    """
+    Все деревья ансамбля в общих массивах
+
+    Узлы всех деревьев склеены; roots - корень каждого дерева,
+    model_starts - первое дерево каждой модели (для np.add.reduceat).
+    """
+
+    def __init__(self, arrays, model_names, outputs, scales, biases, tree_counts, fallback=None):
+        for field in ARRAY_FIELDS + ('roots',):
+            setattr(self, field, arrays[field])
+        self.max_depth = int(arrays['max_depth'])
+        self.model_names = list(model_names)
+        self.outputs = list(outputs)
+        self.scales = np.asarray(scales, dtype=float)
+        self.biases = np.asarray(biases, dtype=float)
+        self.tree_counts = np.asarray(tree_counts)
+        self.model_starts = np.concatenate([[0], np.cumsum(self.tree_counts)[:-1]]).astype(np.intp)
+        self.fallback = dict(fallback or {})
+        self.has_zero_missing = bool(np.any(self.missing == MISSING_ZERO))
+        self._prepare()
+
+    @classmethod
+    def from_models(cls, models):
+        """
+        Скомпилировать словарь {имя: модель}
+
+        Неподдерживаемые модели остаются в fallback (их predict_proba).
+        """
+        model_names, outputs, scales, biases, tree_counts = [], [], [], [], []
+        trees = []
+        fallback = {}
+        for name, model in models.items():
+            try:
+                model_trees, output, scale, bias = export_model(model)
+            except UnsupportedModel as e:
+                print(f"⚠️  {name}: без компиляции ({e})")
+                fallback[name] = model
+                continue
+            if not model_trees:
+                fallback[name] = model
+                continue
+            model_names.append(name)
+            outputs.append(output)
+            scales.append(scale)
+            biases.append(bias)
+            tree_counts.append(len(model_trees))
+            trees.extend(model_trees)
+
+        return cls(cls._concatenate(trees), model_names, outputs, scales, biases, tree_counts, fallback)
+
+    @staticmethod
+    def _concatenate(trees):
+        offsets = np.cumsum([0] + [len(tree) for tree in trees])
+        feature, threshold, left, right, value, default_left, missing, use_f32 = ([] for _ in range(8))
+        for tree, offset in zip(trees, offsets):
+            feature.extend(tree.feature)
+            threshold.extend(tree.threshold)
+            left.extend(child + offset if child >= 0 else -1 for child in tree.left)
+            right.extend(child + offset if child >= 0 else -1 for child in tree.right)
+            value.extend(tree.value)
+            default_left.extend(tree.default_left)
+            missing.extend(tree.missing)
+            use_f32.extend([tree.use_f32] * len(tree))
+
+        arrays = {
+            'feature': np.asarray(feature, dtype=np.int32),
+            'threshold': np.asarray(threshold, dtype=np.float64),
+            'left': np.asarray(left, dtype=np.int32),
+            'right': np.asarray(right, dtype=np.int32),
+            'value': np.asarray(value, dtype=np.float64),
+            'default_left': np.asarray(default_left, dtype=bool),
+            'missing': np.asarray(missing, dtype=np.int8),
+            'use_f32': np.asarray(use_f32, dtype=bool),
+            'roots': np.asarray(offsets[:-1], dtype=np.int32),
+        }
+        arrays['max_depth'] = CompiledEnsemble._max_depth(arrays)
+        return arrays
+
+    @staticmethod
+    def _max_depth(arrays):
+        depth = 0
+        level = arrays['roots']
+        while len(level):
+            internal = level[arrays['feature'][level] >= 0]
+            if not len(internal):
+                break
+            depth += 1
+            level = np.concatenate([arrays['left'][internal], arrays['right'][internal]])
+        return depth
+
+    def to_dict(self):
+        """Массивы и метаданные для сохранения в файл ансамбля (без fallback моделей)"""
+        data = {field: getattr(self, field) for field in ARRAY_FIELDS + ('roots',)}
+        data.update({
+            'max_depth': self.max_depth,
+            'model_names': self.model_names,
+            'outputs': self.outputs,
+            'scales': self.scales.tolist(),
+            'biases': self.biases.tolist(),
+            'tree_counts': self.tree_counts.tolist(),
+            'fallback': sorted(self.fallback),
+        })
+        return data
+
+    @classmethod
+    def from_dict(cls, data, models):
+        """Восстановить из to_dict(); fallback модели берутся из models"""
+        fallback = {name: models[name] for name in data['fallback']}
+        return cls(data, data['model_names'], data['outputs'], data['scales'],
+                   data['biases'], data['tree_counts'], fallback)
+
+    def covers(self, models) -> bool:
+        """Скомпилированы ровно эти модели"""
+        return set(self.model_names) | set(self.fallback) == set(models)
+
+    def _prepare(self):
+        """Рабочие массивы: лист ссылается сам на себя, потомки рядом (2 * node + go_right)"""
+        nodes = np.arange(len(self.feature), dtype=np.int32)
+        self.is_leaf = self.feature < 0
+        self.children = np.empty(2 * len(self.feature), dtype=np.int32)
+        self.children[0::2] = np.where(self.is_leaf, nodes, self.left)
+        self.children[1::2] = np.where(self.is_leaf, nodes, self.right)
+        self.columns = {}
+
+    def _columns(self, n_features):
+        """Колонка матрицы [X float64 | X float32] для каждого узла"""
+        columns = self.columns.get(n_features)
+        if columns is None:
+            columns = np.where(self.is_leaf, 0, self.feature) + self.use_f32 * n_features
+            self.columns[n_features] = columns
+        return columns
+
+    def _leaf_values(self, X):
+        """Значения листьев: матрица (строки x деревья)"""
+        n_rows, n_features = X.shape
+        n_trees = len(self.roots)
+        values = np.concatenate([X, X.astype(np.float32).astype(np.float64)], axis=1).ravel()
+        columns = self._columns(n_features)
+        check_missing = self.has_zero_missing or bool(np.isnan(X).any())
+
+        # Плоский список пар (строка, дерево); дошедшие до листа периодически выбрасываются
+        node = np.tile(self.roots, n_rows)
+        active = np.arange(n_rows * n_trees)
+        current = node.copy()
+        offset = np.repeat(np.arange(n_rows) * 2 * n_features, n_trees)
+        for depth in range(self.max_depth):
+            x = values[offset + columns[current]]
+            threshold = self.threshold[current]
+            go_right = x > threshold
+            if check_missing:
+                go_right = self._missing_right(current, x, threshold, go_right)
+            current = self.children[2 * current + go_right]
+
+            if depth % 4 == 3:
+                node[active] = current
+                keep = ~self.is_leaf[current]
+                active, current, offset = active[keep], current[keep], offset[keep]
+                if not len(active):
+                    break
+
+        node[active] = current
+        return self.value[node].reshape(n_rows, n_trees)
+
+    def _missing_right(self, current, x, threshold, go_right):
+        mode = self.missing[current]
+        nan = np.isnan(x)
+        as_zero = nan & (mode == MISSING_AS_ZERO)
+        go_right = np.where(as_zero, 0.0 > threshold, go_right)
+        missing = (nan & ~as_zero) | ((mode == MISSING_ZERO) & (np.abs(x) <= 1e-35))
+        return np.where(missing, ~self.default_left[current], go_right)
+
+    def predict_proba(self, X):
+        """
+        Вероятность класса 1 от каждой модели за один проход
+
+        Args:
+            X: матрица признаков (уже после scaler)
+
+        Returns:
+            dict {имя модели: np.ndarray}
+        """
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        probas = {}
+        if len(self.model_names):
+            sums = np.add.reduceat(self._leaf_values(X), self.model_starts, axis=1)
+            for column, name in enumerate(self.model_names):
+                if self.outputs[column] == OUTPUT_MEAN:
+                    probas[name] = sums[:, column] / self.tree_counts[column]
+                else:
+                    probas[name] = _sigmoid(self.scales[column] * sums[:, column] + self.biases[column])
+
+        for name, model in self.fallback.items():
+            probas[name] = model.predict_proba(X)[:, 1]
+        return probas
+
+    def stats(self):
+        return {
+            'models': self.model_names,
+            'fallback': sorted(self.fallback),
+            'trees': int(len(self.roots)),
+            'nodes': int(len(self.feature)),
+            'max_depth': self.max_depth,
+        }
@@ -0,0 +1,420 @@
+"""
+Признаки для обучения из базы матчей (prepare_training_data.py)
+
+Построчный режим ('rows') делает ~5 запросов на каждый матч: форма обеих
+команд, личные встречи и две команды (N+1). Пакетные режимы считают то же
+самое для всего датасета за 3 запроса:
+- 'sql': форма - оконные функции по объединению домашних и выездных матчей
+  (PARTITION BY команда, ROWS 5 PRECEDING), H2H - окно по паре команд,
+  статистика команд - JOIN с teams
+- 'pandas': одна выборка матчей, окна через groupby + cumsum
+  (для SQLite без оконных функций, < 3.25)
+
+Результат совпадает с построчным режимом колонка в колонку.
+"""
+import os
+import sqlite3
+import sys
+
+import pandas as pd
+from sqlalchemy import and_, case, func, select, union_all
+from sqlalchemy.orm import aliased
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Team, Match
+
+FINISHED = 'FINISHED'
+FORM_MATCHES = 5
+H2H_MATCHES = 5
+SKIP_FIRST = 10  # первые матчи без достаточной истории
+
+FEATURE_COLUMNS = [
+    'match_id', 'date', 'league',
+    'home_recent_wins', 'home_recent_draws', 'home_recent_losses',
+    'home_recent_goals_for', 'home_recent_goals_against', 'home_recent_form_points',
+    'away_recent_wins', 'away_recent_draws', 'away_recent_losses',
+    'away_recent_goals_for', 'away_recent_goals_against', 'away_recent_form_points',
+    'h2h_home_wins', 'h2h_draws', 'h2h_away_wins',
+    'home_avg_goals', 'home_total_matches', 'away_avg_goals', 'away_total_matches',
+    'total_goals', 'over_2_5', 'btts', 'home_win', 'draw', 'away_win',
+]
+FORM_STATS = ['wins', 'draws', 'losses', 'goals_for', 'goals_against']
+
+
+# ============================================================================
+# Построчный режим (запросы на каждый матч)
+# ============================================================================
+
+def calculate_recent_form(team_id, before_date, num_matches=5):
+    """
+    Рассчитать форму команды за последние N матчей
+    """
+    # Получить последние матчи до указанной даты
+    matches = Match.query.filter(
+        and_(
+            Match.status == 'FINISHED',
+            Match.match_date < before_date,
+            (Match.home_team_id == team_id) | (Match.away_team_id == team_id)
+        )
+    ).order_by(Match.match_date.desc()).limit(num_matches).all()
+
+    if not matches:
+        return 0, 0, 0, 0, 0  # Нет данных
+
+    wins = 0
+    draws = 0
+    losses = 0
+    goals_scored = 0
+    goals_conceded = 0
+
+    for match in matches:
+        is_home = match.home_team_id == team_id
+
+        if is_home:
+            goals_scored += match.home_goals
+            goals_conceded += match.away_goals
+
+            if match.home_goals > match.away_goals:
+                wins += 1
+            elif match.home_goals == match.away_goals:
+                draws += 1
+            else:
+                losses += 1
+        else:
+            goals_scored += match.away_goals
+            goals_conceded += match.home_goals
+
+            if match.away_goals > match.home_goals:
+                wins += 1
+            elif match.away_goals == match.home_goals:
+                draws += 1
+            else:
+                losses += 1
+
+    return wins, draws, losses, goals_scored, goals_conceded
+
+
+def calculate_head_to_head(home_team_id, away_team_id, before_date, num_matches=5):
+    """
+    Статистика личных встреч
+    """
+    h2h_matches = Match.query.filter(
+        and_(
+            Match.status == 'FINISHED',
+            Match.match_date < before_date,
+            ((Match.home_team_id == home_team_id) & (Match.away_team_id == away_team_id)) |
+            ((Match.home_team_id == away_team_id) & (Match.away_team_id == home_team_id))
+        )
+    ).order_by(Match.match_date.desc()).limit(num_matches).all()
+
+    if not h2h_matches:
+        return 0, 0, 0
+
+    home_wins = 0
+    draws = 0
+    away_wins = 0
+
+    for match in h2h_matches:
+        if match.home_team_id == home_team_id:
+            if match.home_goals > match.away_goals:
+                home_wins += 1
+            elif match.home_goals == match.away_goals:
+                draws += 1
+            else:
+                away_wins += 1
+        else:
+            if match.away_goals > match.home_goals:
+                home_wins += 1
+            elif match.away_goals == match.home_goals:
+                draws += 1
+            else:
+                away_wins += 1
+
+    return home_wins, draws, away_wins
+
+
+def extract_features_for_match(match):
+    """
+    Извлечь признаки для одного матча
+    """
+    features = {}
+
+    # Базовая информация
+    features['match_id'] = match.id
+    features['date'] = match.match_date
+    features['league'] = match.league
+
+    # Форма домашней команды (последние 5 матчей)
+    home_wins, home_draws, home_losses, home_gf, home_ga = calculate_recent_form(
+        match.home_team_id, match.match_date, 5
+    )
+
+    features['home_recent_wins'] = home_wins
+    features['home_recent_draws'] = home_draws
+    features['home_recent_losses'] = home_losses
+    features['home_recent_goals_for'] = home_gf
+    features['home_recent_goals_against'] = home_ga
+    features['home_recent_form_points'] = home_wins * 3 + home_draws
+
+    # Форма гостевой команды
+    away_wins, away_draws, away_losses, away_gf, away_ga = calculate_recent_form(
+        match.away_team_id, match.match_date, 5
+    )
+
+    features['away_recent_wins'] = away_wins
+    features['away_recent_draws'] = away_draws
+    features['away_recent_losses'] = away_losses
+    features['away_recent_goals_for'] = away_gf
+    features['away_recent_goals_against'] = away_ga
+    features['away_recent_form_points'] = away_wins * 3 + away_draws
+
+    # Личные встречи
+    h2h_home_wins, h2h_draws, h2h_away_wins = calculate_head_to_head(
+        match.home_team_id, match.away_team_id, match.match_date, 5
+    )
+
+    features['h2h_home_wins'] = h2h_home_wins
+    features['h2h_draws'] = h2h_draws
+    features['h2h_away_wins'] = h2h_away_wins
+
+    # Статистика команд из БД
+    home_team = Team.query.get(match.home_team_id)
+    away_team = Team.query.get(match.away_team_id)
+
+    if home_team:
+        features['home_avg_goals'] = home_team.avg_goals_per_match
+        features['home_total_matches'] = home_team.total_matches
+    else:
+        features['home_avg_goals'] = 0
+        features['home_total_matches'] = 0
+
+    if away_team:
+        features['away_avg_goals'] = away_team.avg_goals_per_match
+        features['away_total_matches'] = away_team.total_matches
+    else:
+        features['away_avg_goals'] = 0
+        features['away_total_matches'] = 0
+
+    # Целевые переменные
+    features['total_goals'] = match.total_goals
+    features['over_2_5'] = 1 if match.over_2_5 else 0
+    features['btts'] = 1 if match.btts else 0
+    features['home_win'] = 1 if match.result == '1' else 0
+    features['draw'] = 1 if match.result == 'X' else 0
+    features['away_win'] = 1 if match.result == '2' else 0
+
+    return features
+
+
+def _features_by_rows(session, skip_first):
+    matches = Match.query.filter_by(status=FINISHED).order_by(Match.match_date, Match.id).all()
+    dataset = []
+    for match in matches[skip_first:]:
+        try:
+            dataset.append(extract_features_for_match(match))
+        except Exception:
+            continue  # неполный счет в истории матча
+    return pd.DataFrame(dataset, columns=FEATURE_COLUMNS)
+
+
+# ============================================================================
+# Пакетные режимы
+# ============================================================================
+
+def supports_window_functions(session) -> bool:
+    dialect = session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        return sqlite3.sqlite_version_info >= (3, 25, 0)
+    return dialect == 'postgresql'
+
+
+def _finished_matches(session) -> pd.DataFrame:
+    """Завершенные матчи со статистикой обеих команд (один запрос)"""
+    home, away = aliased(Team), aliased(Team)
+    query = (
+        select(
+            Match.id.label('match_id'), Match.match_date.label('date'), Match.league,
+            Match.home_team_id, Match.away_team_id, Match.home_goals, Match.away_goals,
+            Match.total_goals, Match.over_2_5, Match.btts, Match.result,
+            home.id.label('home_found'), home.avg_goals_per_match.label('home_avg_goals'),
+            home.total_matches.label('home_total_matches'),
+            away.id.label('away_found'), away.avg_goals_per_match.label('away_avg_goals'),
+            away.total_matches.label('away_total_matches'),
+        )
+        .outerjoin(home, home.id == Match.home_team_id)
+        .outerjoin(away, away.id == Match.away_team_id)
+        .where(Match.status == FINISHED)
+        .order_by(Match.match_date, Match.id)
+    )
+    rows = session.execute(query).all()
+    return pd.DataFrame(rows, columns=list(query.selected_columns.keys()))
+
+
+def _outcome_counts(goals_for, goals_against):
+    """wins, draws, losses, goals_for, goals_against, incomplete (счет неизвестен)"""
+    return [goals_for > goals_against, goals_for == goals_against, goals_for < goals_against,
+            goals_for, goals_against, goals_for.is_(None) | goals_against.is_(None)]
+
+
+def _form_sql(session) -> pd.DataFrame:
+    """Форма команды перед каждым матчем: окно по 5 предыдущим матчам команды"""
+    finished = Match.status == FINISHED
+    games = union_all(
+        select(Match.id.label('match_id'), Match.match_date, Match.home_team_id.label('team_id'),
+               Match.home_goals.label('goals_for'), Match.away_goals.label('goals_against')).where(finished),
+        select(Match.id, Match.match_date, Match.away_team_id,
+               Match.away_goals, Match.home_goals).where(finished),
+    ).cte('team_games')
+
+    window = {
+        'partition_by': games.c.team_id,
+        'order_by': (games.c.match_date, games.c.match_id),
+        'rows': (-FORM_MATCHES, -1),
+    }
+    columns = []
+    for name, expr in zip(FORM_STATS + ['incomplete'], _outcome_counts(games.c.goals_for, games.c.goals_against)):
+        value = expr if name in ('goals_for', 'goals_against') else case((expr, 1), else_=0)
+        columns.append(func.coalesce(func.sum(value).over(**window), 0).label(name))
+
+    rows = session.execute(select(games.c.match_id, games.c.team_id, *columns)).all()
+    return pd.DataFrame(rows, columns=['match_id', 'team_id'] + FORM_STATS + ['incomplete'])
+
+
+def _h2h_sql(session) -> pd.DataFrame:
+    """Личные встречи перед каждым матчем: окно по паре (меньший id, больший id)"""
+    home_is_low = Match.home_team_id < Match.away_team_id
+    pairs = (
+        select(
+            Match.id.label('match_id'), Match.match_date,
+            case((home_is_low, Match.home_team_id), else_=Match.away_team_id).label('low_id'),
+            case((home_is_low, Match.away_team_id), else_=Match.home_team_id).label('high_id'),
+            case((home_is_low, Match.home_goals), else_=Match.away_goals).label('low_goals'),
+            case((home_is_low, Match.away_goals), else_=Match.home_goals).label('high_goals'),
+        )
+        .where(Match.status == FINISHED)
+        .cte('pairs')
+    )
+
+    window = {
+        'partition_by': (pairs.c.low_id, pairs.c.high_id),
+        'order_by': (pairs.c.match_date, pairs.c.match_id),
+        'rows': (-H2H_MATCHES, -1),
+    }
+    wins, draws, losses, _, _, incomplete = _outcome_counts(pairs.c.low_goals, pairs.c.high_goals)
+    columns = [
+        func.coalesce(func.sum(case((expr, 1), else_=0)).over(**window), 0).label(name)
+        for name, expr in [('low_wins', wins), ('draws', draws), ('high_wins', losses), ('incomplete', incomplete)]
+    ]
+
+    rows = session.execute(select(pairs.c.match_id, pairs.c.low_id, *columns)).all()
+    return pd.DataFrame(rows, columns=['match_id', 'low_id', 'low_wins', 'draws', 'high_wins', 'incomplete'])
+
+
+def _previous_sum(df, keys, columns, n):
+    """Сумма колонок по n предыдущим строкам группы (df отсортирован по времени)"""
+    cumsum = df.groupby(keys, sort=False)[columns].cumsum()
+    before = cumsum - df[columns]
+    older = cumsum.groupby([df[key] for key in keys], sort=False).shift(n + 1).fillna(0)
+    return (before - older).astype(int)
+
+
+def _outcome_frame(goals_for, goals_against):
+    incomplete = goals_for.isna() | goals_against.isna()
+    return pd.DataFrame({
+        'wins': goals_for > goals_against,
+        'draws': goals_for == goals_against,
+        'losses': goals_for < goals_against,
+        'goals_for': goals_for.fillna(0),
+        'goals_against': goals_against.fillna(0),
+        'incomplete': incomplete,
+    }).astype(int)
+
+
+def _form_pandas(matches: pd.DataFrame) -> pd.DataFrame:
+    home = pd.DataFrame({'match_id': matches['match_id'], 'date': matches['date'], 'team_id': matches['home_team_id']})
+    home = home.join(_outcome_frame(matches['home_goals'], matches['away_goals']))
+    away = pd.DataFrame({'match_id': matches['match_id'], 'date': matches['date'], 'team_id': matches['away_team_id']})
+    away = away.join(_outcome_frame(matches['away_goals'], matches['home_goals']))
+
+    games = pd.concat([home, away], ignore_index=True).sort_values(['team_id', 'date', 'match_id'], kind='stable')
+    games = games.reset_index(drop=True)
+    columns = FORM_STATS + ['incomplete']
+    games[columns] = _previous_sum(games, ['team_id'], columns, FORM_MATCHES)
+    return games[['match_id', 'team_id'] + columns]
+
+
+def _h2h_pandas(matches: pd.DataFrame) -> pd.DataFrame:
+    home_is_low = matches['home_team_id'] < matches['away_team_id']
+    pairs = pd.DataFrame({
+        'match_id': matches['match_id'],
+        'date': matches['date'],
+        'low_id': matches['home_team_id'].where(home_is_low, matches['away_team_id']),
+        'high_id': matches['away_team_id'].where(home_is_low, matches['home_team_id']),
+    })
+    outcomes = _outcome_frame(matches['home_goals'].where(home_is_low, matches['away_goals']),
+                              matches['away_goals'].where(home_is_low, matches['home_goals']))
+    pairs = pairs.join(outcomes.rename(columns={'wins': 'low_wins', 'losses': 'high_wins'}))
+
+    pairs = pairs.sort_values(['low_id', 'high_id', 'date', 'match_id'], kind='stable').reset_index(drop=True)
+    columns = ['low_wins', 'draws', 'high_wins', 'incomplete']
+    pairs[columns] = _previous_sum(pairs, ['low_id', 'high_id'], columns, H2H_MATCHES)
+    return pairs[['match_id', 'low_id'] + columns]
+
+
+def _assemble(matches, form, h2h, skip_first):
+    df = matches.iloc[skip_first:]
+
+    for side in ('home', 'away'):
+        side_form = form.rename(columns={'team_id': f'{side}_team_id', 'incomplete': f'{side}_incomplete',
+                                         **{stat: f'{side}_recent_{stat}' for stat in FORM_STATS}})
+        df = df.merge(side_form, on=['match_id', f'{side}_team_id'], how='left')
+        df[f'{side}_recent_form_points'] = df[f'{side}_recent_wins'] * 3 + df[f'{side}_recent_draws']
+
+        # Команды нет в teams -> 0 (как в построчном режиме)
+        missing = df[f'{side}_found'].isna()
+        df.loc[missing, [f'{side}_avg_goals', f'{side}_total_matches']] = 0
+        if not df[f'{side}_total_matches'].isna().any():
+            df[f'{side}_total_matches'] = df[f'{side}_total_matches'].astype(int)
+
+    df = df.merge(h2h.rename(columns={'incomplete': 'h2h_incomplete'}), on='match_id', how='left')
+    home_is_low = df['home_team_id'] == df['low_id']
+    df['h2h_home_wins'] = df['low_wins'].where(home_is_low, df['high_wins'])
+    df['h2h_away_wins'] = df['high_wins'].where(home_is_low, df['low_wins'])
+    df['h2h_draws'] = df['draws']
+
+    df['over_2_5'] = df['over_2_5'].fillna(False).astype(bool).astype(int)
+    df['btts'] = df['btts'].fillna(False).astype(bool).astype(int)
+    df['home_win'] = (df['result'] == '1').astype(int)
+    df['draw'] = (df['result'] == 'X').astype(int)
+    df['away_win'] = (df['result'] == '2').astype(int)
+
+    # Построчный режим пропускает матч, если в его истории есть матч без счета
+    complete = (df['home_incomplete'] == 0) & (df['away_incomplete'] == 0) & (df['h2h_incomplete'] == 0)
+    return df.loc[complete, FEATURE_COLUMNS].reset_index(drop=True)
+
+
+def build_training_features(session, mode='auto', skip_first=SKIP_FIRST) -> pd.DataFrame:
+    """
+    Признаки всех завершенных матчей (без dropna - как собирает prepare_training_data.py)
+
+    Args:
+        session: db.session
+        mode: 'sql', 'pandas', 'rows' или 'auto' (sql, если база умеет оконные функции)
+        skip_first: Сколько первых матчей пропустить (мало истории)
+    """
+    if mode == 'auto':
+        mode = 'sql' if supports_window_functions(session) else 'pandas'
+
+    if mode == 'rows':
+        return _features_by_rows(session, skip_first)
+
+    matches = _finished_matches(session)
+    if mode == 'sql':
+        form, h2h = _form_sql(session), _h2h_sql(session)
+    elif mode == 'pandas':
+        form, h2h = _form_pandas(matches), _h2h_pandas(matches)
+    else:
+        raise ValueError(f"Unknown feature mode: {mode}")
+
+    return _assemble(matches, form, h2h, skip_first)
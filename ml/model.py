@@ -13,6 +13,22 @@ import lightgbm as lgb
 import joblib
 
 
+# Уровни уверенности: (порог вероятности Over 2.5, уверенность, рекомендация)
+CONFIDENCE_LEVELS = [
+    (0.75, 'high', 'Сильная рекомендация'),
+    (0.65, 'medium', 'Умеренная рекомендация'),
+    (0.55, 'low', 'Слабая рекомендация'),
+]
+
+
+def confidence_level(over_2_5_prob):
+    """Уверенность и рекомендация по вероятности Over 2.5"""
+    for threshold, confidence, recommendation in CONFIDENCE_LEVELS:
+        if over_2_5_prob >= threshold:
+            return confidence, recommendation
+    return 'very_low', 'Не рекомендуется'
+
+
 class GoalPredictorModel:
     """
     ML-модель для прогнозирования результатов футбольных матчей
@@ -261,34 +277,41 @@ class GoalPredictorModel:
         Returns:
             dict: Прогноз с вероятностями
         """
+        return self.predict_batch_from_features([features])[0]
+    
+    def predict_batch_from_features(self, features_list):
+        """
+        Сделать прогнозы для нескольких матчей за один вызов модели
+        
+        Args:
+            features_list: список dict с признаками матчей
+        
+        Returns:
+            list: Прогнозы с вероятностями (в том же порядке)
+        """
         if self.model is None:
             raise ValueError("Модель не обучена! Сначала вызовите train() или load_model()")
         
+        if not features_list:
+            return []
+        
         # Преобразовать в DataFrame
-        X = pd.DataFrame([features])[self.feature_names]
+        X = pd.DataFrame(list(features_list))[self.feature_names]
         X_scaled = self.scaler.transform(X)
         
         # Получить вероятности для обоих классов
-        probabilities = self.model.predict_proba(X_scaled)[0]
-        over_2_5_prob = probabilities[1]  # Вероятность Over 2.5
-        
-        # Определить уровень уверенности
-        if over_2_5_prob >= 0.75:
-            confidence = 'high'
-            recommendation = 'Сильная рекомендация'
-        elif over_2_5_prob >= 0.65:
-            confidence = 'medium'
-            recommendation = 'Умеренная рекомендация'
-        elif over_2_5_prob >= 0.55:
-            confidence = 'low'
-            recommendation = 'Слабая рекомендация'
-        else:
-            confidence = 'very_low'
-            recommendation = 'Не рекомендуется'
+        probabilities = self.model.predict_proba(X_scaled)
+        
+        return [self._format_prediction(row[1], row[0]) for row in probabilities]
+    
+    def _format_prediction(self, over_2_5_prob, under_2_5_prob):
+        """Сформировать прогноз по вероятности Over 2.5"""
+        confidence, recommendation = confidence_level(over_2_5_prob)
         
         return {
             'over_2_5': over_2_5_prob,
-            'under_2_5': probabilities[0],
+            'under_2_5': under_2_5_prob,
+            'probability': over_2_5_prob,
             'confidence': confidence,
             'recommendation': recommendation,
             'prediction': 'Over 2.5' if over_2_5_prob >= 0.5 else 'Under 2.5',
@@ -314,8 +337,15 @@ class GoalPredictorModel:
         
         return filepath
     
-    def load_model(self, filename=None):
-        """Загрузить модель с диска"""
+    def load_model(self, filename=None, loader=None):
+        """
+        Загрузить модель с диска
+        
+        Args:
+            loader: Функция path -> объект (по умолчанию joblib.load;
+                    сервисы передают model_registry.load)
+        """
+        loader = loader or joblib.load
         try:
             # Попробовать загрузить новую модель (v2.0)
             over_2_5_path = os.path.join(self.model_path, 'over_2_5_model.pkl')
@@ -323,8 +353,8 @@ class GoalPredictorModel:
             
             if os.path.exists(over_2_5_path) and os.path.exists(features_path):
                 # Новая версия модели (из ml/train.py)
-                self.model = joblib.load(over_2_5_path)
-                self.feature_names = joblib.load(features_path)
+                self.model = loader(over_2_5_path)
+                self.feature_names = loader(features_path)
                 self.model_version = 'v2.0'
                 
                 print(f"📂 Модель загружена: {over_2_5_path}")
@@ -350,7 +380,7 @@ class GoalPredictorModel:
             else:
                 filepath = os.path.join(self.model_path, filename)
             
-            model_data = joblib.load(filepath)
+            model_data = loader(filepath)
             
             # Проверить что это словарь со старым форматом
             if isinstance(model_data, dict):
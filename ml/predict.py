@@ -3,6 +3,7 @@
 """
 import os
 import sys
+import threading
 from datetime import datetime
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -10,6 +11,9 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from ml.model import GoalPredictorModel
 from services.football_api import FootballAPIService
 from services.openai_service import OpenAIService
+from services.explanation_queue import explanation_queue
+from services.model_registry import model_registry
+from services.cache import team_form_cache
 
 
 class PredictionService:
@@ -22,12 +26,23 @@ class PredictionService:
         self.football_api = FootballAPIService()
         self.openai_service = OpenAIService()
         
-        # Загрузить обученную модель
-        try:
-            self.model.load_model()
-        except Exception as e:
-            print(f"⚠️ Не удалось загрузить модель: {e}")
-            print("   Модель нужно обучить! Запустите: python ml/train.py")
+        # Модель загружается при первом прогнозе (model_registry)
+        self.model_requested = False
+        self.model_lock = threading.Lock()
+    
+    def _ensure_model(self):
+        """Загрузить обученную модель при первом использовании"""
+        if self.model_requested:
+            return
+        with self.model_lock:
+            if self.model_requested:
+                return
+            try:
+                self.model.load_model(loader=model_registry.load)
+            except Exception as e:
+                print(f"⚠️ Не удалось загрузить модель: {e}")
+                print("   Модель нужно обучить! Запустите: python ml/train.py")
+            self.model_requested = True
     
     def predict_match(self, match_data, include_explanation=True):
         """
@@ -40,53 +55,141 @@ class PredictionService:
         Returns:
             dict: Полный прогноз с объяснением
         """
-        # Получить статистику команд
-        home_stats = self._get_team_stats(
-            match_data['home_team_id'],
-            is_home=True
-        )
+        return self.predict_matches([match_data], include_explanation)[0]
+    
+    def predict_matches(self, matches, include_explanation=True):
+        """
+        Создать прогнозы для списка матчей
+        
+        Модель вызывается один раз на все матчи
+        
+        Args:
+            matches: Список данных о матчах (из API или БД)
+            include_explanation: Генерировать ли текстовое объяснение
+        
+        Returns:
+            list: Прогнозы в том же порядке, что и matches
+        """
+        self._ensure_model()
+        
+        features_list, team_stats = self.build_features(matches)
         
-        away_stats = self._get_team_stats(
-            match_data['away_team_id'],
-            is_home=False
+        # Получить прогнозы от модели
+        predictions = self.model.predict_batch_from_features(features_list)
+        
+        for prediction, match_data, features, (home_stats, away_stats) in zip(
+            predictions, matches, features_list, team_stats
+        ):
+            prediction['features'] = features
+            
+            # Добавить информацию о матче
+            prediction['match_info'] = {
+                'home_team': match_data['home_team_name'],
+                'away_team': match_data['away_team_name'],
+                'league': match_data.get('league', ''),
+                'date': match_data.get('date', ''),
+            }
+            
+            # Генерировать объяснение через OpenAI
+            if include_explanation:
+                explanation = self._generate_explanation(
+                    prediction,
+                    home_stats,
+                    away_stats,
+                    match_data
+                )
+                prediction['explanation'] = explanation
+        
+        return predictions
+    
+    def build_features(self, matches):
+        """
+        Признаки модели для списка матчей (без инференса)
+        
+        Последние матчи каждой команды загружаются один раз на вызов
+        (команда может играть несколько матчей за горизонт) и берутся
+        из team_form_cache до появления нового завершенного матча
+        
+        Returns:
+            tuple: (features_list, [(home_stats, away_stats)]) в порядке matches
+        """
+        team_ids = dict.fromkeys(
+            team_id for match_data in matches
+            for team_id in (match_data['home_team_id'], match_data['away_team_id'])
         )
+        recent_matches = {team_id: self._get_team_matches(team_id) for team_id in team_ids}
         
-        # Информация о матче
-        match_info = {
-            'date': match_data.get('date', datetime.now()),
-            'league': match_data.get('league', 'Unknown')
-        }
+        team_stats = []
+        features_list = []
         
-        # Получить прогноз от модели
-        prediction = self.model.predict(home_stats, away_stats, match_info)
+        for match_data in matches:
+            # Получить статистику команд
+            home_stats = self._get_team_stats(
+                match_data['home_team_id'],
+                is_home=True,
+                matches=recent_matches[match_data['home_team_id']]
+            )
+            
+            away_stats = self._get_team_stats(
+                match_data['away_team_id'],
+                is_home=False,
+                matches=recent_matches[match_data['away_team_id']]
+            )
+            
+            # Информация о матче
+            match_info = {
+                'date': match_data.get('date', datetime.now()),
+                'league': match_data.get('league', 'Unknown')
+            }
+            
+            team_stats.append((home_stats, away_stats))
+            features_list.append(self.model.create_features(home_stats, away_stats, match_info))
         
-        # Добавить информацию о матче
-        prediction['match_info'] = {
-            'home_team': match_data['home_team_name'],
-            'away_team': match_data['away_team_name'],
-            'league': match_data.get('league', ''),
-            'date': match_data.get('date', ''),
-        }
+        return features_list, team_stats
+    
+    def _get_team_matches(self, team_id):
+        """
+        Последние завершенные матчи команды (team_form_cache, kind='last_matches')
         
-        # Генерировать объяснение через OpenAI
-        if include_explanation:
-            explanation = self._generate_explanation(
-                prediction,
-                home_stats,
-                away_stats,
-                match_data
+        Returns:
+            list: матчи в формате FootballAPIService или None при ошибке API
+        """
+        try:
+            return team_form_cache.get_or_fetch(
+                team_id,
+                lambda: self._fetch_team_matches(team_id),
+                kind='last_matches'
             )
-            prediction['explanation'] = explanation
+        except Exception as e:
+            print(f"⚠️ Ошибка при получении матчей команды {team_id}: {e}")
+            return None
+    
+    def _fetch_team_matches(self, team_id):
+        """
+        Returns:
+            tuple: (матчи, дата последнего завершенного матча или None - не кэшировать)
+        """
+        matches = self.football_api.get_team_last_matches(team_id, limit=10)
+        if not matches:
+            return matches, None
         
-        return prediction
+        last_finished_at = max(
+            datetime.fromisoformat(match['date'].replace('Z', '+00:00')) for match in matches
+        )
+        return matches, last_finished_at
     
-    def _get_team_stats(self, team_id, is_home=True):
+    def _get_team_stats(self, team_id, is_home=True, matches=None):
         """
-        Получить статистику команды из API или БД
+        Получить статистику команды по последним матчам
+        
+        Args:
+            matches: Уже загруженные матчи (build_features); None - загрузить
         """
         try:
-            # Получить последние матчи команды
-            matches = self.football_api.get_team_last_matches(team_id, limit=10)
+            if matches is None:
+                matches = self._get_team_matches(team_id)
+            if matches is None:
+                return self._get_default_stats()
             
             # Рассчитать статистику
             stats = self._calculate_stats_from_matches(matches, team_id, is_home)
@@ -188,7 +291,13 @@ class PredictionService:
     def _generate_explanation(self, prediction, home_stats, away_stats, match_data):
         """
         Генерировать текстовое объяснение прогноза через OpenAI
+        
+        Если очередь объяснений запущена и матч есть в БД (match_id), запрос к OpenAI
+        уходит в фон, а сейчас возвращается шаблонный текст
         """
+        if explanation_queue.running and match_data.get('match_id') is not None:
+            return explanation_queue.submit(match_data['match_id'], prediction, home_stats, away_stats, match_data)
+        
         try:
             explanation = self.openai_service.generate_match_explanation(
                 prediction,
@@ -230,17 +339,22 @@ class PredictionService:
         # Получить расписание матчей на сегодня
         matches = self.football_api.get_todays_fixtures(league)
         
-        predictions = []
-        
-        for match in matches:
-            try:
-                # Создать прогноз
-                prediction = self.predict_match(match, include_explanation=True)
-                predictions.append(prediction)
-                
-            except Exception as e:
-                print(f"⚠️ Ошибка прогноза для матча {match.get('id')}: {e}")
-                continue
+        try:
+            # Создать прогнозы одним батчем
+            predictions = self.predict_matches(matches, include_explanation=True)
+        except Exception as e:
+            print(f"⚠️ Ошибка батч-прогноза, прогнозируем по одному: {e}")
+            predictions = []
+            
+            for match in matches:
+                try:
+                    # Создать прогноз
+                    prediction = self.predict_match(match, include_explanation=True)
+                    predictions.append(prediction)
+                    
+                except Exception as e:
+                    print(f"⚠️ Ошибка прогноза для матча {match.get('id')}: {e}")
+                    continue
         
         # Сортировать по вероятности (самые уверенные сначала)
         predictions.sort(key=lambda x: x['probability'], reverse=True)
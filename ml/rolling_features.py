@@ -0,0 +1,193 @@
+"""
+Векторизованный генератор скользящих признаков
+Считает все home_*/away_*_last_{3,5,10} и H2H признаки за один проход
+по отсортированному датасету (groupby + shift + rolling) вместо
+пересчета истории для каждого матча
+"""
+import pandas as pd
+import numpy as np
+
+
+# Статистика -> (колонка для домашней команды, колонка для гостевой)
+# Порядок совпадает с AdvancedFeatureEngineering.calculate_rolling_stats
+ROLLING_STATS = [
+    ('goals_scored', 'FTHG', 'FTAG'),
+    ('goals_conceded', 'FTAG', 'FTHG'),
+    ('shots', 'HS', 'AS'),
+    ('shots_on_target', 'HST', 'AST'),
+    ('corners', 'HC', 'AC'),
+    ('fouls', 'HF', 'AF'),
+    ('yellow_cards', 'HY', 'AY'),
+]
+
+# Признаки формы, которые берутся из датасета как есть (если есть)
+FORM_COLUMNS = [
+    ('home_form_points', 'HTFormPts'),
+    ('away_form_points', 'ATFormPts'),
+    ('home_win_streak_3', 'HTWinStreak3'),
+    ('away_win_streak_3', 'ATWinStreak3'),
+]
+
+
+class RollingFeatureBuilder:
+    """
+    Построитель признаков за один проход
+
+    Результат совпадает с построчным AdvancedFeatureEngineering.create_advanced_features
+    колонка в колонку: для каждого матча используется только история до него
+    (shift(1) внутри группы команды / пары команд)
+    """
+
+    def __init__(self, windows=(3, 5, 10), h2h_last_n=5):
+        self.windows = list(windows)
+        self.h2h_last_n = h2h_last_n
+
+    def _team_rolling(self, df, team_col, side):
+        """
+        Скользящие средние по предыдущим матчам команды (только домашним или только выездным)
+
+        Args:
+            df: Отсортированный по дате DataFrame с позиционным индексом
+            team_col: 'HomeTeam' или 'AwayTeam'
+            side: 'home' или 'away'
+        """
+        column_idx = 1 if side == 'home' else 2
+        source_cols = [stat[column_idx] for stat in ROLLING_STATS if stat[column_idx] in df.columns]
+
+        groups = df.groupby(team_col, sort=False)
+        # Сколько матчей команды было раньше (0 -> статистика по умолчанию = 0)
+        prior_count = groups.cumcount()
+
+        rolled = {}
+        if source_cols:
+            shifted = groups[source_cols].shift(1)
+            shifted_groups = shifted.groupby(df[team_col], sort=False)
+            for window in self.windows:
+                result = shifted_groups.rolling(window=window, min_periods=1).mean()
+                rolled[window] = result.droplevel(0).sort_index()
+
+        features = {}
+        for window in self.windows:
+            for name, home_col, away_col in ROLLING_STATS:
+                source = home_col if side == 'home' else away_col
+                key = f'{side}_{name}_last_{window}'
+                if source in df.columns:
+                    values = rolled[window][source].where(prior_count > 0, 0.0)
+                    features[key] = values.astype(float)
+                else:
+                    features[key] = pd.Series(0, index=df.index)
+        return features
+
+    def _head_to_head(self, df):
+        """H2H по последним N встречам пары (в любом порядке хозяин/гость)"""
+        home = df['HomeTeam'].astype(str)
+        away = df['AwayTeam'].astype(str)
+        pair_key = np.where(home <= away, home + '\x00' + away, away + '\x00' + home)
+        pair_key = pd.Series(pair_key, index=df.index)
+
+        prior_count = df.groupby(pair_key, sort=False).cumcount()
+        has_h2h = prior_count > 0
+
+        goals = pd.DataFrame({
+            'goals': df['TotalGoals'],
+            'over': (df['TotalGoals'] > 2.5).astype(float),
+        })
+        shifted = goals.groupby(pair_key, sort=False).shift(1)
+        rolled = shifted.groupby(pair_key, sort=False).rolling(
+            window=self.h2h_last_n, min_periods=1
+        ).mean().droplevel(0).sort_index()
+
+        return {
+            'h2h_matches': prior_count.clip(upper=self.h2h_last_n).astype('int64'),
+            'h2h_avg_goals': rolled['goals'].where(has_h2h, 0.0),
+            'h2h_over_2_5_pct': rolled['over'].where(has_h2h, 0.0),
+        }
+
+    def _column_order(self, df, base_columns, tail_columns, available_form):
+        """
+        Порядок колонок как у pd.DataFrame(list_of_dicts):
+        признаки формы появляются в словаре только если значение не NaN,
+        поэтому колонки добавляются в порядке первого появления
+        """
+        if not available_form:
+            return base_columns + tail_columns
+
+        presence = pd.DataFrame({
+            feature: df[source].notna() for feature, source in available_form
+        })
+        columns = []
+        seen = set()
+        for mask in presence.drop_duplicates().itertuples(index=False):
+            present = [feature for (feature, _), flag in zip(available_form, mask) if flag]
+            for column in base_columns + present + tail_columns:
+                if column not in seen:
+                    seen.add(column)
+                    columns.append(column)
+        return columns
+
+    def build(self, df, min_history=20):
+        """
+        Построить признаки для всех матчей
+
+        Args:
+            df: DataFrame из load_enhanced_dataset (отсортирован по дате)
+            min_history: Сколько первых матчей пропустить (нужна история)
+
+        Returns:
+            DataFrame: признаки + целевые переменные (без fillna)
+        """
+        df = df.reset_index(drop=True)
+
+        home_features = self._team_rolling(df, 'HomeTeam', 'home')
+        away_features = self._team_rolling(df, 'AwayTeam', 'away')
+        h2h_features = self._head_to_head(df)
+
+        features = {}
+        features.update(home_features)
+        features.update(away_features)
+        features.update(h2h_features)
+
+        # Временные признаки
+        day_of_week = df['Date'].dt.dayofweek.astype('int64')
+        month = df['Date'].dt.month.astype('int64')
+        features['day_of_week'] = day_of_week
+        features['is_weekend'] = (day_of_week >= 5).astype('int64')
+        features['month'] = month
+        features['is_holiday_season'] = month.isin([12, 1]).astype('int64')
+
+        base_columns = list(features.keys())
+
+        # Форма команд из датасета
+        available_form = [(feature, source) for feature, source in FORM_COLUMNS if source in df.columns]
+        for feature, source in available_form:
+            features[feature] = df[source]
+
+        # Расчетные признаки
+        features['expected_home_goals'] = (
+            features['home_goals_scored_last_5'] + features['away_goals_conceded_last_5']
+        ) / 2
+        features['expected_away_goals'] = (
+            features['away_goals_scored_last_5'] + features['home_goals_conceded_last_5']
+        ) / 2
+        features['expected_total_goals'] = features['expected_home_goals'] + features['expected_away_goals']
+        features['attacking_strength'] = (
+            features['home_shots_on_target_last_5'] + features['away_shots_on_target_last_5']
+        )
+        features['total_aggression'] = features['home_fouls_last_5'] + features['away_fouls_last_5']
+
+        # Целевые переменные
+        features['over_2_5'] = df['Over2_5']
+        features['btts'] = df['BTTS']
+
+        tail_columns = [
+            'expected_home_goals', 'expected_away_goals', 'expected_total_goals',
+            'attacking_strength', 'total_aggression', 'over_2_5', 'btts',
+        ]
+
+        # Матчи без достаточной истории не попадают в датасет
+        keep = df.index >= min_history
+        kept = df[keep]
+        columns = self._column_order(kept, base_columns, tail_columns, available_form)
+
+        features_df = pd.DataFrame({column: features[column][keep] for column in columns})
+        return features_df.reset_index(drop=True)
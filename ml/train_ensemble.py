@@ -5,6 +5,7 @@
 import pandas as pd
 import numpy as np
 import os
+import sys
 from datetime import datetime
 from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.preprocessing import StandardScaler
@@ -14,6 +15,10 @@ import lightgbm as lgb
 import xgboost as xgb
 import joblib
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml.compiled_ensemble import CompiledEnsemble
+
 # Попробовать импортировать CatBoost
 try:
     from catboost import CatBoostClassifier
@@ -22,6 +27,9 @@ except ImportError:
     CATBOOST_AVAILABLE = False
     print("⚠️  CatBoost не установлен. Установите: pip install catboost")
 
+# Больше строк - быстрее родной predict_proba моделей (C++, несколько потоков)
+COMPILED_MAX_ROWS = 256
+
 
 class EnsembleGoalPredictor:
     """Ансамбль из нескольких моделей для прогнозирования Over 2.5"""
@@ -32,6 +40,7 @@ class EnsembleGoalPredictor:
         self.scaler = StandardScaler()
         self.feature_names = []
         self.model_weights = {}
+        self.compiled = None
         
         os.makedirs(model_path, exist_ok=True)
     
@@ -291,20 +300,32 @@ class EnsembleGoalPredictor:
             'weights': self.model_weights
         }
     
-    def _ensemble_predict_proba(self, X):
-        """Получить вероятность от ансамбля"""
-        predictions = []
-        weights = []
+    def compile(self):
+        """Выгрузить деревья всех моделей для быстрого инференса"""
+        self.compiled = CompiledEnsemble.from_models(self.models)
+        return self.compiled
+    
+    def _model_probas(self, X):
+        """
+        Вероятности каждой модели и ансамбля за один проход
         
-        for model_name, model in self.models.items():
-            proba = model.predict_proba(X)[:, 1]
-            weight = self.model_weights[model_name]
-            predictions.append(proba * weight)
-            weights.append(weight)
+        Returns:
+            (dict {модель: np.ndarray}, np.ndarray ансамбля)
+        """
+        if self.compiled is not None and self.compiled.covers(self.models) and len(X) <= COMPILED_MAX_ROWS:
+            model_probas = self.compiled.predict_proba(X)
+        else:
+            model_probas = {name: model.predict_proba(X)[:, 1] for name, model in self.models.items()}
         
         # Взвешенное среднее
-        ensemble_proba = np.sum(predictions, axis=0)
-        return ensemble_proba
+        ensemble_proba = np.zeros(len(X))
+        for model_name in self.models:
+            ensemble_proba += model_probas[model_name] * self.model_weights[model_name]
+        return model_probas, ensemble_proba
+    
+    def _ensemble_predict_proba(self, X):
+        """Получить вероятность от ансамбля"""
+        return self._model_probas(X)[1]
     
     def predict(self, features):
         """
@@ -320,14 +341,10 @@ class EnsembleGoalPredictor:
         
         X_scaled = self.scaler.transform(X)
         
-        # Получить прогнозы от каждой модели
-        predictions = {}
-        for model_name, model in self.models.items():
-            proba = model.predict_proba(X_scaled)[0][1]
-            predictions[model_name] = proba
-        
-        # Финальный прогноз ансамбля
-        ensemble_proba = self._ensemble_predict_proba(X_scaled)[0]
+        # Прогнозы моделей и ансамбля за один проход
+        model_probas, ensemble_probas = self._model_probas(X_scaled)
+        predictions = {name: proba[0] for name, proba in model_probas.items()}
+        ensemble_proba = ensemble_probas[0]
         
         return {
             'ensemble_proba': ensemble_proba,
@@ -336,15 +353,52 @@ class EnsembleGoalPredictor:
             'confidence': 'High' if abs(ensemble_proba - 0.5) > 0.25 else 'Medium' if abs(ensemble_proba - 0.5) > 0.15 else 'Low'
         }
     
+    def predict_batch(self, features_list):
+        """
+        Прогноз ансамблем для нескольких матчей
+        
+        Все модели считаются одним проходом по всей матрице признаков
+        
+        Args:
+            features_list: список dict с признаками (или DataFrame)
+        
+        Returns:
+            list: результаты в формате predict()
+        """
+        if len(features_list) == 0:
+            return []
+        
+        if isinstance(features_list, pd.DataFrame):
+            X = features_list[self.feature_names]
+        else:
+            X = pd.DataFrame(list(features_list))[self.feature_names]
+        
+        X_scaled = self.scaler.transform(X)
+        
+        model_probas, ensemble_probas = self._model_probas(X_scaled)
+        
+        results = []
+        for row, ensemble_proba in enumerate(ensemble_probas):
+            results.append({
+                'ensemble_proba': ensemble_proba,
+                'individual_predictions': {name: proba[row] for name, proba in model_probas.items()},
+                'prediction': 'Over 2.5' if ensemble_proba >= 0.5 else 'Under 2.5',
+                'confidence': 'High' if abs(ensemble_proba - 0.5) > 0.25 else 'Medium' if abs(ensemble_proba - 0.5) > 0.15 else 'Low'
+            })
+        
+        return results
+    
     def save_ensemble(self):
         """Сохранить все модели ансамбля"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        compiled = self.compile()
         
         ensemble_data = {
             'models': self.models,
             'scaler': self.scaler,
             'feature_names': self.feature_names,
             'weights': self.model_weights,
+            'compiled': compiled.to_dict(),
             'timestamp': timestamp
         }
         
@@ -354,15 +408,26 @@ class EnsembleGoalPredictor:
         print(f"\n💾 Ансамбль сохранен: {filepath}")
         return filepath
     
-    def load_ensemble(self, filepath):
-        """Загрузить ансамбль с диска"""
-        ensemble_data = joblib.load(filepath)
+    def load_ensemble(self, filepath, mmap_mode=None):
+        """
+        Загрузить ансамбль с диска
+        
+        Args:
+            mmap_mode: 'r' - numpy массивы отображаются в память (общие для воркеров)
+        """
+        ensemble_data = joblib.load(filepath, mmap_mode=mmap_mode)
         
         self.models = ensemble_data['models']
         self.scaler = ensemble_data['scaler']
         self.feature_names = ensemble_data['feature_names']
         self.model_weights = ensemble_data['weights']
         
+        # Старые файлы без выгруженных деревьев компилируются при загрузке
+        if 'compiled' in ensemble_data:
+            self.compiled = CompiledEnsemble.from_dict(ensemble_data['compiled'], self.models)
+        else:
+            self.compile()
+        
         print(f"✅ Ансамбль загружен: {filepath}")
         print(f"   Моделей: {len(self.models)}")
         print(f"   Признаков: {len(self.feature_names)}")
@@ -4,20 +4,81 @@
 import os
 from datetime import datetime
 from flask_login import UserMixin
+from sqlalchemy import inspect
 from werkzeug.security import generate_password_hash, check_password_hash
 from extensions import db
 
 
-def get_table_args():
+def get_table_args(*indexes):
     """
     Get table args with schema only for PostgreSQL
     SQLite doesn't support schemas
+
+    Args:
+        *indexes: db.Index(...) declared for the table
     """
     database_url = os.getenv('DATABASE_URL', '')
+    options = {}
     if 'postgresql' in database_url:
-        schema = os.getenv('DATABASE_SCHEMA', 'goalpredictor')
-        return {'schema': schema}
-    return {}
+        options['schema'] = os.getenv('DATABASE_SCHEMA', 'goalpredictor')
+    if indexes:
+        return (*indexes, options)
+    return options
+
+
+def ensure_columns(bind):
+    """
+    Добавить в существующие таблицы объявленные nullable-колонки, которых в них нет
+
+    Как и ensure_indexes(): db.create_all() существующие таблицы не меняет.
+
+    Returns:
+        Список добавленных колонок ('table.column')
+    """
+    inspector = inspect(bind)
+    added = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name, schema=table.schema):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name, schema=table.schema)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=bind.dialect)
+            table_name = f'{table.schema}.{table.name}' if table.schema else table.name
+            bind.exec_driver_sql(f'ALTER TABLE {table_name} ADD COLUMN {column.name} {column_type}')
+            added.append(f'{table.name}.{column.name}')
+    return added
+
+
+def ensure_indexes(bind):
+    """
+    Создать объявленные индексы, которых нет в существующих таблицах
+
+    db.create_all() пропускает уже созданные таблицы вместе с их индексами,
+    поэтому новые индексы на рабочей БД появляются только здесь.
+
+    Returns:
+        Список имен созданных индексов
+    """
+    inspector = inspect(bind)
+    created = []
+    for table in db.metadata.sorted_tables:
+        if not table.indexes or not inspector.has_table(table.name, schema=table.schema):
+            continue
+        # Сравниваем по колонкам: таблицы Render созданы SQL-скриптом с именами idx_*,
+        # а UNIQUE уже дает индекс
+        existing = {
+            tuple(index['column_names'])
+            for index in (inspector.get_indexes(table.name, schema=table.schema) +
+                          inspector.get_unique_constraints(table.name, schema=table.schema))
+        }
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            columns = tuple(column.name for column in index.columns)
+            if columns not in existing:
+                index.create(bind)
+                created.append(index.name)
+    return created
 
 
 class User(UserMixin, db.Model):
@@ -63,26 +124,13 @@ class User(UserMixin, db.Model):
     
     def can_view_prediction(self):
         """Проверка, может ли пользователь просмотреть прогноз"""
-        # Сброс счетчика если новый день
-        if self.last_prediction_date != datetime.utcnow().date():
-            self.daily_predictions_count = 0
-            self.last_prediction_date = datetime.utcnow().date()
-            db.session.commit()
-        
-        if self.is_premium:
-            return True
-        
-        from config import Config
-        return self.daily_predictions_count < Config.FREE_PREDICTIONS_PER_DAY
+        from services.quota import prediction_quota
+        return prediction_quota.can_view(self)
     
     def increment_prediction_count(self):
-        """Увеличить счетчик просмотренных прогнозов"""
-        if self.last_prediction_date != datetime.utcnow().date():
-            self.daily_predictions_count = 1
-            self.last_prediction_date = datetime.utcnow().date()
-        else:
-            self.daily_predictions_count += 1
-        db.session.commit()
+        """Увеличить счетчик просмотренных прогнозов (запись в БД - отложенная)"""
+        from services.quota import prediction_quota
+        prediction_quota.consume(self, enforce=False)
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -115,10 +163,101 @@ class Team(db.Model):
         return f'<Team {self.name}>'
 
 
+class TeamStats(db.Model):
+    """
+    Материализованная статистика команды
+
+    Обновляется инкрементально при записи результата матча
+    (services/team_stats.py), поля Team синхронизируются отсюда
+    """
+    __tablename__ = 'team_stats'
+    __table_args__ = get_table_args()
+
+    FORM_LENGTH = 5
+
+    team_id = db.Column(db.Integer, primary_key=True)
+
+    # Накопленные суммы
+    matches_played = db.Column(db.Integer, default=0, nullable=False)
+    goals_scored = db.Column(db.Integer, default=0, nullable=False)
+    goals_conceded = db.Column(db.Integer, default=0, nullable=False)
+    over_2_5_count = db.Column(db.Integer, default=0, nullable=False)
+    wins = db.Column(db.Integer, default=0, nullable=False)
+    draws = db.Column(db.Integer, default=0, nullable=False)
+    losses = db.Column(db.Integer, default=0, nullable=False)
+
+    # Форма: последние FORM_LENGTH результатов (кольцевой буфер, новые справа)
+    form = db.Column(db.String(FORM_LENGTH), default='', nullable=False)
+    last_match_date = db.Column(db.DateTime, nullable=True)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __init__(self, **kwargs):
+        for field in ('matches_played', 'goals_scored', 'goals_conceded', 'over_2_5_count',
+                      'wins', 'draws', 'losses'):
+            kwargs.setdefault(field, 0)
+        kwargs.setdefault('form', '')
+        super().__init__(**kwargs)
+
+    def record(self, scored, conceded, match_date, sign=1):
+        """
+        Учесть результат матча (sign=-1 - откатить суммы при исправлении счета)
+
+        Форма обновляется только новыми по дате матчами; при исправлении
+        счета ее пересобирает services/team_stats.py
+        """
+        outcome = 'W' if scored > conceded else ('D' if scored == conceded else 'L')
+
+        self.matches_played += sign
+        self.goals_scored += sign * scored
+        self.goals_conceded += sign * conceded
+        self.over_2_5_count += sign * (scored + conceded > 2)
+        if outcome == 'W':
+            self.wins += sign
+        elif outcome == 'D':
+            self.draws += sign
+        else:
+            self.losses += sign
+
+        if sign > 0 and (self.last_match_date is None or match_date >= self.last_match_date):
+            self.form = (self.form + outcome)[-self.FORM_LENGTH:]
+            self.last_match_date = match_date
+
+    @property
+    def avg_goals_per_match(self):
+        return self.goals_scored / self.matches_played if self.matches_played > 0 else 0
+
+    @property
+    def over_2_5_percentage(self):
+        return self.over_2_5_count / self.matches_played * 100 if self.matches_played > 0 else 0
+
+    def __repr__(self):
+        return f'<TeamStats team={self.team_id} {self.matches_played} matches {self.form}>'
+
+
+class TeamStatsMatch(db.Model):
+    """Матчи, уже учтенные в team_stats (со счетом, с которым они учтены)"""
+    __tablename__ = 'team_stats_matches'
+    __table_args__ = get_table_args()
+
+    match_api_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    home_goals = db.Column(db.Integer, nullable=False)
+    away_goals = db.Column(db.Integer, nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 class Match(db.Model):
     """Модель матча"""
     __tablename__ = 'matches'
-    __table_args__ = get_table_args()
+    __table_args__ = get_table_args(
+        # Ближайшие/завершенные матчи: WHERE status = ? ORDER BY match_date
+        db.Index('ix_matches_status_date', 'status', 'match_date'),
+        # Матчи лиги: WHERE league = ? AND status = ? ORDER BY match_date
+        db.Index('ix_matches_league_status_date', 'league', 'status', 'match_date'),
+        # Форма команды: WHERE home_team_id = ? / away_team_id = ? ORDER BY match_date DESC
+        db.Index('ix_matches_home_team_date', 'home_team_id', 'match_date'),
+        db.Index('ix_matches_away_team_date', 'away_team_id', 'match_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     api_id = db.Column(db.Integer, unique=True, nullable=False, index=True)
@@ -169,7 +308,7 @@ class Prediction(db.Model):
     __table_args__ = get_table_args()
     
     id = db.Column(db.Integer, primary_key=True)
-    match_id = db.Column(db.Integer, nullable=False)
+    match_id = db.Column(db.Integer, nullable=False, index=True)
     
     # Прогноз
     prediction_type = db.Column(db.String(50), default='over_2.5')  # over_2.5, btts, etc.
@@ -187,6 +326,9 @@ class Prediction(db.Model):
     # Метаданные
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     model_version = db.Column(db.String(50), nullable=True)
+    # Хэш признаков: прогноз пересчитывается, только если изменились модель или признаки
+    feature_hash = db.Column(db.String(40), nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=True)
     
     def __repr__(self):
         return f'<Prediction {self.prediction_type} - {self.probability:.2%}>'
@@ -195,7 +337,10 @@ class Prediction(db.Model):
 class UserPrediction(db.Model):
     """История просмотров прогнозов пользователем"""
     __tablename__ = 'user_predictions'
-    __table_args__ = get_table_args()
+    __table_args__ = get_table_args(
+        # История пользователя: WHERE user_id = ? ORDER BY viewed_at DESC
+        db.Index('ix_user_predictions_user_viewed', 'user_id', 'viewed_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, nullable=False)
@@ -214,7 +359,7 @@ class Subscription(db.Model):
     __table_args__ = get_table_args()
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
     
     # Stripe данные
     stripe_subscription_id = db.Column(db.String(255), unique=True, nullable=False)
@@ -7,173 +7,16 @@ import numpy as np
 from datetime import datetime, timedelta
 from extensions import db
 from app import create_app
-from models import Team, Match
-from sqlalchemy import and_
+from config import Config
+from models import Match
+from ml.db_features import (
+    build_training_features, supports_window_functions,
+    calculate_recent_form, calculate_head_to_head, extract_features_for_match
+)
 
 app = create_app()
 
 
-def calculate_recent_form(team_id, before_date, num_matches=5):
-    """
-    Рассчитать форму команды за последние N матчей
-    """
-    # Получить последние матчи до указанной даты
-    matches = Match.query.filter(
-        and_(
-            Match.status == 'FINISHED',
-            Match.match_date < before_date,
-            (Match.home_team_id == team_id) | (Match.away_team_id == team_id)
-        )
-    ).order_by(Match.match_date.desc()).limit(num_matches).all()
-    
-    if not matches:
-        return 0, 0, 0, 0, 0  # Нет данных
-    
-    wins = 0
-    draws = 0
-    losses = 0
-    goals_scored = 0
-    goals_conceded = 0
-    
-    for match in matches:
-        is_home = match.home_team_id == team_id
-        
-        if is_home:
-            goals_scored += match.home_goals
-            goals_conceded += match.away_goals
-            
-            if match.home_goals > match.away_goals:
-                wins += 1
-            elif match.home_goals == match.away_goals:
-                draws += 1
-            else:
-                losses += 1
-        else:
-            goals_scored += match.away_goals
-            goals_conceded += match.home_goals
-            
-            if match.away_goals > match.home_goals:
-                wins += 1
-            elif match.away_goals == match.home_goals:
-                draws += 1
-            else:
-                losses += 1
-    
-    return wins, draws, losses, goals_scored, goals_conceded
-
-
-def calculate_head_to_head(home_team_id, away_team_id, before_date, num_matches=5):
-    """
-    Статистика личных встреч
-    """
-    h2h_matches = Match.query.filter(
-        and_(
-            Match.status == 'FINISHED',
-            Match.match_date < before_date,
-            ((Match.home_team_id == home_team_id) & (Match.away_team_id == away_team_id)) |
-            ((Match.home_team_id == away_team_id) & (Match.away_team_id == home_team_id))
-        )
-    ).order_by(Match.match_date.desc()).limit(num_matches).all()
-    
-    if not h2h_matches:
-        return 0, 0, 0
-    
-    home_wins = 0
-    draws = 0
-    away_wins = 0
-    
-    for match in h2h_matches:
-        if match.home_team_id == home_team_id:
-            if match.home_goals > match.away_goals:
-                home_wins += 1
-            elif match.home_goals == match.away_goals:
-                draws += 1
-            else:
-                away_wins += 1
-        else:
-            if match.away_goals > match.home_goals:
-                home_wins += 1
-            elif match.away_goals == match.home_goals:
-                draws += 1
-            else:
-                away_wins += 1
-    
-    return home_wins, draws, away_wins
-
-
-def extract_features_for_match(match):
-    """
-    Извлечь признаки для одного матча
-    """
-    features = {}
-    
-    # Базовая информация
-    features['match_id'] = match.id
-    features['date'] = match.match_date
-    features['league'] = match.league
-    
-    # Форма домашней команды (последние 5 матчей)
-    home_wins, home_draws, home_losses, home_gf, home_ga = calculate_recent_form(
-        match.home_team_id, match.match_date, 5
-    )
-    
-    features['home_recent_wins'] = home_wins
-    features['home_recent_draws'] = home_draws
-    features['home_recent_losses'] = home_losses
-    features['home_recent_goals_for'] = home_gf
-    features['home_recent_goals_against'] = home_ga
-    features['home_recent_form_points'] = home_wins * 3 + home_draws
-    
-    # Форма гостевой команды
-    away_wins, away_draws, away_losses, away_gf, away_ga = calculate_recent_form(
-        match.away_team_id, match.match_date, 5
-    )
-    
-    features['away_recent_wins'] = away_wins
-    features['away_recent_draws'] = away_draws
-    features['away_recent_losses'] = away_losses
-    features['away_recent_goals_for'] = away_gf
-    features['away_recent_goals_against'] = away_ga
-    features['away_recent_form_points'] = away_wins * 3 + away_draws
-    
-    # Личные встречи
-    h2h_home_wins, h2h_draws, h2h_away_wins = calculate_head_to_head(
-        match.home_team_id, match.away_team_id, match.match_date, 5
-    )
-    
-    features['h2h_home_wins'] = h2h_home_wins
-    features['h2h_draws'] = h2h_draws
-    features['h2h_away_wins'] = h2h_away_wins
-    
-    # Статистика команд из БД
-    home_team = Team.query.get(match.home_team_id)
-    away_team = Team.query.get(match.away_team_id)
-    
-    if home_team:
-        features['home_avg_goals'] = home_team.avg_goals_per_match
-        features['home_total_matches'] = home_team.total_matches
-    else:
-        features['home_avg_goals'] = 0
-        features['home_total_matches'] = 0
-    
-    if away_team:
-        features['away_avg_goals'] = away_team.avg_goals_per_match
-        features['away_total_matches'] = away_team.total_matches
-    else:
-        features['away_avg_goals'] = 0
-        features['away_total_matches'] = 0
-    
-    # Целевые переменные
-    features['total_goals'] = match.total_goals
-    features['over_2_5'] = 1 if match.over_2_5 else 0
-    features['btts'] = 1 if match.btts else 0
-    features['home_win'] = 1 if match.result == '1' else 0
-    features['draw'] = 1 if match.result == 'X' else 0
-    features['away_win'] = 1 if match.result == '2' else 0
-    
-    return features
-
-
 def prepare_training_dataset():
     """
     Подготовить датасет для обучения
@@ -184,47 +27,30 @@ def prepare_training_dataset():
         print("=" * 70)
         
         # Получить все завершенные матчи
-        matches = Match.query.filter_by(status='FINISHED').order_by(Match.match_date).all()
+        total_matches = Match.query.filter_by(status='FINISHED').count()
         
-        print(f"\n📈 Всего завершенных матчей: {len(matches)}")
+        print(f"\n📈 Всего завершенных матчей: {total_matches}")
         
-        if len(matches) < 100:
+        if total_matches < 100:
             print("\n⚠️ ПРЕДУПРЕЖДЕНИЕ: Мало данных для обучения!")
             print("   Рекомендуется минимум 500 матчей")
             print("   Запустите: py collect_historical_data.py\n")
             return
         
-        print("\n🔄 Извлечение признаков...")
-        
-        dataset = []
-        processed = 0
-        skipped = 0
+        mode = Config.TRAINING_FEATURES_MODE
+        if mode == 'auto':
+            mode = 'sql' if supports_window_functions(db.session) else 'pandas'
+        print(f"\n🔄 Извлечение признаков (режим: {mode})...")
         
-        for i, match in enumerate(matches):
-            if (i + 1) % 100 == 0:
-                print(f"   Обработано: {i + 1}/{len(matches)}")
-            
-            try:
-                # Пропустить матчи без достаточной истории (первые 10 матчей сезона)
-                if i < 10:
-                    skipped += 1
-                    continue
-                
-                features = extract_features_for_match(match)
-                dataset.append(features)
-                processed += 1
-            
-            except Exception as e:
-                skipped += 1
-                continue
+        # Пропустить матчи без достаточной истории (первые 10 матчей)
+        df = build_training_features(db.session, mode=mode)
+        processed = len(df)
+        skipped = total_matches - processed
         
         print(f"\n✅ Признаки извлечены:")
         print(f"   Обработано: {processed}")
         print(f"   Пропущено: {skipped}")
         
-        # Создать DataFrame
-        df = pd.DataFrame(dataset)
-        
         # Удалить строки с NaN
         df = df.dropna()
         
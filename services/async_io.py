@@ -0,0 +1,164 @@
+"""
+Async I/O
+Non-blocking outbound calls for threaded (gthread) workers
+
+Outbound clients expose *_async() variants that return a Future right
+away; the call runs on a per-process I/O pool. Identical calls in flight
+(same key) share one Future, so many requests waiting for the same slow
+upstream resource cost one upstream call and one pool thread.
+
+A route thread waits for the Future at most UPSTREAM_WAIT_SECONDS
+(wait_result). If the upstream is slower, the route answers 503 +
+Retry-After and the call keeps running: its result lands in the client
+caches and the next request is served from there. So a slow upstream
+never pins a request thread for the full HTTP timeout.
+
+Usage:
+    future = football_api.make_request_async('matches', params)
+    try:
+        data = wait_result(future)      # UpstreamTimeout after UPSTREAM_WAIT_SECONDS
+    except UpstreamTimeout as e:
+        return upstream_timeout_response(e, matches=[])
+    futures = [io_pool.submit(key, fetch, day) for day in days]
+    matches = gather(futures).result()
+"""
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+class UpstreamTimeout(TimeoutError):
+    """The upstream call did not finish within the route's wait budget"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f'Upstream is slow, retry in {retry_after}s')
+        self.retry_after = retry_after
+
+
+class IOPool:
+    """Per-process thread pool for outbound calls with single-flight by key"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers
+        self.lock = threading.Lock()
+        self.inflight: Dict[Hashable, Future] = {}
+        self.pid = None
+        self.executor = None
+        self.stats = {'submitted': 0, 'coalesced': 0}
+
+    def _ensure_started(self):
+        # Потоки пула не переживают fork (preload_app) - создаем в каждом воркере
+        if self.pid == os.getpid():
+            return
+        if self.max_workers is None:
+            from config import Config
+            self.max_workers = Config.IO_POOL_SIZE
+        self.pid = os.getpid()
+        self.inflight = {}
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='io')
+
+    def submit(self, key: Optional[Hashable], func: Callable[..., Any], *args, **kwargs) -> Future:
+        """Run func(*args, **kwargs) on the pool (key=None - never coalesced)"""
+        with self.lock:
+            self._ensure_started()
+            self.stats['submitted'] += 1
+
+            if key is not None:
+                future = self.inflight.get(key)
+                if future is not None:
+                    self.stats['coalesced'] += 1
+                    return future
+
+            future = self.executor.submit(func, *args, **kwargs)
+            if key is not None:
+                self.inflight[key] = future
+                future.add_done_callback(lambda done, key=key: self._forget(key, done))
+            return future
+
+    def _forget(self, key: Hashable, future: Future):
+        with self.lock:
+            if self.inflight.get(key) is future:
+                del self.inflight[key]
+
+    def pending(self) -> int:
+        with self.lock:
+            return len(self.inflight)
+
+
+def completed(value: Any) -> Future:
+    """Already resolved Future (cache hits of *_async variants)"""
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def then(future: Future, func: Callable[[Any], Any]) -> Future:
+    """Future of func(result) - runs in the thread that resolves `future`, no pool thread waits"""
+    result = Future()
+
+    def done(source: Future):
+        try:
+            result.set_result(func(source.result()))
+        except BaseException as e:
+            result.set_exception(e)
+
+    future.add_done_callback(done)
+    return result
+
+
+def gather(futures: List[Future]) -> Future:
+    """Future of the list of results (in order); fails with the first exception"""
+    result = Future()
+    if not futures:
+        result.set_result([])
+        return result
+
+    lock = threading.Lock()
+    remaining = [len(futures)]
+
+    def done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        try:
+            result.set_result([future.result() for future in futures])
+        except BaseException as e:
+            result.set_exception(e)
+
+    for future in futures:
+        future.add_done_callback(done)
+    return result
+
+
+def wait_result(future: Future, timeout: Optional[float] = None) -> Any:
+    """
+    Result of an *_async call for a route (at most UPSTREAM_WAIT_SECONDS)
+
+    Raises:
+        UpstreamTimeout: still running; the call is not cancelled
+    """
+    from config import Config
+
+    if timeout is None:
+        timeout = Config.UPSTREAM_WAIT_SECONDS
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        raise UpstreamTimeout(retry_after=max(int(timeout), 1)) from None
+
+
+def upstream_timeout_response(error: UpstreamTimeout, **fields):
+    """503 + Retry-After for a route whose upstream call is still running"""
+    from flask import jsonify
+
+    response = jsonify({'success': False, 'pending': True, 'error': str(error), **fields})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
+# Глобальный экземпляр
+io_pool = IOPool()
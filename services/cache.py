@@ -1,63 +1,515 @@
 """
-Simple in-memory cache for Football API responses
+Cache for Football API responses
 Prevents exceeding rate limits (10 requests/min)
+
+Storage is pluggable (CACHE_BACKEND):
+- memory: per-process dict (default)
+- sqlite: file shared by all Gunicorn workers on one host
+- redis: shared Redis instance (REDIS_URL)
 """
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Optional, Dict, Any, Callable, Tuple
+import json
+import os
+import sqlite3
+import tempfile
 import threading
+import time
+
+
+class CacheBackend:
+    """
+    Storage interface for SimpleCache
+    
+    get() returns (status, value) where status is 'hit', 'miss' or 'expired'.
+    set() returns the number of entries evicted to stay within max_entries.
+    """
+    
+    name = 'base'
+    
+    def get(self, key: str) -> Tuple[str, Any]:
+        raise NotImplementedError
+    
+    def set(self, key: str, value: Any, ttl_seconds: int) -> int:
+        raise NotImplementedError
+    
+    def delete(self, key: str):
+        raise NotImplementedError
+    
+    def clear(self) -> int:
+        raise NotImplementedError
+    
+    def cleanup_expired(self) -> int:
+        raise NotImplementedError
+    
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process LRU dict"""
+    
+    name = 'memory'
+    
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return 'miss', None
+            expires_at, value = entry
+            if time.time() >= expires_at:
+                del self.entries[key]
+                return 'expired', None
+            self.entries.move_to_end(key)
+            return 'hit', value
+    
+    def set(self, key, value, ttl_seconds):
+        with self.lock:
+            self.entries[key] = (time.time() + ttl_seconds, value)
+            self.entries.move_to_end(key)
+            evicted = 0
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                evicted += 1
+            return evicted
+    
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+    
+    def clear(self):
+        with self.lock:
+            count = len(self.entries)
+            self.entries.clear()
+            return count
+    
+    def cleanup_expired(self):
+        with self.lock:
+            now = time.time()
+            expired = [k for k, (expires_at, _) in self.entries.items() if now >= expires_at]
+            for key in expired:
+                del self.entries[key]
+            return len(expired)
+    
+    def __len__(self):
+        return len(self.entries)
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    SQLite file shared by all worker processes on one host
+    
+    Values are stored as JSON. One connection per process/thread (WAL mode),
+    LRU eviction by last access time per namespace.
+    """
+    
+    name = 'sqlite'
+    
+    def __init__(self, path: Optional[str] = None, namespace: str = 'default', max_entries: int = 1000):
+        self.path = path or os.path.join(tempfile.gettempdir(), 'goalpredictor_cache.sqlite3')
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.local = threading.local()
+    
+    def _connection(self):
+        # Отдельное соединение на процесс (после fork) и поток
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None and self.local.pid == os.getpid():
+            return conn
+        
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache_entries ('
+            ' namespace TEXT NOT NULL,'
+            ' key TEXT NOT NULL,'
+            ' value TEXT NOT NULL,'
+            ' expires_at REAL NOT NULL,'
+            ' accessed_at REAL NOT NULL,'
+            ' PRIMARY KEY (namespace, key))'
+        )
+        conn.execute(
+            'CREATE INDEX IF NOT EXISTS ix_cache_entries_lru ON cache_entries (namespace, accessed_at)'
+        )
+        self.local.conn = conn
+        self.local.pid = os.getpid()
+        return conn
+    
+    def get(self, key):
+        conn = self._connection()
+        row = conn.execute(
+            'SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?',
+            (self.namespace, key)
+        ).fetchone()
+        if row is None:
+            return 'miss', None
+        
+        now = time.time()
+        if now >= row[1]:
+            conn.execute('DELETE FROM cache_entries WHERE namespace = ? AND key = ?', (self.namespace, key))
+            return 'expired', None
+        
+        conn.execute(
+            'UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?',
+            (now, self.namespace, key)
+        )
+        return 'hit', json.loads(row[0])
+    
+    def set(self, key, value, ttl_seconds):
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            'INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at, accessed_at) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (self.namespace, key, json.dumps(value), now + ttl_seconds, now)
+        )
+        
+        count = conn.execute(
+            'SELECT COUNT(*) FROM cache_entries WHERE namespace = ?', (self.namespace,)
+        ).fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow <= 0:
+            return 0
+        
+        conn.execute(
+            'DELETE FROM cache_entries WHERE namespace = ? AND key IN ('
+            ' SELECT key FROM cache_entries WHERE namespace = ? ORDER BY accessed_at LIMIT ?)',
+            (self.namespace, self.namespace, overflow)
+        )
+        return overflow
+    
+    def delete(self, key):
+        self._connection().execute(
+            'DELETE FROM cache_entries WHERE namespace = ? AND key = ?', (self.namespace, key)
+        )
+    
+    def clear(self):
+        cursor = self._connection().execute(
+            'DELETE FROM cache_entries WHERE namespace = ?', (self.namespace,)
+        )
+        return cursor.rowcount
+    
+    def cleanup_expired(self):
+        cursor = self._connection().execute(
+            'DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?',
+            (self.namespace, time.time())
+        )
+        return cursor.rowcount
+    
+    def __len__(self):
+        return self._connection().execute(
+            'SELECT COUNT(*) FROM cache_entries WHERE namespace = ?', (self.namespace,)
+        ).fetchone()[0]
+
+
+class RedisBackend(CacheBackend):
+    """
+    Shared Redis store
+    
+    TTL is handled by Redis (SET EX); LRU order is kept in a sorted set
+    of access times so the namespace stays within max_entries.
+    """
+    
+    name = 'redis'
+    
+    def __init__(self, client=None, url: Optional[str] = None, namespace: str = 'default',
+                 max_entries: int = 1000):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url or 'redis://localhost:6379/0')
+        self.client = client
+        self.prefix = f'goalpredictor:cache:{namespace}:'
+        self.lru_key = f'goalpredictor:cache-lru:{namespace}'
+        self.max_entries = max_entries
+    
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            self.client.zrem(self.lru_key, key)
+            return 'miss', None
+        self.client.zadd(self.lru_key, {key: time.time()})
+        return 'hit', json.loads(raw)
+    
+    def set(self, key, value, ttl_seconds):
+        self.client.set(self.prefix + key, json.dumps(value), ex=max(int(ttl_seconds), 1))
+        self.client.zadd(self.lru_key, {key: time.time()})
+        
+        overflow = self.client.zcard(self.lru_key) - self.max_entries
+        if overflow <= 0:
+            return 0
+        
+        evicted = [member for member, _ in self.client.zpopmin(self.lru_key, overflow)]
+        evicted = [m.decode() if isinstance(m, bytes) else m for m in evicted]
+        if evicted:
+            self.client.delete(*[self.prefix + k for k in evicted])
+        return len(evicted)
+    
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+        self.client.zrem(self.lru_key, key)
+    
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+        self.client.delete(self.lru_key)
+        return len(keys)
+    
+    def cleanup_expired(self):
+        # Redis удаляет просроченные ключи сам; убрать их из LRU индекса
+        removed = 0
+        for member, _ in self.client.zrange(self.lru_key, 0, -1, withscores=True):
+            key = member.decode() if isinstance(member, bytes) else member
+            if not self.client.exists(self.prefix + key):
+                self.client.zrem(self.lru_key, key)
+                removed += 1
+        return removed
+    
+    def __len__(self):
+        return self.client.zcard(self.lru_key)
+
+
+def create_cache_backend(namespace: str = 'default', backend: Optional[str] = None,
+                         max_entries: Optional[int] = None) -> CacheBackend:
+    """
+    Build the configured backend (CACHE_BACKEND = memory | sqlite | redis)
+    
+    Falls back to memory if the shared backend can't be initialized
+    """
+    from config import Config
+    
+    backend = (backend or Config.CACHE_BACKEND or 'memory').lower()
+    max_entries = max_entries or Config.CACHE_MAX_ENTRIES
+    
+    try:
+        if backend == 'sqlite':
+            return SQLiteBackend(path=Config.CACHE_SQLITE_PATH, namespace=namespace, max_entries=max_entries)
+        if backend == 'redis':
+            redis_backend = RedisBackend(url=Config.REDIS_URL, namespace=namespace, max_entries=max_entries)
+            redis_backend.client.ping()
+            return redis_backend
+    except Exception as e:
+        print(f"⚠️  Cache backend '{backend}' unavailable, using memory: {e}")
+    
+    return MemoryBackend(max_entries=max_entries)
 
 
 class SimpleCache:
-    """Thread-safe in-memory cache"""
+    """Thread-safe cache with TTL, LRU eviction and hit/miss counters"""
     
-    def __init__(self, ttl_seconds: int = 300):  # 5 minutes default TTL
-        self.cache: Dict[str, Dict[str, Any]] = {}
+    def __init__(self, ttl_seconds: int = 300, backend: Optional[CacheBackend] = None):  # 5 minutes default TTL
+        self.backend = backend if backend is not None else MemoryBackend()
         self.ttl = ttl_seconds
         self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'expired': 0, 'sets': 0, 'evictions': 0, 'errors': 0}
+    
+    def _count(self, name: str, amount: int = 1):
+        with self.lock:
+            self.counters[name] += amount
     
     def get(self, key: str) -> Optional[Any]:
         """Get value from cache if not expired"""
-        with self.lock:
-            if key in self.cache:
-                entry = self.cache[key]
-                if datetime.now() < entry['expires']:
-                    print(f"📦 Cache HIT: {key}")
-                    return entry['value']
-                else:
-                    print(f"⏰ Cache EXPIRED: {key}")
-                    del self.cache[key]
+        try:
+            status, value = self.backend.get(key)
+        except Exception as e:
+            print(f"⚠️  Cache error ({self.backend.name}): {e}")
+            self._count('errors')
+            status, value = 'miss', None
+        
+        if status == 'hit':
+            self._count('hits')
+            print(f"📦 Cache HIT: {key}")
+            return value
         
+        if status == 'expired':
+            self._count('expired')
+            print(f"⏰ Cache EXPIRED: {key}")
+        
+        self._count('misses')
         print(f"❌ Cache MISS: {key}")
         return None
     
-    def set(self, key: str, value: Any):
+    def set(self, key: str, value: Any, ttl_seconds: Optional[int] = None):
         """Store value in cache with TTL"""
-        with self.lock:
-            self.cache[key] = {
-                'value': value,
-                'expires': datetime.now() + timedelta(seconds=self.ttl),
-                'cached_at': datetime.now()
-            }
-            print(f"💾 Cached: {key} (TTL: {self.ttl}s)")
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl
+        try:
+            evicted = self.backend.set(key, value, ttl)
+        except Exception as e:
+            print(f"⚠️  Cache error ({self.backend.name}): {e}")
+            self._count('errors')
+            return
+        
+        self._count('sets')
+        if evicted:
+            self._count('evictions', evicted)
+        print(f"💾 Cached: {key} (TTL: {ttl}s)")
+    
+    def delete(self, key: str):
+        """Remove one entry"""
+        self.backend.delete(key)
     
     def clear(self):
         """Clear all cache entries"""
-        with self.lock:
-            count = len(self.cache)
-            self.cache.clear()
-            print(f"🗑️  Cleared {count} cache entries")
+        count = self.backend.clear()
+        print(f"🗑️  Cleared {count} cache entries")
     
     def cleanup_expired(self):
         """Remove expired entries"""
+        removed = self.backend.cleanup_expired()
+        if removed:
+            print(f"🧹 Cleaned up {removed} expired entries")
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters (this process) and backend size"""
         with self.lock:
-            now = datetime.now()
-            expired = [k for k, v in self.cache.items() if now >= v['expires']]
-            for key in expired:
-                del self.cache[key]
-            if expired:
-                print(f"🧹 Cleaned up {len(expired)} expired entries")
+            stats = dict(self.counters)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['backend'] = self.backend.name
+        try:
+            stats['size'] = len(self.backend)
+        except Exception:
+            stats['size'] = None
+        return stats
+
+
+class TeamFormCache:
+    """
+    Per-team form cache with request coalescing (single-flight)
+    
+    Entries are keyed by team id and remember the timestamp of the last
+    finished match they were built from. Recording a newer finished match
+    (invalidate) drops the entry. Concurrent callers asking for the same
+    team share one in-flight fetch.
+    
+    Entries live in a CacheBackend: with CACHE_BACKEND=sqlite|redis an
+    invalidation by one worker is seen by all of them. Single-flight is
+    per process.
+    
+    Several kinds of per-team data can share the cache (kind=...); every
+    kind is declared up front so invalidate() drops all of them.
+    """
+    
+    def __init__(self, ttl_seconds: int = 6 * 3600, backend: Optional[CacheBackend] = None,
+                 kinds: Tuple[str, ...] = ()):
+        self.ttl = ttl_seconds
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.kinds = (None,) + tuple(kinds)
+        self.inflight: Dict[Any, Future] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+    
+    @staticmethod
+    def _key(team_id, kind: Optional[str] = None) -> str:
+        return str(team_id) if kind is None else f'{kind}:{team_id}'
+    
+    def _get_entry(self, team_id, kind: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        try:
+            status, entry = self.backend.get(self._key(team_id, kind))
+        except Exception as e:
+            print(f"⚠️  Team form cache error ({self.backend.name}): {e}")
+            return None
+        return entry if status == 'hit' else None
+    
+    def get_or_fetch(self, team_id, fetch: Callable[[], Tuple[Any, Optional[datetime]]],
+                     kind: Optional[str] = None):
+        """
+        Get team form from cache or fetch it once for all concurrent callers
+        
+        Args:
+            team_id: Team id
+            fetch: Returns (value, last_finished_at). A None last_finished_at
+                   means "no data" and the value is not cached.
+            kind: One of the kinds passed to the constructor (None - team form)
+        """
+        if kind not in self.kinds:
+            raise ValueError(f'Unknown team cache kind: {kind}')
+        key = self._key(team_id, kind)
+        entry = self._get_entry(team_id, kind)
+        
+        with self.lock:
+            if entry is not None:
+                self.hits += 1
+                return entry['value']
+            
+            future = self.inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self.inflight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        
+        if not is_leader:
+            return future.result()
+        
+        try:
+            value, last_finished_at = fetch()
+        except Exception as e:
+            with self.lock:
+                del self.inflight[key]
+            future.set_exception(e)
+            raise
+        
+        if last_finished_at is not None:
+            entry = {'value': value, 'last_finished_at': last_finished_at.isoformat()}
+            try:
+                self.backend.set(key, entry, self.ttl)
+            except Exception as e:
+                print(f"⚠️  Team form cache error ({self.backend.name}): {e}")
+        
+        with self.lock:
+            del self.inflight[key]
+        future.set_result(value)
+        return value
+    
+    def invalidate(self, team_id, finished_at: Optional[datetime] = None):
+        """
+        Drop the team's entries (all kinds) if a newer finished match was recorded
+        
+        Without finished_at the entries are always dropped
+        """
+        for kind in self.kinds:
+            entry = self._get_entry(team_id, kind)
+            if entry is None:
+                continue
+            
+            if finished_at is not None:
+                last_finished_at = datetime.fromisoformat(entry['last_finished_at'])
+                # Сравнивать без часового пояса (БД хранит naive UTC)
+                if finished_at.replace(tzinfo=None) <= last_finished_at.replace(tzinfo=None):
+                    continue
+            
+            try:
+                self.backend.delete(self._key(team_id, kind))
+            except Exception as e:
+                print(f"⚠️  Team form cache error ({self.backend.name}): {e}")
+                continue
+            print(f"🗑️  Team form invalidated: {self._key(team_id, kind)}")
+    
+    def clear(self):
+        """Clear all cache entries"""
+        self.backend.clear()
 
 
 # Global cache instance for Football API
 # TTL = 5 minutes to respect rate limits while providing fresh data
-football_cache = SimpleCache(ttl_seconds=300)
+# Backend is shared between workers if CACHE_BACKEND=sqlite|redis
+football_cache = SimpleCache(ttl_seconds=300, backend=create_cache_backend('football'))
+
+# Global team form cache: EnhancedPredictionService.calculate_team_stats (team form)
+# and PredictionService.build_features ('last_matches' - the team's recent finished matches)
+# Shared between workers if CACHE_BACKEND=sqlite|redis, so invalidation reaches all of them
+team_form_cache = TeamFormCache(ttl_seconds=6 * 3600, backend=create_cache_backend('team_form'),
+                                kinds=('last_matches',))
@@ -0,0 +1,129 @@
+"""
+Response Compression
+gzip / brotli negotiation for text responses (JSON, HTML, CSS, JS)
+
+The encoding is picked from Accept-Encoding by q-value (br preferred on a
+tie, only if the brotli package is installed). Buffered bodies smaller
+than COMPRESS_MIN_SIZE are sent as is. Streamed bodies (stream_json) are
+compressed chunk by chunk with a sync flush after every chunk, so the
+client still receives the items as they are produced.
+
+A compressed body is a different representation: `Vary: Accept-Encoding`
+is added and a strong ETag becomes weak (If-None-Match uses the weak
+comparison, so 304 keeps working).
+
+Usage:
+    compression.init_app(app)
+"""
+import gzip
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:  # необязательная зависимость
+        brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/javascript', 'text/html', 'text/css', 'text/plain', 'text/javascript',
+}
+
+
+def choose_encoding(accept_encodings, allowed: Iterable[str]) -> Optional[str]:
+    """Best encoding from an Accept-Encoding header among allowed (or None)"""
+    best, best_quality = None, 0
+    for encoding in allowed:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _encoded(chunks: Iterable) -> Iterator[bytes]:
+    for chunk in chunks:
+        yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+
+
+def _gzip_stream(chunks: Iterable, level: int) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+    for chunk in _encoded(chunks):
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _brotli_stream(chunks: Iterable, quality: int) -> Iterator[bytes]:
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in _encoded(chunks):
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class ResponseCompressor:
+    """after_request hook compressing text responses"""
+
+    def __init__(self):
+        self.enabled = True
+        self.min_size = 500
+        self.gzip_level = 6
+        self.brotli_quality = 5  # баланс CPU / размер для динамических ответов
+
+    @property
+    def encodings(self):
+        return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('COMPRESS_ENABLED', True)
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', self.min_size)
+        self.gzip_level = app.config.get('COMPRESS_GZIP_LEVEL', self.gzip_level)
+        self.brotli_quality = app.config.get('COMPRESS_BROTLI_QUALITY', self.brotli_quality)
+        app.after_request(self.after_request)
+
+    def compress(self, data: bytes, encoding: str) -> bytes:
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+
+    def after_request(self, response):
+        if (not self.enabled
+                or response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.direct_passthrough  # send_file / статика
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.accept_encodings, self.encodings)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            chunks = response.response
+            if encoding == 'br':
+                response.response = _brotli_stream(chunks, self.brotli_quality)
+            else:
+                response.response = _gzip_stream(chunks, self.gzip_level)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            response.set_data(self.compress(data, encoding))
+
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+# Глобальный экземпляр
+compression = ResponseCompressor()
@@ -0,0 +1,277 @@
+"""
+Explanation Queue
+LLM explanations of predictions generated in the background
+
+Creating a prediction no longer waits for OpenAI: the template text is
+stored right away and a job keyed by match id is queued (a newer job
+for the same match replaces the queued one). A daemon dispatcher in each
+worker packs up to EXPLANATION_BATCH_SIZE matches into one prompt and
+runs at most EXPLANATION_CONCURRENCY prompts at a time. A failed batch
+is retried with exponential backoff + jitter, one match per prompt;
+after EXPLANATION_MAX_RETRIES the template text stays.
+
+The text is written to the match's first Prediction row only if its
+probability is still the one the text explains (the row may have been
+recomputed meanwhile). updated_at is bumped, so responses cached on
+predictions_version() re-render. Jobs still queued at shutdown are
+dropped - those rows keep the template text.
+
+Clients: OpenAIService or FakeExplanationClient (EXPLANATION_CLIENT=fake,
+for local runs without an API key and for tests).
+
+Usage:
+    explanation_queue.init_app(app)
+    text = explanation_queue.submit(match_id, prediction, home_stats, away_stats, match_data)
+"""
+import contextlib
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class FakeExplanationClient:
+    """Explanation client without network calls: deterministic text, optional failures"""
+
+    def __init__(self, fail_times: int = 0):
+        self.fail_times = fail_times
+        self.batches: List[int] = []  # размеры полученных батчей
+        self.lock = threading.Lock()
+
+    def explain_batch(self, items: List[dict]) -> List[str]:
+        with self.lock:
+            self.batches.append(len(items))
+            if self.fail_times > 0:
+                self.fail_times -= 1
+                raise RuntimeError('Fake LLM failure')
+        return [
+            f"🤖 {item['match_data']['home_team_name']} - {item['match_data']['away_team_name']}: "
+            f"Over 2.5 {item['prediction']['probability']:.0%}"
+            for item in items
+        ]
+
+    def fallback_explanation(self, prediction: dict, home_stats: dict, away_stats: dict) -> str:
+        return f"⚽ Вероятность Over 2.5 голов: {prediction['probability']:.1%}"
+
+
+def create_explanation_client(name: Optional[str] = None):
+    """EXPLANATION_CLIENT = openai | fake"""
+    from config import Config
+
+    name = (name or Config.EXPLANATION_CLIENT or 'openai').lower()
+    if name == 'fake':
+        return FakeExplanationClient()
+
+    from services.openai_service import OpenAIService
+    return OpenAIService()
+
+
+class ExplanationQueue:
+    """Per-worker queue of explanation jobs with batching, bounded concurrency and retries"""
+
+    def __init__(self, client=None, batch_size: int = 5, concurrency: int = 2, max_retries: int = 3,
+                 retry_backoff: float = 2.0, batch_wait: float = 1.0):
+        self._client = client
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.batch_wait = batch_wait  # секунд ждем, пока наберется батч
+        self.lock = threading.Condition()
+        self.pending: Dict[int, dict] = {}  # match_id -> job, в порядке постановки
+        self.retries: List[tuple] = []  # heap (ready_at, seq, job)
+        self.counter = itertools.count()
+        self.app = None
+        self.background = False
+        self.pid = None
+        self.executor = None
+        self.slots = None
+        self.stats = {'queued': 0, 'replaced': 0, 'batches': 0, 'written': 0,
+                      'retried': 0, 'failed': 0}
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = create_explanation_client()
+        return self._client
+
+    @property
+    def running(self) -> bool:
+        return self.app is not None
+
+    def init_app(self, app, background: bool = True):
+        """Bind the app; background=False leaves processing to run_pending()"""
+        from config import Config
+
+        if not Config.EXPLANATION_QUEUE_ENABLED:
+            return
+        self.batch_size = Config.EXPLANATION_BATCH_SIZE
+        self.concurrency = Config.EXPLANATION_CONCURRENCY
+        self.max_retries = Config.EXPLANATION_MAX_RETRIES
+        self.retry_backoff = Config.EXPLANATION_RETRY_BACKOFF
+        self.app = app
+        self.background = background
+
+    def _ensure_started(self):
+        # Поток-диспетчер и пул создаются заново после fork воркера
+        if not self.background or self.pid == os.getpid():
+            return
+        self.pid = os.getpid()
+        self.pending = {}
+        self.retries = []
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='explanation')
+        self.slots = threading.Semaphore(self.concurrency)
+        threading.Thread(target=self._dispatch_loop, name='explanation-dispatcher', daemon=True).start()
+
+    def submit(self, match_id: int, prediction: dict, home_stats: dict, away_stats: dict, match_data: dict) -> str:
+        """Queue an LLM explanation; returns the template text to store until it is ready"""
+        fallback = self.client.fallback_explanation(prediction, home_stats, away_stats)
+        job = {
+            'match_id': match_id,
+            'probability': float(prediction['probability']),
+            'item': {
+                'prediction': {'probability': float(prediction['probability']),
+                               'confidence': prediction.get('confidence')},
+                'home_stats': home_stats,
+                'away_stats': away_stats,
+                'match_data': match_data,
+            },
+            'attempts': 0,
+            'queued_at': time.monotonic(),
+        }
+
+        with self.lock:
+            self._ensure_started()
+            if match_id in self.pending:
+                self.stats['replaced'] += 1
+            self.pending[match_id] = job
+            self.stats['queued'] += 1
+            self.lock.notify()
+        return fallback
+
+    def queue_size(self) -> int:
+        with self.lock:
+            return len(self.pending) + len(self.retries)
+
+    # --- выбор батча (под self.lock) ---
+
+    def _take_batch(self, force: bool = False) -> List[dict]:
+        """Due retry (alone), else up to batch_size queued jobs once the batch is full or old enough"""
+        now = time.monotonic()
+        if self.retries and self.retries[0][0] <= now:
+            return [heapq.heappop(self.retries)[2]]
+        if not self.pending:
+            return []
+
+        oldest = next(iter(self.pending.values()))
+        if not force and len(self.pending) < self.batch_size and now - oldest['queued_at'] < self.batch_wait:
+            return []
+        match_ids = list(self.pending)[:self.batch_size]
+        return [self.pending.pop(match_id) for match_id in match_ids]
+
+    def _wait_time(self) -> Optional[float]:
+        deadlines = []
+        if self.retries:
+            deadlines.append(self.retries[0][0])
+        if self.pending:
+            deadlines.append(next(iter(self.pending.values()))['queued_at'] + self.batch_wait)
+        if not deadlines:
+            return None
+        return max(min(deadlines) - time.monotonic(), 0.01)
+
+    def _dispatch_loop(self):
+        while True:
+            # Не больше `concurrency` промптов одновременно; пока слоты заняты, батч копится
+            self.slots.acquire()
+            with self.lock:
+                batch = self._take_batch()
+                while not batch:
+                    self.lock.wait(self._wait_time())
+                    batch = self._take_batch()
+
+            future = self.executor.submit(self._run_batch, batch)
+            future.add_done_callback(lambda _: self.slots.release())
+
+    def run_pending(self) -> int:
+        """Process all queued jobs and their retries in the calling thread; returns rows written"""
+        written = 0
+        while True:
+            with self.lock:
+                batch = self._take_batch(force=True)
+                delay = self.retries[0][0] - time.monotonic() if not batch and self.retries else None
+            if batch:
+                written += self._run_batch(batch)
+            elif delay is not None:
+                time.sleep(max(delay, 0))
+            else:
+                return written
+
+    # --- выполнение ---
+
+    def _run_batch(self, jobs: List[dict]) -> int:
+        with self.lock:
+            self.stats['batches'] += 1
+        try:
+            texts = self.client.explain_batch([job['item'] for job in jobs])
+            if len(texts) != len(jobs):
+                raise ValueError(f'{len(texts)} explanations for {len(jobs)} matches')
+            missing = self._write(list(zip(jobs, texts)))
+        except Exception as e:
+            print(f"⚠️  Explanation batch failed ({len(jobs)} matches): {e}")
+            missing = jobs
+
+        # Строка прогноза еще не закоммичена или изменилась - повторить позже
+        for job in missing:
+            self._retry(job)
+        written = len(jobs) - len(missing)
+        with self.lock:
+            self.stats['written'] += written
+        return written
+
+    def _retry(self, job: dict):
+        job['attempts'] += 1
+        with self.lock:
+            if job['attempts'] > self.max_retries:
+                self.stats['failed'] += 1
+                return
+            self.stats['retried'] += 1
+            # Экспоненциальная задержка + jitter, чтобы повторы не шли пачкой
+            delay = self.retry_backoff * 2 ** (job['attempts'] - 1) * (1 + random.random() * 0.5)
+            heapq.heappush(self.retries, (time.monotonic() + delay, next(self.counter), job))
+            self.lock.notify()
+
+    def _write(self, results: List[tuple]) -> List[dict]:
+        """UPDATE explanations in one transaction; returns jobs whose row did not match"""
+        from sqlalchemy import func, select, update
+        from sqlalchemy.orm import aliased
+
+        from extensions import db
+        from models import Prediction
+
+        first = aliased(Prediction)
+        missing = []
+        context = self.app.app_context() if self.app is not None else contextlib.nullcontext()
+        with context, db.engine.begin() as conn:
+            for job, text in results:
+                first_id = (
+                    select(func.min(first.id))
+                    .where(first.match_id == job['match_id'])
+                    .scalar_subquery()
+                )
+                result = conn.execute(
+                    update(Prediction)
+                    .where(Prediction.id == first_id, Prediction.probability == job['probability'])
+                    .values(explanation=text, updated_at=datetime.utcnow())
+                )
+                if not result.rowcount:
+                    missing.append(job)
+        return missing
+
+
+# Глобальный экземпляр
+explanation_queue = ExplanationQueue()
@@ -37,6 +37,16 @@ class FootballAPIService:
         """Получить предстоящие матчи на N дней вперед"""
         return self.api.get_upcoming_fixtures(league_id, days)
     
+    def get_upcoming_fixtures_for_leagues(self, league_ids, days=7):
+        """Получить предстоящие матчи нескольких лиг (параллельно, если провайдер умеет)"""
+        if hasattr(self.api, 'get_upcoming_fixtures_for_leagues'):
+            return self.api.get_upcoming_fixtures_for_leagues(league_ids, days)
+        
+        fixtures = []
+        for league_id in league_ids:
+            fixtures.extend(self.api.get_upcoming_fixtures(league_id, days))
+        return fixtures
+    
     def get_team_last_matches(self, team_id, limit=10):
         """Получить последние матчи команды"""
         return self.api.get_team_last_matches(team_id, limit)
@@ -2,10 +2,34 @@
 Адаптер для Football-Data.org API
 Бесплатный API с ограничениями: 10 запросов/минуту, 100 в день для free tier
 """
+import time
 import requests
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime, timedelta
 from config import Config
+from services.async_io import completed, io_pool
 from services.cache import football_cache
+from services.http_cache import ResponseStore
+from services.http_client import RETRY_STATUSES, get_session, retry_after_seconds, retry_delay
+from services.rate_limiter import (
+    TokenBucket, PriorityRequestQueue, create_bucket_store,
+    current_priority, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+)
+
+
+# Общий лимит Football-Data.org для всех воркеров (free tier: 10 запросов/мин)
+football_rate_limiter = TokenBucket(
+    'football-data-org',
+    per_minute=Config.FOOTBALL_API_REQUESTS_PER_MINUTE,
+    store=create_bucket_store()
+)
+football_request_queue = PriorityRequestQueue(
+    football_rate_limiter,
+    max_concurrency=Config.FOOTBALL_API_MAX_CONCURRENCY
+)
+
+# Ответы API на диске: переживают деплой и перезапуск воркеров
+football_response_store = ResponseStore('football-data-org')
 
 
 class FootballDataOrgAPI:
@@ -32,26 +56,158 @@ class FootballDataOrgAPI:
             'Ligue 1': 'FL1'
         }
     
-    def _make_request(self, endpoint, params=None):
+    def _make_request(self, endpoint, params=None, priority=None):
         """
         Базовый метод для выполнения запросов к API с кэшированием
+        
+        Промахи кэша идут через общую очередь с лимитом 10 запросов/мин:
+        интерактивные запросы обслуживаются раньше фоновых (request_priority),
+        одинаковые запросы в очереди объединяются
         """
-        # Create cache key from endpoint and params
-        cache_key = f"{endpoint}:{str(sorted((params or {}).items()))}"
+        return self._make_requests([(endpoint, params)], priority=priority)[0]
+    
+    def make_request_async(self, endpoint, params=None, priority=None):
+        """
+        Неблокирующий вариант _make_request: сразу возвращает Future
         
-        # Try to get from cache first
+        Попадание в кэш - готовый Future, промах выполняется в io_pool;
+        одинаковые запросы из разных потоков получают один Future
+        """
+        # contextvar приоритета не переходит в поток пула - фиксируем здесь
+        if priority is None:
+            priority = current_priority()
+        
+        cache_key = self._cache_key(endpoint, params)
+        cached_data = football_cache.get(cache_key)
+        if cached_data is not None:
+            return completed(cached_data)
+        
+        return io_pool.submit(('football-data-org', cache_key), self._make_request, endpoint, params, priority)
+    
+    @staticmethod
+    def _cache_key(endpoint, params):
+        return f"{endpoint}:{str(sorted((params or {}).items()))}"
+    
+    def _make_requests(self, request_list, priority=None):
+        """
+        Выполнить несколько запросов параллельно (в рамках лимита)
+        
+        Args:
+            request_list: список (endpoint, params)
+        
+        Returns:
+            list: ответы в том же порядке (None для ошибок/таймаутов);
+                  общее время ограничено самым медленным запросом
+        """
+        if priority is None:
+            priority = current_priority()
+        
+        results = [None] * len(request_list)
+        futures = {}
+        stale = {}
+        
+        for i, (endpoint, params) in enumerate(request_list):
+            # Create cache key from endpoint and params
+            cache_key = self._cache_key(endpoint, params)
+            
+            # Try to get from cache first
+            cached_data = football_cache.get(cache_key)
+            if cached_data is not None:
+                results[i] = cached_data
+                continue
+            
+            # Затем ответ, сохраненный на диске (другим воркером или до перезапуска)
+            stored = self._stored_response(cache_key)
+            if stored is not None and stored.is_fresh:
+                results[i] = stored.data
+                continue
+            
+            fetch = lambda endpoint=endpoint, params=params, cache_key=cache_key: self._fetch(endpoint, params, cache_key)
+            
+            if stored is not None and stored.age < Config.HTTP_CACHE_STALE_SECONDS:
+                # stale-while-revalidate: отдать сохраненный ответ сразу,
+                # обновление ждет свободного токена в фоне
+                results[i] = stored.data
+                football_request_queue.submit(cache_key, fetch, priority=PRIORITY_BACKGROUND)
+                continue
+            
+            futures[i] = football_request_queue.submit(cache_key, fetch, priority=priority)
+            stale[i] = stored
+        
+        # Фоновые задачи ждут своей очереди сколько нужно
+        deadline = None
+        if priority <= PRIORITY_INTERACTIVE:
+            deadline = time.monotonic() + Config.FOOTBALL_API_MAX_WAIT
+        
+        for i, future in futures.items():
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                results[i] = future.result(timeout=timeout)
+            except FutureTimeoutError:
+                endpoint = request_list[i][0]
+                print(f"⏳ Football-Data.org: очередь запросов переполнена, {endpoint} будет загружен позже")
+            except Exception as e:
+                # Например, хранилище лимитов недоступно - запрос не был отправлен
+                print(f"❌ Ошибка запроса к Football-Data.org API: {e}")
+
+            # Лимит исчерпан или API недоступен - лучше старые данные, чем никаких
+            if results[i] is None and stale[i] is not None:
+                results[i] = stale[i].data
+        
+        return results
+    
+    def _stored_response(self, cache_key):
+        """Ответ из football_response_store (свежий ответ копируется в football_cache)"""
+        try:
+            stored = football_response_store.get(cache_key)
+        except Exception as e:
+            print(f"⚠️  Response store error: {e}")
+            return None
+        
+        if stored is not None and stored.is_fresh:
+            football_cache.set(cache_key, stored.data, ttl_seconds=max(stored.remaining_ttl(), 1))
+        return stored
+    
+    def _fetch(self, endpoint, params, cache_key):
+        """Выполнить HTTP запрос (вызывается из очереди, уже с токеном)"""
+        # Другой воркер мог заполнить общий кэш, пока запрос ждал в очереди
         cached_data = football_cache.get(cache_key)
         if cached_data is not None:
             return cached_data
         
+        stored = self._stored_response(cache_key)
+        if stored is not None and stored.is_fresh:
+            return stored.data
+        
         url = f"{self.base_url}/{endpoint}"
+        headers = dict(self.headers)
+        if stored is not None:
+            # Условный запрос: 304 Not Modified = сохраненный ответ еще актуален
+            headers.update(stored.conditional_headers())
         
         try:
             print(f"🌐 API Request: {url} {params}")
-            response = requests.get(url, headers=self.headers, params=params, timeout=10)
-            response.raise_for_status()
+            session = get_session('football')
+            for attempt in range(Config.HTTP_MAX_RETRIES + 1):
+                if attempt:
+                    # Повтор - еще один запрос к API: берет свой токен общего лимита
+                    time.sleep(retry_delay(attempt))
+                    football_rate_limiter.acquire()
+                response = session.get(url, headers=headers, params=params)
+                if response.status_code not in RETRY_STATUSES:
+                    break
             
-            data = response.json()
+            if response.status_code == 429:
+                # Лимит превышен - остановить все воркеры до сброса счетчика
+                retry_after = response.headers.get('X-RequestCounter-Reset') or response.headers.get('Retry-After')
+                football_rate_limiter.penalize(retry_after_seconds(retry_after))
+            
+            if response.status_code == 304 and stored is not None:
+                data = football_response_store.refresh(cache_key, football_cache.ttl, response.headers).data
+            else:
+                response.raise_for_status()
+                data = response.json()
+                football_response_store.put(cache_key, data, football_cache.ttl, response.headers)
             
             # Cache successful response
             football_cache.set(cache_key, data)
@@ -60,6 +216,9 @@ class FootballDataOrgAPI:
             
         except requests.exceptions.RequestException as e:
             print(f"❌ Ошибка запроса к Football-Data.org API: {e}")
+            if stored is not None:
+                print(f"♻️  Используем сохраненный ответ ({int(stored.age)}s): {endpoint}")
+                return stored.data
             return None
     
     def get_todays_fixtures(self, league=None, date=None):
@@ -82,13 +241,14 @@ class FootballDataOrgAPI:
             if fixtures and 'matches' in fixtures:
                 all_fixtures = fixtures['matches']
         else:
-            # Все топ-5 лиги
-            for league_name, league_code in self.league_codes.items():
-                fixtures = self._make_request(f'competitions/{league_code}/matches', {
-                    'dateFrom': date,
-                    'dateTo': date
-                })
-                
+            # Все топ-5 лиги (параллельно)
+            league_items = list(self.league_codes.items())
+            responses = self._make_requests([
+                (f'competitions/{league_code}/matches', {'dateFrom': date, 'dateTo': date})
+                for _, league_code in league_items
+            ])
+            
+            for (league_name, _), fixtures in zip(league_items, responses):
                 if fixtures and 'matches' in fixtures:
                     for match in fixtures['matches']:
                         match['league_name'] = league_name
@@ -113,6 +273,25 @@ class FootballDataOrgAPI:
         
         return []
     
+    def get_upcoming_fixtures_for_leagues(self, league_codes, days=7):
+        """
+        Получить предстоящие матчи нескольких лиг параллельно
+        """
+        date_from = datetime.now().strftime('%Y-%m-%d')
+        date_to = (datetime.now() + timedelta(days=days)).strftime('%Y-%m-%d')
+        
+        responses = self._make_requests([
+            (f'competitions/{league_code}/matches', {'dateFrom': date_from, 'dateTo': date_to})
+            for league_code in league_codes
+        ])
+        
+        all_fixtures = []
+        for fixtures in responses:
+            if fixtures and 'matches' in fixtures:
+                all_fixtures.extend(fixtures['matches'])
+        
+        return self._format_fixtures(all_fixtures)
+    
     def _format_fixtures(self, fixtures):
         """
         Форматировать данные о матчах в единый формат
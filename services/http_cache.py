@@ -0,0 +1,147 @@
+"""
+Persistent HTTP response store
+Upstream API responses survive deploys and worker restarts (SQLite file on disk)
+
+Each entry keeps the response body plus ETag / Last-Modified, so an expired
+entry is revalidated with a conditional request (304 = reuse the body), and
+can be served stale while a refresh waits for the rate limit.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+
+class StoredResponse(NamedTuple):
+    data: Any
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+    fresh_until: float
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.fresh_until
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    def remaining_ttl(self) -> int:
+        return max(int(self.fresh_until - time.time()), 0)
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since for revalidation"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseStore:
+    """
+    Disk-backed response store shared by all workers on one host
+
+    Entries are not deleted when they expire: stale bodies are still useful
+    for revalidation and as a fallback. prune() drops entries older than max_age.
+    """
+
+    def __init__(self, namespace: str, path: Optional[str] = None):
+        from config import Config
+
+        self.namespace = namespace
+        self.path = path or Config.HTTP_CACHE_PATH
+        self.local = threading.local()
+        self.stats = {'fresh': 0, 'stale': 0, 'miss': 0, 'revalidated': 0, 'stored': 0}
+
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None and self.local.pid == os.getpid():
+            return conn
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS http_responses ('
+            ' namespace TEXT NOT NULL,'
+            ' key TEXT NOT NULL,'
+            ' body TEXT NOT NULL,'
+            ' etag TEXT,'
+            ' last_modified TEXT,'
+            ' fetched_at REAL NOT NULL,'
+            ' fresh_until REAL NOT NULL,'
+            ' PRIMARY KEY (namespace, key))'
+        )
+        self.local.conn = conn
+        self.local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[StoredResponse]:
+        """Stored response (fresh or stale) or None"""
+        row = self._connection().execute(
+            'SELECT body, etag, last_modified, fetched_at, fresh_until FROM http_responses '
+            'WHERE namespace = ? AND key = ?',
+            (self.namespace, key)
+        ).fetchone()
+        if row is None:
+            self.stats['miss'] += 1
+            return None
+
+        entry = StoredResponse(json.loads(row[0]), row[1], row[2], row[3], row[4])
+        self.stats['fresh' if entry.is_fresh else 'stale'] += 1
+        return entry
+
+    def put(self, key: str, data: Any, ttl_seconds: int, headers=None):
+        """Store a 200 response (headers: response headers, for ETag / Last-Modified)"""
+        headers = headers or {}
+        now = time.time()
+        self._connection().execute(
+            'INSERT OR REPLACE INTO http_responses '
+            '(namespace, key, body, etag, last_modified, fetched_at, fresh_until) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (self.namespace, key, json.dumps(data), headers.get('ETag'),
+             headers.get('Last-Modified'), now, now + ttl_seconds)
+        )
+        self.stats['stored'] += 1
+
+    def refresh(self, key: str, ttl_seconds: int, headers=None) -> Optional[StoredResponse]:
+        """Upstream answered 304 Not Modified: extend freshness and return the stored body"""
+        headers = headers or {}
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            'UPDATE http_responses SET fetched_at = ?, fresh_until = ?, '
+            ' etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) '
+            'WHERE namespace = ? AND key = ?',
+            (now, now + ttl_seconds, headers.get('ETag'), headers.get('Last-Modified'),
+             self.namespace, key)
+        )
+        self.stats['revalidated'] += 1
+        return self.get(key)
+
+    def delete(self, key: str):
+        self._connection().execute(
+            'DELETE FROM http_responses WHERE namespace = ? AND key = ?', (self.namespace, key)
+        )
+
+    def prune(self, max_age_seconds: float) -> int:
+        """Delete entries fetched more than max_age_seconds ago"""
+        cursor = self._connection().execute(
+            'DELETE FROM http_responses WHERE namespace = ? AND fetched_at < ?',
+            (self.namespace, time.time() - max_age_seconds)
+        )
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        return self._connection().execute(
+            'SELECT COUNT(*) FROM http_responses WHERE namespace = ?', (self.namespace,)
+        ).fetchone()[0]
@@ -0,0 +1,160 @@
+"""
+Shared HTTP sessions for outbound API clients
+Keep-alive connection pools per host, retries with exponential backoff
+and jitter, gzip (and brotli, if installed) responses, per-host timeouts
+
+Usage:
+    from services.http_client import get_session
+    response = get_session('football').get(url, params=params)
+"""
+import os
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# Таймауты (connect, read) по хостам; остальные хосты - HTTP_CONNECT_TIMEOUT / HTTP_READ_TIMEOUT
+HOST_TIMEOUTS: Dict[str, Tuple[float, float]] = {
+    'api.football-data.org': (3.05, 10),
+    'tennis-api-atp-wta-itf.p.rapidapi.com': (3.05, 10),
+    'www.football-data.co.uk': (5, 30),
+}
+
+# Повторять только временные ошибки сервера; 429 обрабатывают сами клиенты
+RETRY_STATUSES = (500, 502, 503, 504)
+
+# Сессии без повторов в адаптере: каждый запрос к Football-Data.org стоит
+# токен общего лимита (10/мин), клиент повторяет сам, с новым токеном
+SESSION_MAX_RETRIES = {'football': 0}
+
+
+def retry_delay(attempt: int) -> float:
+    """Pause before retry number `attempt` (1, 2, ...), same backoff + jitter as the adapters"""
+    from config import Config
+
+    return Config.HTTP_BACKOFF_FACTOR * 2 ** (attempt - 1) + random.uniform(0, Config.HTTP_BACKOFF_JITTER)
+
+
+def retry_after_seconds(value: Optional[str], default: float = 60.0) -> float:
+    """Seconds to wait from a Retry-After header: delta-seconds or an HTTP date (RFC 9110)"""
+    if not value:
+        return default
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    if retry_at.tzinfo is None:
+        # Дата без зоны (-0000) - UTC
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def _accept_encoding() -> str:
+    try:
+        import brotli  # noqa: F401 - urllib3 декодирует br, если пакет установлен
+        return 'gzip, deflate, br'
+    except ImportError:
+        return 'gzip, deflate'
+
+
+class JitterRetry(Retry):
+    """Retry with exponential backoff plus random jitter (spreads out retries of parallel workers)"""
+
+    def __init__(self, *args, jitter: float = 0.0, **kwargs):
+        self.jitter = jitter
+        super().__init__(*args, **kwargs)
+
+    def new(self, **kwargs):
+        retry = super().new(**kwargs)
+        retry.jitter = self.jitter
+        return retry
+
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        if backoff <= 0 or not self.jitter:
+            return backoff
+        return backoff + random.uniform(0, self.jitter)
+
+
+class PooledSession(requests.Session):
+    """requests.Session with a default timeout chosen by host"""
+
+    def __init__(self, default_timeout: Tuple[float, float], host_timeouts: Optional[Dict] = None):
+        super().__init__()
+        self.default_timeout = default_timeout
+        self.host_timeouts = dict(host_timeouts or {})
+
+    def timeout_for(self, url: str) -> Tuple[float, float]:
+        return self.host_timeouts.get(urlsplit(url).hostname, self.default_timeout)
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout_for(url)
+        return super().request(method, url, **kwargs)
+
+
+def create_session(max_retries: Optional[int] = None,
+                   backoff_factor: Optional[float] = None,
+                   jitter: Optional[float] = None,
+                   pool_maxsize: Optional[int] = None) -> PooledSession:
+    """Build a new pooled session (settings default to Config.HTTP_*)"""
+    from config import Config
+
+    retry = JitterRetry(
+        total=Config.HTTP_MAX_RETRIES if max_retries is None else max_retries,
+        backoff_factor=Config.HTTP_BACKOFF_FACTOR if backoff_factor is None else backoff_factor,
+        jitter=Config.HTTP_BACKOFF_JITTER if jitter is None else jitter,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=len(HOST_TIMEOUTS) + 1,
+        pool_maxsize=Config.HTTP_POOL_MAXSIZE if pool_maxsize is None else pool_maxsize,
+        max_retries=retry,
+    )
+
+    session = PooledSession(
+        default_timeout=(Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT),
+        host_timeouts=HOST_TIMEOUTS,
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['Accept-Encoding'] = _accept_encoding()
+    return session
+
+
+_sessions: Dict[str, PooledSession] = {}
+_sessions_pid = None
+_sessions_lock = threading.Lock()
+
+
+def get_session(name: str = 'default') -> PooledSession:
+    """
+    Shared session for this process
+
+    Clients use their own name ('football', 'tennis', ...) so their pools
+    do not compete; sockets are never shared across a fork.
+    """
+    global _sessions_pid
+
+    with _sessions_lock:
+        if _sessions_pid != os.getpid():
+            _sessions.clear()
+            _sessions_pid = os.getpid()
+
+        session = _sessions.get(name)
+        if session is None:
+            session = _sessions[name] = create_session(max_retries=SESSION_MAX_RETRIES.get(name))
+        return session
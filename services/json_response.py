@@ -0,0 +1,99 @@
+"""
+JSON Responses
+Fast JSON provider for jsonify() and chunked streaming of large lists
+
+FastJSONProvider replaces Flask's provider (app.json): orjson when it is
+installed, the stdlib encoder otherwise. Both understand NumPy scalars
+and arrays, so model outputs go to jsonify() without float(...) casts.
+Output stays compatible with Flask's provider (sorted keys, dates as
+HTTP dates); NaN / Infinity become null with orjson.
+
+stream_json() writes {"<key>": [...], "count": N, ...} item by item, so
+a long listing is sent as chunks while it is being serialized instead of
+being built as one string first. Only for routes without
+response_cache.cached: the cache buffers the whole body anyway.
+
+Usage:
+    app.json = FastJSONProvider(app)
+    return stream_json('matches', (format_match(m) for m in matches))
+"""
+import json
+from typing import Any, Iterable
+
+import numpy as np
+from flask import Response, current_app, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # необязательная зависимость
+    orjson = None
+
+
+def _default(o: Any) -> Any:
+    """NumPy types -> Python, the rest as Flask does it"""
+    if isinstance(o, np.generic):
+        return o.item()
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    return DefaultJSONProvider.default(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """app.json provider: orjson if available, NumPy aware in both modes"""
+
+    default = staticmethod(_default)
+
+    @property
+    def backend(self) -> str:
+        return 'orjson' if orjson is not None else 'json'
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return self.dumps_bytes(obj, **kwargs).decode('utf-8')
+
+    def dumps_bytes(self, obj: Any, **kwargs: Any) -> bytes:
+        if orjson is not None:
+            option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+            if kwargs.get('sort_keys', self.sort_keys):
+                option |= orjson.OPT_SORT_KEYS
+            if kwargs.get('indent'):
+                option |= orjson.OPT_INDENT_2
+            return orjson.dumps(obj, default=self.default, option=option)
+
+        kwargs.setdefault('default', self.default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        if not kwargs.get('indent'):
+            kwargs.setdefault('separators', (',', ':'))
+        return json.dumps(obj, **kwargs).encode('utf-8')
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+
+def _dumps(obj: Any) -> bytes:
+    provider = current_app.json
+    if isinstance(provider, FastJSONProvider):
+        return provider.dumps_bytes(obj)
+    return provider.dumps(obj).encode('utf-8')
+
+
+def stream_json(key: str, items: Iterable[Any], status: int = 200, **fields: Any) -> Response:
+    """
+    Chunked JSON response: {"success": true, **fields, key: [items...], "count": N}
+
+    Items are serialized lazily, one chunk per item (the generator runs
+    after the view has returned, with the request context kept alive).
+    """
+    def generate():
+        head = _dumps({'success': True, **fields})
+        yield head[:-1] + (b',' if len(head) > 2 else b'') + b'"' + key.encode('utf-8') + b'":['
+        count = 0
+        for item in items:
+            yield (b',' if count else b'') + _dumps(item)
+            count += 1
+        yield b'],"count":' + str(count).encode('ascii') + b'}\n'
+
+    return Response(stream_with_context(generate()), status=status, mimetype='application/json')
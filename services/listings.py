@@ -0,0 +1,184 @@
+"""
+Listings
+Match / prediction listings in a constant number of queries
+
+Teams are joined into the match query (joinedload), the first prediction
+of a match is joined through a correlated subquery on
+predictions.match_id, so a page costs one SELECT regardless of its size.
+
+Pages are keyset-based: the cursor carries the sort key of the last row
+((match_date, id) or (viewed_at, id)) and the next page continues with
+WHERE (key) > cursor, which walks the composite indexes instead of
+re-reading OFFSET rows.
+
+Usage:
+    rows, next_cursor = league_predictions('PL', limit=20, cursor=request.args.get('cursor'))
+    return {'predictions': [serialize_match_prediction(m, p) for m, p in rows], 'next_cursor': next_cursor}
+"""
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import joinedload
+
+from extensions import db
+from models import Match, Prediction, UserPrediction
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """Cursor is not one produced by encode_cursor()"""
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    payload = json.dumps([sort_value.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {cursor}') from e
+
+
+def page_size(value: Optional[int], default: int = DEFAULT_PAGE_SIZE) -> int:
+    """Clamp a client supplied page size to [1, MAX_PAGE_SIZE]"""
+    if value is None:
+        return default
+    return max(1, min(int(value), MAX_PAGE_SIZE))
+
+
+def _with_teams(stmt):
+    return stmt.options(joinedload(Match.home_team), joinedload(Match.away_team))
+
+
+def first_prediction_id():
+    """id of the match's first prediction (correlated, uses ix_predictions_match_id)"""
+    return (
+        select(func.min(Prediction.id))
+        .where(Prediction.match_id == Match.id)
+        .correlate(Match)
+        .scalar_subquery()
+    )
+
+
+def _page(rows: list, limit: int, key) -> Tuple[list, Optional[str]]:
+    """Split the limit + 1 lookahead row off and build the next cursor"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
+
+
+def upcoming_matches(start: datetime, end: datetime, limit: int = 10) -> List[Match]:
+    """Matches in (start, end] ordered by kick-off, teams loaded"""
+    stmt = _with_teams(
+        select(Match)
+        .where(Match.match_date > start, Match.match_date <= end)
+        .order_by(Match.match_date, Match.id)
+        .limit(limit)
+    )
+    return list(db.session.scalars(stmt).unique())
+
+
+def league_predictions(league: str, status: str = 'scheduled', limit: int = DEFAULT_PAGE_SIZE,
+                       cursor: Optional[str] = None) -> Tuple[List[Tuple[Match, Prediction]], Optional[str]]:
+    """
+    Matches of a league that have a prediction, ordered by kick-off
+
+    Returns:
+        ([(match, prediction)], next_cursor or None)
+    """
+    stmt = _with_teams(
+        select(Match, Prediction)
+        .join(Prediction, Prediction.id == first_prediction_id())
+        .where(Match.league == league, Match.status == status)
+        .order_by(Match.match_date, Match.id)
+        .limit(limit + 1)
+    )
+    after = decode_cursor(cursor)
+    if after is not None:
+        stmt = stmt.where(tuple_(Match.match_date, Match.id) > tuple_(*after))
+
+    rows = [tuple(row) for row in db.session.execute(stmt).unique()]
+    return _page(rows, limit, key=lambda row: (row[0].match_date, row[0].id))
+
+
+def prediction_history(user_id: int, limit: int = DEFAULT_PAGE_SIZE,
+                       cursor: Optional[str] = None) -> Tuple[List[Tuple[UserPrediction, Prediction]], Optional[str]]:
+    """
+    Predictions viewed by a user, newest first, with match and teams loaded
+
+    Returns:
+        ([(view, prediction)], next_cursor or None)
+    """
+    stmt = (
+        select(UserPrediction, Prediction)
+        .join(Prediction, Prediction.id == UserPrediction.prediction_id)
+        .where(UserPrediction.user_id == user_id)
+        .options(
+            joinedload(Prediction.match).joinedload(Match.home_team),
+            joinedload(Prediction.match).joinedload(Match.away_team),
+        )
+        .order_by(UserPrediction.viewed_at.desc(), UserPrediction.id.desc())
+        .limit(limit + 1)
+    )
+    before = decode_cursor(cursor)
+    if before is not None:
+        stmt = stmt.where(tuple_(UserPrediction.viewed_at, UserPrediction.id) < tuple_(*before))
+
+    rows = [tuple(row) for row in db.session.execute(stmt).unique()]
+    return _page(rows, limit, key=lambda row: (row[0].viewed_at, row[0].id))
+
+
+def _team_name(team) -> str:
+    return team.name if team is not None else 'Unknown'
+
+
+def serialize_match(match: Match) -> dict:
+    return {
+        'id': match.id,
+        'date': match.match_date.isoformat(),
+        'home_team': _team_name(match.home_team),
+        'away_team': _team_name(match.away_team),
+        'league': match.league,
+    }
+
+
+def serialize_match_prediction(match: Match, prediction: Prediction) -> dict:
+    return {
+        'match_id': match.id,
+        'home_team': _team_name(match.home_team),
+        'away_team': _team_name(match.away_team),
+        'date': match.match_date.isoformat(),
+        'probability': prediction.probability,
+        'confidence': prediction.confidence,
+    }
+
+
+def serialize_history_entry(view: UserPrediction, prediction: Prediction) -> dict:
+    match = prediction.match
+    return {
+        'match': {
+            'home_team': _team_name(match.home_team) if match else 'Unknown',
+            'away_team': _team_name(match.away_team) if match else 'Unknown',
+            'league': match.league if match else None,
+            'date': match.match_date.isoformat() if match else None,
+        },
+        'prediction': {
+            'probability': prediction.probability,
+            'confidence': prediction.confidence,
+            'is_correct': prediction.is_correct,
+            'actual_result': prediction.actual_result,
+        },
+        'viewed_at': view.viewed_at.isoformat(),
+    }
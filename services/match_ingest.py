@@ -0,0 +1,247 @@
+"""
+Match Ingest
+Bulk loading of finished matches (football-data.co.uk CSV, Football-Data.org API)
+
+Per batch of rows:
+1. rows are deduplicated in memory (same teams + kick-off = same match)
+2. teams are resolved with one query per batch; missing ones are inserted in bulk
+3. matches already in the DB are filtered out with one query per chunk
+4. new matches are written in chunks with executemany
+   (INSERT ... ON CONFLICT (api_id) DO NOTHING on PostgreSQL and SQLite)
+
+Bulk inserts bypass the ORM, so team_stats are brought up to date with
+refresh_team_stats() at the end of ingest_matches().
+
+Usage:
+    rows = csv_match_rows(df)
+    added = ingest_matches(rows, 'PL')
+"""
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Tuple
+
+import pandas as pd
+from sqlalchemy import insert, select, tuple_
+
+from extensions import db
+from models import Match, Team
+
+DEFAULT_CHUNK_SIZE = 500
+CSV_DATE_FORMATS = ['%d/%m/%Y', '%d/%m/%y', '%Y-%m-%d']
+
+
+def synthetic_api_id(*parts) -> int:
+    """
+    Stable api_id for rows without one (CSV data)
+
+    Negative, so it never clashes with Football-Data.org ids. Unlike hash()
+    the value does not change between runs (PYTHONHASHSEED).
+    """
+    key = '|'.join(str(part) for part in parts).encode('utf-8')
+    return -(zlib.crc32(key) % 1_000_000_000 + 1)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """Columns are timezone-less: store UTC without tzinfo"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def csv_match_rows(df: pd.DataFrame) -> List[dict]:
+    """
+    football-data.co.uk CSV -> ingest rows (vectorized, no iterrows)
+
+    Rows without teams, result or a parsable date are dropped.
+    """
+    if df is None or df.empty or not {'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'Date'} <= set(df.columns):
+        return []
+
+    df = df.dropna(subset=['HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'Date'])
+    dates = pd.Series(pd.NaT, index=df.index)
+    for fmt in CSV_DATE_FORMATS:
+        missing = dates.isna()
+        if not missing.any():
+            break
+        dates[missing] = pd.to_datetime(df.loc[missing, 'Date'].astype(str), format=fmt, errors='coerce')
+
+    df = df.assign(match_date=dates).dropna(subset=['match_date'])
+    home_names = df['HomeTeam'].astype(str).str.strip()
+    away_names = df['AwayTeam'].astype(str).str.strip()
+
+    return [
+        {
+            'home_team': {'name': home},
+            'away_team': {'name': away},
+            'match_date': match_date.to_pydatetime(),
+            'home_goals': int(home_goals),
+            'away_goals': int(away_goals),
+        }
+        for home, away, match_date, home_goals, away_goals in zip(
+            home_names, away_names, df['match_date'], df['FTHG'], df['FTAG']
+        )
+    ]
+
+
+def api_match_rows(matches: Iterable[dict]) -> List[dict]:
+    """Football-Data.org /matches payload -> ingest rows (only matches with a final score)"""
+    rows = []
+    for match in matches:
+        full_time = (match.get('score') or {}).get('fullTime') or {}
+        if full_time.get('home') is None or full_time.get('away') is None:
+            continue
+        rows.append({
+            'api_id': match['id'],
+            'home_team': {'api_id': match['homeTeam']['id'], 'name': match['homeTeam']['name']},
+            'away_team': {'api_id': match['awayTeam']['id'], 'name': match['awayTeam']['name']},
+            'match_date': datetime.fromisoformat(match['utcDate'].replace('Z', '+00:00')),
+            'home_goals': full_time['home'],
+            'away_goals': full_time['away'],
+        })
+    return rows
+
+
+def _team_key(team: dict) -> Tuple[str, object]:
+    return ('api_id', team['api_id']) if team.get('api_id') is not None else ('name', team['name'])
+
+
+def _insert_ignore(table, rows: List[dict]) -> int:
+    """executemany INSERT that skips rows whose unique key already exists"""
+    if not rows:
+        return 0
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        db.session.execute(insert(table), rows)
+        return len(rows)
+
+    result = db.session.execute(dialect_insert(table).on_conflict_do_nothing(index_elements=['api_id']), rows)
+    return result.rowcount if result.rowcount is not None and result.rowcount >= 0 else len(rows)
+
+
+def resolve_teams(teams: Iterable[dict], league_code: str, country: str = 'Unknown') -> Dict[tuple, int]:
+    """
+    Team ids for team refs ({'api_id'} or {'name'} within the league); missing teams are created
+
+    Returns:
+        {_team_key(ref): Team.id}
+    """
+    refs = {_team_key(team): team for team in teams}
+    api_ids = [value for kind, value in refs if kind == 'api_id']
+    names = [value for kind, value in refs if kind == 'name']
+
+    def lookup():
+        found = {}
+        if api_ids:
+            for team_id, api_id in db.session.execute(select(Team.id, Team.api_id).where(Team.api_id.in_(api_ids))):
+                found[('api_id', api_id)] = team_id
+        if names:
+            query = select(Team.id, Team.name).where(Team.league == league_code, Team.name.in_(names))
+            for team_id, name in db.session.execute(query):
+                found.setdefault(('name', name), team_id)
+        return found
+
+    found = lookup()
+    missing = [key for key in refs if key not in found]
+    if missing:
+        _insert_ignore(Team.__table__, [
+            {
+                'api_id': value if kind == 'api_id' else synthetic_api_id('team', league_code, value),
+                'name': refs[(kind, value)]['name'],
+                'league': league_code,
+                'country': country,
+            }
+            for kind, value in missing
+        ])
+        found = lookup()
+    return found
+
+
+def _match_values(row: dict, league_code: str, home_id: int, away_id: int) -> dict:
+    home_goals, away_goals = int(row['home_goals']), int(row['away_goals'])
+    total_goals = home_goals + away_goals
+    return {
+        'api_id': row['api_id'],
+        'home_team_id': home_id,
+        'away_team_id': away_id,
+        'league': league_code,
+        'match_date': row['match_date'],
+        'status': 'FINISHED',
+        'home_goals': home_goals,
+        'away_goals': away_goals,
+        'total_goals': total_goals,
+        'result': '1' if home_goals > away_goals else ('X' if home_goals == away_goals else '2'),
+        'over_2_5': total_goals > 2.5,
+        'btts': home_goals > 0 and away_goals > 0,
+    }
+
+
+def ingest_matches(rows: Iterable[dict], league_code: str, country: str = 'Unknown',
+                   chunk_size: int = DEFAULT_CHUNK_SIZE, refresh_stats: bool = True) -> int:
+    """
+    Write finished matches in bulk
+
+    Args:
+        rows: dicts from csv_match_rows() / api_match_rows()
+        league_code: 'PL', 'PD', ...
+        country: Country for newly created teams
+        chunk_size: Matches per INSERT
+        refresh_stats: Update team_stats for the new matches
+
+    Returns:
+        Number of new matches
+    """
+    # 1. Дубликаты внутри батча (один матч в нескольких файлах/страницах)
+    unique = {}
+    for row in rows:
+        row = dict(row, match_date=_naive_utc(row['match_date']))
+        key = (_team_key(row['home_team']), _team_key(row['away_team']), row['match_date'])
+        unique[key] = row
+    if not unique:
+        return 0
+
+    # 2. Команды: один запрос на батч
+    team_ids = resolve_teams(
+        [team for row in unique.values() for team in (row['home_team'], row['away_team'])],
+        league_code, country
+    )
+
+    values = []
+    for (home_key, away_key, match_date), row in unique.items():
+        api_id = row.get('api_id')
+        if api_id is None:
+            api_id = synthetic_api_id('match', league_code, home_key[1], away_key[1], match_date.isoformat())
+        values.append(_match_values(dict(row, api_id=api_id), league_code, team_ids[home_key], team_ids[away_key]))
+
+    # 3-4. Существующие матчи (по api_id и по командам + дате) и запись чанками
+    added = 0
+    for start in range(0, len(values), chunk_size):
+        chunk = values[start:start + chunk_size]
+        existing_ids = set(db.session.scalars(
+            select(Match.api_id).where(Match.api_id.in_([value['api_id'] for value in chunk]))
+        ))
+        existing_keys = set(db.session.execute(
+            select(Match.home_team_id, Match.away_team_id, Match.match_date).where(
+                tuple_(Match.home_team_id, Match.away_team_id).in_(
+                    list({(value['home_team_id'], value['away_team_id']) for value in chunk})
+                ),
+                Match.match_date.between(min(v['match_date'] for v in chunk), max(v['match_date'] for v in chunk)),
+            )
+        ).all())
+        new_rows = [
+            value for value in chunk
+            if value['api_id'] not in existing_ids
+            and (value['home_team_id'], value['away_team_id'], value['match_date']) not in existing_keys
+        ]
+        added += _insert_ignore(Match.__table__, new_rows)
+
+    db.session.commit()
+
+    if refresh_stats and added:
+        from services.team_stats import refresh_team_stats
+        refresh_team_stats()
+
+    return added
@@ -0,0 +1,198 @@
+"""
+Model Registry
+One place that loads ML artifacts (football ensemble, match result models,
+Over 2.5 model, tennis model, ATP history) lazily on first use
+
+- every artifact is loaded at most once per process, no matter how many
+  services ask for it
+- joblib files are opened with mmap_mode (MODEL_MMAP_MODE, default 'r'):
+  numpy arrays stay in the page cache and are shared by forked Gunicorn
+  workers instead of being copied into each worker
+- per-artifact stats: file size, load time, RSS growth, errors
+
+Usage:
+    from services.model_registry import model_registry
+    scaler = model_registry.load('ml/models/over_2_5_scaler.pkl')
+"""
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process (0 if unknown)"""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import resource
+        # ru_maxrss: пик, а не текущее значение (macOS - байты, Linux - КБ)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except Exception:
+        return 0
+
+
+def load_joblib(path: str, mmap_mode: Optional[str] = None):
+    """joblib.load with the configured mmap mode (plain pickles are read normally)"""
+    import joblib
+    from config import Config
+
+    if mmap_mode is None:
+        mmap_mode = Config.MODEL_MMAP_MODE or None
+    return joblib.load(path, mmap_mode=mmap_mode)
+
+
+class _Entry:
+    def __init__(self, name: str, loader: Callable[[], Any], path: Optional[str] = None):
+        self.name = name
+        self.loader = loader
+        self.path = path
+        self.lock = threading.Lock()
+        self.value = None
+        self.loaded = False
+        self.error: Optional[BaseException] = None
+        self.load_seconds = None
+        self.rss_delta_bytes = None
+        self.loaded_at = None
+        self.hits = 0
+        self.version = 0
+
+    def stats(self) -> Dict[str, Any]:
+        size = None
+        if self.path and os.path.exists(self.path):
+            size = os.path.getsize(self.path)
+        return {
+            'name': self.name,
+            'path': self.path,
+            'loaded': self.loaded,
+            'error': str(self.error) if self.error else None,
+            'file_size_bytes': size,
+            'load_seconds': round(self.load_seconds, 4) if self.load_seconds is not None else None,
+            'rss_delta_bytes': self.rss_delta_bytes,
+            'loaded_at': self.loaded_at,
+            'hits': self.hits,
+            'version': self.version,
+        }
+
+
+class ModelRegistry:
+    """
+    Lazily loaded, process-wide artifacts
+
+    A failed load is remembered (the error is re-raised on every get)
+    until unload() - a missing model file must not be re-read on every request.
+    """
+
+    def __init__(self):
+        self.entries: Dict[str, _Entry] = {}
+        self.lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], Any], path: Optional[str] = None) -> str:
+        """Register an artifact; does nothing if `name` is already registered"""
+        with self.lock:
+            if name not in self.entries:
+                self.entries[name] = _Entry(name, loader, path)
+        return name
+
+    def get(self, name: str):
+        """Artifact value, loading it on first use"""
+        entry = self.entries[name]
+        if not entry.loaded and entry.error is None:
+            with entry.lock:
+                if not entry.loaded and entry.error is None:
+                    self._load(entry)
+
+        if entry.error is not None:
+            raise entry.error
+        entry.hits += 1
+        return entry.value
+
+    def load(self, path: str, loader: Optional[Callable[[str], Any]] = None):
+        """
+        Load a file artifact (registered by its absolute path)
+
+        Args:
+            path: Path to the file
+            loader: Function path -> object (default load_joblib)
+        """
+        path = os.path.abspath(path)
+        loader = loader or load_joblib
+        self.register(path, lambda: loader(path), path=path)
+        return self.get(path)
+
+    def _load(self, entry: _Entry):
+        rss_before = current_rss_bytes()
+        started = time.perf_counter()
+        try:
+            entry.value = entry.loader()
+        except Exception as e:
+            entry.error = e
+            print(f"❌ Model registry: {entry.name} не загружен: {e}")
+            return
+        finally:
+            entry.load_seconds = time.perf_counter() - started
+
+        entry.rss_delta_bytes = current_rss_bytes() - rss_before
+        entry.loaded_at = datetime.now(timezone.utc).isoformat()
+        entry.loaded = True
+        entry.version += 1
+        print(f"📦 Model registry: {os.path.basename(entry.name)} "
+              f"({entry.load_seconds:.2f}s, +{entry.rss_delta_bytes / 1024 / 1024:.1f} MB RSS)")
+
+    def replace(self, path: str, value: Any, loader: Optional[Callable[[str], Any]] = None,
+                load_seconds: Optional[float] = None):
+        """
+        Put an already loaded (and validated) version of a file artifact
+
+        Used by the model watcher: callers that already hold the old object
+        keep using it, the next load() returns the new one.
+        """
+        path = os.path.abspath(path)
+        loader = loader or load_joblib
+        self.register(path, lambda: loader(path), path=path)
+        entry = self.entries[path]
+        with entry.lock:
+            entry.value = value
+            entry.error = None
+            entry.loaded = True
+            entry.load_seconds = load_seconds
+            entry.rss_delta_bytes = None
+            entry.loaded_at = datetime.now(timezone.utc).isoformat()
+            entry.version += 1
+
+    def is_loaded(self, name: str) -> bool:
+        entry = self.entries.get(name)
+        return bool(entry and entry.loaded)
+
+    def unload(self, name: str):
+        """Forget a loaded value (or a remembered error); next get() loads again"""
+        entry = self.entries.get(name)
+        if entry is None:
+            return
+        with entry.lock:
+            entry.value = None
+            entry.loaded = False
+            entry.error = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-artifact stats plus totals"""
+        models: List[Dict[str, Any]] = [entry.stats() for entry in list(self.entries.values())]
+        loaded = [model for model in models if model['loaded']]
+        return {
+            'pid': os.getpid(),
+            'rss_bytes': current_rss_bytes(),
+            'registered': len(models),
+            'loaded': len(loaded),
+            'total_load_seconds': round(sum(model['load_seconds'] or 0 for model in loaded), 4),
+            'models': models,
+        }
+
+
+# Global registry
+model_registry = ModelRegistry()
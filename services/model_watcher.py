@@ -0,0 +1,303 @@
+"""
+Model Watcher
+Hot reload of retrained models without restarting workers
+
+A background thread in every worker polls ml/models and tennis/models.
+When an artifact changes (new ensemble_model_*.pkl, overwritten
+over_2_5_*.pkl, tennis model...) the new version is loaded in the
+background, checked on a small smoke set and only then swapped into the
+registry and the service. Requests already running keep the model
+version they started with.
+
+A file has to keep the same size/mtime for two polls before it is loaded,
+so a model that is still being copied is never read half-written.
+"""
+import glob
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from services.model_registry import model_registry, load_joblib
+
+
+def smoke_check_proba(model, X, name: str = 'model'):
+    """Model must return one valid probability distribution per smoke row"""
+    proba = np.asarray(model.predict_proba(X), dtype=float)
+    if proba.ndim != 2 or proba.shape[0] != len(X):
+        raise ValueError(f"{name}: unexpected predict_proba shape {proba.shape}")
+    if not np.all(np.isfinite(proba)) or proba.min() < 0 or proba.max() > 1:
+        raise ValueError(f"{name}: probabilities out of range")
+    if not np.allclose(proba.sum(axis=1), 1.0, atol=1e-3):
+        raise ValueError(f"{name}: probabilities do not sum to 1")
+    return proba
+
+
+def smoke_rows(feature_names, scaler=None) -> pd.DataFrame:
+    """Smoke set: an all-zero row plus the training mean (if the scaler has one)"""
+    rows = [np.zeros(len(feature_names))]
+    mean = getattr(scaler, 'mean_', None)
+    if mean is not None and len(mean) == len(feature_names):
+        rows.append(np.asarray(mean, dtype=float))
+    return pd.DataFrame(rows, columns=list(feature_names))
+
+
+class WatchedArtifact:
+    """
+    A group of files that is reloaded as one unit
+
+    Args:
+        name: Name for logs / stats
+        resolve: () -> current list of files of the group
+        reload: (paths) -> None; loads, validates and swaps, raises on failure
+    """
+
+    def __init__(self, name: str, resolve: Callable[[], List[str]], reload: Callable[[List[str]], None]):
+        self.name = name
+        self.resolve = resolve
+        self.reload = reload
+        self.signature = None
+        self.pending = None
+        self.rejected = None
+        self.version = 0
+        self.reloaded_at = None
+        self.last_error = None
+
+    def current_signature(self):
+        signature = []
+        for path in self.resolve():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            signature.append((os.path.abspath(path), stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+
+class ModelWatcher:
+    """Polls watched artifacts and hot-swaps changed ones"""
+
+    def __init__(self, interval: Optional[float] = None):
+        from config import Config
+
+        self.interval = Config.MODEL_WATCH_INTERVAL if interval is None else interval
+        self.artifacts: Dict[str, WatchedArtifact] = {}
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def watch(self, artifact: WatchedArtifact):
+        self.artifacts[artifact.name] = artifact
+
+    def snapshot(self):
+        """Remember the current files as the loaded version (call after models are loaded)"""
+        for artifact in self.artifacts.values():
+            artifact.signature = artifact.current_signature()
+            artifact.pending = None
+
+    def check_once(self) -> List[str]:
+        """One poll; returns names of the artifacts that were reloaded"""
+        reloaded = []
+        with self.lock:
+            for artifact in self.artifacts.values():
+                if self._check(artifact):
+                    reloaded.append(artifact.name)
+        return reloaded
+
+    def _check(self, artifact: WatchedArtifact) -> bool:
+        signature = artifact.current_signature()
+        if artifact.signature is None:
+            artifact.signature = signature
+            return False
+
+        if not signature or signature == artifact.signature or signature == artifact.rejected:
+            artifact.pending = None
+            return False
+
+        # Подождать один интервал: файл мог быть еще не дописан
+        if signature != artifact.pending:
+            artifact.pending = signature
+            return False
+
+        artifact.pending = None
+        started = time.perf_counter()
+        try:
+            artifact.reload([path for path, _, _ in signature])
+        except Exception as e:
+            artifact.rejected = signature
+            artifact.last_error = str(e)
+            print(f"❌ Model watcher: новая версия '{artifact.name}' отклонена: {e}")
+            return False
+
+        artifact.signature = signature
+        artifact.version += 1
+        artifact.reloaded_at = time.time()
+        artifact.last_error = None
+        print(f"🔄 Model watcher: '{artifact.name}' обновлена (v{artifact.version}, "
+              f"{time.perf_counter() - started:.1f}s)")
+        return True
+
+    def start(self):
+        """Start the polling thread in this process (again after fork)"""
+        if not self.interval or self.pid == os.getpid():
+            return
+        self.pid = os.getpid()
+        threading.Thread(target=self._run, name='model-watcher', daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check_once()
+            except Exception as e:
+                print(f"⚠️  Model watcher error: {e}")
+
+    def stats(self):
+        return {
+            name: {
+                'version': artifact.version,
+                'files': [os.path.basename(path) for path, _, _ in (artifact.signature or ())],
+                'reloaded_at': artifact.reloaded_at,
+                'last_error': artifact.last_error,
+            }
+            for name, artifact in self.artifacts.items()
+        }
+
+
+def _existing(paths):
+    return [path for path in paths if os.path.exists(path)]
+
+
+def _timed_load(path, loader=load_joblib):
+    started = time.perf_counter()
+    value = loader(path)
+    return value, time.perf_counter() - started
+
+
+# --- Football: ensemble (Over 2.5) ---
+
+FOOTBALL_MODEL_DIR = 'ml/models'
+TENNIS_MODEL_DIR = 'tennis/models'
+
+
+def _latest_ensemble():
+    files = sorted(glob.glob(os.path.join(FOOTBALL_MODEL_DIR, 'ensemble_*')))
+    return files[-1:]
+
+
+def _reload_ensemble(paths):
+    import services.prediction_service as prediction_service
+
+    path = paths[0]
+    ensemble, seconds = _timed_load(path, prediction_service._load_ensemble_file)
+    X = smoke_rows(ensemble.feature_names, ensemble.scaler)
+    predictions = ensemble.predict_batch(X.to_dict('records'))
+    probas = [prediction['ensemble_proba'] for prediction in predictions]
+    if len(probas) != len(X) or not all(0 <= proba <= 1 for proba in probas):
+        raise ValueError('ensemble: invalid smoke predictions')
+
+    model_registry.replace(path, ensemble, loader=prediction_service._load_ensemble_file, load_seconds=seconds)
+    service = prediction_service._prediction_service
+    if service is not None and service.models_requested:
+        service.swap_ensemble(ensemble)
+
+    # Старые версии освобождаются, когда их отпустят текущие запросы
+    for name in list(model_registry.entries):
+        if os.path.basename(name).startswith('ensemble_') and name != os.path.abspath(path):
+            model_registry.unload(name)
+
+
+# --- Football: match result models (Home / Draw / Away) ---
+
+MATCH_RESULT_FILES = ['home_win_model.pkl', 'draw_model.pkl', 'away_win_model.pkl', 'feature_columns.pkl']
+
+
+def _match_result_files():
+    return _existing([os.path.join(FOOTBALL_MODEL_DIR, name) for name in MATCH_RESULT_FILES])
+
+
+def _reload_match_result(paths):
+    import services.prediction_service as prediction_service
+
+    by_name = {os.path.basename(path): path for path in paths}
+    loaded = {name: _timed_load(path) for name, path in by_name.items()}
+    models = [loaded[name][0] for name in MATCH_RESULT_FILES[:3]]
+    feature_columns = loaded['feature_columns.pkl'][0] if 'feature_columns.pkl' in loaded else None
+
+    required = feature_columns if feature_columns is not None else getattr(models[0], 'feature_names_in_', None)
+    if required is None:
+        raise ValueError('match result: unknown feature columns')
+    X = smoke_rows(required)
+    for name, model in zip(MATCH_RESULT_FILES, models):
+        smoke_check_proba(model, X, name)
+
+    for name, (value, seconds) in loaded.items():
+        model_registry.replace(by_name[name], value, load_seconds=seconds)
+    service = prediction_service._prediction_service
+    if service is not None and service.models_requested:
+        service.swap_match_result_models(*models, feature_columns)
+
+
+# --- Football: Over 2.5 model ---
+
+OVER25_FILES = ['over_2_5_goals_model.pkl', 'over_2_5_scaler.pkl', 'over_2_5_features.pkl', 'over_2_5_metadata.pkl']
+
+
+def _over25_files():
+    return _existing([os.path.join(FOOTBALL_MODEL_DIR, name) for name in OVER25_FILES])
+
+
+def _reload_over25(paths):
+    import services.over25_prediction_service as over25_service
+
+    by_name = {os.path.basename(path): path for path in paths}
+    if set(by_name) != set(OVER25_FILES):
+        raise ValueError('over 2.5: incomplete set of files')
+    loaded = {name: _timed_load(path) for name, path in by_name.items()}
+    model, scaler, features, metadata = (loaded[name][0] for name in OVER25_FILES)
+
+    X = smoke_rows(features, scaler)
+    smoke_check_proba(model, scaler.transform(X), 'over 2.5')
+
+    for name, (value, seconds) in loaded.items():
+        model_registry.replace(by_name[name], value, load_seconds=seconds)
+    service = over25_service._service_instance
+    if service is not None and service.load_attempted:
+        service.swap_model(model, scaler, features, metadata)
+
+
+# --- Tennis ---
+
+TENNIS_FILES = ['tennis_player1_win_model.pkl', 'tennis_feature_columns.pkl']
+
+
+def _tennis_files():
+    return _existing([os.path.join(TENNIS_MODEL_DIR, name) for name in TENNIS_FILES])
+
+
+def _reload_tennis(paths):
+    import tennis.predict as tennis_predict
+
+    by_name = {os.path.basename(path): path for path in paths}
+    if set(by_name) != set(TENNIS_FILES):
+        raise ValueError('tennis: incomplete set of files')
+    loaded = {name: _timed_load(path) for name, path in by_name.items()}
+    model, feature_columns = (loaded[name][0] for name in TENNIS_FILES)
+
+    smoke_check_proba(model, smoke_rows(feature_columns), 'tennis')
+
+    for name, (value, seconds) in loaded.items():
+        model_registry.replace(by_name[name], value, load_seconds=seconds)
+    service = tennis_predict._tennis_prediction_service
+    if service is not None and service.load_attempted:
+        service.swap_model(model, feature_columns)
+
+
+# Global watcher
+model_watcher = ModelWatcher()
+model_watcher.watch(WatchedArtifact('football_ensemble', _latest_ensemble, _reload_ensemble))
+model_watcher.watch(WatchedArtifact('football_match_result', _match_result_files, _reload_match_result))
+model_watcher.watch(WatchedArtifact('football_over25', _over25_files, _reload_over25))
+model_watcher.watch(WatchedArtifact('tennis', _tennis_files, _reload_tennis))
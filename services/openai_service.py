@@ -2,8 +2,11 @@
 Сервис для работы с OpenAI API
 Генерация текстовых объяснений прогнозов
 """
+import json
+
 from openai import OpenAI
 from config import Config
+from services.async_io import io_pool
 
 
 class OpenAIService:
@@ -37,29 +40,80 @@ class OpenAIService:
         )
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": self._get_system_prompt()
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.7,
-                max_tokens=500
-            )
-            
-            explanation = response.choices[0].message.content.strip()
-            return explanation
+            return self._complete(prompt, max_tokens=500)
             
         except Exception as e:
             print(f"❌ Ошибка OpenAI API: {e}")
             return self._generate_fallback_explanation(prediction, home_stats, away_stats)
     
+    def explain_batch(self, items):
+        """
+        Объяснения для нескольких матчей одним запросом (очередь объяснений)
+        
+        Args:
+            items: Список {'prediction', 'home_stats', 'away_stats', 'match_data'}
+        
+        Returns:
+            list: Тексты в порядке items
+        
+        Raises:
+            Exception: ошибка API или ответ не в ожидаемом формате (очередь повторит)
+        """
+        prompts = [
+            self._build_explanation_prompt(item['prediction'], item['home_stats'],
+                                           item['away_stats'], item['match_data'])
+            for item in items
+        ]
+        if len(prompts) == 1:
+            return [self._complete(prompts[0], max_tokens=500)]
+        
+        prompt = (
+            f"Ниже {len(prompts)} независимых задач. Для каждой напиши отдельное объяснение.\n"
+            'Ответь JSON-объектом {"explanations": ["...", ...]} - по одной строке на задачу, в том же порядке.\n\n'
+        )
+        prompt += "\n\n".join(f"=== ЗАДАЧА {i} ===\n{text}" for i, text in enumerate(prompts, 1))
+        
+        content = self._complete(prompt, max_tokens=500 * len(prompts), response_format={'type': 'json_object'})
+        explanations = json.loads(content)['explanations']
+        if len(explanations) != len(items):
+            raise ValueError(f"Ожидалось {len(items)} объяснений, получено {len(explanations)}")
+        return [str(text).strip() for text in explanations]
+    
+    def fallback_explanation(self, prediction, home_stats, away_stats):
+        """Шаблонное объяснение без OpenAI (показывается, пока готовится текст от LLM)"""
+        return self._generate_fallback_explanation(prediction, home_stats, away_stats)
+    
+    def _complete(self, prompt, max_tokens, **kwargs):
+        """Один запрос к chat completions с системным промптом; ошибки не перехватываются"""
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": self._get_system_prompt()
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            temperature=0.7,
+            max_tokens=max_tokens,
+            **kwargs
+        )
+        return response.choices[0].message.content.strip()
+    
+    def generate_match_explanation_async(self, prediction, home_stats, away_stats, match_data):
+        """
+        Неблокирующий вариант generate_match_explanation
+        
+        Returns:
+            Future: текст объяснения (при ошибке API - запасной текст)
+        """
+        return io_pool.submit(
+            None, self.generate_match_explanation, prediction, home_stats, away_stats, match_data
+        )
+    
     def _get_system_prompt(self):
         """
         Системный промпт для настройки поведения GPT
@@ -3,10 +3,12 @@
 Використовує натреновану модель з акцентом на історію голів
 """
 import os
-import joblib
+import threading
 import pandas as pd
 import numpy as np
 
+from services.model_registry import model_registry
+
 
 class Over25GoalsPredictionService:
     """Сервіс прогнозу Over 2.5 голів"""
@@ -16,9 +18,19 @@ class Over25GoalsPredictionService:
         self.scaler = None
         self.features = None
         self.metadata = None
-        self.loaded = False
-        
-        self._load_model()
+        self._loaded = False
+        self.load_attempted = False
+        self.load_lock = threading.Lock()
+    
+    @property
+    def loaded(self):
+        """Модель завантажується при першому зверненні (model_registry)"""
+        if not self.load_attempted:
+            with self.load_lock:
+                if not self.load_attempted:
+                    self._load_model()
+                    self.load_attempted = True
+        return self._loaded
     
     def _load_model(self):
         """Завантажити модель і допоміжні файли"""
@@ -27,27 +39,37 @@ class Over25GoalsPredictionService:
             
             # Завантажити модель
             model_path = os.path.join(models_dir, 'over_2_5_goals_model.pkl')
-            self.model = joblib.load(model_path)
+            self.model = model_registry.load(model_path)
             
             # Завантажити scaler
             scaler_path = os.path.join(models_dir, 'over_2_5_scaler.pkl')
-            self.scaler = joblib.load(scaler_path)
+            self.scaler = model_registry.load(scaler_path)
             
             # Завантажити список фічів
             features_path = os.path.join(models_dir, 'over_2_5_features.pkl')
-            self.features = joblib.load(features_path)
+            self.features = model_registry.load(features_path)
             
             # Завантажити metadata
             metadata_path = os.path.join(models_dir, 'over_2_5_metadata.pkl')
-            self.metadata = joblib.load(metadata_path)
+            self.metadata = model_registry.load(metadata_path)
             
-            self.loaded = True
+            self._loaded = True
             print(f"✅ Over 2.5 модель завантажено ({self.metadata.get('model_type', 'Unknown')})")
             print(f"   Фічів: {len(self.features)}")
             
         except Exception as e:
             print(f"⚠️  Помилка завантаження Over 2.5 моделі: {e}")
-            self.loaded = False
+            self._loaded = False
+    
+    def swap_model(self, model, scaler, features, metadata):
+        """Підмінити модель (hot reload); поточні запити працюють зі старою версією"""
+        with self.load_lock:
+            self.model = model
+            self.scaler = scaler
+            self.features = features
+            self.metadata = metadata
+            self._loaded = True
+            self.load_attempted = True
     
     def predict(self, match_data):
         """
@@ -81,23 +103,27 @@ class Over25GoalsPredictionService:
                 'confidence_percentage': 0
             }
         
+        # Одна версія моделі на весь запит
+        with self.load_lock:
+            model, scaler, features = self.model, self.scaler, self.features
+        
         try:
             # Створити DataFrame з одним рядком
             features_df = pd.DataFrame([match_data])
             
             # Додати відсутні фічі (заповнити 0)
-            for feature in self.features:
+            for feature in features:
                 if feature not in features_df.columns:
                     features_df[feature] = 0
             
             # Вибрати тільки потрібні фічі в правильному порядку
-            features_df = features_df[self.features]
+            features_df = features_df[features]
             
             # Стандартизувати
-            features_scaled = self.scaler.transform(features_df)
+            features_scaled = scaler.transform(features_df)
             
             # Прогноз
-            probability = self.model.predict_proba(features_scaled)[0][1]  # Ймовірність Over 2.5
+            probability = model.predict_proba(features_scaled)[0][1]  # Ймовірність Over 2.5
             
             # Визначити prediction
             prediction_text = 'Over 2.5' if probability >= 0.5 else 'Under 2.5'
@@ -4,7 +4,8 @@
 """
 import os
 import sys
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime, timedelta, timezone
 import pandas as pd
 import numpy as np
 
@@ -14,6 +15,16 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from ml.train_ensemble import EnsembleGoalPredictor
 from ml.advanced_features import AdvancedFeatureEngineering
 from services.football_api import FootballAPIService
+from services.cache import team_form_cache
+from services.model_registry import model_registry
+from config import Config
+
+
+def _load_ensemble_file(path):
+    """Загрузчик ансамбля для model_registry"""
+    ensemble = EnsembleGoalPredictor()
+    ensemble.load_ensemble(path, mmap_mode=Config.MODEL_MMAP_MODE or None)
+    return ensemble
 
 
 class EnhancedPredictionService:
@@ -30,12 +41,22 @@ class EnhancedPredictionService:
         self.draw_model = None
         self.away_win_model = None
         self.match_result_models_loaded = False
+        self.match_result_feature_columns = None
         
-        # Загрузить последнюю модель ансамбля (для Over 2.5)
-        self._load_latest_ensemble()
-        
-        # Загрузить модели результата матча
-        self._load_match_result_models()
+        # Модели загружаются при первом прогнозе (model_registry)
+        self.models_requested = False
+        self.models_lock = threading.Lock()
+    
+    def _ensure_models(self):
+        """Загрузить ансамбль (Over 2.5) и модели результата матча при первом использовании"""
+        if self.models_requested:
+            return
+        with self.models_lock:
+            if self.models_requested:
+                return
+            self._load_latest_ensemble()
+            self._load_match_result_models()
+            self.models_requested = True
     
     def _load_latest_ensemble(self):
         """Загрузить последнюю обученную модель ансамбля"""
@@ -46,7 +67,7 @@ class EnhancedPredictionService:
             if ensemble_files:
                 latest_model = sorted(ensemble_files)[-1]
                 model_path = os.path.join(model_dir, latest_model)
-                self.ensemble.load_ensemble(model_path)
+                self.ensemble = model_registry.load(model_path, loader=_load_ensemble_file)
                 self.model_loaded = True
                 print(f"✅ Ансамбль загружен: {latest_model}")
             else:
@@ -57,17 +78,16 @@ class EnhancedPredictionService:
     def _load_match_result_models(self):
         """Загрузить модели для прогноза результата матча"""
         try:
-            import joblib
             model_dir = 'ml/models'
             
             # Загрузить модели
-            self.home_win_model = joblib.load(os.path.join(model_dir, 'home_win_model.pkl'))
-            self.draw_model = joblib.load(os.path.join(model_dir, 'draw_model.pkl'))
-            self.away_win_model = joblib.load(os.path.join(model_dir, 'away_win_model.pkl'))
+            self.home_win_model = model_registry.load(os.path.join(model_dir, 'home_win_model.pkl'))
+            self.draw_model = model_registry.load(os.path.join(model_dir, 'draw_model.pkl'))
+            self.away_win_model = model_registry.load(os.path.join(model_dir, 'away_win_model.pkl'))
             
             # Загрузить список фичей, которые использовались при тренировке
             try:
-                self.match_result_feature_columns = joblib.load(os.path.join(model_dir, 'feature_columns.pkl'))
+                self.match_result_feature_columns = model_registry.load(os.path.join(model_dir, 'feature_columns.pkl'))
                 print(f"✅ Загружено {len(self.match_result_feature_columns)} feature columns")
             except:
                 self.match_result_feature_columns = None
@@ -78,6 +98,21 @@ class EnhancedPredictionService:
         except Exception as e:
             print(f"⚠️  Ошибка загрузки моделей результата: {e}")
     
+    def swap_ensemble(self, ensemble):
+        """Подменить ансамбль (hot reload); текущие запросы дорабатывают со старым"""
+        with self.models_lock:
+            self.ensemble = ensemble
+            self.model_loaded = True
+    
+    def swap_match_result_models(self, home_win_model, draw_model, away_win_model, feature_columns=None):
+        """Подменить модели результата матча одним действием (hot reload)"""
+        with self.models_lock:
+            self.home_win_model = home_win_model
+            self.draw_model = draw_model
+            self.away_win_model = away_win_model
+            self.match_result_feature_columns = feature_columns
+            self.match_result_models_loaded = True
+    
     def get_upcoming_matches(self, days_ahead=7, leagues=None):
         """
         Получить расписание предстоящих матчей
@@ -94,30 +129,31 @@ class EnhancedPredictionService:
         
         all_matches = []
         
-        for league_code in leagues:
-            try:
-                matches = self.football_api.get_matches(competition=league_code)
-                
-                # Фильтр только будущих матчей
-                today = datetime.now()
-                future_date = today + timedelta(days=days_ahead)
-                
-                for match in matches:
-                    match_date = datetime.fromisoformat(match['utcDate'].replace('Z', '+00:00'))
-                    
-                    if today <= match_date <= future_date:
-                        all_matches.append({
-                            'id': match['id'],
-                            'date': match_date.strftime('%Y-%m-%d %H:%M'),
-                            'competition': match['competition']['name'],
-                            'home_team': match['homeTeam']['name'],
-                            'away_team': match['awayTeam']['name'],
-                            'home_team_id': match['homeTeam']['id'],
-                            'away_team_id': match['awayTeam']['id'],
-                            'status': match['status']
-                        })
-            except Exception as e:
-                print(f"Ошибка получения матчей для {league_code}: {e}")
+        try:
+            # Все лиги запрашиваются параллельно
+            fixtures = self.football_api.get_upcoming_fixtures_for_leagues(leagues, days=days_ahead)
+        except Exception as e:
+            print(f"Ошибка получения матчей для {', '.join(leagues)}: {e}")
+            fixtures = []
+        
+        # Фильтр только будущих матчей
+        today = datetime.now(timezone.utc)
+        future_date = today + timedelta(days=days_ahead)
+        
+        for match in fixtures:
+            match_date = datetime.fromisoformat(match['date'].replace('Z', '+00:00'))
+            
+            if today <= match_date <= future_date:
+                all_matches.append({
+                    'id': match['id'],
+                    'date': match_date.strftime('%Y-%m-%d %H:%M'),
+                    'competition': match['league'],
+                    'home_team': match['home_team_name'],
+                    'away_team': match['away_team_name'],
+                    'home_team_id': match['home_team_id'],
+                    'away_team_id': match['away_team_id'],
+                    'status': match['status']
+                })
         
         # Сортировка по дате
         all_matches.sort(key=lambda x: x['date'])
@@ -130,23 +166,47 @@ class EnhancedPredictionService:
             matches = self.football_api.get_team_matches(team_id)
             
             # Фильтр только завершенных матчей
-            finished_matches = [m for m in matches if m['status'] == 'FINISHED']
+            finished_matches = [m for m in matches if m['status'] in ('FINISHED', 'finished')]
             
             # Сортировка по дате (новые первые)
-            finished_matches.sort(
-                key=lambda x: datetime.fromisoformat(x['utcDate'].replace('Z', '+00:00')),
-                reverse=True
-            )
+            finished_matches.sort(key=self._match_datetime, reverse=True)
             
             return finished_matches[:limit]
         except Exception as e:
             print(f"Ошибка получения матчей команды {team_id}: {e}")
             return []
     
+    @staticmethod
+    def _match_datetime(match):
+        """Дата матча (сырой ответ API - utcDate, формат адаптера - date)"""
+        raw_date = match.get('utcDate') or match.get('date')
+        return datetime.fromisoformat(raw_date.replace('Z', '+00:00'))
+    
+    @staticmethod
+    def _match_goals(match, team_id):
+        """Голы (забитые, пропущенные) команды в матче"""
+        if 'score' in match:
+            score = match.get('score', {}).get('fullTime', {})
+            home_id = match['homeTeam']['id']
+        else:
+            score = match.get('goals', {})
+            home_id = match['teams']['home']['id']
+        
+        home_goals = score.get('home', 0) or 0
+        away_goals = score.get('away', 0) or 0
+        
+        if home_id == team_id:
+            return home_goals, away_goals
+        return away_goals, home_goals
+    
     def calculate_team_stats(self, team_id, is_home=True):
         """
         Рассчитать статистику команды для прогноза
         
+        Статистика кэшируется по команде (team_form_cache) до появления
+        нового завершенного матча; одновременные запросы одной команды
+        разделяют один запрос к API
+        
         Args:
             team_id: ID команды
             is_home: Домашние или выездные матчи
@@ -154,10 +214,23 @@ class EnhancedPredictionService:
         Returns:
             dict: Статистика команды
         """
+        stats = team_form_cache.get_or_fetch(
+            team_id,
+            lambda: self._fetch_team_stats(team_id)
+        )
+        return dict(stats)
+    
+    def _fetch_team_stats(self, team_id):
+        """
+        Загрузить последние матчи и посчитать статистику
+        
+        Returns:
+            tuple: (stats, дата последнего завершенного матча или None)
+        """
         recent_matches = self.get_team_recent_matches(team_id)
         
         if not recent_matches:
-            return self._get_default_stats()
+            return self._get_default_stats(), None
         
         stats = {
             'goals_scored_last_3': 0,
@@ -175,17 +248,8 @@ class EnhancedPredictionService:
         
         # Рассчитать статистику по окнам
         for i, match in enumerate(recent_matches[:10]):
-            score = match.get('score', {}).get('fullTime', {})
-            home_goals = score.get('home', 0) or 0
-            away_goals = score.get('away', 0) or 0
-            
             # Определить голы для/против
-            if match['homeTeam']['id'] == team_id:
-                goals_for = home_goals
-                goals_against = away_goals
-            else:
-                goals_for = away_goals
-                goals_against = home_goals
+            goals_for, goals_against = self._match_goals(match, team_id)
             
             # Добавить в окна
             if i < 3:
@@ -210,7 +274,7 @@ class EnhancedPredictionService:
         for key in ['goals_scored_last_10', 'goals_conceded_last_10']:
             stats[key] = stats[key] / min(10, len(recent_matches))
         
-        return stats
+        return stats, self._match_datetime(recent_matches[0])
     
     def _get_default_stats(self):
         """Статистика по умолчанию если нет данных"""
@@ -332,114 +396,168 @@ class EnhancedPredictionService:
         Returns:
             dict: Прогноз с объяснениями
         """
+        return self.predict_matches([match_info])[0]
+    
+    def predict_matches(self, matches):
+        """
+        Сделать прогнозы для списка матчей одним батчем
+        
+        Признаки всех матчей собираются в одну матрицу, и каждая модель
+        (Home/Draw/Away и ансамбль Over 2.5) вызывается один раз на все строки
+        
+        Args:
+            matches: Список match_info
+        
+        Returns:
+            list: Прогнозы в том же порядке, что и matches
+        """
+        if not matches:
+            return []
+        
+        self._ensure_models()
+        
         if not self.match_result_models_loaded:
-            return {
-                'error': 'Модели не загружены',
-                'home_win_proba': 0.33,
-                'draw_proba': 0.33,
-                'away_win_proba': 0.34,
-                'prediction': 'Error',
-                'confidence_score': 0.0
-            }
+            return [self._error_result('Модели не загружены') for _ in matches]
+        
+        # Одна согласованная версия моделей на весь запрос (hot reload может подменить их)
+        with self.models_lock:
+            home_win_model = self.home_win_model
+            draw_model = self.draw_model
+            away_win_model = self.away_win_model
+            feature_columns = self.match_result_feature_columns
+            ensemble = self.ensemble if self.model_loaded else None
+        
+        results = [None] * len(matches)
+        features_list = []
+        positions = []
+        
+        # Создать признаки для каждого матча
+        for i, match_info in enumerate(matches):
+            try:
+                features = self.create_features_for_match(
+                    match_info['home_team_id'],
+                    match_info['away_team_id'],
+                    match_info.get('date')
+                )
+                features_list.append(features)
+                positions.append(i)
+            except Exception as e:
+                print(f"Ошибка прогноза: {e}")
+                results[i] = self._error_result(str(e))
+        
+        if not features_list:
+            return results
         
         try:
-            # Создать признаки
-            features = self.create_features_for_match(
-                match_info['home_team_id'],
-                match_info['away_team_id'],
-                match_info.get('date')
-            )
-            
-            # Получить прогнозы от моделей результата матча
-            features_df = pd.DataFrame([features])
-            
-            # Получить правильный список фичей
-            if self.match_result_feature_columns is not None:
-                required_features = self.match_result_feature_columns
-            elif hasattr(self.home_win_model, 'feature_names_in_'):
-                required_features = self.home_win_model.feature_names_in_
-            else:
-                raise ValueError("Невозможно определить требуемые фичи для модели")
-            
-            # Создать DataFrame с правильными колонками
-            # Заполнить недостающие нулями
-            for col in required_features:
-                if col not in features_df.columns:
-                    features_df[col] = 0
-            
-            # Выбрать только нужные колонки в правильном порядке
-            features_df = features_df[required_features]
-            
-            # Прогнозы вероятностей
-            home_win_proba = self.home_win_model.predict_proba(features_df)[0][1]
-            draw_proba = self.draw_model.predict_proba(features_df)[0][1]
-            away_win_proba = self.away_win_model.predict_proba(features_df)[0][1]
-            
-            # Нормализация вероятностей (чтобы сумма = 1)
-            total = home_win_proba + draw_proba + away_win_proba
-            home_win_proba = home_win_proba / total
-            draw_proba = draw_proba / total
-            away_win_proba = away_win_proba / total
-            
-            # Определить рекомендацию
-            max_proba = max(home_win_proba, draw_proba, away_win_proba)
-            if max_proba == home_win_proba:
-                prediction_text = 'Home Win'
-            elif max_proba == draw_proba:
-                prediction_text = 'Draw'
-            else:
-                prediction_text = 'Away Win'
+            features_df = self._match_result_frame(features_list, feature_columns, home_win_model)
             
-            # Уверенность модели
-            confidence_score = max_proba
+            # Прогнозы вероятностей (один вызов на модель)
+            home_win_probas = home_win_model.predict_proba(features_df)[:, 1]
+            draw_probas = draw_model.predict_proba(features_df)[:, 1]
+            away_win_probas = away_win_model.predict_proba(features_df)[:, 1]
             
             # Получить прогноз Over 2.5 (если нужно)
-            over_25_prediction = None
-            if self.model_loaded:
+            over_25_predictions = [None] * len(features_list)
+            if ensemble is not None:
                 try:
-                    over_25_prediction = self.ensemble.predict(features)
+                    over_25_predictions = ensemble.predict_batch(features_list)
                 except:
                     pass
             
-            # Ожидаемые голы (простая оценка)
-            expected_home_goals = features.get('home_goals_scored_last_5', 1.5)
-            expected_away_goals = features.get('away_goals_scored_last_5', 1.2)
-            
-            # Формировать ответ
-            result = {
-                'home_win_proba': float(home_win_proba),
-                'draw_proba': float(draw_proba),
-                'away_win_proba': float(away_win_proba),
-                'prediction': prediction_text,
-                'confidence_score': float(confidence_score),
-                'expected_home_goals': float(expected_home_goals),
-                'expected_away_goals': float(expected_away_goals),
-                'match_info': match_info,
-                'key_factors': self._extract_key_factors(features),
-                'explanation': f"{match_info.get('home_team', 'Home')} имеет {home_win_proba*100:.1f}% шанс победить. "
-                              f"Вероятность ничьей: {draw_proba*100:.1f}%. "
-                              f"{match_info.get('away_team', 'Away')} имеет {away_win_proba*100:.1f}% шанс победить."
-            }
-            
-            # Добавить Over 2.5 если доступно
-            if over_25_prediction:
-                result['over_2_5_proba'] = over_25_prediction.get('ensemble_proba', 0.5)
-                result['over_2_5_prediction'] = over_25_prediction.get('prediction', 'Unknown')
-            
-            return result
-            
+            for row, position in enumerate(positions):
+                results[position] = self._build_match_result(
+                    matches[position],
+                    features_list[row],
+                    home_win_probas[row],
+                    draw_probas[row],
+                    away_win_probas[row],
+                    over_25_predictions[row]
+                )
+        
         except Exception as e:
             print(f"Ошибка прогноза: {e}")
             import traceback
             traceback.print_exc()
-            return {
-                'error': str(e),
-                'home_win_proba': 0.33,
-                'draw_proba': 0.33,
-                'away_win_proba': 0.34,
-                'prediction': 'Error',
-                'confidence_score': 0.0
-            }
+            for position in positions:
+                results[position] = self._error_result(str(e))
+        
+        return results
+    
+    def _match_result_frame(self, features_list, feature_columns=None, model=None):
+        """Матрица признаков для моделей результата матча"""
+        features_df = pd.DataFrame(features_list)
+        
+        # Получить правильный список фичей
+        if feature_columns is not None:
+            required_features = feature_columns
+        elif hasattr(model, 'feature_names_in_'):
+            required_features = model.feature_names_in_
+        else:
+            raise ValueError("Невозможно определить требуемые фичи для модели")
+        
+        # Выбрать только нужные колонки в правильном порядке
+        # Заполнить недостающие нулями
+        return features_df.reindex(columns=list(required_features), fill_value=0)
+    
+    def _build_match_result(self, match_info, features, home_win_proba, draw_proba,
+                            away_win_proba, over_25_prediction=None):
+        """Сформировать ответ для одного матча"""
+        # Нормализация вероятностей (чтобы сумма = 1)
+        total = home_win_proba + draw_proba + away_win_proba
+        home_win_proba = home_win_proba / total
+        draw_proba = draw_proba / total
+        away_win_proba = away_win_proba / total
+        
+        # Определить рекомендацию
+        max_proba = max(home_win_proba, draw_proba, away_win_proba)
+        if max_proba == home_win_proba:
+            prediction_text = 'Home Win'
+        elif max_proba == draw_proba:
+            prediction_text = 'Draw'
+        else:
+            prediction_text = 'Away Win'
+        
+        # Уверенность модели
+        confidence_score = max_proba
+        
+        # Ожидаемые голы (простая оценка)
+        expected_home_goals = features.get('home_goals_scored_last_5', 1.5)
+        expected_away_goals = features.get('away_goals_scored_last_5', 1.2)
+        
+        # Формировать ответ
+        result = {
+            # NumPy скаляры сериализует FastJSONProvider
+            'home_win_proba': home_win_proba,
+            'draw_proba': draw_proba,
+            'away_win_proba': away_win_proba,
+            'prediction': prediction_text,
+            'confidence_score': confidence_score,
+            'expected_home_goals': expected_home_goals,
+            'expected_away_goals': expected_away_goals,
+            'match_info': match_info,
+            'key_factors': self._extract_key_factors(features),
+            'explanation': f"{match_info.get('home_team', 'Home')} имеет {home_win_proba*100:.1f}% шанс победить. "
+                          f"Вероятность ничьей: {draw_proba*100:.1f}%. "
+                          f"{match_info.get('away_team', 'Away')} имеет {away_win_proba*100:.1f}% шанс победить."
+        }
+        
+        # Добавить Over 2.5 если доступно
+        if over_25_prediction:
+            result['over_2_5_proba'] = over_25_prediction.get('ensemble_proba', 0.5)
+            result['over_2_5_prediction'] = over_25_prediction.get('prediction', 'Unknown')
+        
+        return result
+    
+    def _error_result(self, error):
+        """Ответ по умолчанию при ошибке прогноза"""
+        return {
+            'error': error,
+            'home_win_proba': 0.33,
+            'draw_proba': 0.33,
+            'away_win_proba': 0.34,
+            'prediction': 'Error',
+            'confidence_score': 0.0
+        }
     
     def _extract_key_factors(self, features):
         """Извлечь ключевые факторы для объяснения"""
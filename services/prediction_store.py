@@ -0,0 +1,233 @@
+"""
+Prediction Store
+Predictions for upcoming fixtures computed ahead of time into Prediction rows
+
+materialize_predictions() (scheduler, after every fixtures update and
+every PREDICTION_REFRESH_MINUTES) builds the features of all scheduled
+matches in the horizon, hashes them and only runs the model - and queues
+an explanation (services/explanation_queue.py) - for matches whose
+(model_version, feature_hash) differs from the stored row. The row is updated in place, so views in
+user_predictions keep pointing at it.
+
+Read endpoints call stored_predictions(): one indexed query over
+matches + predictions + teams, no upstream API calls and no inference.
+predictions_version() changes whenever a row is created, updated or
+deleted - the response cache re-renders only then.
+
+todays_predictions() only reads the store as well: before the scheduler's
+first run the day simply has no rows yet (the scheduler fetches fixtures
+and materializes them right after it starts).
+
+Usage:
+    materialize_predictions(prediction_service, horizon_days=7)
+    predictions = stored_predictions(day_start, day_end, league='PL')
+    predictions = todays_predictions(league='PL')
+"""
+import hashlib
+import json
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
+
+from extensions import db
+from ml.model import confidence_level
+from models import Match, Prediction, Team
+from services.listings import first_prediction_id
+
+def feature_hash(features: dict) -> str:
+    """Stable hash of a feature dict (key order and numpy scalar types do not matter)"""
+    payload = json.dumps(
+        {key: round(float(value), 10) for key, value in features.items()},
+        sort_keys=True, separators=(',', ':')
+    )
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _match_data(match: Match) -> dict:
+    """Match -> input of PredictionService (team ids of the upstream API)"""
+    return {
+        'match_id': match.id,
+        'home_team_id': match.home_team.api_id,
+        'away_team_id': match.away_team.api_id,
+        'home_team_name': match.home_team.name,
+        'away_team_name': match.away_team.name,
+        'league': match.league,
+        'date': match.match_date,
+    }
+
+
+def materialize_predictions(prediction_service, horizon_days: int = 7, now: Optional[datetime] = None,
+                            include_explanation: bool = True) -> dict:
+    """
+    Compute missing or outdated predictions for scheduled matches in [now, now + horizon_days)
+
+    Returns:
+        {'matches': N, 'created': N, 'updated': N, 'unchanged': N}
+    """
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    stats = {'matches': 0, 'created': 0, 'updated': 0, 'unchanged': 0}
+
+    rows = db.session.execute(
+        select(Match, Prediction)
+        .outerjoin(Prediction, Prediction.id == first_prediction_id())
+        .where(
+            Match.status == 'scheduled',
+            Match.match_date >= now,
+            Match.match_date < now + timedelta(days=horizon_days),
+        )
+        .options(joinedload(Match.home_team), joinedload(Match.away_team))
+        .order_by(Match.match_date, Match.id)
+    ).unique().all()
+    # Без команд прогноз не построить
+    rows = [(match, prediction) for match, prediction in rows
+            if match.home_team is not None and match.away_team is not None]
+    stats['matches'] = len(rows)
+    if not rows:
+        return stats
+
+    prediction_service._ensure_model()
+    model = prediction_service.model
+    match_data = [_match_data(match) for match, _ in rows]
+    features_list, team_stats = prediction_service.build_features(match_data)
+
+    # Только матчи с новой моделью или изменившимися признаками
+    pending = []
+    for index, ((match, prediction), features) in enumerate(zip(rows, features_list)):
+        digest = feature_hash(features)
+        if (prediction is not None and prediction.feature_hash == digest
+                and prediction.model_version == model.model_version):
+            stats['unchanged'] += 1
+            continue
+        pending.append((index, digest))
+
+    if not pending:
+        return stats
+
+    results = model.predict_batch_from_features([features_list[index] for index, _ in pending])
+    computed_at = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    for (index, digest), result in zip(pending, results):
+        match, prediction = rows[index]
+        if prediction is None:
+            prediction = Prediction(match_id=match.id)
+            db.session.add(prediction)
+            stats['created'] += 1
+        else:
+            stats['updated'] += 1
+
+        prediction.probability = float(result['probability'])
+        prediction.confidence = result['confidence']
+        prediction.factors = {key: float(value) for key, value in features_list[index].items()}
+        prediction.model_version = result.get('model_version')
+        prediction.feature_hash = digest
+        prediction.updated_at = computed_at
+        if include_explanation:
+            home_stats, away_stats = team_stats[index]
+            prediction.explanation = prediction_service._generate_explanation(
+                result, home_stats, away_stats, match_data[index]
+            )
+
+    db.session.commit()
+    return stats
+
+
+def _get_or_create_team(api_id: int, name: str, league: Optional[str]) -> Team:
+    team = Team.query.filter_by(api_id=api_id).first()
+    if team is None:
+        team = Team(api_id=api_id, name=name, league=league, country='Unknown')
+        db.session.add(team)
+        db.session.flush()
+    return team
+
+
+def store_fixtures(fixtures: Iterable[dict], league: Optional[str] = None) -> int:
+    """
+    Add fixtures (FootballAPIService format) missing from matches; unknown teams are created
+
+    Does not commit. Returns the number of new matches.
+    """
+    fixtures = list(fixtures)
+    known = set(db.session.scalars(
+        select(Match.api_id).where(Match.api_id.in_([fixture['id'] for fixture in fixtures]))
+    )) if fixtures else set()
+
+    added = 0
+    for fixture in fixtures:
+        if fixture['id'] in known:
+            continue
+        known.add(fixture['id'])
+
+        league_name = league or fixture.get('league')
+        home_team = _get_or_create_team(fixture['home_team_id'], fixture['home_team_name'], league_name)
+        away_team = _get_or_create_team(fixture['away_team_id'], fixture['away_team_name'], league_name)
+        match_date = datetime.fromisoformat(fixture['date'].replace('Z', '+00:00'))
+        if match_date.tzinfo is not None:
+            match_date = match_date.astimezone(timezone.utc).replace(tzinfo=None)
+
+        db.session.add(Match(
+            api_id=fixture['id'],
+            home_team_id=home_team.id,
+            away_team_id=away_team.id,
+            league=league_name,
+            match_date=match_date,
+            status=fixture['status'],
+        ))
+        added += 1
+    return added
+
+
+def todays_predictions(league: Optional[str] = None, today: Optional[date] = None) -> List[dict]:
+    """Stored predictions of today's (UTC) matches; empty until the scheduler has materialized them"""
+    day_start = datetime.combine(today or datetime.now(timezone.utc).date(), datetime.min.time())
+    return stored_predictions(day_start, day_start + timedelta(days=1), league)
+
+
+def stored_predictions(start: datetime, end: datetime, league: Optional[str] = None) -> List[dict]:
+    """
+    Stored predictions of matches in [start, end), most confident first
+
+    Same shape as PredictionService.predict_todays_matches() (match_info, probability, ...)
+    """
+    stmt = (
+        select(Match, Prediction)
+        .join(Prediction, Prediction.id == first_prediction_id())
+        .where(Match.match_date >= start, Match.match_date < end)
+        .options(joinedload(Match.home_team), joinedload(Match.away_team))
+        .order_by(Prediction.probability.desc(), Match.id)
+    )
+    if league:
+        stmt = stmt.where(Match.league == league)
+
+    return [serialize_prediction(match, prediction) for match, prediction in db.session.execute(stmt).unique()]
+
+
+def predictions_version() -> str:
+    """Cheap version of the stored predictions (count, last id, last update) plus the UTC day"""
+    count, last_id, last_update = db.session.execute(
+        select(func.count(Prediction.id), func.max(Prediction.id), func.max(Prediction.updated_at))
+    ).one()
+    return f'{datetime.now(timezone.utc).date().isoformat()}:{count}:{last_id}:{last_update}'
+
+
+def serialize_prediction(match: Match, prediction: Prediction) -> dict:
+    probability = prediction.probability
+    _, recommendation = confidence_level(probability)
+    return {
+        'match_id': match.id,
+        'match_info': {
+            'home_team': match.home_team.name if match.home_team else 'Unknown',
+            'away_team': match.away_team.name if match.away_team else 'Unknown',
+            'league': match.league,
+            'date': match.match_date.isoformat(),
+        },
+        'over_2_5': probability,
+        'under_2_5': 1 - probability,
+        'probability': probability,
+        'confidence': prediction.confidence,
+        'recommendation': recommendation,
+        'prediction': 'Over 2.5' if probability >= 0.5 else 'Under 2.5',
+        'explanation': prediction.explanation,
+        'model_version': prediction.model_version,
+    }
@@ -0,0 +1,146 @@
+"""
+Preload for Gunicorn (preload_app = True)
+Loads all models and the tennis history in the master process before
+workers are forked, then freezes the heap so the pages stay shared
+(copy-on-write) between workers instead of being copied into each one.
+
+gc.freeze() moves every object created so far to a permanent generation:
+the garbage collector in the workers never touches them, so it does not
+dirty the shared pages by writing to object headers.
+"""
+import gc
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from services.model_registry import model_registry
+
+
+def _warm_football():
+    from services.prediction_service import get_prediction_service
+    get_prediction_service()._ensure_models()
+
+
+def _warm_over25():
+    from services.over25_prediction_service import get_over25_prediction_service
+    get_over25_prediction_service().loaded
+
+
+def _warm_goal_predictor():
+    from api.routes_matches import prediction_service
+    prediction_service._ensure_model()
+
+
+def _warm_tennis():
+    from tennis.predict import get_tennis_prediction_service
+    service = get_tennis_prediction_service()
+    service._ensure_loaded()
+    if service.player_index is not None:
+        service.player_index.freeze()
+
+
+WARM_UP_STEPS = [
+    ('football ensemble + match result models', _warm_football),
+    ('over 2.5 model', _warm_over25),
+    ('goal predictor model', _warm_goal_predictor),
+    ('tennis model + ATP history', _warm_tennis),
+]
+
+
+def warm_up() -> Dict[str, Any]:
+    """Load every model and reference dataset now (a failing step is skipped)"""
+    started = time.perf_counter()
+    print("🔥 Warm-up: загрузка моделей до fork воркеров...")
+
+    for name, step in WARM_UP_STEPS:
+        try:
+            step()
+        except Exception as e:
+            print(f"⚠️  Warm-up '{name}' не выполнен: {e}")
+
+    stats = model_registry.stats()
+    print(f"✅ Warm-up: {stats['loaded']}/{stats['registered']} артефактов за "
+          f"{time.perf_counter() - started:.1f}s, RSS {stats['rss_bytes'] / 1024 / 1024:.0f} MB")
+    return stats
+
+
+def freeze_heap():
+    """Collect garbage once, then exclude all existing objects from future collections"""
+    gc.collect()
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+
+
+# procfs (Linux); на других ОС его нет - статистика памяти пустая
+PROC_ROOT = '/proc'
+
+SMAPS_FIELDS = {
+    'Rss': 'rss_bytes',
+    'Pss': 'pss_bytes',
+    'Shared_Clean': 'shared_clean_bytes',
+    'Shared_Dirty': 'shared_dirty_bytes',
+    'Private_Clean': 'private_clean_bytes',
+    'Private_Dirty': 'private_dirty_bytes',
+}
+
+
+def process_memory(pid='self') -> Optional[Dict[str, int]]:
+    """
+    Shared / private memory of a process (Linux /proc/<pid>/smaps_rollup)
+
+    shared_bytes - pages also mapped by other processes (master / other workers),
+    private_bytes - pages only this process uses.
+    Returns None if the process is gone or smaps is unavailable.
+    """
+    try:
+        with open(os.path.join(PROC_ROOT, str(pid), 'smaps_rollup')) as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+
+    memory = {'pid': os.getpid() if pid == 'self' else int(pid)}
+    for line in lines:
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].rstrip(':') in SMAPS_FIELDS:
+            memory[SMAPS_FIELDS[parts[0].rstrip(':')]] = int(parts[1]) * 1024
+
+    memory['shared_bytes'] = memory.get('shared_clean_bytes', 0) + memory.get('shared_dirty_bytes', 0)
+    memory['private_bytes'] = memory.get('private_clean_bytes', 0) + memory.get('private_dirty_bytes', 0)
+    return memory
+
+
+def _sibling_pids(parent_pid: int) -> List[int]:
+    """Processes with the same parent (other Gunicorn workers)"""
+    try:
+        entries = os.listdir(PROC_ROOT)
+    except OSError:
+        return []
+
+    pids = []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(os.path.join(PROC_ROOT, entry, 'stat')) as f:
+                # pid (comm) state ppid ... - comm может содержать пробелы
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == parent_pid:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def worker_memory() -> Dict[str, Any]:
+    """Memory of this worker, the master and all sibling workers"""
+    master_pid = os.getppid()
+    workers = [memory for memory in (process_memory(pid) for pid in _sibling_pids(master_pid)) if memory]
+
+    return {
+        'worker': process_memory(),
+        'master': process_memory(master_pid),
+        'workers': workers,
+        'total_private_bytes': sum(memory['private_bytes'] for memory in workers),
+        'gc_frozen_objects': gc.get_freeze_count() if hasattr(gc, 'get_freeze_count') else None,
+        'models_loaded': model_registry.stats()['loaded'],
+    }
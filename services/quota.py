@@ -0,0 +1,403 @@
+"""
+Prediction Quota
+Daily prediction view counters outside the request transaction
+
+A view used to cost up to three commits (counter reset, counter increment,
+UserPrediction insert). Now:
+- the daily counter lives in a fast shared store (SQLite file or Redis,
+  same choice as the rate limiter) and the limit check + increment is one
+  atomic operation, so parallel requests of one user cannot overshoot
+- UserPrediction rows and the users.daily_predictions_count mirror are
+  written behind, in batches, by a background thread in every worker
+
+The counter key contains the date, so there is no reset write at midnight.
+A key that does not exist yet is seeded from users.daily_predictions_count,
+which keeps the count across a switch of backend or a store wipe.
+
+Views buffered in a worker that is killed hard (SIGKILL) are lost, at most
+VIEW_LOG_FLUSH_INTERVAL seconds of history; the quota itself is not affected.
+"""
+import atexit
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+COUNTER_TTL = 2 * 24 * 3600  # ключ дня живет до конца следующего дня
+
+
+class LocalQuotaStore:
+    """Counters in this process only"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self.counters: Dict[str, tuple] = {}
+        self.lock = threading.Lock()
+
+    def consume(self, key: str, limit: Optional[int], ttl: int, initial: int = 0, amount: int = 1) -> Tuple[bool, int]:
+        with self.lock:
+            now = time.time()
+            count, expires_at = self.counters.get(key, (initial, now + ttl))
+            if expires_at <= now:
+                count, expires_at = initial, now + ttl
+            if limit is not None and count + amount > limit:
+                self.counters[key] = (count, expires_at)
+                return False, count
+            count = max(0, count + amount)
+            self.counters[key] = (count, expires_at)
+            return True, count
+
+    def get(self, key: str, default: int = 0) -> int:
+        with self.lock:
+            entry = self.counters.get(key)
+        if entry is None or entry[1] <= time.time():
+            return default
+        return entry[0]
+
+
+class SQLiteQuotaStore:
+    """Counters in a SQLite file shared by all workers on one host"""
+
+    name = 'sqlite'
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(tempfile.gettempdir(), 'goalpredictor_quota.sqlite3')
+        self.local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None and self.local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS quota_counters ('
+            ' key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires_at REAL NOT NULL)'
+        )
+        self.local.conn = conn
+        self.local.pid = os.getpid()
+        return conn
+
+    def consume(self, key: str, limit: Optional[int], ttl: int, initial: int = 0, amount: int = 1) -> Tuple[bool, int]:
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()
+            row = conn.execute(
+                'SELECT count, expires_at FROM quota_counters WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                count, expires_at = initial, now + ttl
+                # Новый ключ дня - заодно убрать вчерашние
+                conn.execute('DELETE FROM quota_counters WHERE expires_at <= ?', (now,))
+            else:
+                count, expires_at = row
+
+            allowed = limit is None or count + amount <= limit
+            if allowed:
+                count = max(0, count + amount)
+            conn.execute(
+                'INSERT OR REPLACE INTO quota_counters (key, count, expires_at) VALUES (?, ?, ?)',
+                (key, count, expires_at)
+            )
+            conn.execute('COMMIT')
+            return allowed, count
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def get(self, key: str, default: int = 0) -> int:
+        row = self._connection().execute(
+            'SELECT count FROM quota_counters WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else default
+
+
+class RedisQuotaStore:
+    """Counters in Redis (atomic Lua script)"""
+
+    name = 'redis'
+
+    CONSUME_SCRIPT = """
+    local count = tonumber(redis.call('GET', KEYS[1]))
+    if not count then
+        count = tonumber(ARGV[3])
+        redis.call('SET', KEYS[1], count, 'EX', ARGV[2])
+    end
+    local limit = tonumber(ARGV[1])
+    local amount = tonumber(ARGV[4])
+    if limit >= 0 and count + amount > limit then
+        return {0, count}
+    end
+    count = redis.call('INCRBY', KEYS[1], amount)
+    if count < 0 then
+        count = redis.call('INCRBY', KEYS[1], -count)
+    end
+    return {1, count}
+    """
+
+    def __init__(self, client=None, url: Optional[str] = None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url or 'redis://localhost:6379/0')
+        self.client = client
+        self.consume_script = client.register_script(self.CONSUME_SCRIPT)
+
+    def consume(self, key: str, limit: Optional[int], ttl: int, initial: int = 0, amount: int = 1) -> Tuple[bool, int]:
+        allowed, count = self.consume_script(
+            keys=[f'goalpredictor:quota:{key}'],
+            args=[-1 if limit is None else limit, ttl, initial, amount]
+        )
+        return bool(int(allowed)), int(count)
+
+    def get(self, key: str, default: int = 0) -> int:
+        value = self.client.get(f'goalpredictor:quota:{key}')
+        return int(value) if value is not None else default
+
+
+def create_quota_store(backend: Optional[str] = None):
+    """Build the configured counter store (QUOTA_BACKEND = memory | sqlite | redis)"""
+    from config import Config
+
+    backend = (backend or Config.QUOTA_BACKEND or 'sqlite').lower()
+    try:
+        if backend == 'sqlite':
+            return SQLiteQuotaStore(path=Config.QUOTA_SQLITE_PATH)
+        if backend == 'redis':
+            store = RedisQuotaStore(url=Config.REDIS_URL)
+            store.client.ping()
+            return store
+    except Exception as e:
+        print(f"⚠️  Quota backend '{backend}' unavailable, using memory: {e}")
+
+    return LocalQuotaStore()
+
+
+class ViewLogBuffer:
+    """
+    Write-behind buffer for UserPrediction rows and users.daily_predictions_count
+
+    flush() writes everything buffered with two executemany statements in
+    one transaction on its own connection (the request session is never
+    committed). With an app bound (init_app) a daemon thread in each worker
+    flushes every `flush_interval` seconds or as soon as `max_batch` views
+    are waiting; without one, record_*() flushes immediately.
+    """
+
+    def __init__(self, flush_interval: float = 5.0, max_batch: int = 200):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.lock = threading.Lock()
+        self.views: List[dict] = []
+        self.counters: Dict[int, dict] = {}
+        self.app = None
+        self.background = False
+        self.pid = None
+        self.wakeup = threading.Event()
+        self.stats = {'recorded': 0, 'flushed': 0, 'flushes': 0, 'errors': 0}
+
+    def init_app(self, app, background: bool = True):
+        """Bind the app; background=False leaves flushing to the caller"""
+        self.app = app
+        self.background = background
+        if background:
+            atexit.register(self.flush)
+
+    def _ensure_started(self):
+        # Поток создается заново после fork воркера
+        if not self.background or self.pid == os.getpid():
+            return
+        self.pid = os.getpid()
+        self.views = []
+        self.counters = {}
+        threading.Thread(target=self._flush_loop, name='view-log-flusher', daemon=True).start()
+
+    def record_view(self, user_id: int, prediction_id: int, viewed_at: Optional[datetime] = None):
+        with self.lock:
+            self._ensure_started()
+            self.views.append({
+                'user_id': user_id,
+                'prediction_id': prediction_id,
+                'viewed_at': viewed_at or datetime.now(timezone.utc).replace(tzinfo=None),  # колонка без tzinfo
+            })
+            self.stats['recorded'] += 1
+            full = len(self.views) >= self.max_batch
+        self._after_record(full)
+
+    def record_counter(self, user_id: int, count: int, day: date):
+        with self.lock:
+            self._ensure_started()
+            # Только последнее значение: N просмотров = один UPDATE
+            self.counters[user_id] = {'user_id': user_id, 'count': count, 'day': day}
+        self._after_record(False)
+
+    def _after_record(self, full: bool):
+        if self.app is None:
+            self.flush()
+        elif full:
+            self.wakeup.set()
+
+    def pending(self) -> int:
+        with self.lock:
+            return len(self.views) + len(self.counters)
+
+    def _flush_loop(self):
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Write buffered views and counters; returns the number of views written"""
+        with self.lock:
+            views, counters = self.views, list(self.counters.values())
+            self.views, self.counters = [], {}
+        if not views and not counters:
+            return 0
+
+        try:
+            if self.app is not None:
+                with self.app.app_context():
+                    self._write(views, counters)
+            else:
+                self._write(views, counters)
+        except Exception as e:
+            # Вернуть в буфер: запишется при следующем сбросе
+            with self.lock:
+                self.views = views + self.views
+                for row in counters:
+                    self.counters.setdefault(row['user_id'], row)
+                self.stats['errors'] += 1
+            print(f"⚠️  View log flush failed ({len(views)} views pending): {e}")
+            return 0
+
+        with self.lock:
+            self.stats['flushed'] += len(views)
+            self.stats['flushes'] += 1
+        return len(views)
+
+    @staticmethod
+    def _write(views: List[dict], counters: List[dict]):
+        from sqlalchemy import bindparam, insert, update
+
+        from extensions import db
+        from models import User, UserPrediction
+
+        users = User.__table__
+        with db.engine.begin() as conn:
+            if views:
+                conn.execute(insert(UserPrediction.__table__), views)
+            if counters:
+                conn.execute(
+                    update(users)
+                    .where(users.c.id == bindparam('user_id'))
+                    .values(daily_predictions_count=bindparam('count'), last_prediction_date=bindparam('day')),
+                    counters
+                )
+
+
+class PredictionQuota:
+    """
+    Daily prediction limit (FREE_PREDICTIONS_PER_DAY, premium is unlimited)
+
+    Usage:
+        if not prediction_quota.consume(user):
+            return 403
+        ...
+        prediction_quota.record_view(user, prediction.id)
+    """
+
+    def __init__(self, store=None, buffer: Optional[ViewLogBuffer] = None):
+        self._store = store
+        self.buffer = buffer if buffer is not None else ViewLogBuffer()
+        self.lock = threading.Lock()
+
+    def init_app(self, app):
+        from config import Config
+
+        self.buffer.flush_interval = Config.VIEW_LOG_FLUSH_INTERVAL
+        self.buffer.max_batch = Config.VIEW_LOG_BATCH_SIZE
+        self.buffer.init_app(app)
+
+    @property
+    def store(self):
+        if self._store is None:
+            with self.lock:
+                if self._store is None:
+                    self._store = create_quota_store()
+        return self._store
+
+    @staticmethod
+    def _user(user):
+        # current_user (LocalProxy) -> объект модели
+        get_object = getattr(user, '_get_current_object', None)
+        return get_object() if get_object is not None else user
+
+    @staticmethod
+    def limit_for(user) -> Optional[int]:
+        if user.is_premium:
+            return None
+        from config import Config
+        return Config.FREE_PREDICTIONS_PER_DAY
+
+    @staticmethod
+    def _key(user_id: int, day: date) -> str:
+        return f'prediction_views:{user_id}:{day.isoformat()}'
+
+    @staticmethod
+    def _initial(user, day: date) -> int:
+        # Значение из БД (запись отстает не больше чем на flush_interval)
+        if user.last_prediction_date == day:
+            return user.daily_predictions_count or 0
+        return 0
+
+    def used(self, user) -> int:
+        """Views used today"""
+        user = self._user(user)
+        day = datetime.now(timezone.utc).date()
+        return self.store.get(self._key(user.id, day), default=self._initial(user, day))
+
+    def can_view(self, user) -> bool:
+        """Read-only check (the view itself must go through consume())"""
+        user = self._user(user)
+        limit = self.limit_for(user)
+        return limit is None or self.used(user) < limit
+
+    def consume(self, user, enforce: bool = True) -> bool:
+        """Atomically check the limit and count one view; False if the limit is reached"""
+        return self._add(self._user(user), 1, enforce)
+
+    def refund(self, user):
+        """Give back a view whose prediction could not be served"""
+        self._add(self._user(user), -1, enforce=False)
+
+    def _add(self, user, amount: int, enforce: bool) -> bool:
+        from sqlalchemy.orm.attributes import set_committed_value
+
+        day = datetime.now(timezone.utc).date()
+        allowed, count = self.store.consume(
+            self._key(user.id, day),
+            self.limit_for(user) if enforce else None,
+            COUNTER_TTL,
+            initial=self._initial(user, day),
+            amount=amount
+        )
+        if allowed:
+            # Без пометки "изменен": объект в сессии не попадет в UPDATE запроса
+            set_committed_value(user, 'daily_predictions_count', count)
+            set_committed_value(user, 'last_prediction_date', day)
+            self.buffer.record_counter(user.id, count, day)
+        return allowed
+
+    def record_view(self, user, prediction_id: int):
+        """Log a view (UserPrediction) write-behind"""
+        self.buffer.record_view(self._user(user).id, prediction_id)
+
+
+# Глобальный экземпляр
+prediction_quota = PredictionQuota()
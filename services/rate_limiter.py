@@ -0,0 +1,360 @@
+"""
+Rate limiting for upstream APIs
+Token bucket shared between Gunicorn workers + priority request queue
+
+Football-Data.org free tier: 10 requests/min. All workers take tokens from
+one bucket (SQLite file or Redis), interactive page requests are dispatched
+before scheduler jobs, and identical queued requests are merged.
+"""
+import contextlib
+import contextvars
+import heapq
+import itertools
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+# Приоритеты запросов (меньше = раньше)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+_request_priority = contextvars.ContextVar('request_priority', default=PRIORITY_INTERACTIVE)
+
+
+@contextlib.contextmanager
+def request_priority(priority: int):
+    """
+    Set the priority of upstream requests made inside the block
+
+    Example:
+        with request_priority(PRIORITY_BACKGROUND):
+            football_api.get_team_statistics(...)
+    """
+    token = _request_priority.set(priority)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+
+def current_priority() -> int:
+    return _request_priority.get()
+
+
+class LocalBucketStore:
+    """Bucket state in this process only"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self.state: Dict[str, tuple] = {}
+        self.lock = threading.Lock()
+
+    def take(self, bucket: str, capacity: float, rate: float) -> float:
+        with self.lock:
+            now = time.time()
+            tokens, updated_at = self.state.get(bucket, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            if tokens >= 1:
+                self.state[bucket] = (tokens - 1, now)
+                return 0.0
+            self.state[bucket] = (tokens, now)
+            return (1 - tokens) / rate
+
+    def drain(self, bucket: str, seconds: float, rate: float):
+        with self.lock:
+            # Отрицательный баланс = пауза на seconds
+            self.state[bucket] = (-seconds * rate, time.time())
+
+
+class SQLiteBucketStore:
+    """Bucket state in a SQLite file shared by all workers on one host"""
+
+    name = 'sqlite'
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(tempfile.gettempdir(), 'goalpredictor_ratelimit.sqlite3')
+        self.local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None and self.local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS token_buckets ('
+            ' name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)'
+        )
+        self.local.conn = conn
+        self.local.pid = os.getpid()
+        return conn
+
+    def take(self, bucket: str, capacity: float, rate: float) -> float:
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()
+            row = conn.execute(
+                'SELECT tokens, updated_at FROM token_buckets WHERE name = ?', (bucket,)
+            ).fetchone()
+            tokens, updated_at = row if row else (capacity, now)
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+
+            conn.execute(
+                'INSERT OR REPLACE INTO token_buckets (name, tokens, updated_at) VALUES (?, ?, ?)',
+                (bucket, tokens, now)
+            )
+            conn.execute('COMMIT')
+            return wait
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def drain(self, bucket: str, seconds: float, rate: float):
+        self._connection().execute(
+            'INSERT OR REPLACE INTO token_buckets (name, tokens, updated_at) VALUES (?, ?, ?)',
+            (bucket, -seconds * rate, time.time())
+        )
+
+
+class RedisBucketStore:
+    """Bucket state in Redis (atomic Lua script)"""
+
+    name = 'redis'
+
+    TAKE_SCRIPT = """
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local tokens = tonumber(state[1]) or capacity
+    local updated_at = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + (now - updated_at) * rate)
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+    redis.call('EXPIRE', KEYS[1], 3600)
+    return tostring(wait)
+    """
+
+    def __init__(self, client=None, url: Optional[str] = None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url or 'redis://localhost:6379/0')
+        self.client = client
+        self.take_script = client.register_script(self.TAKE_SCRIPT)
+
+    def take(self, bucket: str, capacity: float, rate: float) -> float:
+        key = f'goalpredictor:bucket:{bucket}'
+        return float(self.take_script(keys=[key], args=[capacity, rate, time.time()]))
+
+    def drain(self, bucket: str, seconds: float, rate: float):
+        key = f'goalpredictor:bucket:{bucket}'
+        self.client.hset(key, mapping={'tokens': -seconds * rate, 'updated_at': time.time()})
+
+
+def create_bucket_store(backend: Optional[str] = None):
+    """Build the configured bucket store (RATE_LIMIT_BACKEND = memory | sqlite | redis)"""
+    from config import Config
+
+    backend = (backend or Config.RATE_LIMIT_BACKEND or 'sqlite').lower()
+    try:
+        if backend == 'sqlite':
+            return SQLiteBucketStore(path=Config.RATE_LIMIT_SQLITE_PATH)
+        if backend == 'redis':
+            store = RedisBucketStore(url=Config.REDIS_URL)
+            store.client.ping()
+            return store
+    except Exception as e:
+        print(f"⚠️  Rate limit backend '{backend}' unavailable, using memory: {e}")
+
+    return LocalBucketStore()
+
+
+class TokenBucket:
+    """Token bucket: `capacity` requests burst, refilled at `per_minute` / 60 per second"""
+
+    def __init__(self, name: str, per_minute: float, capacity: Optional[float] = None, store=None):
+        self.name = name
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.store = store if store is not None else LocalBucketStore()
+
+    def try_acquire(self) -> float:
+        """Take a token; returns 0 on success or seconds to wait"""
+        return self.store.take(self.name, self.capacity, self.rate)
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Block until a token is available (or timeout)"""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return True
+            if deadline is not None and time.time() + wait > deadline:
+                return False
+            time.sleep(min(wait, 1.0))
+
+    def penalize(self, seconds: float):
+        """Upstream said 'too many requests' - pause everyone for `seconds`"""
+        self.store.drain(self.name, seconds, self.rate)
+
+
+class PriorityRequestQueue:
+    """
+    Dispatches upstream requests in priority order, one token per request
+
+    Requests with the same key that are already queued or running are merged:
+    all callers share one Future. A duplicate with a higher priority promotes
+    the queued request.
+    """
+
+    ERROR_BACKOFF = 1.0
+    MAX_ERROR_BACKOFF = 30.0
+
+    def __init__(self, bucket: TokenBucket, max_concurrency: int = 3):
+        self.bucket = bucket
+        self.max_concurrency = max_concurrency
+        self.lock = threading.Condition()
+        self.heap = []
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.counter = itertools.count()
+        self.pid = None
+        self.executor = None
+        self.stats = {'submitted': 0, 'merged': 0, 'dispatched': 0}
+
+    def _ensure_started(self):
+        # Поток-диспетчер создается заново после fork воркера
+        if self.pid == os.getpid():
+            return
+        self.pid = os.getpid()
+        self.heap = []
+        self.pending = {}
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                           thread_name_prefix=f'{self.bucket.name}-request')
+        threading.Thread(target=self._dispatch_loop, name=f'{self.bucket.name}-dispatcher',
+                         daemon=True).start()
+
+    def submit(self, key: str, func: Callable[[], Any], priority: Optional[int] = None) -> Future:
+        """Queue `func` (or join an identical queued request)"""
+        if priority is None:
+            priority = current_priority()
+
+        with self.lock:
+            self._ensure_started()
+            self.stats['submitted'] += 1
+
+            entry = self.pending.get(key)
+            if entry is not None:
+                self.stats['merged'] += 1
+                if priority < entry['priority'] and not entry['started']:
+                    entry['priority'] = priority
+                    heapq.heappush(self.heap, (priority, next(self.counter), key))
+                    self.lock.notify()
+                return entry['future']
+
+            entry = {'func': func, 'priority': priority, 'future': Future(), 'started': False}
+            self.pending[key] = entry
+            heapq.heappush(self.heap, (priority, next(self.counter), key))
+            self.lock.notify()
+            return entry['future']
+
+    def call(self, key: str, func: Callable[[], Any], priority: Optional[int] = None,
+             timeout: Optional[float] = None):
+        """
+        Submit and wait for the result
+
+        On timeout the request stays queued (it will still fill the cache),
+        TimeoutError is raised to the caller.
+        """
+        return self.submit(key, func, priority).result(timeout=timeout)
+
+    def _drop_stale(self) -> bool:
+        """Discard stale heap items; True if a request is waiting (called under self.lock)"""
+        while self.heap:
+            priority, _, key = self.heap[0]
+            entry = self.pending.get(key)
+            # Устаревшие записи: приоритет повышен (есть новая запись) или уже запущен
+            if entry is None or entry['started'] or entry['priority'] != priority:
+                heapq.heappop(self.heap)
+                continue
+            return True
+        return False
+
+    def _pop_entry(self):
+        """Highest-priority request that is still waiting (None if only stale items left)"""
+        with self.lock:
+            if not self._drop_stale():
+                return None
+            _, _, key = heapq.heappop(self.heap)
+            entry = self.pending[key]
+            entry['started'] = True
+            self.stats['dispatched'] += 1
+            return key, entry
+
+    def _fail_waiting(self, error: BaseException):
+        """Resolve every request that has not started with `error` (callers must not hang)"""
+        with self.lock:
+            waiting = [(key, entry) for key, entry in self.pending.items() if not entry['started']]
+            for key, _ in waiting:
+                del self.pending[key]
+            self.heap = []
+        for _, entry in waiting:
+            entry['future'].set_exception(error)
+
+    def _dispatch_loop(self):
+        backoff = self.ERROR_BACKOFF
+        while True:
+            with self.lock:
+                while not self._drop_stale():
+                    self.lock.wait()
+
+            try:
+                # Токен берется только под живой запрос, а выбор запроса - после токена:
+                # пока ждем токен, более приоритетный запрос может встать в начало очереди
+                self.bucket.acquire()
+                item = self._pop_entry()
+                if item is not None:
+                    self.executor.submit(self._run, *item)
+                backoff = self.ERROR_BACKOFF
+            except Exception as e:
+                # Хранилище лимитов недоступно (SQLite locked, Redis): ждущие получают ошибку,
+                # диспетчер продолжает работу
+                print(f"⚠️  {self.bucket.name} dispatcher error, retry in {backoff:.0f}s: {e}")
+                self._fail_waiting(e)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.MAX_ERROR_BACKOFF)
+
+    def _run(self, key, entry):
+        try:
+            result = entry['func']()
+        except BaseException as e:
+            with self.lock:
+                self.pending.pop(key, None)
+            entry['future'].set_exception(e)
+            return
+
+        with self.lock:
+            self.pending.pop(key, None)
+        entry['future'].set_result(result)
+
+    def queue_size(self) -> int:
+        with self.lock:
+            return sum(1 for entry in self.pending.values() if not entry['started'])
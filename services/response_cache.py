@@ -0,0 +1,118 @@
+"""
+Response Cache
+Rendered JSON bodies of public endpoints shared by all workers + conditional GET
+
+Per (endpoint, query string, user tier) the rendered body is kept in the
+CACHE_BACKEND store together with a strong ETag (hash of the body) and
+the data version it was rendered from. A request:
+1. computes the data version (a cheap query, or nothing for TTL-only routes)
+2. reuses the stored body if it was rendered from the same version
+3. answers If-None-Match with 304 without sending the body again
+
+Tier dependent endpoints send `Vary: Cookie` and mark logged-in variants
+`private`, so shared proxies never hand a premium body to a free user.
+
+Usage:
+    @matches_bp.route('/today')
+    @response_cache.cached(ttl=300, max_age=30, version=predictions_version)
+    def get_todays_matches(): ...
+"""
+import functools
+import hashlib
+from typing import Callable, Optional
+from urllib.parse import urlencode
+
+from flask import Response, make_response, request
+from flask_login import current_user
+
+from services.cache import SimpleCache, create_cache_backend
+
+
+def user_tier() -> str:
+    """anonymous | free | premium - the variants a public endpoint renders differently"""
+    if not current_user or not current_user.is_authenticated:
+        return 'anonymous'
+    return 'premium' if current_user.is_premium else 'free'
+
+
+def _etag(body: bytes) -> str:
+    return hashlib.sha1(body).hexdigest()
+
+
+class ResponseCache:
+    """Shared rendered-body cache with ETag / Cache-Control handling"""
+
+    def __init__(self, cache: Optional[SimpleCache] = None):
+        self._cache = cache
+        self.enabled = True
+
+    @property
+    def cache(self) -> SimpleCache:
+        if self._cache is None:
+            self._cache = SimpleCache(ttl_seconds=300, backend=create_cache_backend('responses'))
+        return self._cache
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RESPONSE_CACHE_ENABLED', True)
+
+    @staticmethod
+    def _key(tier: str) -> str:
+        query = urlencode(sorted(request.args.items(multi=True)))
+        return f'{request.endpoint}:{tier}:{query}'
+
+    def cached(self, ttl: int, max_age: int, version: Optional[Callable[[], str]] = None,
+               vary_tier: bool = True):
+        """
+        Cache decorator for GET JSON views
+
+        Args:
+            ttl: Seconds a rendered body is reused (also when the version did not change)
+            max_age: Cache-Control max-age for browsers / proxies
+            version: () -> str, data version; a new value re-renders the body
+            vary_tier: Render separately for anonymous / free / premium users
+        """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or request.method != 'GET':
+                    return view(*args, **kwargs)
+
+                tier = user_tier() if vary_tier else 'anonymous'
+                key = self._key(tier)
+                data_version = version() if version is not None else ''
+
+                entry = self.cache.get(key)
+                status = 'HIT'
+                if entry is None or entry.get('version') != data_version:
+                    status = 'MISS'
+                    response = make_response(view(*args, **kwargs))
+                    # Ошибки и не-JSON не кэшируем
+                    if response.status_code != 200 or response.mimetype != 'application/json':
+                        return response
+                    body = response.get_data()
+                    entry = {'version': data_version, 'etag': _etag(body), 'body': body.decode('utf-8')}
+                    self.cache.set(key, entry, ttl)
+
+                return self._respond(entry, tier, vary_tier, max_age, status)
+
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def _respond(entry: dict, tier: str, vary_tier: bool, max_age: int, status: str) -> Response:
+        if request.if_none_match.contains_weak(entry['etag']):  # W/ после сжатия
+            response = Response(status=304)
+        else:
+            response = Response(entry['body'], mimetype='application/json')
+
+        response.set_etag(entry['etag'])
+        scope = 'public' if tier == 'anonymous' else 'private'
+        response.headers['Cache-Control'] = f'{scope}, max-age={max_age}'
+        if vary_tier:
+            response.vary.add('Cookie')
+        response.headers['X-Cache'] = status
+        return response
+
+
+# Глобальный экземпляр
+response_cache = ResponseCache()
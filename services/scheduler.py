@@ -3,16 +3,20 @@
 """
 import os
 import sys
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from models import Match, Team, Prediction, User
+from models import Match, Prediction, User
 from services.football_api import FootballAPIService
 from ml.predict import PredictionService
 from services.openai_service import OpenAIService
+from services.cache import team_form_cache
+from services.team_stats import refresh_team_stats
+from services.prediction_store import materialize_predictions, store_fixtures
+from services.rate_limiter import request_priority, PRIORITY_BACKGROUND
 from extensions import db
 
 
@@ -32,19 +36,24 @@ class TaskScheduler:
         """
         Запустить планировщик
         """
-        # Обновление матчей каждое утро в 07:00
+        # Обновление матчей каждое утро в 07:00 и сразу при старте:
+        # пустая БД получает матчи и прогнозы без участия запросов
         self.scheduler.add_job(
             self.update_fixtures,
             trigger=CronTrigger(hour=7, minute=0),
+            next_run_time=datetime.now(),
             id='update_fixtures',
             name='Обновление расписания матчей',
             replace_existing=True
         )
         
-        # Создание прогнозов каждое утро в 08:00
+        # Прогнозы на ближайшие матчи: пересчет новых/изменившихся
+        # (первый расчет - в конце update_fixtures при старте)
+        from config import Config
         self.scheduler.add_job(
             self.generate_predictions,
-            trigger=CronTrigger(hour=8, minute=0),
+            trigger='interval',
+            minutes=Config.PREDICTION_REFRESH_MINUTES,
             id='generate_predictions',
             name='Генерация прогнозов',
             replace_existing=True
@@ -92,7 +101,7 @@ class TaskScheduler:
         """
         Обновить расписание матчей на сегодня и ближайшие дни
         """
-        with self.app.app_context():
+        with self.app.app_context(), request_priority(PRIORITY_BACKGROUND):
             print("🔄 Обновление расписания матчей...")
             
             try:
@@ -102,35 +111,7 @@ class TaskScheduler:
                 for league_name, league_id in Config.LEAGUES.items():
                     fixtures = self.football_api.get_upcoming_fixtures(league_id, days=7)
                     
-                    for fixture in fixtures:
-                        # Проверить существует ли матч
-                        match = Match.query.filter_by(api_id=fixture['id']).first()
-                        
-                        if not match:
-                            # Создать новый матч
-                            # Сначала получить/создать команды
-                            home_team = self._get_or_create_team(
-                                fixture['home_team_id'],
-                                fixture['home_team_name'],
-                                league_name
-                            )
-                            
-                            away_team = self._get_or_create_team(
-                                fixture['away_team_id'],
-                                fixture['away_team_name'],
-                                league_name
-                            )
-                            
-                            match = Match(
-                                api_id=fixture['id'],
-                                home_team_id=home_team.id,
-                                away_team_id=away_team.id,
-                                league=league_name,
-                                match_date=datetime.fromisoformat(fixture['date'].replace('Z', '+00:00')),
-                                status=fixture['status']
-                            )
-                            
-                            db.session.add(match)
+                    store_fixtures(fixtures, league_name)
                 
                 db.session.commit()
                 print(f"✅ Расписание обновлено")
@@ -138,78 +119,29 @@ class TaskScheduler:
             except Exception as e:
                 db.session.rollback()
                 print(f"❌ Ошибка обновления расписания: {e}")
-    
-    def _get_or_create_team(self, api_id, name, league):
-        """Получить или создать команду"""
-        team = Team.query.filter_by(api_id=api_id).first()
         
-        if not team:
-            team = Team(
-                api_id=api_id,
-                name=name,
-                league=league,
-                country='Unknown'
-            )
-            db.session.add(team)
-            db.session.flush()
-        
-        return team
+        # Новые матчи получают прогноз сразу, а не к следующему запуску
+        # (и матчи, уже лежащие в БД, если API недоступен)
+        self.generate_predictions()
     
     def generate_predictions(self):
         """
-        Создать прогнозы на сегодняшние матчи
+        Посчитать прогнозы на ближайшие матчи заранее (services/prediction_store.py)
+        
+        Пересчитываются только матчи, у которых изменились модель или признаки
         """
-        with self.app.app_context():
-            print("🎯 Генерация прогнозов на сегодня...")
+        with self.app.app_context(), request_priority(PRIORITY_BACKGROUND):
+            print("🎯 Генерация прогнозов на ближайшие матчи...")
             
             try:
-                # Получить матчи на сегодня без прогнозов
-                today = datetime.utcnow().date()
-                
-                matches = Match.query.filter(
-                    db.func.date(Match.match_date) == today,
-                    Match.status == 'scheduled'
-                ).all()
-                
-                generated = 0
-                
-                for match in matches:
-                    # Проверить есть ли уже прогноз
-                    existing = Prediction.query.filter_by(match_id=match.id).first()
-                    
-                    if existing:
-                        continue
-                    
-                    # Создать прогноз
-                    match_data = {
-                        'home_team_id': match.home_team.api_id,
-                        'away_team_id': match.away_team.api_id,
-                        'home_team_name': match.home_team.name,
-                        'away_team_name': match.away_team.name,
-                        'league': match.league,
-                        'date': match.match_date
-                    }
-                    
-                    prediction_data = self.prediction_service.predict_match(
-                        match_data,
-                        include_explanation=True
-                    )
-                    
-                    # Сохранить прогноз
-                    prediction = Prediction(
-                        match_id=match.id,
-                        probability=prediction_data['probability'],
-                        confidence=prediction_data['confidence'],
-                        explanation=prediction_data.get('explanation'),
-                        factors=prediction_data.get('features'),
-                        model_version=prediction_data.get('model_version')
-                    )
-                    
-                    db.session.add(prediction)
-                    generated += 1
+                from config import Config
                 
-                db.session.commit()
-                print(f"✅ Создано прогнозов: {generated}")
+                stats = materialize_predictions(
+                    self.prediction_service,
+                    horizon_days=Config.PREDICTION_HORIZON_DAYS
+                )
+                print(f"✅ Прогнозы: новых {stats['created']}, обновлено {stats['updated']}, "
+                      f"без изменений {stats['unchanged']}")
                 
             except Exception as e:
                 db.session.rollback()
@@ -219,7 +151,7 @@ class TaskScheduler:
         """
         Обновить результаты завершенных матчей
         """
-        with self.app.app_context():
+        with self.app.app_context(), request_priority(PRIORITY_BACKGROUND):
             print("🔄 Обновление результатов матчей...")
             
             try:
@@ -240,6 +172,11 @@ class TaskScheduler:
                         match.total_goals = result['total_goals']
                         match.status = result['status']
                         
+                        # Новый завершенный матч - сбросить кэш формы команд
+                        for team in (match.home_team, match.away_team):
+                            if team is not None:
+                                team_form_cache.invalidate(team.api_id, match.match_date)
+                        
                         # Проверить правильность прогноза
                         prediction = Prediction.query.filter_by(match_id=match.id).first()
                         
@@ -261,38 +198,17 @@ class TaskScheduler:
     
     def update_team_statistics(self):
         """
-        Обновить статистику всех команд
+        Досчитать статистику команд по новым завершенным матчам
+        
+        Результаты обычно учитываются сразу при записи (services/team_stats.py),
+        здесь - только матчи, записанные в обход ORM. Без запросов к API.
         """
         with self.app.app_context():
             print("📊 Обновление статистики команд...")
             
             try:
-                teams = Team.query.all()
-                updated = 0
-                
-                from config import Config
-                
-                for team in teams:
-                    # Получить ID лиги
-                    league_id = Config.LEAGUES.get(team.league)
-                    
-                    if not league_id:
-                        continue
-                    
-                    # Получить статистику
-                    stats = self.football_api.get_team_statistics(team.api_id, league_id)
-                    
-                    if stats:
-                        team.total_matches = stats.get('total_matches', 0)
-                        team.goals_scored = stats.get('goals_scored', 0)
-                        team.goals_conceded = stats.get('goals_conceded', 0)
-                        team.avg_goals_per_match = stats.get('avg_goals_scored', 0)
-                        team.last_update = datetime.utcnow()
-                        
-                        updated += 1
-                
-                db.session.commit()
-                print(f"✅ Обновлено команд: {updated}")
+                applied = refresh_team_stats()
+                print(f"✅ Учтено новых матчей: {applied}")
                 
             except Exception as e:
                 db.session.rollback()
@@ -349,6 +265,50 @@ def start_scheduler(app):
     return scheduler
 
 
+_leader_lock_files = []
+
+
+def start_scheduler_leader(app, lock_path=None, retry_seconds=60):
+    """
+    Запустить планировщик ровно в одном процессе (воркеры Gunicorn)
+    
+    Планировщик работает в воркере, захватившем flock на SCHEDULER_LOCK_FILE.
+    ОС снимает блокировку при выходе процесса (в т.ч. перезапуск после
+    max_requests), остальные воркеры раз в retry_seconds пробуют ее забрать.
+    
+    Returns:
+        bool: планировщик запущен в этом процессе
+    """
+    import fcntl
+    import threading
+    from config import Config
+    
+    # Файл открыт, пока жив процесс: закрытие (в т.ч. сборщиком мусора) сняло бы блокировку
+    lock_file = open(lock_path or Config.SCHEDULER_LOCK_FILE, 'a')
+    _leader_lock_files.append(lock_file)
+    
+    def try_lead():
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        print(f"🗓️  Планировщик запущен в процессе {os.getpid()}")
+        start_scheduler(app)
+        return True
+    
+    if try_lead():
+        return True
+    
+    def wait_for_leadership():
+        stop = threading.Event()
+        while not stop.wait(retry_seconds):
+            if try_lead():
+                return
+    
+    threading.Thread(target=wait_for_leadership, name='scheduler-leader', daemon=True).start()
+    return False
+
+
 if __name__ == '__main__':
     from app import create_app
     
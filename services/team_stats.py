@@ -0,0 +1,201 @@
+"""
+Team Stats
+Materialized team statistics with incremental refresh
+
+Every flush that writes a finished Match result folds it into team_stats
+(running sums, Over 2.5 count, form ring buffer) and mirrors the totals
+into the Team columns. team_stats_matches remembers which results were
+already counted, so the same match is never counted twice and a corrected
+score only replaces its own contribution.
+
+refresh_team_stats() catches up results written past the ORM (raw SQL,
+bulk loads): it only reads finished matches that are not in
+team_stats_matches, so a refresh costs O(new matches) and no API calls.
+
+Form is a ring buffer of the latest results. A corrected score changes a
+result somewhere inside it, so the form of both teams is rebuilt from
+their last FORM_LENGTH finished matches.
+"""
+from datetime import datetime, timezone
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import event, func, or_
+
+from extensions import db
+from models import Match, Team, TeamStats, TeamStatsMatch
+
+FINISHED = 'finished'
+
+
+def match_score(match) -> Optional[Tuple[int, int]]:
+    """(home, away) goals of a finished match, None otherwise"""
+    if (match.status or '').lower() != FINISHED:
+        return None
+    home = match.home_goals if match.home_goals is not None else match.home_score
+    away = match.away_goals if match.away_goals is not None else match.away_score
+    if home is None or away is None:
+        return None
+    return int(home), int(away)
+
+
+def apply_results(session, matches: Iterable[Match]) -> int:
+    """
+    Fold finished matches into team_stats (one query per table for the whole batch)
+
+    Returns:
+        Number of results that changed the stats
+    """
+    results = []
+    for match in matches:
+        score = match_score(match)
+        if score is not None and match.home_team_id is not None and match.away_team_id is not None:
+            results.append((match, score))
+    if not results:
+        return 0
+
+    ledger = {
+        entry.match_api_id: entry
+        for entry in session.query(TeamStatsMatch).filter(
+            TeamStatsMatch.match_api_id.in_([match.api_id for match, _ in results])
+        )
+    }
+    team_ids = {team_id for match, _ in results for team_id in (match.home_team_id, match.away_team_id)}
+    stats = {row.team_id: row for row in session.query(TeamStats).filter(TeamStats.team_id.in_(team_ids))}
+
+    def team_stats(team_id):
+        if team_id not in stats:
+            stats[team_id] = TeamStats(team_id=team_id)
+            session.add(stats[team_id])
+        return stats[team_id]
+
+    touched = set()
+    corrected = set()
+    applied = 0
+    for match, (home, away) in sorted(results, key=lambda item: item[0].match_date or datetime.min):
+        home_stats = team_stats(match.home_team_id)
+        away_stats = team_stats(match.away_team_id)
+
+        entry = ledger.get(match.api_id)
+        if entry is None:
+            entry = TeamStatsMatch(match_api_id=match.api_id)
+            session.add(entry)
+            ledger[match.api_id] = entry
+        elif (entry.home_goals, entry.away_goals) == (home, away):
+            continue
+        else:
+            # Исправленный счет: откатить старый вклад в суммы
+            home_stats.record(entry.home_goals, entry.away_goals, match.match_date, sign=-1)
+            away_stats.record(entry.away_goals, entry.home_goals, match.match_date, sign=-1)
+            corrected.update((match.home_team_id, match.away_team_id))
+
+        home_stats.record(home, away, match.match_date)
+        away_stats.record(away, home, match.match_date)
+        entry.home_goals, entry.away_goals = home, away
+        touched.update((match.home_team_id, match.away_team_id))
+        applied += 1
+
+    for team_id in corrected:
+        _rebuild_form(session, stats[team_id], [match for match, _ in results])
+    if touched:
+        _sync_teams(session, {team_id: stats[team_id] for team_id in touched})
+    return applied
+
+
+def _rebuild_form(session, row: TeamStats, batch: Iterable[Match]):
+    """Form from the team's last FORM_LENGTH finished matches (stored ones + this batch)"""
+    team_id = row.team_id
+    stored = (
+        session.query(Match)
+        .filter(
+            or_(Match.home_team_id == team_id, Match.away_team_id == team_id),
+            func.lower(Match.status) == FINISHED,
+        )
+        .order_by(Match.match_date.desc())
+        .limit(row.FORM_LENGTH)
+        .all()
+    )
+    candidates = {match.api_id: match for match in stored}
+    candidates.update(
+        (match.api_id, match) for match in batch if team_id in (match.home_team_id, match.away_team_id)
+    )
+
+    # Счет - из объектов сессии: исправление в этом flush еще не записано в БД
+    results = []
+    for match in candidates.values():
+        score = match_score(match)
+        if score is None:
+            continue
+        scored, conceded = score if match.home_team_id == team_id else score[::-1]
+        results.append((match.match_date or datetime.min, scored, conceded))
+    results.sort(key=lambda result: result[0])
+    results = results[-row.FORM_LENGTH:]
+
+    row.form = ''.join(
+        'W' if scored > conceded else ('D' if scored == conceded else 'L') for _, scored, conceded in results
+    )
+    row.last_match_date = results[-1][0] if results else None
+
+
+def _sync_teams(session, stats):
+    """Mirror materialized stats into the Team columns read by the app"""
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    for team in session.query(Team).filter(Team.id.in_(list(stats))):
+        row = stats[team.id]
+        team.total_matches = row.matches_played
+        team.goals_scored = row.goals_scored
+        team.goals_conceded = row.goals_conceded
+        team.avg_goals_per_match = row.avg_goals_per_match
+        team.over_2_5_percentage = row.over_2_5_percentage
+        team.last_5_form = row.form
+        team.last_update = now
+
+
+def refresh_team_stats(batch_size: int = 5000) -> int:
+    """
+    Count finished matches that are not in team_stats yet (the first run builds everything)
+
+    Returns:
+        Number of matches applied
+    """
+    applied = 0
+    while True:
+        pending = (
+            Match.query
+            .outerjoin(TeamStatsMatch, TeamStatsMatch.match_api_id == Match.api_id)
+            .filter(
+                TeamStatsMatch.match_api_id.is_(None),
+                func.lower(Match.status) == FINISHED,
+                func.coalesce(Match.home_goals, Match.home_score).isnot(None),
+                func.coalesce(Match.away_goals, Match.away_score).isnot(None),
+            )
+            .order_by(Match.match_date)
+            .limit(batch_size)
+            .all()
+        )
+        if not pending:
+            break
+        with db.session.no_autoflush:
+            applied += apply_results(db.session, pending)
+        db.session.commit()
+    return applied
+
+
+def rebuild_team_stats() -> int:
+    """Drop materialized stats and count every finished match again"""
+    TeamStatsMatch.query.delete()
+    TeamStats.query.delete()
+    db.session.commit()
+    return refresh_team_stats()
+
+
+def _before_flush(session, flush_context, instances):
+    matches = [obj for obj in list(session.new) + list(session.dirty) if isinstance(obj, Match)]
+    if matches:
+        with session.no_autoflush:
+            apply_results(session, matches)
+
+
+def install_team_stats_listener():
+    """Update team_stats on every flush that writes Match results"""
+    if not event.contains(db.session, 'before_flush', _before_flush):
+        event.listen(db.session, 'before_flush', _before_flush)
@@ -6,13 +6,20 @@ Documentation: https://matchstat.com/predictions-tips/the-best-tennis-data-api-f
 FREE tier: 100 requests/month
 """
 import os
-import requests
+from concurrent.futures import Future
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import logging
 
+from services.async_io import completed, gather, io_pool, then
+from services.http_cache import ResponseStore
+from services.http_client import get_session
+
 logger = logging.getLogger(__name__)
 
+# Ответы API на диске: free tier всего 100 запросов/мес, не тратить их после перезапуска
+tennis_response_store = ResponseStore('tennis-api')
+
 
 class TennisAPIService:
     """
@@ -50,6 +57,7 @@ class TennisAPIService:
         
     def _make_request(self, endpoint: str, params: Dict = None) -> Optional[Dict]:
         """Make API request with error handling"""
+        stored = None
         try:
             # Check if we have API key
             if not self.api_key or self.api_key == 'DEMO_KEY' or self.api_key.startswith('your-'):
@@ -68,31 +76,61 @@ class TennisAPIService:
                 # Fallback
                 url = f"{self.BASE_URL}/{endpoint}"
             
-            response = requests.get(url, headers=self.headers, timeout=10)
+            stored = self._stored_response(url)
+            if stored is not None and stored.is_fresh:
+                logger.info(f"✓ Stored response: {endpoint} (age {int(stored.age)}s)")
+                return stored.data
+            
+            headers = dict(self.headers)
+            if stored is not None:
+                # Conditional request: 304 keeps the stored body
+                headers.update(stored.conditional_headers())
+            
+            response = get_session('tennis').get(url, headers=headers)
             
             print(f"🔍 API Request: {url}")
             print(f"🔍 Status: {response.status_code}")
             
-            if response.status_code == 200:
+            if response.status_code == 304 and stored is not None:
+                logger.info(f"✓ Not modified: {endpoint}")
+                return tennis_response_store.refresh(url, self.cache_ttl, response.headers).data
+            elif response.status_code == 200:
                 data = response.json()
                 print(f"🔍 Response keys: {list(data.keys()) if isinstance(data, dict) else 'not a dict'}")
                 if isinstance(data, dict) and 'results' in data:
                     print(f"🔍 Found {data.get('results', 0)} results")
                 logger.info(f"✓ API call successful: {endpoint}")
+                tennis_response_store.put(url, data, self.cache_ttl, response.headers)
                 return data
             elif response.status_code == 401:
                 logger.error(f"❌ Authentication failed - check your API key")
-                return self._get_demo_data(endpoint, params)
+                return self._fallback_data(endpoint, params, stored)
             elif response.status_code == 429:
-                logger.error(f"❌ Rate limit exceeded - using demo data")
-                return self._get_demo_data(endpoint, params)
+                logger.error(f"❌ Rate limit exceeded - using stored or demo data")
+                return self._fallback_data(endpoint, params, stored)
             else:
                 logger.error(f"❌ API error {response.status_code}: {endpoint}")
-                return self._get_demo_data(endpoint, params)
+                return self._fallback_data(endpoint, params, stored)
                 
         except Exception as e:
+            # Connection errors / timeouts: a stale real response beats demo fixtures
             logger.error(f"❌ API exception: {e}")
-            return self._get_demo_data(endpoint, params)
+            return self._fallback_data(endpoint, params, stored)
+    
+    def _stored_response(self, url: str):
+        """Response saved by an earlier request (fresh or stale), None if unavailable"""
+        try:
+            return tennis_response_store.get(url)
+        except Exception as e:
+            logger.warning(f"⚠️  Response store error: {e}")
+            return None
+    
+    def _fallback_data(self, endpoint: str, params: Dict, stored) -> Dict:
+        """Stale stored response if we have one, otherwise demo data"""
+        if stored is not None:
+            logger.info(f"♻️  Using stored response ({int(stored.age)}s old): {endpoint}")
+            return stored.data
+        return self._get_demo_data(endpoint, params)
     
     def _get_demo_data(self, endpoint: str, params: Dict = None) -> Dict:
         """Return demo data when API key is not available"""
@@ -189,32 +227,47 @@ class TennisAPIService:
                 }
             }
         """
-        logger.info(f"🎾 Fetching upcoming tennis matches (next {days} days)...")
+        return self.get_upcoming_matches_async(days).result()
+    
+    def get_upcoming_matches_async(self, days: int = 7) -> Future:
+        """
+        Non-blocking get_upcoming_matches: Future of the same list
         
-        matches = []
+        Days missing from the cache are fetched in parallel on io_pool
+        (one request per day, identical in-flight days are shared)
+        """
+        logger.info(f"🎾 Fetching upcoming tennis matches (next {days} days)...")
         
-        # Try to get matches for next N days
+        futures = []
         for day_offset in range(days):
-            date = datetime.now() + timedelta(days=day_offset)
-            date_str = date.strftime('%Y-%m-%d')
-            
-            # Cache key
-            cache_key = f"fixtures_{date_str}"
-            
-            # Check cache
-            if cache_key in self.cache:
-                cached_data, cached_time = self.cache[cache_key]
-                if (datetime.now().timestamp() - cached_time) < self.cache_ttl:
-                    logger.info(f"  ✓ Using cached data for {date_str}")
-                    data = cached_data
-                else:
-                    data = self._make_request('fixtures', {'date': date_str})
-                    self.cache[cache_key] = (data, datetime.now().timestamp())
+            date_str = (datetime.now() + timedelta(days=day_offset)).strftime('%Y-%m-%d')
+            data = self._cached_fixtures(date_str)
+            if data is not None:
+                logger.info(f"  ✓ Using cached data for {date_str}")
+                futures.append(completed(data))
             else:
-                data = self._make_request('fixtures', {'date': date_str})
-                if data:
-                    self.cache[cache_key] = (data, datetime.now().timestamp())
-            
+                futures.append(io_pool.submit(('tennis-api', 'fixtures', date_str), self._fetch_fixtures, date_str))
+        
+        return then(gather(futures), self._collect_matches)
+    
+    def _cached_fixtures(self, date_str: str) -> Optional[Dict]:
+        cached = self.cache.get(f"fixtures_{date_str}")
+        if cached is not None:
+            cached_data, cached_time = cached
+            if (datetime.now().timestamp() - cached_time) < self.cache_ttl:
+                return cached_data
+        return None
+    
+    def _fetch_fixtures(self, date_str: str) -> Optional[Dict]:
+        data = self._make_request('fixtures', {'date': date_str})
+        if data:
+            self.cache[f"fixtures_{date_str}"] = (data, datetime.now().timestamp())
+        return data
+    
+    def _collect_matches(self, days_data: List[Optional[Dict]]) -> List[Dict]:
+        """Parse fixtures of all days (in date order)"""
+        matches = []
+        for data in days_data:
             # API returns 'data' key with array of matches
             if data and 'data' in data:
                 for fixture in data['data']:
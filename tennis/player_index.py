@@ -0,0 +1,125 @@
+"""
+Player History Index
+Startup-built lookup tables over atp_matches_combined.csv so that
+form / H2H / surface stats are dictionary and small-array reads
+instead of full DataFrame scans per prediction
+"""
+import unicodedata
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def normalize_player_name(name) -> str:
+    """Normalize a player name for lookups (accents, case, whitespace)"""
+    if not isinstance(name, str):
+        return ''
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(ch for ch in name if not unicodedata.combining(ch))
+    return ' '.join(name.casefold().split())
+
+
+class PlayerHistoryIndex:
+    """
+    Precomputed per-player match history
+
+    - per player: match positions (CSV row order), dates and win flags
+    - per (winner, loser) pair: number of wins
+    - per (player, surface): wins / total
+    """
+
+    def __init__(self, matches: pd.DataFrame):
+        self.players: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self.h2h_wins: Dict[Tuple[str, str], int] = {}
+        self.surface_counts: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        self._build(matches)
+
+    @staticmethod
+    def _normalized(names: pd.Series) -> pd.Series:
+        unique_names = names.dropna().unique()
+        mapping = {name: normalize_player_name(name) for name in unique_names}
+        return names.map(mapping)
+
+    def _build(self, matches: pd.DataFrame):
+        positions = np.arange(len(matches))
+        winners = self._normalized(matches['winner_name']).to_numpy()
+        losers = self._normalized(matches['loser_name']).to_numpy()
+        dates = pd.to_datetime(matches['tourney_date']).to_numpy()
+        surfaces = matches['surface'].to_numpy() if 'surface' in matches.columns else np.full(len(matches), None)
+
+        # Long format: one row per (player, match)
+        long_df = pd.DataFrame({
+            'player': np.concatenate([winners, losers]),
+            'position': np.concatenate([positions, positions]),
+            'date': np.concatenate([dates, dates]),
+            'win': np.concatenate([np.ones(len(matches), dtype=bool), np.zeros(len(matches), dtype=bool)]),
+            'surface': np.concatenate([surfaces, surfaces]),
+        })
+        long_df = long_df[long_df['player'].notna() & (long_df['player'] != '')]
+        long_df = long_df.sort_values(['player', 'position'], kind='stable')
+
+        # Per-player arrays (sorted by position)
+        players = long_df['player'].to_numpy()
+        if len(players):
+            boundaries = np.flatnonzero(players[1:] != players[:-1]) + 1
+            starts = np.concatenate([[0], boundaries])
+            ends = np.concatenate([boundaries, [len(players)]])
+            position_values = long_df['position'].to_numpy()
+            date_values = long_df['date'].to_numpy()
+            win_values = long_df['win'].to_numpy()
+            for start, end in zip(starts, ends):
+                self.players[players[start]] = (
+                    position_values[start:end],
+                    date_values[start:end],
+                    win_values[start:end],
+                )
+
+        # Per-surface aggregates
+        surface_df = long_df[long_df['surface'].notna()]
+        surface_agg = surface_df.groupby(['player', 'surface'])['win'].agg(['sum', 'count'])
+        self.surface_counts = {
+            key: (int(row_sum), int(row_count))
+            for key, row_sum, row_count in zip(surface_agg.index, surface_agg['sum'], surface_agg['count'])
+        }
+
+        # H2H pair table
+        pairs = pd.DataFrame({'winner': winners, 'loser': losers}).dropna()
+        pair_counts = pairs.groupby(['winner', 'loser']).size()
+        self.h2h_wins = {key: int(count) for key, count in pair_counts.items()}
+
+    def freeze(self):
+        """Make all arrays read-only (shared between forked workers, must not be modified)"""
+        for arrays in self.players.values():
+            for array in arrays:
+                array.flags.writeable = False
+    
+    def recent_results(self, player_name: str, since=None, window: int = 10) -> Optional[np.ndarray]:
+        """
+        Win flags of the player's last `window` matches (CSV order) on or after `since`
+
+        Returns None if the player has no such matches
+        """
+        entry = self.players.get(normalize_player_name(player_name))
+        if entry is None:
+            return None
+
+        _, dates, wins = entry
+        if since is not None:
+            wins = wins[dates >= np.datetime64(since)]
+        if len(wins) == 0:
+            return None
+        return wins[-window:]
+
+    def h2h(self, player1_name: str, player2_name: str) -> Tuple[int, int]:
+        """Returns: (player1_wins, player2_wins)"""
+        player1 = normalize_player_name(player1_name)
+        player2 = normalize_player_name(player2_name)
+        return (
+            self.h2h_wins.get((player1, player2), 0),
+            self.h2h_wins.get((player2, player1), 0),
+        )
+
+    def surface_stats(self, player_name: str, surface: str) -> Tuple[int, int]:
+        """Returns: (wins, total) on the surface"""
+        return self.surface_counts.get((normalize_player_name(player_name), surface), (0, 0))
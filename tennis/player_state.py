@@ -0,0 +1,110 @@
+"""
+Incremental Player State Store
+Per-player form ring buffers, H2H counters and surface counters
+that are updated one match at a time (in date order)
+"""
+import pickle
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Hashable, Tuple
+
+
+class PlayerStateStore:
+    """
+    Running per-player statistics for tennis feature generation
+
+    Features for a match are read from the store BEFORE the match is applied,
+    so the store always reflects only the history prior to that match.
+    """
+
+    def __init__(self, form_window: int = 10):
+        self.form_window = form_window
+        # player -> deque of 1 (win) / 0 (loss), newest on the right
+        self.recent_results = defaultdict(lambda: deque(maxlen=self.form_window))
+        # (winner, loser) -> number of wins
+        self.h2h_wins = defaultdict(int)
+        # (player, surface) -> [wins, total]
+        self.surface_counts = defaultdict(lambda: [0, 0])
+        self.matches_applied = 0
+        self.last_date = None
+
+    def apply_match(self, winner_id: Hashable, loser_id: Hashable, surface: str, date=None):
+        """Record a finished match"""
+        self.recent_results[winner_id].append(1)
+        self.recent_results[loser_id].append(0)
+
+        self.h2h_wins[(winner_id, loser_id)] += 1
+
+        winner_surface = self.surface_counts[(winner_id, surface)]
+        winner_surface[0] += 1
+        winner_surface[1] += 1
+        self.surface_counts[(loser_id, surface)][1] += 1
+
+        self.matches_applied += 1
+        if date is not None:
+            self.last_date = date
+
+    def player_form(self, player_id: Hashable) -> Tuple[int, int, int]:
+        """
+        Form over the last `form_window` matches
+
+        Returns: (wins, losses, form_points)
+        """
+        results = self.recent_results.get(player_id)
+        if not results:
+            return 0, 0, 0
+
+        wins = sum(results)
+        losses = len(results) - wins
+        return wins, losses, wins * 3
+
+    def h2h(self, player1_id: Hashable, player2_id: Hashable) -> Tuple[int, int]:
+        """
+        Returns: (player1_h2h_wins, player2_h2h_wins)
+        """
+        return (
+            self.h2h_wins.get((player1_id, player2_id), 0),
+            self.h2h_wins.get((player2_id, player1_id), 0),
+        )
+
+    def surface_stats(self, player_id: Hashable, surface: str) -> Tuple[int, int, float]:
+        """
+        Returns: (wins, total_matches, win_rate)
+        """
+        counts = self.surface_counts.get((player_id, surface))
+        if not counts or counts[1] == 0:
+            return 0, 0, 0.5
+
+        wins, total = counts
+        return wins, total, wins / total
+
+    def save(self, path):
+        """Persist the store so new seasons can be appended later"""
+        state = {
+            'form_window': self.form_window,
+            'recent_results': {player: list(results) for player, results in self.recent_results.items()},
+            'h2h_wins': dict(self.h2h_wins),
+            'surface_counts': {key: list(counts) for key, counts in self.surface_counts.items()},
+            'matches_applied': self.matches_applied,
+            'last_date': self.last_date,
+        }
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            pickle.dump(state, f)
+
+    @classmethod
+    def load(cls, path) -> 'PlayerStateStore':
+        """Restore a store saved with save()"""
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+
+        store = cls(form_window=state['form_window'])
+        for player, results in state['recent_results'].items():
+            store.recent_results[player].extend(results)
+        store.h2h_wins.update(state['h2h_wins'])
+        for key, counts in state['surface_counts'].items():
+            store.surface_counts[key] = list(counts)
+        store.matches_applied = state['matches_applied']
+        store.last_date = state['last_date']
+        return store
@@ -2,7 +2,7 @@
 Tennis Prediction Service
 Makes predictions for tennis matches using trained ML model
 """
-import pickle
+import threading
 import numpy as np
 import pandas as pd
 from pathlib import Path
@@ -10,22 +10,54 @@ from typing import Dict, Optional, Tuple
 from datetime import datetime, timedelta
 import logging
 
+from tennis.player_index import PlayerHistoryIndex
+from services.model_registry import model_registry
+
 logger = logging.getLogger(__name__)
 
 
+def load_player_history(data_path) -> Tuple[pd.DataFrame, PlayerHistoryIndex]:
+    """Read the ATP CSV and build the player lookup index (form / H2H / surface)"""
+    historical_data = pd.read_csv(data_path)
+    historical_data['tourney_date'] = pd.to_datetime(
+        historical_data['tourney_date'],
+        format='%Y%m%d'
+    )
+    return historical_data, PlayerHistoryIndex(historical_data)
+
+
 class TennisPredictionService:
     """Generate predictions for tennis matches"""
     
     def __init__(self, model_path='tennis/models/tennis_player1_win_model.pkl',
-                 features_path='tennis/models/tennis_feature_columns.pkl'):
+                 features_path='tennis/models/tennis_feature_columns.pkl',
+                 data_path='tennis/data/atp_matches_combined.csv'):
+        self.model_path = model_path
+        self.features_path = features_path
+        self.data_path = data_path
         self.model = None
         self.feature_columns = None
         self.historical_data = None
+        self.player_index = None
         
+        # Model and ATP history are loaded on first prediction (model_registry)
+        self.load_attempted = False
+        self.load_lock = threading.Lock()
+    
+    def _ensure_loaded(self):
+        """Load model, feature columns and historical data once"""
+        if self.load_attempted:
+            return
+        with self.load_lock:
+            if self.load_attempted:
+                return
+            self._load()
+            self.load_attempted = True
+    
+    def _load(self):
         # Load model
         try:
-            with open(model_path, 'rb') as f:
-                self.model = pickle.load(f)
+            self.model = model_registry.load(self.model_path)
             print("✅ Tennis model loaded successfully")
             logger.info("✓ Tennis model loaded")
         except Exception as e:
@@ -34,8 +66,7 @@ class TennisPredictionService:
         
         # Load feature columns
         try:
-            with open(features_path, 'rb') as f:
-                self.feature_columns = pickle.load(f)
+            self.feature_columns = model_registry.load(self.features_path)
             print(f"✅ Tennis feature columns loaded ({len(self.feature_columns)} features)")
             logger.info(f"✓ Feature columns loaded ({len(self.feature_columns)} features)")
         except Exception as e:
@@ -44,17 +75,21 @@ class TennisPredictionService:
         
         # Load historical data for stats
         try:
-            data_path = Path('tennis/data/atp_matches_combined.csv')
-            if data_path.exists():
-                self.historical_data = pd.read_csv(data_path)
-                self.historical_data['tourney_date'] = pd.to_datetime(
-                    self.historical_data['tourney_date'], 
-                    format='%Y%m%d'
+            if Path(self.data_path).exists():
+                self.historical_data, self.player_index = model_registry.load(
+                    self.data_path, loader=load_player_history
                 )
                 logger.info(f"✓ Historical data loaded ({len(self.historical_data)} matches)")
+                logger.info(f"✓ Player index built ({len(self.player_index.players)} players)")
         except Exception as e:
             logger.error(f"⚠️  Historical data not available: {e}")
     
+    def swap_model(self, model, feature_columns):
+        """Replace model and feature columns together (hot reload); in-flight predictions keep the old pair"""
+        with self.load_lock:
+            self.model = model
+            self.feature_columns = feature_columns
+    
     def predict_match(self, player1_name: str, player1_rank: int,
                      player2_name: str, player2_rank: int,
                      surface: str, tournament_level: str = None) -> Dict:
@@ -82,7 +117,13 @@ class TennisPredictionService:
                 'explanation': 'Player 1 has a strong advantage...'
             }
         """
-        if not self.model or not self.feature_columns:
+        self._ensure_loaded()
+        
+        # One consistent model version for the whole prediction
+        with self.load_lock:
+            model, feature_columns = self.model, self.feature_columns
+        
+        if not model or not feature_columns:
             return self._fallback_prediction(player1_name, player1_rank, player2_name, player2_rank)
         
         logger.info(f"🎾 Predicting: {player1_name} (#{player1_rank}) vs {player2_name} (#{player2_rank}) on {surface}")
@@ -95,11 +136,11 @@ class TennisPredictionService:
         )
         
         # Create feature vector
-        X = pd.DataFrame([features])[self.feature_columns].fillna(0)
+        X = pd.DataFrame([features])[feature_columns].fillna(0)
         
         # Make prediction
         try:
-            probability = self.model.predict_proba(X)[0]
+            probability = model.predict_proba(X)[0]
             player1_prob = float(probability[1])  # Probability of player1 winning
             player2_prob = float(probability[0])  # Probability of player2 winning
             
@@ -212,64 +253,46 @@ class TennisPredictionService:
     
     def _get_player_form(self, player_name: str, window: int = 10) -> Dict:
         """Get player's recent form"""
-        if self.historical_data is None:
+        if self.player_index is None:
             return {'wins': 5, 'losses': 5, 'points': 15}
         
         recent_cutoff = datetime.now() - timedelta(days=180)
         
-        player_matches = self.historical_data[
-            (self.historical_data['tourney_date'] >= recent_cutoff) &
-            ((self.historical_data['winner_name'] == player_name) | 
-             (self.historical_data['loser_name'] == player_name))
-        ].tail(window)
+        results = self.player_index.recent_results(player_name, since=recent_cutoff, window=window)
         
-        if len(player_matches) == 0:
+        if results is None:
             return {'wins': 5, 'losses': 5, 'points': 15}
         
-        wins = (player_matches['winner_name'] == player_name).sum()
-        losses = len(player_matches) - wins
+        wins = int(results.sum())
+        losses = len(results) - wins
         points = wins * 3
         
-        return {'wins': int(wins), 'losses': int(losses), 'points': int(points)}
+        return {'wins': wins, 'losses': int(losses), 'points': int(points)}
     
     def _get_h2h(self, player1_name: str, player2_name: str) -> Dict:
         """Get head-to-head statistics"""
-        if self.historical_data is None:
+        if self.player_index is None:
             return {'player1_wins': 0, 'player2_wins': 0, 'total': 0}
         
-        h2h_matches = self.historical_data[
-            ((self.historical_data['winner_name'] == player1_name) & 
-             (self.historical_data['loser_name'] == player2_name)) |
-            ((self.historical_data['winner_name'] == player2_name) & 
-             (self.historical_data['loser_name'] == player1_name))
-        ]
-        
-        player1_wins = ((h2h_matches['winner_name'] == player1_name)).sum()
-        player2_wins = len(h2h_matches) - player1_wins
+        player1_wins, player2_wins = self.player_index.h2h(player1_name, player2_name)
         
         return {
-            'player1_wins': int(player1_wins),
-            'player2_wins': int(player2_wins),
-            'total': len(h2h_matches)
+            'player1_wins': player1_wins,
+            'player2_wins': player2_wins,
+            'total': player1_wins + player2_wins
         }
     
     def _get_surface_stats(self, player_name: str, surface: str) -> Dict:
         """Get player statistics on specific surface"""
-        if self.historical_data is None:
+        if self.player_index is None:
             return {'wins': 10, 'total': 20, 'winrate': 0.5}
         
-        surface_matches = self.historical_data[
-            (self.historical_data['surface'] == surface) &
-            ((self.historical_data['winner_name'] == player_name) | 
-             (self.historical_data['loser_name'] == player_name))
-        ]
+        wins, total = self.player_index.surface_stats(player_name, surface)
         
-        if len(surface_matches) == 0:
+        if total == 0:
             return {'wins': 10, 'total': 20, 'winrate': 0.5}
         
-        wins = (surface_matches['winner_name'] == player_name).sum()
-        total = len(surface_matches)
-        winrate = wins / total if total > 0 else 0.5
+        winrate = wins / total
         
         return {'wins': int(wins), 'total': int(total), 'winrate': float(winrate)}
     
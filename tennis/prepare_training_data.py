@@ -2,12 +2,18 @@
 Tennis Training Data Preparation
 Creates ML-ready dataset with features for player1 win prediction
 """
+import os
+import sys
 import pandas as pd
 import numpy as np
 from pathlib import Path
 from collections import defaultdict
 from datetime import datetime, timedelta
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tennis.player_state import PlayerStateStore
+
 
 class TennisTrainingDataPreparator:
     """Prepare tennis training data with features"""
@@ -17,6 +23,7 @@ class TennisTrainingDataPreparator:
         self.matches = None
         self.rankings = None
         self.players = None
+        self.state_store = None
         
     def load_data(self):
         """Load downloaded data"""
@@ -140,23 +147,33 @@ class TennisTrainingDataPreparator:
         
         return wins, total, win_rate
     
-    def create_features(self):
+    def create_features(self, state_store=None):
         """
         Створити фічі для кожного матчу
         
         ВАЖЛИВО: Використовуємо тільки дані ДО матчу (no leakage!)
+        
+        Матчі проходять один раз у порядку дати через PlayerStateStore:
+        фічі читаються зі стану до застосування матчу, а матчі однієї дати
+        застосовуються разом (як фільтр tourney_date < date).
+        
+        Args:
+            state_store: Існуючий стан (щоб дописати новий сезон без перерахунку історії)
         """
         print("=" * 70)
         print("🎯 СТВОРЕННЯ ФІЧ")
         print("=" * 70)
         print()
         
-        matches = self.matches.copy()
+        matches = self.matches
+        store = state_store if state_store is not None else PlayerStateStore(form_window=10)
         features_list = []
         
         total = len(matches)
+        pending = []
+        current_date = None
         
-        for idx, match in matches.iterrows():
+        for idx, match in zip(matches.index, matches.to_dict('records')):
             if idx % 500 == 0:
                 print(f"  Обробка {idx}/{total} матчів...")
             
@@ -166,6 +183,13 @@ class TennisTrainingDataPreparator:
             date = match['tourney_date']
             surface = match['surface']
             
+            # Нова дата - застосувати матчі попередньої дати
+            if date != current_date:
+                for pending_match in pending:
+                    store.apply_match(*pending_match)
+                pending = []
+                current_date = date
+            
             # ВАЖЛИВО: Випадково вибираємо хто player1, хто player2
             # Щоб модель не запам'ятала "winner завжди в колонці 1"
             if np.random.random() > 0.5:
@@ -182,15 +206,17 @@ class TennisTrainingDataPreparator:
             player2_rank = match.get('loser_rank' if player1_id == winner_id else 'winner_rank', 999)
             
             # Форма (останні 10 матчів)
-            p1_wins, p1_losses, p1_form = self.calculate_player_form(matches, player1_id, date, window=10)
-            p2_wins, p2_losses, p2_form = self.calculate_player_form(matches, player2_id, date, window=10)
+            p1_wins, p1_losses, p1_form = store.player_form(player1_id)
+            p2_wins, p2_losses, p2_form = store.player_form(player2_id)
             
             # H2H
-            p1_h2h_wins, p2_h2h_wins = self.calculate_h2h(matches, player1_id, player2_id, date)
+            p1_h2h_wins, p2_h2h_wins = store.h2h(player1_id, player2_id)
             
             # Статистика на покритті
-            p1_surf_wins, p1_surf_total, p1_surf_wr = self.calculate_surface_stats(matches, player1_id, date, surface)
-            p2_surf_wins, p2_surf_total, p2_surf_wr = self.calculate_surface_stats(matches, player2_id, date, surface)
+            p1_surf_wins, p1_surf_total, p1_surf_wr = store.surface_stats(player1_id, surface)
+            p2_surf_wins, p2_surf_total, p2_surf_wr = store.surface_stats(player2_id, surface)
+            
+            pending.append((winner_id, loser_id, surface, date))
             
             # Фічі
             features = {
@@ -243,6 +269,10 @@ class TennisTrainingDataPreparator:
             
             features_list.append(features)
         
+        for pending_match in pending:
+            store.apply_match(*pending_match)
+        self.state_store = store
+        
         print(f"  ✓ Оброблено {len(features_list)} матчів")
         print()
         
@@ -278,6 +308,16 @@ class TennisTrainingDataPreparator:
         
         return output_path
     
+    def save_state(self, output_path='tennis/data/player_state.pkl'):
+        """Зберегти стан гравців, щоб дописувати нові сезони без перерахунку"""
+        if self.state_store is None:
+            return None
+        
+        self.state_store.save(output_path)
+        print(f"✓ Стан гравців збережено: {output_path} ({self.state_store.matches_applied} матчів)")
+        print()
+        return output_path
+    
     def run(self):
         """Повний пайплайн"""
         print()
@@ -297,6 +337,7 @@ class TennisTrainingDataPreparator:
         
         # 4. Зберегти
         output_path = self.save_training_data(df_features)
+        self.save_state()
         
         print("=" * 70)
         print("✅ ГОТОВО!")
@@ -0,0 +1,127 @@
+"""
+Tests for services/async_io.py and the *_async client variants
+Run: pytest test_async_io.py
+"""
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from api import routes_football
+from config import Config
+from services import football_data_org
+from services.async_io import IOPool, UpstreamTimeout, completed, gather, then, wait_result
+from services.cache import SimpleCache
+from services.tennis_api import TennisAPIService
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = IOPool(max_workers=8)
+    for module in ('services.async_io', 'services.football_data_org', 'services.tennis_api'):
+        monkeypatch.setattr(f'{module}.io_pool', pool)
+    return pool
+
+
+def test_identical_calls_share_one_future(pool):
+    release = threading.Event()
+    calls = []
+
+    def fetch(value):
+        calls.append(value)
+        release.wait(5)
+        return value * 2
+
+    futures = [pool.submit('key', fetch, 21) for _ in range(10)]
+    other = pool.submit(None, fetch, 1)
+    release.set()
+
+    assert {id(future) for future in futures} == {id(futures[0])}
+    assert [future.result(5) for future in futures] == [42] * 10
+    assert other.result(5) == 2
+    assert sorted(calls) == [1, 21]
+    assert pool.stats['coalesced'] == 9 and pool.pending() == 0
+
+
+def test_gather_and_then(pool):
+    futures = [pool.submit(None, time.sleep, 0.01), completed('cached'), pool.submit(None, lambda: 'fetched')]
+    assert then(gather(futures), lambda results: results[1:]).result(5) == ['cached', 'fetched']
+    assert gather([]).result() == []
+
+    failing = gather([completed(1), pool.submit(None, lambda: 1 / 0)])
+    with pytest.raises(ZeroDivisionError):
+        failing.result(5)
+
+
+def test_wait_result_does_not_cancel(pool):
+    release = threading.Event()
+    future = pool.submit('slow', release.wait, 5)
+
+    with pytest.raises(UpstreamTimeout) as error:
+        wait_result(future, timeout=0.05)
+    assert error.value.retry_after == 1
+
+    release.set()
+    assert future.result(5) is True
+
+
+def test_tennis_days_fetched_in_parallel(pool, monkeypatch):
+    service = TennisAPIService()
+
+    def make_request(endpoint, params):
+        time.sleep(0.2)
+        return {'data': [{'date': params['date']}]}
+
+    monkeypatch.setattr(service, '_make_request', make_request)
+    monkeypatch.setattr(service, '_parse_fixture', lambda fixture: fixture)
+
+    started = time.monotonic()
+    matches = service.get_upcoming_matches(days=7)
+    assert time.monotonic() - started < 0.2 * 3  # последовательно было бы 1.4s
+    assert [m['date'] for m in matches] == sorted(m['date'] for m in matches)
+    assert len(matches) == 7
+
+    # Второй раз - из кэша, без запросов
+    monkeypatch.setattr(service, '_make_request', lambda *args: pytest.fail('unexpected request'))
+    assert service.get_upcoming_matches_async(days=7).result(1) == matches
+
+
+def test_football_async_uses_cache_and_coalesces(pool, monkeypatch):
+    monkeypatch.setattr(football_data_org, 'football_cache', SimpleCache(ttl_seconds=60))
+    api = football_data_org.FootballDataOrgAPI()
+    release = threading.Event()
+    calls = []
+
+    def make_request(endpoint, params=None, priority=None):
+        calls.append(endpoint)
+        release.wait(5)
+        football_data_org.football_cache.set(api._cache_key(endpoint, params), {'matches': []})
+        return {'matches': []}
+
+    monkeypatch.setattr(api, '_make_request', make_request)
+    futures = [api.make_request_async('matches', {'dateFrom': '2025-08-01'}) for _ in range(5)]
+    release.set()
+    assert [future.result(5) for future in futures] == [{'matches': []}] * 5
+    assert calls == ['matches']
+
+    assert api.make_request_async('matches', {'dateFrom': '2025-08-01'}).done()
+    assert calls == ['matches']
+
+
+def test_slow_upstream_returns_503(pool, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(Config, 'UPSTREAM_WAIT_SECONDS', 0.05)
+    monkeypatch.setattr(football_data_org, 'football_cache', SimpleCache(ttl_seconds=60))
+    monkeypatch.setattr(football_data_org.FootballDataOrgAPI, '_make_request',
+                        lambda self, endpoint, params=None, priority=None: release.wait(5) and {'matches': []})
+
+    app = Flask(__name__)
+    monkeypatch.setattr(routes_football.response_cache, 'enabled', False)
+    app.register_blueprint(routes_football.football_bp)
+
+    response = app.test_client().get('/api/football/matches')
+    release.set()
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert response.json['pending'] is True and response.json['matches'] == []
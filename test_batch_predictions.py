@@ -0,0 +1,126 @@
+"""
+Tests for batch prediction (one model call per batch == one call per match)
+Run: pytest test_batch_predictions.py
+"""
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+from ml.model import GoalPredictorModel
+from ml.train_ensemble import EnsembleGoalPredictor
+from services.prediction_service import EnhancedPredictionService
+
+FEATURES = [f'f{i}' for i in range(6)]
+
+
+def _data(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(n, len(FEATURES))), columns=FEATURES)
+    y = (X['f0'] + 0.5 * X['f1'] * X['f2'] + rng.normal(scale=0.5, size=n) > 0).astype(int)
+    return X, y
+
+
+def _features_list(n=40, seed=1):
+    X, _ = _data(n=n, seed=seed)
+    return X.to_dict('records')
+
+
+def _assert_same(batch, single):
+    """Сравнить ответы (вложенные dict, numpy скаляры)"""
+    if isinstance(single, dict):
+        assert set(batch) == set(single)
+        for key in single:
+            _assert_same(batch[key], single[key])
+    elif isinstance(single, (float, np.floating)):
+        assert batch == pytest.approx(single, abs=1e-9)
+    else:
+        assert batch == single
+
+
+def _ensemble(tmp_path, compiled):
+    X, y = _data()
+    ensemble = EnsembleGoalPredictor(model_path=str(tmp_path))
+    ensemble.feature_names = FEATURES
+    X_scaled = ensemble.scaler.fit_transform(X)
+    ensemble.models = {
+        'lightgbm': lgb.LGBMClassifier(n_estimators=30, num_leaves=15, verbose=-1).fit(X_scaled, y),
+        'random_forest': RandomForestClassifier(n_estimators=20, max_depth=6, random_state=0).fit(X_scaled, y),
+    }
+    ensemble.model_weights = {'lightgbm': 0.6, 'random_forest': 0.4}
+    if compiled:
+        ensemble.compile()
+    return ensemble
+
+
+@pytest.mark.parametrize('compiled', [False, True])
+def test_ensemble_batch_matches_single(tmp_path, compiled):
+    ensemble = _ensemble(tmp_path, compiled)
+    features_list = _features_list()
+
+    batch = ensemble.predict_batch(features_list)
+
+    assert len(batch) == len(features_list)
+    for result, features in zip(batch, features_list):
+        _assert_same(result, ensemble.predict(features))
+    assert ensemble.predict_batch([]) == []
+
+
+def test_goal_model_batch_matches_single(tmp_path):
+    X, y = _data()
+    model = GoalPredictorModel(model_path=str(tmp_path))
+    model.feature_names = FEATURES
+    model.model = lgb.LGBMClassifier(n_estimators=30, verbose=-1).fit(model.scaler.fit_transform(X), y)
+    features_list = _features_list()
+
+    batch = model.predict_batch_from_features(features_list)
+
+    assert len(batch) == len(features_list)
+    for result, features in zip(batch, features_list):
+        _assert_same(result, model.predict_from_features(features))
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    X, y = _data()
+    service = EnhancedPredictionService()
+    service.models_requested = True
+    service.swap_match_result_models(
+        LogisticRegression().fit(X, y),
+        LogisticRegression().fit(X, 1 - y),
+        LogisticRegression(C=0.1).fit(X, y),
+        feature_columns=FEATURES,
+    )
+    service.swap_ensemble(_ensemble(tmp_path, compiled=True))
+
+    # Признаки матча - детерминированная функция пары команд, без API и БД
+    def create_features(home_team_id, away_team_id, match_date=None):
+        if home_team_id < 0:
+            raise ValueError('unknown team')
+        X_match, _ = _data(n=1, seed=home_team_id * 100 + away_team_id)
+        features = X_match.iloc[0].to_dict()
+        features['home_goals_scored_last_5'] = home_team_id / 10
+        return features
+
+    monkeypatch.setattr(service, 'create_features_for_match', create_features)
+    return service
+
+
+def test_service_batch_matches_single(service):
+    matches = [
+        {'home_team_id': home, 'away_team_id': away, 'home_team': f'Team {home}', 'away_team': f'Team {away}'}
+        for home, away in [(1, 2), (3, 4), (-1, 5), (2, 1), (5, 6)]
+    ]
+
+    batch = service.predict_matches(matches)
+
+    assert len(batch) == len(matches)
+    for result, match in zip(batch, matches):
+        _assert_same(result, service.predict_match(match))
+
+    # Ошибка одного матча не ломает остальные
+    assert batch[2]['prediction'] == 'Error'
+    assert all('over_2_5_proba' in batch[i] for i in (0, 1, 3, 4))
+    assert batch[0]['match_info'] is matches[0]
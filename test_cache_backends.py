@@ -0,0 +1,214 @@
+"""
+Tests for services/cache.py backends (memory, SQLite, Redis stand-in)
+Run: pytest test_cache_backends.py
+"""
+import fnmatch
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from services.cache import SimpleCache, MemoryBackend, SQLiteBackend, RedisBackend, TeamFormCache
+
+
+class FakeRedis:
+    """Minimal local stand-in for the redis client commands used by RedisBackend"""
+
+    def __init__(self):
+        self.values = {}
+        self.expires = {}
+        self.zsets = {}
+
+    def _alive(self, name):
+        if name in self.expires and time.time() >= self.expires[name]:
+            self.values.pop(name, None)
+            self.expires.pop(name, None)
+        return name in self.values
+
+    def ping(self):
+        return True
+
+    def get(self, name):
+        return self.values[name] if self._alive(name) else None
+
+    def set(self, name, value, ex=None):
+        self.values[name] = value.encode() if isinstance(value, str) else value
+        if ex is not None:
+            self.expires[name] = time.time() + ex
+
+    def exists(self, name):
+        return int(self._alive(name))
+
+    def delete(self, *names):
+        for name in names:
+            self.values.pop(name, None)
+            self.expires.pop(name, None)
+            self.zsets.pop(name, None)
+
+    def scan_iter(self, match='*'):
+        return [name for name in list(self.values) if fnmatch.fnmatch(name, match) and self._alive(name)]
+
+    def zadd(self, name, mapping):
+        self.zsets.setdefault(name, {}).update(mapping)
+
+    def zrem(self, name, *members):
+        for member in members:
+            self.zsets.get(name, {}).pop(member, None)
+
+    def zcard(self, name):
+        return len(self.zsets.get(name, {}))
+
+    def zrange(self, name, start, end, withscores=False):
+        items = sorted(self.zsets.get(name, {}).items(), key=lambda item: item[1])
+        items = items[start:] if end == -1 else items[start:end + 1]
+        return items if withscores else [member for member, _ in items]
+
+    def zpopmin(self, name, count=1):
+        items = self.zrange(name, 0, count - 1, withscores=True)
+        for member, _ in items:
+            self.zsets[name].pop(member)
+        return items
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'redis'])
+def backend_factory(request, tmp_path):
+    def factory(max_entries=1000):
+        if request.param == 'memory':
+            return MemoryBackend(max_entries=max_entries)
+        if request.param == 'sqlite':
+            return SQLiteBackend(path=str(tmp_path / 'cache.sqlite3'), namespace='test', max_entries=max_entries)
+        return RedisBackend(client=FakeRedis(), namespace='test', max_entries=max_entries)
+    return factory
+
+
+def test_set_get_and_stats(backend_factory):
+    cache = SimpleCache(ttl_seconds=60, backend=backend_factory())
+
+    assert cache.get('matches') is None
+    cache.set('matches', {'matches': [{'id': 1}]})
+    assert cache.get('matches') == {'matches': [{'id': 1}]}
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['sets'] == 1
+    assert stats['size'] == 1
+
+
+def test_ttl_expiry(backend_factory):
+    cache = SimpleCache(ttl_seconds=60, backend=backend_factory())
+
+    cache.set('short', [1, 2, 3], ttl_seconds=1)
+    assert cache.get('short') == [1, 2, 3]
+    time.sleep(1.1)
+    assert cache.get('short') is None
+
+
+def test_lru_eviction(backend_factory):
+    cache = SimpleCache(ttl_seconds=60, backend=backend_factory(max_entries=2))
+
+    cache.set('a', 1)
+    time.sleep(0.01)
+    cache.set('b', 2)
+    time.sleep(0.01)
+    assert cache.get('a') == 1  # 'b' becomes least recently used
+    time.sleep(0.01)
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_clear(backend_factory):
+    cache = SimpleCache(ttl_seconds=60, backend=backend_factory())
+
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.clear()
+
+    assert cache.get('a') is None
+    assert cache.stats()['size'] == 0
+
+
+def test_sqlite_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'shared.sqlite3')
+    worker_1 = SimpleCache(backend=SQLiteBackend(path=path, namespace='football'))
+    worker_2 = SimpleCache(backend=SQLiteBackend(path=path, namespace='football'))
+    other_namespace = SimpleCache(backend=SQLiteBackend(path=path, namespace='tennis'))
+
+    worker_1.set('competitions/PL/matches', {'count': 10})
+
+    assert worker_2.get('competitions/PL/matches') == {'count': 10}
+    assert other_namespace.get('competitions/PL/matches') is None
+
+
+def test_team_form_single_flight():
+    cache = TeamFormCache(backend=MemoryBackend())
+    gate = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        gate.wait(5)
+        return {'goals_scored_last_5': 1.4}, datetime(2025, 8, 1, 18, 0)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch(101, fetch))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    gate.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == [{'goals_scored_last_5': 1.4}] * 5
+    assert len(calls) == 1
+    assert (cache.misses, cache.coalesced) == (1, 4)
+    assert cache.get_or_fetch(101, fetch) == {'goals_scored_last_5': 1.4}
+    assert cache.hits == 1 and len(calls) == 1
+
+
+def test_team_form_invalidation_reaches_other_workers(backend_factory):
+    backend = backend_factory()
+    if isinstance(backend, MemoryBackend):
+        pytest.skip('memory backend is per process')
+    # Второй воркер: SQLite - свое соединение к тому же файлу, Redis - тот же сервер
+    if isinstance(backend, SQLiteBackend):
+        other = backend_factory()
+    else:
+        other = RedisBackend(client=backend.client, namespace='test')
+    worker_1, worker_2 = TeamFormCache(backend=backend), TeamFormCache(backend=other)
+    played = datetime(2025, 8, 1, 18, 0)
+    worker_1.get_or_fetch(101, lambda: ({'form': 'old'}, played))
+
+    # Матч не новее учтенного - запись остается
+    worker_2.invalidate(101, played)
+    assert worker_1.get_or_fetch(101, lambda: pytest.fail('unexpected fetch')) == {'form': 'old'}
+
+    worker_2.invalidate(101, datetime(2025, 8, 8, 18, 0))
+    assert worker_1.get_or_fetch(101, lambda: ({'form': 'new'}, played)) == {'form': 'new'}
+
+
+def test_team_form_without_data_is_not_cached():
+    cache = TeamFormCache(backend=MemoryBackend())
+    assert cache.get_or_fetch(101, lambda: ({'form': 'default'}, None)) == {'form': 'default'}
+    assert cache.get_or_fetch(101, lambda: ({'form': 'fetched'}, None)) == {'form': 'fetched'}
+
+
+def test_team_cache_kinds_are_separate_and_invalidated_together():
+    cache = TeamFormCache(backend=MemoryBackend(), kinds=('last_matches',))
+    played = datetime(2025, 8, 1, 18, 0)
+    cache.get_or_fetch(101, lambda: ({'form': 'old'}, played))
+    cache.get_or_fetch(101, lambda: (['match'], played), kind='last_matches')
+
+    assert cache.get_or_fetch(101, lambda: pytest.fail('unexpected fetch')) == {'form': 'old'}
+    assert cache.get_or_fetch(101, lambda: pytest.fail('unexpected fetch'), kind='last_matches') == ['match']
+    with pytest.raises(ValueError):
+        cache.get_or_fetch(101, lambda: ({}, played), kind='standings')
+
+    cache.invalidate(101, datetime(2025, 8, 8, 18, 0))
+    assert cache.get_or_fetch(101, lambda: ({'form': 'new'}, None)) == {'form': 'new'}
+    assert cache.get_or_fetch(101, lambda: ([], None), kind='last_matches') == []
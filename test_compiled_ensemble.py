@@ -0,0 +1,115 @@
+"""
+Tests for ml/compiled_ensemble.py (tree arrays must match predict_proba)
+Run: pytest test_compiled_ensemble.py
+"""
+import lightgbm as lgb
+import numpy as np
+import pytest
+import xgboost as xgb
+from sklearn.ensemble import RandomForestClassifier
+
+from ml.compiled_ensemble import CompiledEnsemble, UnsupportedModel, export_model
+from ml.train_ensemble import EnsembleGoalPredictor
+
+
+def _data(n=400, features=6, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, features))
+    y = (X[:, 0] + 0.5 * X[:, 1] * X[:, 2] + rng.normal(scale=0.5, size=n) > 0).astype(int)
+    return X, y
+
+
+def _models(X, y):
+    models = {
+        'lightgbm': lgb.LGBMClassifier(n_estimators=30, num_leaves=15, verbose=-1).fit(X, y),
+        'xgboost': xgb.XGBClassifier(n_estimators=30, max_depth=4).fit(X, y),
+        'random_forest': RandomForestClassifier(n_estimators=20, max_depth=6, random_state=0).fit(X, y),
+    }
+    try:
+        from catboost import CatBoostClassifier
+        models['catboost'] = CatBoostClassifier(iterations=30, depth=4, verbose=False, allow_writing_files=False).fit(X, y)
+    except ImportError:
+        pass
+    return models
+
+
+def test_matches_predict_proba():
+    X, y = _data()
+    models = _models(X, y)
+    compiled = CompiledEnsemble.from_models(models)
+    assert compiled.fallback == {}
+
+    X_new, _ = _data(n=200, seed=1)
+    X_new[::10, 0] = 0.0
+    probas = compiled.predict_proba(X_new)
+    for name, model in models.items():
+        np.testing.assert_allclose(probas[name], model.predict_proba(X_new)[:, 1], atol=1e-5, err_msg=name)
+
+
+def test_missing_values_follow_default_direction():
+    X, y = _data()
+    X[::4, 1] = np.nan
+    models = {
+        'lightgbm': lgb.LGBMClassifier(n_estimators=20, verbose=-1).fit(X, y),
+        'xgboost': xgb.XGBClassifier(n_estimators=20, max_depth=4).fit(X, y),
+    }
+    compiled = CompiledEnsemble.from_models(models)
+
+    X_new, _ = _data(n=100, seed=2)
+    X_new[::3, 1] = np.nan
+    probas = compiled.predict_proba(X_new)
+    for name, model in models.items():
+        np.testing.assert_allclose(probas[name], model.predict_proba(X_new)[:, 1], atol=1e-5, err_msg=name)
+
+
+def test_unsupported_model_falls_back():
+    from sklearn.linear_model import LogisticRegression
+
+    X, y = _data()
+    models = {'logistic': LogisticRegression().fit(X, y)}
+    compiled = CompiledEnsemble.from_models(models)
+
+    assert list(compiled.fallback) == ['logistic']
+    np.testing.assert_allclose(compiled.predict_proba(X[:5])['logistic'], models['logistic'].predict_proba(X[:5])[:, 1])
+
+
+def test_only_unsupported_models_fall_back():
+    from sklearn.linear_model import LogisticRegression
+
+    X, y = _data()
+    with pytest.raises(UnsupportedModel):
+        export_model(LogisticRegression().fit(X, y))
+    multiclass = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y + (X[:, 3] > 1))
+    assert list(CompiledEnsemble.from_models({'rf3': multiclass}).fallback) == ['rf3']
+
+    # Ошибка выгрузки, а не неподдерживаемая модель - не прячется в fallback
+    class LGBMClassifier:
+        @property
+        def booster_(self):
+            raise RuntimeError('corrupted booster')
+
+    with pytest.raises(RuntimeError):
+        CompiledEnsemble.from_models({'lightgbm': LGBMClassifier()})
+
+
+def test_saved_ensemble_predicts_once(tmp_path, monkeypatch):
+    X, y = _data()
+    ensemble = EnsembleGoalPredictor(model_path=str(tmp_path))
+    ensemble.models = _models(X, y)
+    ensemble.feature_names = [f'f{i}' for i in range(X.shape[1])]
+    ensemble.scaler.fit(X)
+    ensemble.model_weights = {name: 1 / len(ensemble.models) for name in ensemble.models}
+    expected = sum(
+        model.predict_proba(ensemble.scaler.transform(X[:1]))[0, 1] * ensemble.model_weights[name]
+        for name, model in ensemble.models.items()
+    )
+    path = ensemble.save_ensemble()
+
+    loaded = EnsembleGoalPredictor(model_path=str(tmp_path))
+    loaded.load_ensemble(path, mmap_mode='r')
+    for name, model in loaded.models.items():
+        monkeypatch.setattr(model, 'predict_proba', lambda *args: pytest.fail('compiled path expected'))
+
+    result = loaded.predict(dict(zip(loaded.feature_names, X[0])))
+    assert result['ensemble_proba'] == pytest.approx(expected, abs=1e-5)
+    assert set(result['individual_predictions']) == set(loaded.models)
@@ -0,0 +1,71 @@
+"""
+Tests for ml/db_features.py (batch SQL / pandas features must match the per-match queries)
+Run: pytest test_db_features.py
+"""
+import io
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from flask import Flask
+
+from extensions import db
+from ml.db_features import build_training_features
+from models import Match, Team
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        _seed()
+        yield app
+        db.session.remove()
+
+
+def _seed(teams=8, rounds=6):
+    rng = np.random.default_rng(7)
+    for team_id in range(1, teams + 1):
+        db.session.add(Team(id=team_id, api_id=team_id, name=f'Team {team_id}', league='PL', country='England',
+                            avg_goals_per_match=float(rng.uniform(0.5, 2.5)), total_matches=int(rng.integers(10, 40))))
+
+    api_id = 0
+    start = datetime(2024, 8, 1)
+    for round_no in range(rounds):
+        order = rng.permutation(np.arange(1, teams + 2))  # команда teams + 1 не существует в teams
+        for slot in range(0, len(order) - 1, 2):
+            api_id += 1
+            home, away = int(order[slot]), int(order[slot + 1])
+            home_goals, away_goals = (int(goal) for goal in rng.integers(0, 4, size=2))
+            if api_id == 30:
+                home_goals = None  # счет не записан - строки с ним в истории пропускаются
+            total = None if home_goals is None else home_goals + away_goals
+            db.session.add(Match(
+                api_id=api_id, home_team_id=home, away_team_id=away, league='PL',
+                match_date=start + timedelta(days=7 * round_no, hours=slot), status='FINISHED',
+                home_goals=home_goals, away_goals=away_goals, total_goals=total,
+                result=None if total is None else ('1' if home_goals > away_goals else 'X' if home_goals == away_goals else '2'),
+                over_2_5=None if total is None else total > 2, btts=None if total is None else home_goals > 0 and away_goals > 0,
+            ))
+    db.session.add(Match(api_id=999, home_team_id=1, away_team_id=2, league='PL',
+                         match_date=start + timedelta(days=100), status='scheduled'))
+    db.session.commit()
+
+
+def _csv(df):
+    buffer = io.StringIO()
+    df.dropna().to_csv(buffer, index=False)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('mode', ['sql', 'pandas'])
+def test_batch_features_match_per_match_queries(app, mode):
+    expected = build_training_features(db.session, mode='rows')
+    actual = build_training_features(db.session, mode=mode)
+
+    assert len(expected) > 10
+    assert list(actual.columns) == list(expected.columns)
+    assert _csv(actual) == _csv(expected)
@@ -0,0 +1,112 @@
+"""
+Tests for composite indexes on the hot Match/Prediction lookups (EXPLAIN QUERY PLAN)
+Run: pytest test_db_indexes.py
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+from sqlalchemy import and_, or_, select
+
+from extensions import db
+from models import Match, Prediction, Subscription, UserPrediction, ensure_columns, ensure_indexes
+
+NOW = datetime(2025, 8, 1)
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+def _plan(stmt):
+    """EXPLAIN QUERY PLAN для ORM-запроса -> строки плана"""
+    compiled = stmt.compile(dialect=db.engine.dialect, compile_kwargs={'render_postcompile': True})
+    params = [
+        value.isoformat(' ') if isinstance(value, datetime) else value
+        for value in (compiled.params[name] for name in compiled.positiontup)
+    ]
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', tuple(params)).all()
+    return ' | '.join(row[-1] for row in rows)
+
+
+@pytest.mark.parametrize('stmt, index', [
+    (lambda: select(Match).where(
+        Match.status == 'scheduled',
+        Match.match_date >= NOW,
+        Match.match_date < NOW + timedelta(days=1),
+    ), 'ix_matches_status_date'),
+    (lambda: select(Match).filter_by(league='PL', status='scheduled').order_by(Match.match_date).limit(20),
+     'ix_matches_league_status_date'),
+    (lambda: select(Match).where(Match.home_team_id == 1).order_by(Match.match_date.desc()).limit(5),
+     'ix_matches_home_team_date'),
+    (lambda: select(Match).where(Match.away_team_id == 1).order_by(Match.match_date.desc()).limit(5),
+     'ix_matches_away_team_date'),
+    (lambda: select(Prediction).filter_by(match_id=1).limit(1), 'ix_predictions_match_id'),
+    (lambda: select(Prediction).where(Prediction.match_id.in_([1, 2, 3])), 'ix_predictions_match_id'),
+    (lambda: select(UserPrediction).filter_by(user_id=1).order_by(UserPrediction.viewed_at.desc()),
+     'ix_user_predictions_user_viewed'),
+    (lambda: select(Subscription).filter_by(user_id=1, status='active').limit(1), 'ix_subscriptions_user_id'),
+])
+def test_hot_lookups_use_index(app, stmt, index):
+    plan = _plan(stmt())
+    assert index in plan
+    assert 'TEMP B-TREE' not in plan  # сортировка берется из индекса
+
+
+def test_team_form_query_avoids_full_scan(app):
+    plan = _plan(select(Match).where(and_(
+        Match.status == 'FINISHED',
+        Match.match_date < NOW,
+        or_(Match.home_team_id == 1, Match.away_team_id == 1),
+    )).order_by(Match.match_date.desc()).limit(5))
+
+    assert 'USING INDEX' in plan
+    assert 'SCAN matches' not in plan
+
+
+def test_ensure_indexes_migrates_existing_tables(app):
+    # Таблицы, созданные до появления индексов
+    db.drop_all()
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql(
+            'CREATE TABLE matches (id INTEGER PRIMARY KEY, api_id INTEGER UNIQUE NOT NULL, '
+            'home_team_id INTEGER NOT NULL, away_team_id INTEGER NOT NULL, league VARCHAR(50) NOT NULL, '
+            'match_date DATETIME NOT NULL, status VARCHAR(20))'
+        )
+        conn.exec_driver_sql('CREATE INDEX idx_matches_date ON matches(match_date)')
+        conn.exec_driver_sql('CREATE TABLE predictions (id INTEGER PRIMARY KEY, match_id INTEGER NOT NULL)')
+
+    with db.engine.begin() as conn:
+        created = ensure_indexes(conn)
+
+    assert created == [
+        'ix_matches_away_team_date', 'ix_matches_home_team_date',
+        'ix_matches_league_status_date', 'ix_matches_status_date', 'ix_predictions_match_id',
+    ]
+    # Повторный запуск ничего не создает
+    with db.engine.begin() as conn:
+        assert ensure_indexes(conn) == []
+
+
+def test_ensure_columns_adds_nullable_columns(app):
+    db.drop_all()
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql(
+            'CREATE TABLE predictions (id INTEGER PRIMARY KEY, match_id INTEGER NOT NULL, '
+            'prediction_type VARCHAR(50), probability FLOAT NOT NULL, confidence VARCHAR(20) NOT NULL, '
+            'explanation TEXT, factors JSON, is_correct BOOLEAN, actual_result VARCHAR(50), '
+            'created_at DATETIME, model_version VARCHAR(50))'
+        )
+
+    with db.engine.begin() as conn:
+        assert ensure_columns(conn) == ['predictions.feature_hash', 'predictions.updated_at']
+    with db.engine.begin() as conn:
+        assert ensure_columns(conn) == []
@@ -0,0 +1,146 @@
+"""
+Tests for services/explanation_queue.py (background LLM explanations)
+Run: pytest test_explanation_queue.py
+"""
+import threading
+import time
+from datetime import datetime
+
+import pytest
+from flask import Flask
+
+from extensions import db
+from ml import predict
+from models import Match, Prediction, Team
+from services.explanation_queue import ExplanationQueue, FakeExplanationClient
+
+STATS = {'avg_goals_scored': 1.5, 'over_2_5_percentage': 0.6}
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all(Team(id=i, api_id=100 + i, name=f'Team {i}', league='PL', country='England')
+                           for i in range(1, 9))
+        for match_id in range(1, 5):
+            db.session.add(Match(id=match_id, api_id=match_id, home_team_id=2 * match_id - 1,
+                                 away_team_id=2 * match_id, league='PL', status='scheduled',
+                                 match_date=datetime(2025, 8, 1, 18, 0)))
+            db.session.add(Prediction(match_id=match_id, probability=0.6, confidence='medium',
+                                      explanation='template'))
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+def make_queue(app, client, background=False, **options):
+    queue = ExplanationQueue(client=client)
+    queue.init_app(app, background=background)
+    queue.retry_backoff = 0
+    for name, value in options.items():
+        setattr(queue, name, value)
+    return queue
+
+
+def submit(queue, match_id, probability=0.6):
+    match_data = {'home_team_name': f'Team {2 * match_id - 1}', 'away_team_name': f'Team {2 * match_id}'}
+    return queue.submit(match_id, {'probability': probability, 'confidence': 'medium'}, STATS, STATS, match_data)
+
+
+def explanations():
+    db.session.expire_all()
+    return {p.match_id: p.explanation for p in Prediction.query}
+
+
+def test_batched_writeback(app):
+    client = FakeExplanationClient()
+    queue = make_queue(app, client, batch_size=2)
+
+    assert submit(queue, 1) == '⚽ Вероятность Over 2.5 голов: 60.0%'
+    for match_id in (2, 3):
+        submit(queue, match_id)
+
+    assert explanations()[1] == 'template'  # до обработки - шаблон
+    assert queue.run_pending() == 3
+    assert client.batches == [2, 1]
+    assert explanations() == {1: '🤖 Team 1 - Team 2: Over 2.5 60%', 2: '🤖 Team 3 - Team 4: Over 2.5 60%',
+                              3: '🤖 Team 5 - Team 6: Over 2.5 60%', 4: 'template'}
+    assert all(p.updated_at is not None for p in Prediction.query.filter(Prediction.match_id < 4))
+
+
+def test_failed_batch_retried_per_match(app):
+    client = FakeExplanationClient(fail_times=1)
+    queue = make_queue(app, client, batch_size=5)
+    submit(queue, 1)
+    submit(queue, 2)
+
+    assert queue.run_pending() == 2
+    assert client.batches == [2, 1, 1]
+    assert queue.stats['retried'] == 2 and queue.stats['failed'] == 0
+
+
+def test_gives_up_after_max_retries(app):
+    queue = make_queue(app, FakeExplanationClient(fail_times=100), max_retries=2)
+    submit(queue, 1)
+
+    assert queue.run_pending() == 0
+    assert queue.stats['failed'] == 1
+    assert explanations()[1] == 'template'
+    assert queue.queue_size() == 0
+
+
+def test_recomputed_row_is_not_overwritten(app):
+    queue = make_queue(app, FakeExplanationClient(), max_retries=1)
+    submit(queue, 1, probability=0.6)
+    submit(queue, 2, probability=0.6)
+    submit(queue, 2, probability=0.7)  # новая задача заменяет ожидающую
+
+    Prediction.query.filter_by(match_id=1).update({'probability': 0.8})
+    db.session.commit()
+
+    queue.run_pending()
+    assert queue.stats['replaced'] == 1
+    assert explanations()[1] == 'template'  # текст объяснял 60%, а прогноз уже 80%
+    assert explanations()[2] == 'template'  # строка с 60%, задача - для 70%
+
+
+def test_prediction_service_defers_to_queue(app, monkeypatch):
+    queue = make_queue(app, FakeExplanationClient())
+    monkeypatch.setattr(predict, 'explanation_queue', queue)
+    match_data = {'match_id': 1, 'home_team_name': 'Team 1', 'away_team_name': 'Team 2'}
+
+    text = predict.PredictionService._generate_explanation(None, {'probability': 0.6}, STATS, STATS, match_data)
+    assert text.startswith('⚽')
+    assert queue.queue_size() == 1
+
+
+def test_background_concurrency_is_bounded(app):
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    class SlowClient(FakeExplanationClient):
+        def explain_batch(self, items):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return super().explain_batch(items)
+
+    client = SlowClient()
+    queue = make_queue(app, client, background=True, batch_size=1, concurrency=2, batch_wait=0)
+    for match_id in range(1, 5):
+        submit(queue, match_id)
+
+    deadline = time.monotonic() + 5
+    while queue.stats['written'] < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert queue.stats['written'] == 4
+    assert peak[0] == 2
+    assert all(text.startswith('🤖') for text in explanations().values())
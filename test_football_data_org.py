@@ -0,0 +1,144 @@
+"""
+Tests for services/football_data_org.py (parallel requests under the shared rate limit)
+Run: pytest test_football_data_org.py
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import services.football_data_org as football_data_org
+from services.cache import SimpleCache
+from services.http_cache import ResponseStore
+from services.rate_limiter import LocalBucketStore, PriorityRequestQueue, TokenBucket
+
+# Код лиги -> (задержка ответа, статус); медленные лиги идут первыми,
+# чтобы ответы приходили не в порядке запросов
+LEAGUES = {
+    'PL': (0.4, 200),
+    'PD': (0.0, 200),
+    'BL1': (0.2, 404),
+    'SA': (0.3, 200),
+    'FL1': (0.0, 500),
+}
+
+
+def _fixture(code, match_id):
+    return {
+        'id': match_id, 'utcDate': '2025-08-16T14:00:00Z', 'status': 'SCHEDULED',
+        'competition': {'name': code, 'code': code},
+        'homeTeam': {'id': match_id * 10, 'name': f'{code} Home'},
+        'awayTeam': {'id': match_id * 10 + 1, 'name': f'{code} Away'},
+        'score': {'fullTime': {'home': None, 'away': None}},
+    }
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    requests_seen = []
+
+    def do_GET(self):
+        code = self.path.split('/')[2]
+        Handler.requests_seen.append(code)
+        delay, status = LEAGUES.get(code, (0.0, 404))
+        time.sleep(delay)
+
+        body = b''
+        if status == 200:
+            body = json.dumps({'matches': [_fixture(code, list(LEAGUES).index(code) + 1)]}).encode()
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    Handler.requests_seen = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    bucket = TokenBucket('test', per_minute=6000, store=LocalBucketStore())
+    monkeypatch.setattr(football_data_org, 'football_cache', SimpleCache(ttl_seconds=60))
+    monkeypatch.setattr(football_data_org, 'football_rate_limiter', bucket)
+    monkeypatch.setattr(football_data_org, 'football_request_queue', PriorityRequestQueue(bucket, max_concurrency=5))
+    monkeypatch.setattr(football_data_org, 'football_response_store',
+                        ResponseStore('football', path=str(tmp_path / 'http.sqlite3')))
+    monkeypatch.setattr(football_data_org.Config, 'HTTP_MAX_RETRIES', 0)
+    monkeypatch.setattr(football_data_org.Config, 'HTTP_CACHE_STALE_SECONDS', 0)
+
+    client = football_data_org.FootballDataOrgAPI()
+    client.base_url = f'http://127.0.0.1:{httpd.server_address[1]}'
+    yield client
+    httpd.shutdown()
+
+
+def _requests(codes):
+    return [(f'competitions/{code}/matches', {'dateFrom': '2025-08-16'}) for code in codes]
+
+
+def _codes(responses):
+    return [response['matches'][0]['competition']['code'] if response else None for response in responses]
+
+
+def test_results_keep_request_order_with_partial_failures(api):
+    started = time.monotonic()
+    responses = api._make_requests(_requests(LEAGUES))
+
+    assert _codes(responses) == ['PL', 'PD', None, 'SA', None]
+    assert sorted(Handler.requests_seen) == sorted(LEAGUES)
+    # Параллельно: общее время - самый медленный запрос, а не сумма
+    assert time.monotonic() - started < 0.8
+
+
+def test_cached_stale_and_fetched_results_are_merged_in_order(api):
+    key = api._cache_key(*_requests(['FL1'])[0])
+    football_data_org.football_response_store.put(key, {'matches': [_fixture('FL1', 99)]}, ttl_seconds=0)
+    key = api._cache_key(*_requests(['PD'])[0])
+    football_data_org.football_cache.set(key, {'matches': [_fixture('PD', 42)]})
+
+    responses = api._make_requests(_requests(['FL1', 'PD', 'BL1', 'PL']))
+
+    # FL1: 500 -> старый ответ с диска; PD: из кэша без запроса; BL1: None
+    assert _codes(responses) == ['FL1', 'PD', None, 'PL']
+    assert responses[0]['matches'][0]['id'] == 99
+    assert responses[1]['matches'][0]['id'] == 42
+    assert 'PD' not in Handler.requests_seen
+
+
+def test_interactive_deadline_leaves_slow_requests_empty(api, monkeypatch):
+    monkeypatch.setattr(football_data_org.Config, 'FOOTBALL_API_MAX_WAIT', 0.15)
+
+    responses = api._make_requests(_requests(['PL', 'PD', 'SA']))
+
+    assert _codes(responses) == [None, 'PD', None]
+
+
+def test_request_errors_only_fail_their_slot(api, monkeypatch):
+    queue = football_data_org.football_request_queue
+    submit = queue.submit
+
+    def bucket_store_down():
+        raise RuntimeError('bucket store down')
+
+    def failing_submit(key, func, priority=None):
+        return submit(key, bucket_store_down if 'BL1' in key else func, priority=priority)
+
+    monkeypatch.setattr(queue, 'submit', failing_submit)
+
+    responses = api._make_requests(_requests(['PL', 'BL1', 'PD']))
+
+    assert _codes(responses) == ['PL', None, 'PD']
+
+
+def test_todays_fixtures_keep_league_names(api):
+    fixtures = api.get_todays_fixtures(date='2025-08-16')
+
+    assert [(fixture['league'], fixture['league_id']) for fixture in fixtures] == [
+        ('Premier League', 'PL'), ('La Liga', 'PD'), ('Serie A', 'SA'),
+    ]
@@ -0,0 +1,193 @@
+"""
+Tests for services/http_cache.py (persistent responses, revalidation, stale fallback)
+Run: pytest test_http_cache.py
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import services.football_data_org as football_data_org
+import services.tennis_api as tennis_api
+from services.cache import SimpleCache
+from services.http_cache import ResponseStore
+from services.rate_limiter import TokenBucket, PriorityRequestQueue, LocalBucketStore
+
+
+def test_put_get_fresh_and_stale(tmp_path):
+    store = ResponseStore('test', path=str(tmp_path / 'http.sqlite3'))
+
+    store.put('matches', {'count': 1}, ttl_seconds=60, headers={'ETag': '"v1"'})
+    entry = store.get('matches')
+    assert entry.data == {'count': 1}
+    assert entry.is_fresh
+    assert entry.conditional_headers() == {'If-None-Match': '"v1"'}
+
+    store.put('old', {'count': 2}, ttl_seconds=0)
+    entry = store.get('old')
+    assert entry.data == {'count': 2}
+    assert not entry.is_fresh
+
+
+def test_refresh_extends_freshness(tmp_path):
+    store = ResponseStore('test', path=str(tmp_path / 'http.sqlite3'))
+    store.put('matches', {'count': 1}, ttl_seconds=0, headers={'Last-Modified': 'Sat, 01 Nov 2025 10:00:00 GMT'})
+
+    entry = store.refresh('matches', ttl_seconds=60)
+
+    assert entry.is_fresh
+    assert entry.data == {'count': 1}
+    assert entry.last_modified == 'Sat, 01 Nov 2025 10:00:00 GMT'
+
+
+def test_survives_new_instance_and_prune(tmp_path):
+    path = str(tmp_path / 'http.sqlite3')
+    ResponseStore('football', path=path).put('matches', [1, 2], ttl_seconds=60)
+
+    restarted = ResponseStore('football', path=path)
+    assert restarted.get('matches').data == [1, 2]
+    assert ResponseStore('tennis', path=path).get('matches') is None
+
+    time.sleep(0.01)
+    assert restarted.prune(max_age_seconds=0) == 1
+    assert len(restarted) == 0
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    requests_seen = []
+    status = 200
+    status_headers = {}
+    failures_left = 0
+
+    def do_GET(self):
+        Handler.requests_seen.append(self.headers.get('If-None-Match'))
+
+        if Handler.failures_left > 0:
+            Handler.failures_left -= 1
+            self._send(503, b'')
+        elif Handler.status != 200:
+            self._send(Handler.status, b'', Handler.status_headers)
+        elif self.headers.get('If-None-Match') == '"v1"':
+            self._send(304, b'')
+        else:
+            self._send(200, b'{"matches": []}', {'ETag': '"v1"'})
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    Handler.requests_seen = []
+    Handler.status = 200
+    Handler.status_headers = {}
+    Handler.failures_left = 0
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    bucket = TokenBucket('test', per_minute=6000, store=LocalBucketStore())
+    monkeypatch.setattr(football_data_org, 'football_cache', SimpleCache(ttl_seconds=60))
+    monkeypatch.setattr(football_data_org, 'football_rate_limiter', bucket)
+    monkeypatch.setattr(football_data_org, 'football_request_queue', PriorityRequestQueue(bucket))
+    monkeypatch.setattr(football_data_org, 'football_response_store',
+                        ResponseStore('football', path=str(tmp_path / 'http.sqlite3')))
+
+    client = football_data_org.FootballDataOrgAPI()
+    client.base_url = f'http://127.0.0.1:{httpd.server_address[1]}'
+    yield client
+    httpd.shutdown()
+
+
+def test_restart_reuses_stored_response(api):
+    assert api._make_request('competitions/PL/matches') == {'matches': []}
+
+    # Новый воркер: пустой кэш в памяти, ответ берется с диска без запроса
+    football_data_org.football_cache.clear()
+    assert api._make_request('competitions/PL/matches') == {'matches': []}
+    assert len(Handler.requests_seen) == 1
+
+
+def test_expired_response_is_revalidated(api, monkeypatch):
+    monkeypatch.setattr(football_data_org.Config, 'HTTP_CACHE_STALE_SECONDS', 0)
+    store = football_data_org.football_response_store
+    store.put('competitions/PL/matches:[]', {'matches': []}, ttl_seconds=0, headers={'ETag': '"v1"'})
+
+    assert api._make_request('competitions/PL/matches') == {'matches': []}
+    assert Handler.requests_seen == ['"v1"']
+    assert store.get('competitions/PL/matches:[]').is_fresh
+
+
+def test_stale_response_served_when_upstream_fails(api, monkeypatch):
+    monkeypatch.setattr(football_data_org.Config, 'HTTP_CACHE_STALE_SECONDS', 0)
+    Handler.status = 429
+    football_data_org.football_response_store.put('competitions/PL/matches:[]', {'matches': ['old']}, ttl_seconds=0)
+
+    assert api._make_request('competitions/PL/matches') == {'matches': ['old']}
+
+
+def test_rate_limit_with_http_date_retry_after(api, monkeypatch):
+    penalties = []
+    monkeypatch.setattr(football_data_org.football_rate_limiter, 'penalize', penalties.append)
+    monkeypatch.setattr(football_data_org.Config, 'HTTP_CACHE_STALE_SECONDS', 0)
+    Handler.status = 429
+    Handler.status_headers = {'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}
+    football_data_org.football_response_store.put('competitions/PL/matches:[]', {'matches': ['old']}, ttl_seconds=0)
+
+    assert api._make_request('competitions/PL/matches') == {'matches': ['old']}
+    assert penalties == [0]
+
+
+def test_tennis_connection_error_serves_stored_response(tmp_path, monkeypatch):
+    class DownSession:
+        def get(self, url, **kwargs):
+            raise requests.exceptions.ConnectTimeout('upstream down')
+
+    store = ResponseStore('tennis', path=str(tmp_path / 'http.sqlite3'))
+    monkeypatch.setattr(tennis_api, 'tennis_response_store', store)
+    monkeypatch.setattr(tennis_api, 'get_session', lambda name: DownSession())
+    service = tennis_api.TennisAPIService()
+    service.api_key = 'test-key'
+
+    url = f'{service.BASE_URL}/tennis/v2/atp/fixtures/2025-08-01'
+    store.put(url, {'data': [{'id': 'real'}]}, ttl_seconds=0)
+    assert service._make_request('fixtures', {'date': '2025-08-01'}) == {'data': [{'id': 'real'}]}
+
+    # Без сохраненного ответа - демо-данные, как раньше
+    assert service._make_request('fixtures', {'date': '2025-08-02'})['response'][0]['id'] == 'demo_1'
+
+
+class CountingStore(LocalBucketStore):
+    def __init__(self):
+        super().__init__()
+        self.taken = 0
+
+    def take(self, bucket, capacity, rate):
+        wait = super().take(bucket, capacity, rate)
+        if wait <= 0:
+            self.taken += 1
+        return wait
+
+
+def test_server_errors_retried_with_a_token_each(api, monkeypatch):
+    store = CountingStore()
+    bucket = TokenBucket('test', per_minute=6000, store=store)
+    monkeypatch.setattr(football_data_org, 'football_rate_limiter', bucket)
+    monkeypatch.setattr(football_data_org, 'football_request_queue', PriorityRequestQueue(bucket))
+    monkeypatch.setattr(football_data_org.Config, 'HTTP_BACKOFF_FACTOR', 0.01)
+    monkeypatch.setattr(football_data_org.Config, 'HTTP_BACKOFF_JITTER', 0)
+    Handler.failures_left = 2
+
+    assert api._make_request('competitions/PL/matches') == {'matches': []}
+    assert len(Handler.requests_seen) == 3
+    assert store.taken == 3  # токен на каждый запрос к API, включая повторы
@@ -0,0 +1,124 @@
+"""
+Tests for services/http_client.py (pooled sessions, retries, timeouts)
+Run: pytest test_http_client.py
+"""
+import gzip
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.http_client import create_session, get_session, JitterRetry, retry_after_seconds
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    failures_left = 0
+    connections = set()
+
+    def do_GET(self):
+        Handler.connections.add(self.client_address)
+
+        if Handler.failures_left > 0:
+            Handler.failures_left -= 1
+            self._send(503, b'unavailable')
+            return
+
+        body = b'{"ok": true}'
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            self._send(200, gzip.compress(body), {'Content-Encoding': 'gzip'})
+        else:
+            self._send(200, body)
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.failures_left = 0
+    Handler.connections = set()
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+
+
+def test_connections_are_reused(server):
+    session = create_session()
+
+    for _ in range(5):
+        assert session.get(f'{server}/matches').json() == {'ok': True}
+
+    assert len(Handler.connections) == 1
+
+
+def test_gzip_response_is_decoded(server):
+    response = create_session().get(f'{server}/matches')
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.json() == {'ok': True}
+
+
+def test_retries_server_errors(server):
+    Handler.failures_left = 2
+    session = create_session(max_retries=3, backoff_factor=0.01, jitter=0.01)
+
+    assert session.get(f'{server}/matches').status_code == 200
+
+
+def test_gives_up_after_max_retries(server):
+    Handler.failures_left = 5
+    session = create_session(max_retries=1, backoff_factor=0.01)
+
+    assert session.get(f'{server}/matches').status_code == 503
+
+
+def test_backoff_has_jitter():
+    retry = JitterRetry(total=5, backoff_factor=1, jitter=0.5)
+    for _ in range(3):
+        retry = retry.increment(method='GET', url='/')
+
+    assert 4 <= retry.get_backoff_time() <= 4.5
+
+
+def test_timeout_per_host():
+    session = create_session()
+
+    assert session.timeout_for('https://www.football-data.co.uk/mmz4281/2425/E0.csv') == (5, 30)
+    assert session.timeout_for('https://example.com/') == session.default_timeout
+
+
+def test_football_session_does_not_retry(server):
+    Handler.failures_left = 1
+    adapter = get_session('football').get_adapter('https://api.football-data.org/v4/matches')
+
+    assert adapter.max_retries.total == 0
+    assert get_session('football').get(f'{server}/matches').status_code == 503
+    assert get_session('tennis').get_adapter('https://example.com/').max_retries.total > 0
+
+
+def test_get_session_is_shared():
+    assert get_session('football') is get_session('football')
+    assert get_session('football') is not get_session('tennis')
+
+
+def test_retry_after_seconds_and_http_date():
+    in_two_minutes = format_datetime(datetime.now(timezone.utc) + timedelta(minutes=2), usegmt=True)
+
+    assert retry_after_seconds('30') == 30
+    assert 110 <= retry_after_seconds(in_two_minutes) <= 120
+    assert retry_after_seconds('Wed, 21 Oct 2015 07:28:00 GMT') == 0  # уже прошло
+    assert retry_after_seconds('soon') == 60
+    assert retry_after_seconds(None) == 60
@@ -0,0 +1,108 @@
+"""
+Tests for services/json_response.py and services/compression.py
+Run: pytest test_json_response.py
+"""
+import gzip
+import json
+import zlib
+from datetime import datetime
+
+import numpy as np
+import pytest
+from flask import Flask, jsonify
+
+from services import compression as compression_module
+from services.cache import SimpleCache
+from services.compression import ResponseCompressor
+from services.json_response import FastJSONProvider, stream_json
+from services.response_cache import ResponseCache
+
+ITEMS = [{'id': i, 'proba': np.float32(0.25), 'goals': np.int64(i), 'team': 'Команда'} for i in range(200)]
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    ResponseCompressor().init_app(app)
+    cache = ResponseCache(SimpleCache())
+
+    @app.route('/list')
+    def listing():
+        return jsonify({'items': ITEMS, 'date': datetime(2025, 8, 1, 18, 30)})
+
+    @app.route('/small')
+    def small():
+        return jsonify({'ok': True})
+
+    @app.route('/stream')
+    def stream():
+        return stream_json('items', (item for item in ITEMS), league='PL')
+
+    @app.route('/cached')
+    @cache.cached(ttl=60, max_age=60, vary_tier=False)
+    def cached():
+        return jsonify({'items': ITEMS})
+
+    return app
+
+
+def test_numpy_and_flask_compatibility(app):
+    with app.app_context():
+        encoded = app.json.dumps({'b': np.float64(0.5), 'a': np.arange(3), 'date': datetime(2025, 8, 1)})
+        stdlib = Flask(__name__).json.dumps({'b': 0.5, 'a': [0, 1, 2], 'date': datetime(2025, 8, 1)})
+        assert json.loads(encoded) == json.loads(stdlib)
+        assert list(json.loads(encoded)) == ['a', 'b', 'date']  # ключи отсортированы, как в Flask
+
+
+def test_stream_json_chunks(app):
+    response = app.test_client().get('/stream', headers={'Accept-Encoding': 'identity'})
+    assert response.is_streamed
+    body = json.loads(response.get_data())
+    assert body['success'] is True and body['league'] == 'PL'
+    assert body['count'] == len(ITEMS) == len(body['items'])
+    assert body['items'][1] == {'id': 1, 'proba': 0.25, 'goals': 1, 'team': 'Команда'}
+
+    with app.test_request_context():
+        chunks = list(stream_json('items', []).response)
+    assert json.loads(b''.join(chunks)) == {'success': True, 'items': [], 'count': 0}
+
+
+def test_gzip_negotiation(app):
+    client = app.test_client()
+
+    response = client.get('/list', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(gzip.decompress(response.get_data()))['date'] == 'Fri, 01 Aug 2025 18:30:00 GMT'
+
+    plain = client.get('/list', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plain.headers
+    assert len(response.get_data()) < len(plain.get_data()) / 5
+
+    assert 'Content-Encoding' not in client.get('/small', headers={'Accept-Encoding': 'gzip'}).headers
+
+
+@pytest.mark.skipif(compression_module.brotli is None, reason='brotli not installed')
+def test_brotli_preferred(app):
+    response = app.test_client().get('/list', headers={'Accept-Encoding': 'gzip, deflate, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert len(json.loads(compression_module.brotli.decompress(response.get_data()))['items']) == len(ITEMS)
+
+
+def test_streamed_gzip(app):
+    response = app.test_client().get('/stream', headers={'Accept-Encoding': 'gzip;q=1.0, br;q=0.5'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    body = zlib.decompress(response.get_data(), 16 + zlib.MAX_WBITS)
+    assert json.loads(body)['count'] == len(ITEMS)
+
+
+def test_compressed_etag_is_weak_and_revalidates(app):
+    client = app.test_client()
+    response = client.get('/cached', headers={'Accept-Encoding': 'gzip'})
+    etag = response.headers['ETag']
+    assert etag.startswith('W/')
+
+    revalidated = client.get('/cached', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert revalidated.status_code == 304
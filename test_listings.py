@@ -0,0 +1,123 @@
+"""
+Tests for services/listings.py (eager-loaded listings, keyset pagination)
+Run: pytest test_listings.py
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+from extensions import db
+from models import Match, Prediction, Team, UserPrediction
+from services.listings import (
+    InvalidCursor, decode_cursor, encode_cursor, league_predictions, prediction_history,
+    serialize_history_entry, serialize_match, serialize_match_prediction, upcoming_matches,
+)
+
+START = datetime(2025, 8, 1, 15, 0)
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all(Team(id=i, api_id=100 + i, name=f'Team {i}', league='PL', country='England')
+                           for i in range(1, 7))
+        for i in range(12):
+            # Пары матчей в одно время - проверка порядка по (match_date, id)
+            db.session.add(Match(id=i + 1, api_id=i + 1, home_team_id=i % 6 + 1, away_team_id=(i + 1) % 6 + 1,
+                                 league='PL' if i < 10 else 'PD', status='scheduled',
+                                 match_date=START + timedelta(days=i // 2)))
+        for match_id in range(1, 13):
+            if match_id != 4:  # матч без прогноза
+                db.session.add(Prediction(id=match_id, match_id=match_id, probability=0.5 + match_id / 100,
+                                          confidence='medium'))
+        db.session.add(Prediction(id=50, match_id=1, probability=0.9, confidence='high'))  # второй прогноз
+        for i, prediction_id in enumerate([1, 2, 3, 5, 6, 7, 8]):
+            db.session.add(UserPrediction(id=i + 1, user_id=7, prediction_id=prediction_id,
+                                          viewed_at=START + timedelta(hours=i // 2)))
+        db.session.add(UserPrediction(id=99, user_id=8, prediction_id=1, viewed_at=START))
+        db.session.commit()
+        db.session.expunge_all()
+        yield app
+        db.session.remove()
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_execute)
+
+
+def _pages(fetch, limit):
+    items, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = fetch(limit=limit, cursor=cursor)
+        items.extend(rows)
+        pages += 1
+        if cursor is None:
+            return items, pages
+
+
+def test_cursor_roundtrip():
+    cursor = encode_cursor(START, 42)
+    assert decode_cursor(cursor) == (START, 42)
+    assert decode_cursor(None) is None
+    with pytest.raises(InvalidCursor):
+        decode_cursor('not-a-cursor')
+
+
+def test_league_predictions_single_query(app):
+    with count_queries() as statements:
+        rows, _ = league_predictions('PL', limit=20)
+        payload = [serialize_match_prediction(match, prediction) for match, prediction in rows]
+
+    assert len(statements) == 1
+    assert [item['match_id'] for item in payload] == [1, 2, 3, 5, 6, 7, 8, 9, 10]
+    assert payload[0]['probability'] == pytest.approx(0.51)  # первый прогноз матча
+    assert payload[0]['home_team'] == 'Team 1' and payload[0]['away_team'] == 'Team 2'
+
+
+def test_league_predictions_keyset_pages(app):
+    items, pages = _pages(lambda **kw: league_predictions('PL', **kw), limit=4)
+
+    assert pages == 3
+    assert [match.id for match, _ in items] == [1, 2, 3, 5, 6, 7, 8, 9, 10]
+
+
+def test_prediction_history_pages_newest_first(app):
+    with count_queries() as statements:
+        rows, cursor = prediction_history(7, limit=3)
+        payload = [serialize_history_entry(view, prediction) for view, prediction in rows]
+
+    assert len(statements) == 1
+    assert [view.id for view, _ in rows] == [7, 6, 5]
+    assert payload[0]['match']['home_team'] == 'Team 2'
+    assert payload[0]['viewed_at'] == (START + timedelta(hours=3)).isoformat()
+
+    items, pages = _pages(lambda **kw: prediction_history(7, **kw), limit=3)
+    assert pages == 3
+    assert [view.id for view, _ in items] == [7, 6, 5, 4, 3, 2, 1]
+
+
+def test_upcoming_matches_loads_teams(app):
+    with count_queries() as statements:
+        matches = upcoming_matches(START, START + timedelta(days=2), limit=10)
+        payload = [serialize_match(match) for match in matches]
+
+    assert len(statements) == 1
+    assert [item['id'] for item in payload] == [3, 4, 5, 6]
+    assert payload[0]['home_team'] == 'Team 3'
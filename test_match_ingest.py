@@ -0,0 +1,97 @@
+"""
+Tests for services/match_ingest.py (bulk match ingestion)
+Run: pytest test_match_ingest.py
+"""
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+from flask import Flask
+
+from extensions import db
+from models import Match, Team, TeamStats
+from services.match_ingest import api_match_rows, csv_match_rows, ingest_matches, synthetic_api_id
+from services.team_stats import install_team_stats_listener
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    db.init_app(app)
+    install_team_stats_listener()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+def _season_csv(teams=20, start=datetime(2023, 8, 12), league='E0'):
+    rows = []
+    names = [f'{league} Team {i}' for i in range(teams)]
+    day = 0
+    for home in names:
+        for away in names:
+            if home != away:
+                rows.append({'Date': (start + timedelta(days=day // 10)).strftime('%d/%m/%Y'),
+                             'HomeTeam': home, 'AwayTeam': away,
+                             'FTHG': day % 4, 'FTAG': day % 3, 'FTR': 'H'})
+                day += 1
+    return pd.DataFrame(rows)
+
+
+def test_csv_rows_parse_dates_and_skip_incomplete():
+    df = pd.DataFrame([
+        {'Date': '12/08/2023', 'HomeTeam': ' Arsenal ', 'AwayTeam': 'Forest', 'FTHG': 2, 'FTAG': 1},
+        {'Date': '19/08/23', 'HomeTeam': 'Chelsea', 'AwayTeam': 'Luton', 'FTHG': 3, 'FTAG': 0},
+        {'Date': '2023-08-26', 'HomeTeam': 'Spurs', 'AwayTeam': 'Fulham', 'FTHG': None, 'FTAG': None},
+        {'Date': 'bad', 'HomeTeam': 'Spurs', 'AwayTeam': 'Fulham', 'FTHG': 1, 'FTAG': 1},
+    ])
+
+    rows = csv_match_rows(df)
+
+    assert [row['match_date'] for row in rows] == [datetime(2023, 8, 12), datetime(2023, 8, 19)]
+    assert rows[0]['home_team'] == {'name': 'Arsenal'}
+    assert synthetic_api_id('match', 'x') == synthetic_api_id('match', 'x') < 0
+
+
+def test_ingest_is_idempotent_and_updates_team_stats(app):
+    rows = csv_match_rows(_season_csv(teams=6))
+
+    assert ingest_matches(rows + rows[:5], 'PL') == 30
+    assert ingest_matches(rows, 'PL') == 0
+    assert Team.query.count() == 6
+    assert Match.query.count() == 30
+    assert db.session.get(TeamStats, Team.query.first().id).matches_played == 10
+
+
+def test_api_rows_reuse_existing_teams(app):
+    db.session.add(Team(api_id=57, name='Arsenal FC', league='PL', country='England'))
+    db.session.commit()
+    payload = [
+        {'id': 1, 'utcDate': '2024-08-17T14:00:00Z', 'homeTeam': {'id': 57, 'name': 'Arsenal FC'},
+         'awayTeam': {'id': 76, 'name': 'Wolves'}, 'score': {'fullTime': {'home': 2, 'away': 0}}},
+        {'id': 2, 'utcDate': '2024-08-24T14:00:00Z', 'homeTeam': {'id': 76, 'name': 'Wolves'},
+         'awayTeam': {'id': 57, 'name': 'Arsenal FC'}, 'score': {'fullTime': {'home': None, 'away': None}}},
+    ]
+
+    assert ingest_matches(api_match_rows(payload), 'PL') == 1
+
+    match = Match.query.one()
+    assert match.api_id == 1
+    assert match.home_team.api_id == 57
+    assert match.match_date == datetime(2024, 8, 17, 14, 0)
+    assert Team.query.count() == 2
+
+
+def test_five_leagues_five_seasons_load_in_seconds(app):
+    started = time.perf_counter()
+    total = 0
+    for league in ('E0', 'SP1', 'D1', 'I1', 'F1'):
+        for season in range(5):
+            df = _season_csv(league=league, start=datetime(2020 + season, 8, 12))
+            total += ingest_matches(csv_match_rows(df), league)
+
+    assert total == 25 * 380
+    assert time.perf_counter() - started < 20
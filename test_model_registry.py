@@ -0,0 +1,72 @@
+"""
+Tests for services/model_registry.py (lazy loading, mmap, stats)
+Run: pytest test_model_registry.py
+"""
+from datetime import datetime, timedelta
+
+import joblib
+import numpy as np
+import pytest
+
+from services.model_registry import ModelRegistry, load_joblib
+
+
+def test_loads_lazily_once():
+    registry = ModelRegistry()
+    calls = []
+    registry.register('model', lambda: calls.append(1) or 'weights')
+
+    assert calls == []
+    assert registry.get('model') == 'weights'
+    assert registry.get('model') == 'weights'
+    assert calls == [1]
+
+    stats = registry.stats()
+    assert stats['loaded'] == 1
+    assert stats['models'][0]['hits'] == 2
+    assert stats['models'][0]['load_seconds'] is not None
+    assert datetime.fromisoformat(stats['models'][0]['loaded_at']).utcoffset() == timedelta(0)
+
+
+def test_failed_load_is_remembered_until_unload():
+    registry = ModelRegistry()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        raise FileNotFoundError('model.pkl')
+
+    registry.register('model', loader)
+    for _ in range(3):
+        with pytest.raises(FileNotFoundError):
+            registry.get('model')
+    assert len(calls) == 1
+    assert registry.stats()['models'][0]['error'] == 'model.pkl'
+
+    registry.unload('model')
+    with pytest.raises(FileNotFoundError):
+        registry.get('model')
+    assert len(calls) == 2
+
+
+def test_load_by_path_shares_one_object(tmp_path):
+    path = tmp_path / 'features.pkl'
+    joblib.dump(['home_goals', 'away_goals'], path)
+    registry = ModelRegistry()
+
+    first = registry.load(str(path))
+    second = registry.load(str(tmp_path / '.' / 'features.pkl'))
+
+    assert first is second
+    assert registry.stats()['models'][0]['file_size_bytes'] == path.stat().st_size
+
+
+def test_joblib_arrays_are_memory_mapped(tmp_path):
+    path = tmp_path / 'scaler.pkl'
+    joblib.dump({'mean': np.arange(1000, dtype=float)}, path)
+
+    mapped = load_joblib(str(path), mmap_mode='r')['mean']
+
+    assert isinstance(mapped, np.memmap)
+    assert not mapped.flags.writeable
+    assert mapped[10] == 10.0
@@ -0,0 +1,113 @@
+"""
+Tests for services/model_watcher.py (hot reload with smoke validation)
+Run: pytest test_model_watcher.py
+"""
+import os
+
+import joblib
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+
+import services.model_watcher as model_watcher_module
+import tennis.predict as tennis_predict
+from services.model_watcher import ModelWatcher, WatchedArtifact, smoke_check_proba, smoke_rows
+
+
+def _touch(path, content):
+    with open(path, 'w') as f:
+        f.write(content)
+    # Разные mtime даже на файловых системах с грубым разрешением
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_reload_waits_until_file_is_stable(tmp_path):
+    path = tmp_path / 'model.pkl'
+    _touch(path, 'v1')
+    reloads = []
+
+    watcher = ModelWatcher(interval=0)
+    watcher.watch(WatchedArtifact('model', lambda: [str(path)], reloads.append))
+    watcher.snapshot()
+
+    assert watcher.check_once() == []
+    _touch(path, 'v2')
+    assert watcher.check_once() == []  # первый раз: ждем, пока файл допишется
+    assert watcher.check_once() == ['model']
+    assert watcher.check_once() == []
+    assert len(reloads) == 1
+
+
+def test_rejected_version_is_not_retried(tmp_path):
+    path = tmp_path / 'model.pkl'
+    _touch(path, 'v1')
+    attempts = []
+
+    def reload(paths):
+        attempts.append(paths)
+        raise ValueError('smoke test failed')
+
+    watcher = ModelWatcher(interval=0)
+    watcher.watch(WatchedArtifact('model', lambda: [str(path)], reload))
+    watcher.snapshot()
+    _touch(path, 'broken')
+
+    for _ in range(4):
+        assert watcher.check_once() == []
+    assert len(attempts) == 1
+    assert watcher.stats()['model']['last_error'] == 'smoke test failed'
+
+
+def test_smoke_check_rejects_bad_probabilities():
+    class BrokenModel:
+        def predict_proba(self, X):
+            return np.full((len(X), 2), np.nan)
+
+    X = smoke_rows(['a', 'b'])
+    try:
+        smoke_check_proba(BrokenModel(), X)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('NaN probabilities must be rejected')
+
+
+def _train(features, flip=False):
+    X = np.array([[0.0] * len(features), [1.0] * len(features)] * 5)
+    y = np.array([0, 1] * 5)
+    return LogisticRegression().fit(X, 1 - y if flip else y)
+
+
+def test_tennis_model_hot_swap(tmp_path, monkeypatch):
+    features = ['rank_diff', 'form_difference']
+    model_path = tmp_path / 'tennis_player1_win_model.pkl'
+    features_path = tmp_path / 'tennis_feature_columns.pkl'
+    joblib.dump(_train(features), model_path)
+    joblib.dump(features, features_path)
+
+    service = tennis_predict.TennisPredictionService(
+        model_path=str(model_path), features_path=str(features_path), data_path=str(tmp_path / 'none.csv')
+    )
+    service._ensure_loaded()
+    old_model = service.model
+
+    monkeypatch.setattr(model_watcher_module, 'TENNIS_MODEL_DIR', str(tmp_path))
+    monkeypatch.setattr(tennis_predict, '_tennis_prediction_service', service)
+    watcher = ModelWatcher(interval=0)
+    watcher.watch(WatchedArtifact('tennis', model_watcher_module._tennis_files, model_watcher_module._reload_tennis))
+    watcher.snapshot()
+
+    # Битая модель отклоняется, сервис продолжает работать со старой
+    joblib.dump('not a model', model_path)
+    watcher.check_once()
+    watcher.check_once()
+    assert service.model is old_model
+
+    new_model = _train(features, flip=True)
+    joblib.dump(new_model, model_path)
+    os.utime(model_path, ns=(0, os.stat(model_path).st_mtime_ns + 2_000_000_000))
+    watcher.check_once()
+    assert watcher.check_once() == ['tennis']
+
+    assert service.model is not old_model
+    assert service.model.coef_[0][0] < 0
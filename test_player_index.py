@@ -0,0 +1,111 @@
+"""
+Tests for tennis/player_index.py (player lookups without DataFrame scans)
+Run: pytest test_player_index.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from tennis.player_index import PlayerHistoryIndex, normalize_player_name
+from tennis.predict import TennisPredictionService
+
+PLAYERS = ['Novak Djokovic', 'Rafael Nadal', 'Gaël Monfils', 'Stan Wawrinka', 'Dominic Thiem']
+
+
+def _matches(n=150, seed=4):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n):
+        winner, loser = rng.choice(PLAYERS, size=2, replace=False)
+        rows.append({
+            'tourney_date': pd.Timestamp('2024-01-01') + pd.Timedelta(days=i * 2),
+            'winner_name': winner,
+            'loser_name': loser,
+            'surface': rng.choice(['Hard', 'Clay', 'Grass']),
+        })
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize('raw, expected', [
+    ('Gaël Monfils', 'gael monfils'),
+    ('  NOVAK   Djokovic ', 'novak djokovic'),
+    ('Stan\tWawrinka', 'stan wawrinka'),
+    ('Thiem', 'thiem'),
+    (None, ''),
+    (float('nan'), ''),
+])
+def test_normalize_player_name(raw, expected):
+    assert normalize_player_name(raw) == expected
+
+
+def test_lookups_match_dataframe_scan():
+    matches = _matches()
+    index = PlayerHistoryIndex(matches)
+    since = pd.Timestamp('2024-06-01')
+
+    for player in PLAYERS:
+        # Эталон: полный проход по DataFrame, как до индекса
+        played = matches[(matches['winner_name'] == player) | (matches['loser_name'] == player)]
+        recent = played[played['tourney_date'] >= since].tail(10)
+        np.testing.assert_array_equal(
+            index.recent_results(player, since=since), (recent['winner_name'] == player).to_numpy()
+        )
+
+        for surface in ['Hard', 'Clay', 'Grass']:
+            on_surface = played[played['surface'] == surface]
+            assert index.surface_stats(player, surface) == \
+                ((on_surface['winner_name'] == player).sum(), len(on_surface))
+
+        for opponent in PLAYERS:
+            if opponent == player:
+                continue
+            wins = ((matches['winner_name'] == player) & (matches['loser_name'] == opponent)).sum()
+            losses = ((matches['winner_name'] == opponent) & (matches['loser_name'] == player)).sum()
+            assert index.h2h(player, opponent) == (wins, losses)
+
+
+def test_lookup_ignores_accents_case_and_spacing():
+    index = PlayerHistoryIndex(_matches())
+
+    assert index.h2h('gael monfils', ' RAFAEL  nadal') == index.h2h('Gaël Monfils', 'Rafael Nadal')
+    assert index.surface_stats('GAEL MONFILS', 'Clay') == index.surface_stats('Gaël Monfils', 'Clay')
+    np.testing.assert_array_equal(index.recent_results('novak djokovic'), index.recent_results('Novak Djokovic'))
+    assert set(index.players) == {normalize_player_name(player) for player in PLAYERS}
+
+
+def test_unknown_players_and_missing_names():
+    matches = _matches(n=10)
+    matches.loc[0, 'loser_name'] = np.nan
+    index = PlayerHistoryIndex(matches)
+
+    assert index.recent_results('Roger Federer') is None
+    assert index.recent_results(PLAYERS[0], since=pd.Timestamp('2030-01-01')) is None
+    assert index.h2h('Roger Federer', PLAYERS[0]) == (0, 0)
+    assert index.surface_stats('Roger Federer', 'Hard') == (0, 0)
+    assert '' not in index.players
+    assert len(index.recent_results(matches.loc[0, 'winner_name'], window=3)) <= 3
+
+
+def test_freeze_makes_arrays_read_only():
+    index = PlayerHistoryIndex(_matches(n=10))
+    index.freeze()
+
+    results = index.recent_results(PLAYERS[0])
+    with pytest.raises(ValueError):
+        results[0] = not results[0]
+
+
+def test_service_reads_stats_from_the_index():
+    matches = _matches()
+    matches['tourney_date'] = pd.Timestamp.now().normalize() - pd.to_timedelta(matches.index[::-1], unit='D')
+    service = TennisPredictionService()
+    service.historical_data = matches
+    service.player_index = PlayerHistoryIndex(matches)
+
+    last = matches[(matches['winner_name'] == 'Gaël Monfils') | (matches['loser_name'] == 'Gaël Monfils')].tail(10)
+    wins = int((last['winner_name'] == 'Gaël Monfils').sum())
+    assert service._get_player_form('gael monfils') == {'wins': wins, 'losses': 10 - wins, 'points': wins * 3}
+
+    h2h = service._get_h2h('Novak Djokovic', 'Rafael Nadal')
+    assert h2h['total'] == h2h['player1_wins'] + h2h['player2_wins'] > 0
+    assert service._get_surface_stats('Roger Federer', 'Clay') == {'wins': 10, 'total': 20, 'winrate': 0.5}
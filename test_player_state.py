@@ -0,0 +1,125 @@
+"""
+Tests for tennis/player_state.py (incremental tennis player state)
+Run: pytest test_player_state.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from tennis.player_state import PlayerStateStore
+from tennis.prepare_training_data import TennisTrainingDataPreparator
+
+
+def test_form_is_a_ring_buffer():
+    store = PlayerStateStore(form_window=3)
+    for winner, loser in [('A', 'B'), ('A', 'B'), ('B', 'A'), ('B', 'A'), ('A', 'B')]:
+        store.apply_match(winner, loser, 'Hard')
+
+    # Последние 3 матча A: L L W
+    assert store.player_form('A') == (1, 2, 3)
+    assert store.player_form('B') == (2, 1, 6)
+    assert store.player_form('unknown') == (0, 0, 0)
+    assert store.matches_applied == 5
+
+
+def test_h2h_and_surface_counters():
+    store = PlayerStateStore()
+    store.apply_match('A', 'B', 'Clay')
+    store.apply_match('A', 'B', 'Hard')
+    store.apply_match('B', 'A', 'Clay')
+    store.apply_match('A', 'C', 'Clay')
+
+    assert store.h2h('A', 'B') == (2, 1)
+    assert store.h2h('B', 'A') == (1, 2)
+    assert store.h2h('B', 'C') == (0, 0)
+
+    assert store.surface_stats('A', 'Clay') == (2, 3, 2 / 3)
+    assert store.surface_stats('B', 'Hard') == (0, 1, 0.0)
+    assert store.surface_stats('C', 'Grass') == (0, 0, 0.5)
+
+
+def _preparator(n=120, seed=3, start='2023-01-02'):
+    """Синтетические матчи в формате atp_matches_combined.csv (несколько матчей в день)"""
+    rng = np.random.default_rng(seed)
+    players = [100 + i for i in range(6)]
+    rows = []
+    for i in range(n):
+        winner, loser = rng.choice(players, size=2, replace=False)
+        date = pd.Timestamp(start) + pd.Timedelta(days=i // 3)
+        rows.append({
+            'tourney_date': int(date.strftime('%Y%m%d')),
+            'winner_id': int(winner),
+            'loser_id': int(loser),
+            'surface': rng.choice(['Hard', 'Clay', 'Grass']),
+            'winner_rank': int(rng.integers(1, 200)),
+            'loser_rank': int(rng.integers(1, 200)),
+            'tourney_level': 'A',
+        })
+
+    preparator = TennisTrainingDataPreparator(data_dir='unused')
+    preparator.matches = pd.DataFrame(rows)
+    preparator.prepare_matches()
+    return preparator
+
+
+def test_features_use_only_earlier_dates():
+    preparator = _preparator()
+    matches = preparator.matches
+    np.random.seed(0)
+    features = preparator.create_features()
+
+    # Эталон: пересчет по фильтру tourney_date < date для каждого матча
+    for row, match in zip(features.itertuples(), matches.itertuples()):
+        if row.player1_win:
+            player1, player2 = match.winner_id, match.loser_id
+        else:
+            player1, player2 = match.loser_id, match.winner_id
+        date = match.tourney_date
+
+        assert (row.player1_recent_wins, row.player1_recent_losses, row.player1_form_points) == \
+            preparator.calculate_player_form(matches, player1, date)
+        assert (row.player2_recent_wins, row.player2_recent_losses, row.player2_form_points) == \
+            preparator.calculate_player_form(matches, player2, date)
+        assert (row.h2h_player1_wins, row.h2h_player2_wins) == \
+            preparator.calculate_h2h(matches, player1, player2, date)
+        assert (row.player1_surface_wins, row.player1_surface_total, row.player1_surface_winrate) == \
+            pytest.approx(preparator.calculate_surface_stats(matches, player1, date, match.surface))
+
+    # Первый день: истории нет ни у кого
+    first_day = features['date'] == features['date'].min()
+    assert (features.loc[first_day, ['player1_recent_wins', 'player2_recent_losses', 'h2h_total']] == 0).all().all()
+    assert preparator.state_store.matches_applied == len(matches)
+
+
+def test_pickle_round_trip_continues_the_history(tmp_path):
+    first = _preparator(n=60, seed=5)
+    first.create_features()
+    path = first.save_state(tmp_path / 'state' / 'player_state.pkl')
+
+    loaded = PlayerStateStore.load(path)
+    store = first.state_store
+    assert loaded.form_window == store.form_window
+    assert loaded.matches_applied == store.matches_applied
+    assert loaded.last_date == store.last_date
+    for player in store.recent_results:
+        assert loaded.player_form(player) == store.player_form(player)
+        assert loaded.surface_stats(player, 'Clay') == store.surface_stats(player, 'Clay')
+    assert dict(loaded.h2h_wins) == dict(store.h2h_wins)
+    assert loaded.recent_results[100].maxlen == store.form_window
+
+    # Новый сезон поверх загруженного состояния == поверх состояния в памяти
+    season = _preparator(n=30, seed=6, start='2024-01-01')
+    np.random.seed(1)
+    appended = season.create_features(state_store=loaded)
+    np.random.seed(1)
+    expected = season.create_features(state_store=store)
+    pd.testing.assert_frame_equal(appended, expected)
+
+    # ... и == одному проходу по всей истории
+    full = _preparator(n=60, seed=5)
+    full.matches = pd.concat([full.matches, season.matches], ignore_index=True)
+    full.create_features()
+    assert loaded.matches_applied == full.state_store.matches_applied == 90
+    for player in full.state_store.recent_results:
+        assert loaded.player_form(player) == full.state_store.player_form(player)
+    assert dict(loaded.h2h_wins) == dict(full.state_store.h2h_wins)
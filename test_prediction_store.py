@@ -0,0 +1,230 @@
+"""
+Tests for services/prediction_store.py (precomputed predictions)
+Run: pytest test_prediction_store.py
+"""
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+from extensions import db
+from ml.model import GoalPredictorModel
+from models import Match, Prediction, Team
+from ml.predict import PredictionService
+from services import scheduler
+from services.cache import MemoryBackend, TeamFormCache
+from services.prediction_store import (
+    feature_hash, materialize_predictions, predictions_version, stored_predictions, todays_predictions
+)
+
+NOW = datetime(2025, 8, 1, 9, 0)
+
+
+class FakePredictionService:
+    """Признаки из словаря form, модель - формат GoalPredictorModel без обучения"""
+
+    def __init__(self):
+        self.model = GoalPredictorModel()
+        self.model.model_version = 'v1'
+        self.form = {}
+        self.inference_rows = 0
+        self.explanations = 0
+        self.model.predict_batch_from_features = self._predict
+
+    def _ensure_model(self):
+        pass
+
+    def _predict(self, features_list):
+        self.inference_rows += len(features_list)
+        return [self.model._format_prediction(f['total_expected_goals'] / 4, 1 - f['total_expected_goals'] / 4)
+                for f in features_list]
+
+    def build_features(self, matches):
+        features = [{'total_expected_goals': np.float64(self.form.get(m['home_team_id'], 2.0))} for m in matches]
+        return features, [({}, {}) for _ in matches]
+
+    def _generate_explanation(self, prediction, home_stats, away_stats, match_data):
+        self.explanations += 1
+        return f"{match_data['home_team_name']}: {prediction['probability']:.0%}"
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all(Team(id=i, api_id=100 + i, name=f'Team {i}', league='PL', country='England')
+                           for i in range(1, 9))
+        fixtures = [(1, 2, 3), (3, 4, 5), (5, 6, 30), (7, 8, 24 * 10)]  # (home, away, часов от NOW)
+        for match_id, (home, away, hours) in enumerate(fixtures, start=1):
+            db.session.add(Match(id=match_id, api_id=match_id, home_team_id=home, away_team_id=away, league='PL',
+                                 status='scheduled', match_date=NOW + timedelta(hours=hours)))
+        db.session.add(Match(id=5, api_id=5, home_team_id=1, away_team_id=3, league='PL', status='finished',
+                             match_date=NOW + timedelta(hours=1)))
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+def test_feature_hash_is_stable():
+    assert feature_hash({'a': 1, 'b': np.float64(0.5)}) == feature_hash({'b': 0.5, 'a': 1.0})
+    assert feature_hash({'a': 1}) != feature_hash({'a': 1.0001})
+
+
+def test_materialize_only_recomputes_changes(app):
+    service = FakePredictionService()
+
+    stats = materialize_predictions(service, horizon_days=7, now=NOW)
+    assert stats == {'matches': 3, 'created': 3, 'updated': 0, 'unchanged': 0}
+    assert service.inference_rows == 3 and service.explanations == 3
+
+    # Ничего не изменилось - ни инференса, ни объяснений
+    assert materialize_predictions(service, horizon_days=7, now=NOW)['unchanged'] == 3
+    assert service.inference_rows == 3 and service.explanations == 3
+
+    # Изменилась форма хозяев одного матча
+    service.form[103] = 3.0
+    stats = materialize_predictions(service, horizon_days=7, now=NOW)
+    assert (stats['updated'], stats['unchanged']) == (1, 2)
+    prediction = Prediction.query.filter_by(match_id=2).one()
+    assert prediction.probability == pytest.approx(0.75)
+    assert prediction.confidence == 'high'
+    assert prediction.factors == {'total_expected_goals': 3.0}
+
+    # Новая модель - пересчет всех, строки те же
+    ids = sorted(p.id for p in Prediction.query)
+    service.model.model_version = 'v2'
+    assert materialize_predictions(service, horizon_days=7, now=NOW)['updated'] == 3
+    assert sorted(p.id for p in Prediction.query) == ids
+    assert {p.model_version for p in Prediction.query} == {'v2'}
+
+
+def test_stored_predictions_single_query(app):
+    service = FakePredictionService()
+    service.form = {101: 3.2, 103: 1.0}
+    materialize_predictions(service, horizon_days=7, now=NOW)
+
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    day_start = datetime.combine(NOW.date(), datetime.min.time())
+    predictions = stored_predictions(day_start, day_start + timedelta(days=1))
+
+    assert len(statements) == 1
+    assert [p['match_id'] for p in predictions] == [1, 2]  # самые уверенные сначала
+    first = predictions[0]
+    assert first['match_info'] == {'home_team': 'Team 1', 'away_team': 'Team 2', 'league': 'PL',
+                                   'date': (NOW + timedelta(hours=3)).isoformat()}
+    assert first['probability'] == pytest.approx(0.8)
+    assert first['prediction'] == 'Over 2.5'
+    assert first['recommendation'] == 'Сильная рекомендация'
+    assert first['explanation'] == 'Team 1: 80%'
+    assert stored_predictions(day_start, day_start + timedelta(days=1), league='PD') == []
+
+
+def test_predictions_version_tracks_changes(app):
+    service = FakePredictionService()
+    empty = predictions_version()
+
+    materialize_predictions(service, horizon_days=7, now=NOW)
+    created = predictions_version()
+    assert created != empty
+
+    materialize_predictions(service, horizon_days=7, now=NOW)
+    assert predictions_version() == created  # без изменений версия та же
+
+    service.form[103] = 3.0
+    materialize_predictions(service, horizon_days=7, now=NOW)
+    assert predictions_version() != created
+
+
+def test_todays_predictions_only_read_the_store(app):
+    service = FakePredictionService()
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+    # Планировщик еще не запускался: пустой ответ, без API и инференса
+    assert todays_predictions(today=NOW.date()) == []
+    assert len(statements) == 1
+
+    materialize_predictions(service, horizon_days=7, now=NOW)
+    assert [p['match_id'] for p in todays_predictions(today=NOW.date())] == [1, 2]
+    assert todays_predictions(league='PD', today=NOW.date()) == []
+
+
+class UpcomingFootballAPI:
+    def __init__(self, fixtures=None):
+        self.fixtures = fixtures
+
+    def get_upcoming_fixtures(self, league_id, days=7):
+        if self.fixtures is None:
+            raise ConnectionError('API недоступен')
+        fixtures, self.fixtures = self.fixtures, []
+        return fixtures
+
+
+def test_fixture_update_materializes_predictions(app):
+    tomorrow = datetime.now(timezone.utc) + timedelta(days=1)
+    task_scheduler = scheduler.TaskScheduler.__new__(scheduler.TaskScheduler)
+    task_scheduler.app = app
+    task_scheduler.prediction_service = FakePredictionService()
+    task_scheduler.football_api = UpcomingFootballAPI([
+        {'id': 501, 'date': tomorrow.isoformat(), 'status': 'scheduled', 'league': 'PL',
+         'home_team_id': 101, 'home_team_name': 'Team 1', 'away_team_id': 900, 'away_team_name': 'New Team'},
+    ])
+
+    task_scheduler.update_fixtures()
+    prediction = Prediction.query.filter_by(match_id=Match.query.filter_by(api_id=501).one().id).one()
+    assert task_scheduler.prediction_service.inference_rows == 1
+
+    # API недоступен - прогнозы матчей, уже лежащих в БД, все равно считаются
+    prediction.feature_hash = 'outdated'
+    db.session.commit()
+    task_scheduler.football_api = UpcomingFootballAPI()
+    task_scheduler.update_fixtures()
+    assert task_scheduler.prediction_service.inference_rows == 2
+
+
+class LastMatchesFootballAPI:
+    """Последние матчи команды: победа 2:1 дома над командой team_id + 1"""
+
+    def __init__(self):
+        self.calls = []
+
+    def get_team_last_matches(self, team_id, limit=10):
+        self.calls.append(team_id)
+        return [{'date': '2025-07-26T14:00:00Z', 'goals': {'home': 2, 'away': 1},
+                 'teams': {'home': {'id': team_id}, 'away': {'id': team_id + 1}}}]
+
+
+def test_build_features_fetch_each_team_once(monkeypatch):
+    cache = TeamFormCache(backend=MemoryBackend(), kinds=('last_matches',))
+    monkeypatch.setattr('ml.predict.team_form_cache', cache)
+    service = PredictionService.__new__(PredictionService)
+    service.model = GoalPredictorModel()
+    service.football_api = LastMatchesFootballAPI()
+    matches = [{'home_team_id': home, 'away_team_id': away, 'date': NOW}
+               for home, away in [(101, 102), (103, 101), (102, 103)]]
+
+    features_list, team_stats = service.build_features(matches)
+
+    assert sorted(service.football_api.calls) == [101, 102, 103]
+    assert len(features_list) == len(team_stats) == 3
+    assert team_stats[0][0]['avg_goals_scored'] == team_stats[1][1]['avg_goals_scored'] == 2
+
+    # Следующий прогон (час спустя) - матчи из team_form_cache
+    service.build_features(matches)
+    assert len(service.football_api.calls) == 3
+
+
+def test_scheduler_runs_in_one_process(app, tmp_path, monkeypatch):
+    started = []
+    monkeypatch.setattr(scheduler, 'start_scheduler', started.append)
+    lock_path = str(tmp_path / 'scheduler.lock')
+
+    assert scheduler.start_scheduler_leader(app, lock_path) is True
+    assert scheduler.start_scheduler_leader(app, lock_path, retry_seconds=3600) is False
+    assert started == [app]
@@ -0,0 +1,120 @@
+"""
+Tests for services/preload.py (warm-up before fork, frozen heap, worker memory)
+Run: pytest test_preload.py
+"""
+import gc
+
+import pytest
+from flask import Flask
+from flask_login import LoginManager, UserMixin
+
+import services.preload as preload
+from services.model_registry import ModelRegistry
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    registry = ModelRegistry()
+    monkeypatch.setattr(preload, 'model_registry', registry)
+    path = tmp_path / 'model.pkl'
+    path.write_bytes(b'model')
+    return registry, str(path)
+
+
+def test_warm_up_loads_models_and_skips_failing_steps(registry, monkeypatch):
+    registry, path = registry
+    calls = []
+
+    def broken_step():
+        calls.append('broken')
+        raise FileNotFoundError('tennis/data/atp_matches_combined.csv')
+
+    def model_step():
+        calls.append('model')
+        registry.load(path, loader=lambda p: open(p, 'rb').read())
+
+    monkeypatch.setattr(preload, 'WARM_UP_STEPS', [('broken', broken_step), ('model', model_step)])
+
+    stats = preload.warm_up()
+
+    assert calls == ['broken', 'model']
+    assert (stats['registered'], stats['loaded']) == (1, 1)
+    assert registry.load(path) == b'model'  # уже загружено, не читается повторно
+
+
+@pytest.mark.skipif(not hasattr(gc, 'freeze'), reason='gc.freeze() requires Python 3.7+')
+def test_freeze_heap_moves_objects_to_permanent_generation():
+    gc.unfreeze()
+    try:
+        survivor = [object() for _ in range(1000)]
+        preload.freeze_heap()
+
+        assert gc.get_freeze_count() >= len(survivor)
+        assert gc.get_count()[0] < len(survivor)
+    finally:
+        gc.unfreeze()
+
+
+def _proc(tmp_path, pids, parent):
+    """Фейковый /proc: master (parent) и воркеры с smaps_rollup"""
+    for pid in [parent] + pids:
+        process = tmp_path / str(pid)
+        process.mkdir()
+        (process / 'stat').write_text(f'{pid} (gunicorn: worker [app]) S {parent if pid != parent else 1} 0 0')
+        (process / 'smaps_rollup').write_text(
+            'Rss:              40960 kB\n'
+            'Pss:              20480 kB\n'
+            'Shared_Clean:     30720 kB\n'
+            'Shared_Dirty:      2048 kB\n'
+            'Private_Clean:     1024 kB\n'
+            'Private_Dirty:     7168 kB\n'
+        )
+    (tmp_path / 'self').symlink_to(tmp_path / str(pids[0]))
+    return tmp_path
+
+
+def test_worker_memory_reads_smaps(tmp_path, monkeypatch):
+    monkeypatch.setattr(preload, 'PROC_ROOT', str(_proc(tmp_path, [11, 12], parent=10)))
+    monkeypatch.setattr(preload.os, 'getppid', lambda: 10)
+
+    memory = preload.worker_memory()
+
+    assert [worker['pid'] for worker in memory['workers']] == [11, 12]
+    assert memory['master']['pid'] == 10
+    assert memory['worker']['shared_bytes'] == (30720 + 2048) * 1024
+    assert memory['worker']['private_bytes'] == (1024 + 7168) * 1024
+    assert memory['total_private_bytes'] == 2 * (1024 + 7168) * 1024
+
+
+class Admin(UserMixin):
+    id = 1
+    is_admin = True
+
+
+@pytest.fixture
+def client():
+    from api.routes_admin import admin_bp
+
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'test'
+    login_manager = LoginManager(app)
+    login_manager.request_loader(lambda request: Admin())
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    return app.test_client()
+
+
+@pytest.mark.parametrize('proc_root', ['missing', 'no_smaps'])
+def test_memory_route_without_smaps_rollup(client, tmp_path, monkeypatch, proc_root):
+    # missing - не Linux (нет /proc); no_smaps - старое ядро без smaps_rollup
+    root = tmp_path / proc_root
+    if proc_root == 'no_smaps':
+        (root / '5').mkdir(parents=True)
+        (root / '5' / 'stat').write_text(f'5 (python) S {preload.os.getppid()} 0 0')
+    monkeypatch.setattr(preload, 'PROC_ROOT', str(root))
+
+    response = client.get('/api/admin/memory')
+
+    assert response.status_code == 200
+    memory = response.get_json()['memory']
+    assert (memory['worker'], memory['master'], memory['workers']) == (None, None, [])
+    assert memory['total_private_bytes'] == 0
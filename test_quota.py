@@ -0,0 +1,124 @@
+"""
+Tests for services/quota.py (atomic daily counters, write-behind view log)
+Run: pytest test_quota.py
+"""
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask import Flask
+
+from config import Config
+from extensions import db
+from models import User, UserPrediction
+from services.quota import LocalQuotaStore, PredictionQuota, SQLiteQuotaStore, ViewLogBuffer
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            User(id=1, email='free@example.com', username='free', password_hash='x'),
+            User(id=2, email='premium@example.com', username='premium', password_hash='x', is_premium=True),
+        ])
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def quota(app):
+    buffer = ViewLogBuffer()
+    buffer.init_app(app, background=False)  # сбрасываем вручную
+    return PredictionQuota(store=LocalQuotaStore(), buffer=buffer)
+
+
+@pytest.mark.parametrize('make_store', [LocalQuotaStore, lambda: None])
+def test_consume_is_atomic_under_concurrency(tmp_path, make_store):
+    store = make_store() or SQLiteQuotaStore(path=str(tmp_path / 'quota.sqlite3'))
+    results = []
+
+    def worker():
+        for _ in range(5):
+            results.append(store.consume('views:1', limit=3, ttl=60)[0])
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == 3
+    assert store.get('views:1') == 3
+
+
+def test_sqlite_store_seed_and_refund(tmp_path):
+    store = SQLiteQuotaStore(path=str(tmp_path / 'quota.sqlite3'))
+
+    assert store.get('views:2', default=2) == 2
+    assert store.consume('views:2', limit=3, ttl=60, initial=2) == (True, 3)
+    assert store.consume('views:2', limit=3, ttl=60, initial=0) == (False, 3)  # seed только для нового ключа
+    assert store.consume('views:2', limit=None, ttl=60, amount=-1) == (True, 2)
+
+
+def test_limit_without_commits(app, quota):
+    user = db.session.get(User, 1)
+    statements = []
+    db.event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+    allowed = [quota.consume(user) for _ in range(Config.FREE_PREDICTIONS_PER_DAY + 2)]
+    for prediction_id in range(Config.FREE_PREDICTIONS_PER_DAY):
+        quota.record_view(user, prediction_id)
+
+    assert allowed.count(True) == Config.FREE_PREDICTIONS_PER_DAY
+    assert not quota.can_view(user)
+    assert user.daily_predictions_count == Config.FREE_PREDICTIONS_PER_DAY
+    assert user not in db.session.dirty
+    assert statements == []  # до сброса буфера БД не трогаем
+
+
+def test_flush_writes_views_and_counter_in_batch(app, quota):
+    user = db.session.get(User, 1)
+    for prediction_id in (10, 11):
+        assert quota.consume(user)
+        quota.record_view(user, prediction_id)
+
+    assert quota.buffer.flush() == 2
+    db.session.expire_all()
+
+    assert sorted(view.prediction_id for view in UserPrediction.query.filter_by(user_id=1)) == [10, 11]
+    stored = db.session.get(User, 1)
+    assert stored.daily_predictions_count == 2
+    assert stored.last_prediction_date == datetime.now(timezone.utc).date()
+    assert quota.buffer.pending() == 0
+
+
+def test_counter_seeded_from_db_and_reset_next_day(app, quota):
+    user = db.session.get(User, 1)
+    user.daily_predictions_count = Config.FREE_PREDICTIONS_PER_DAY
+    user.last_prediction_date = datetime.now(timezone.utc).date()
+    db.session.commit()
+
+    assert quota.used(user) == Config.FREE_PREDICTIONS_PER_DAY
+    assert not quota.consume(user)
+
+    # Вчерашний счетчик не учитывается
+    user.last_prediction_date = datetime.now(timezone.utc).date() - timedelta(days=1)
+    db.session.commit()
+    fresh = PredictionQuota(store=LocalQuotaStore(), buffer=quota.buffer)
+    assert fresh.used(user) == 0
+    assert fresh.consume(user)
+
+
+def test_premium_unlimited_and_refund(app, quota):
+    premium = db.session.get(User, 2)
+    assert all(quota.consume(premium) for _ in range(Config.FREE_PREDICTIONS_PER_DAY + 5))
+
+    user = db.session.get(User, 1)
+    assert quota.consume(user)
+    quota.refund(user)
+    assert quota.used(user) == 0
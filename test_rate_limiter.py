@@ -0,0 +1,125 @@
+"""
+Tests for services/rate_limiter.py (token bucket + priority request queue)
+Run: pytest test_rate_limiter.py
+"""
+import threading
+import time
+
+import pytest
+
+from services.rate_limiter import (
+    TokenBucket, PriorityRequestQueue, LocalBucketStore, SQLiteBucketStore,
+    PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+)
+
+
+def test_bucket_allows_burst_then_waits():
+    bucket = TokenBucket('test', per_minute=60, capacity=3, store=LocalBucketStore())
+
+    assert [bucket.try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert 0 < bucket.try_acquire() <= 1.0
+
+
+def test_sqlite_bucket_shared_between_stores(tmp_path):
+    path = str(tmp_path / 'ratelimit.sqlite3')
+    worker_1 = TokenBucket('football', per_minute=10, capacity=2, store=SQLiteBucketStore(path))
+    worker_2 = TokenBucket('football', per_minute=10, capacity=2, store=SQLiteBucketStore(path))
+
+    assert worker_1.try_acquire() == 0
+    assert worker_2.try_acquire() == 0
+    assert worker_1.try_acquire() > 0
+    assert worker_2.try_acquire() > 0
+
+
+def test_penalize_blocks_bucket():
+    bucket = TokenBucket('test', per_minute=600, store=LocalBucketStore())
+    bucket.penalize(30)
+
+    assert bucket.try_acquire() > 29
+
+
+def test_queue_runs_interactive_before_background():
+    bucket = TokenBucket('test', per_minute=600, capacity=1, store=LocalBucketStore())
+    queue = PriorityRequestQueue(bucket, max_concurrency=1)
+    order = []
+    gate = threading.Event()
+
+    # Первый запрос занимает единственный поток, пока остальные встают в очередь
+    blocker = queue.submit('blocker', lambda: gate.wait(5))
+    time.sleep(0.05)
+    background = queue.submit('team-stats', lambda: order.append('background'), PRIORITY_BACKGROUND)
+    interactive = queue.submit('page', lambda: order.append('interactive'), PRIORITY_INTERACTIVE)
+    gate.set()
+
+    blocker.result(5)
+    background.result(5)
+    interactive.result(5)
+    assert order == ['interactive', 'background']
+
+
+def test_queue_merges_duplicate_requests():
+    bucket = TokenBucket('test', per_minute=600, store=LocalBucketStore())
+    queue = PriorityRequestQueue(bucket)
+    calls = []
+    gate = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        gate.wait(5)
+        return {'matches': []}
+
+    first = queue.submit('matches:PL', fetch)
+    second = queue.submit('matches:PL', fetch)
+    gate.set()
+
+    assert first is second
+    assert first.result(5) == {'matches': []}
+    assert len(calls) == 1
+    assert queue.stats['merged'] == 1
+
+
+class CountingStore(LocalBucketStore):
+    def __init__(self, failures=0):
+        super().__init__()
+        self.taken = 0
+        self.failures = failures
+
+    def take(self, bucket, capacity, rate):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError('database is locked')
+        wait = super().take(bucket, capacity, rate)
+        if wait <= 0:
+            self.taken += 1
+        return wait
+
+
+def test_promoted_request_takes_one_token():
+    store = CountingStore()
+    queue = PriorityRequestQueue(TokenBucket('test', per_minute=600, store=store), max_concurrency=1)
+    gate = threading.Event()
+
+    blocker = queue.submit('blocker', lambda: gate.wait(5))
+    time.sleep(0.05)
+    # Повышение приоритета оставляет в куче устаревшую запись
+    promoted = queue.submit('page', lambda: 'page', PRIORITY_BACKGROUND)
+    assert queue.submit('page', lambda: 'page', PRIORITY_INTERACTIVE) is promoted
+    gate.set()
+
+    assert promoted.result(5) == 'page'
+    blocker.result(5)
+    time.sleep(0.05)
+    assert queue.stats['dispatched'] == 2
+    assert store.taken == 2
+
+
+def test_dispatcher_survives_bucket_errors():
+    queue = PriorityRequestQueue(TokenBucket('test', per_minute=600, store=CountingStore(failures=1)))
+    queue.ERROR_BACKOFF = 0.01
+
+    with pytest.raises(RuntimeError, match='database is locked'):
+        queue.submit('first', lambda: 'first').result(5)
+
+    # Диспетчер жив: следующие запросы выполняются
+    assert queue.submit('second', lambda: 'second').result(5) == 'second'
+    assert queue.queue_size() == 0
@@ -0,0 +1,107 @@
+"""
+Tests for services/response_cache.py (shared rendered bodies, ETag / 304)
+Run: pytest test_response_cache.py
+"""
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask, jsonify, request
+from flask_login import LoginManager
+
+from services.cache import SimpleCache
+from services.response_cache import ResponseCache
+
+
+@pytest.fixture
+def setup():
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'test'
+    login_manager = LoginManager(app)
+
+    # Пользователь из заголовка вместо сессии
+    @login_manager.request_loader
+    def load_user(req):
+        tier = req.headers.get('X-Tier')
+        if not tier:
+            return None
+        return SimpleNamespace(is_authenticated=True, is_active=True, is_anonymous=False,
+                               is_premium=tier == 'premium', get_id=lambda: tier)
+
+    cache = ResponseCache(SimpleCache())
+    state = {'version': 'v1', 'renders': 0}
+
+    @app.route('/today')
+    @cache.cached(ttl=300, max_age=30, version=lambda: state['version'])
+    def today():
+        state['renders'] += 1
+        return jsonify({'tier': request.headers.get('X-Tier', 'anonymous'), 'version': state['version']})
+
+    @app.route('/public')
+    @cache.cached(ttl=300, max_age=60, vary_tier=False)
+    def public():
+        state['renders'] += 1
+        if request.args.get('fail'):
+            return jsonify({'success': False}), 500
+        return jsonify({'days': request.args.get('days')})
+
+    return app.test_client(), state
+
+
+def test_hit_and_conditional_get(setup):
+    client, state = setup
+
+    first = client.get('/today')
+    assert first.status_code == 200
+    assert first.headers['X-Cache'] == 'MISS'
+    etag = first.headers['ETag']
+
+    second = client.get('/today')
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.get_data() == first.get_data()
+    assert second.headers['ETag'] == etag
+
+    not_modified = client.get('/today', headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304
+    assert not_modified.get_data() == b''
+    assert state['renders'] == 1
+
+
+def test_version_change_rerenders(setup):
+    client, state = setup
+    etag = client.get('/today').headers['ETag']
+
+    state['version'] = 'v2'
+    response = client.get('/today', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.json['version'] == 'v2'
+    assert response.headers['ETag'] != etag
+    assert state['renders'] == 2
+
+
+def test_tiers_cached_separately(setup):
+    client, state = setup
+
+    anonymous = client.get('/today')
+    premium = client.get('/today', headers={'X-Tier': 'premium'})
+    free = client.get('/today', headers={'X-Tier': 'free'})
+
+    assert [r.json['tier'] for r in (anonymous, premium, free)] == ['anonymous', 'premium', 'free']
+    assert anonymous.headers['Cache-Control'] == 'public, max-age=30'
+    assert premium.headers['Cache-Control'] == 'private, max-age=30'
+    assert 'Cookie' in premium.headers['Vary']
+    assert state['renders'] == 3
+
+
+def test_query_args_and_errors(setup):
+    client, state = setup
+
+    client.get('/public?days=3')
+    response = client.get('/public?days=7')
+    assert response.json == {'days': '7'}
+    assert response.headers['Cache-Control'] == 'public, max-age=60'
+    assert 'Vary' not in response.headers
+
+    # Ошибки не кэшируются
+    assert client.get('/public?fail=1').status_code == 500
+    assert client.get('/public?fail=1').status_code == 500
+    assert state['renders'] == 4
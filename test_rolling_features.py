@@ -0,0 +1,66 @@
+"""
+Tests for ml/rolling_features.py (vectorized features == row-by-row reference)
+Run: pytest test_rolling_features.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml.advanced_features import AdvancedFeatureEngineering
+
+
+TEAMS = ['Arsenal', 'Chelsea', 'Everton', 'Fulham', 'Leeds', 'Wolves']
+
+
+def _matches(n=80, seed=7, form_columns=False):
+    """Синтетический датасет в формате load_enhanced_dataset (отсортирован по дате)"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n):
+        home, away = rng.choice(TEAMS, size=2, replace=False)
+        row = {
+            'Date': pd.Timestamp('2024-08-01') + pd.Timedelta(days=i),
+            'HomeTeam': home,
+            'AwayTeam': away,
+            'FTHG': int(rng.integers(0, 5)),
+            'FTAG': int(rng.integers(0, 4)),
+        }
+        for home_col, away_col, high in [('HS', 'AS', 25), ('HST', 'AST', 10), ('HC', 'AC', 12),
+                                         ('HF', 'AF', 18), ('HY', 'AY', 5)]:
+            row[home_col] = int(rng.integers(0, high))
+            row[away_col] = int(rng.integers(0, high))
+        if form_columns:
+            row['HTFormPts'] = int(rng.integers(0, 16))
+            row['ATFormPts'] = int(rng.integers(0, 16))
+            row['HTWinStreak3'] = int(rng.integers(0, 2))
+            row['ATWinStreak3'] = int(rng.integers(0, 2))
+        rows.append(row)
+
+    df = pd.DataFrame(rows)
+    df['TotalGoals'] = df['FTHG'] + df['FTAG']
+    df['Over2_5'] = (df['TotalGoals'] > 2.5).astype(int)
+    df['BTTS'] = ((df['FTHG'] > 0) & (df['FTAG'] > 0)).astype(int)
+    return df
+
+
+@pytest.mark.parametrize('form_columns', [False, True])
+@pytest.mark.parametrize('min_history', [0, 20])
+def test_vectorized_matches_rowwise(form_columns, min_history):
+    df = _matches(form_columns=form_columns)
+    fe = AdvancedFeatureEngineering()
+
+    vectorized = fe.prepare_training_dataset(df, min_history=min_history)
+    rowwise = fe.prepare_training_dataset_rowwise(df, min_history=min_history)
+
+    assert len(vectorized) == len(df) - min_history
+    pd.testing.assert_frame_equal(vectorized, rowwise)
+
+
+def test_only_earlier_matches_are_used():
+    df = _matches(n=40)
+    fe = AdvancedFeatureEngineering()
+    before = fe.prepare_training_dataset(df.iloc[:30].copy(), min_history=0)
+
+    # Матчи после 30-го не меняют признаки первых 30
+    after = fe.prepare_training_dataset(df, min_history=0).iloc[:30]
+    pd.testing.assert_frame_equal(after, before)
@@ -0,0 +1,125 @@
+"""
+Tests for services/team_stats.py (incremental materialized team statistics)
+Run: pytest test_team_stats.py
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask import Flask
+
+from extensions import db
+from models import Match, Team, TeamStats, TeamStatsMatch
+from services.team_stats import install_team_stats_listener, rebuild_team_stats, refresh_team_stats
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    db.init_app(app)
+    install_team_stats_listener()
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Team(id=1, api_id=101, name='Home FC', league='PL', country='England'),
+            Team(id=2, api_id=102, name='Away FC', league='PL', country='England'),
+        ])
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+START = datetime(2025, 8, 1)
+
+
+def _match(api_id, home_goals=None, away_goals=None, days=0, status='FINISHED', home=1, away=2):
+    return Match(api_id=api_id, home_team_id=home, away_team_id=away, league='PL',
+                 match_date=START + timedelta(days=days), status=status,
+                 home_goals=home_goals, away_goals=away_goals)
+
+
+def test_result_is_counted_on_write(app):
+    db.session.add_all([_match(1, 3, 1, days=0), _match(2, 0, 0, days=7), _match(3, days=14, status='scheduled')])
+    db.session.commit()
+
+    home = db.session.get(TeamStats, 1)
+    assert (home.matches_played, home.goals_scored, home.goals_conceded) == (2, 3, 1)
+    assert home.over_2_5_count == 1
+    assert home.form == 'WD'
+    assert db.session.get(TeamStats, 2).form == 'LD'
+
+    team = db.session.get(Team, 1)
+    assert team.total_matches == 2
+    assert team.over_2_5_percentage == 50
+    assert team.last_5_form == 'WD'
+
+
+def test_scheduler_style_update_and_score_correction(app):
+    match = _match(1, days=0, status='scheduled')
+    db.session.add(match)
+    db.session.commit()
+    assert db.session.get(TeamStats, 1) is None
+
+    match.home_score, match.away_score, match.status = 2, 1, 'finished'
+    db.session.commit()
+    match.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)  # повторная запись того же результата
+    db.session.commit()
+    assert db.session.get(TeamStats, 1).matches_played == 1
+
+    match.home_score = 1
+    db.session.commit()
+    home = db.session.get(TeamStats, 1)
+    assert (home.matches_played, home.goals_scored, home.wins, home.draws) == (1, 1, 0, 1)
+
+
+def test_form_ring_buffer_keeps_latest_matches(app):
+    for day in range(7):
+        db.session.add(_match(100 + day, 1, 0, days=day))
+    db.session.commit()
+    db.session.add(_match(200, 0, 5, days=30))
+    db.session.add(_match(201, 0, 5, days=-30))  # старый матч: только суммы
+    db.session.commit()
+
+    home = db.session.get(TeamStats, 1)
+    assert home.form == 'WWWWL'
+    assert home.matches_played == 9
+
+
+def test_score_correction_rebuilds_form(app):
+    matches = [_match(1 + day, 2, 0, days=day) for day in range(3)]
+    db.session.add_all(matches)
+    db.session.commit()
+    assert db.session.get(TeamStats, 1).form == 'WWW'
+
+    # Последний матч: 2:0 -> 0:1
+    matches[-1].home_goals, matches[-1].away_goals = 0, 1
+    db.session.commit()
+    home, away = db.session.get(TeamStats, 1), db.session.get(TeamStats, 2)
+    assert (home.form, home.matches_played, home.wins, home.losses) == ('WWL', 3, 2, 1)
+    assert away.form == 'LLW'
+    assert home.last_match_date == START + timedelta(days=2)
+
+    # Исправление матча в середине формы
+    matches[1].home_goals = 0
+    db.session.commit()
+    assert db.session.get(TeamStats, 1).form == 'WDL'
+    assert db.session.get(Team, 1).last_5_form == 'WDL'
+
+
+def test_refresh_counts_only_matches_written_past_the_orm(app):
+    db.session.execute(Match.__table__.insert(), [
+        {'api_id': 10, 'home_team_id': 1, 'away_team_id': 2, 'league': 'PL',
+         'match_date': START, 'status': 'FINISHED', 'home_goals': 2, 'away_goals': 2},
+        {'api_id': 11, 'home_team_id': 2, 'away_team_id': 1, 'league': 'PL',
+         'match_date': START + timedelta(days=7), 'status': 'FINISHED', 'home_goals': 1, 'away_goals': 0},
+    ])
+    db.session.commit()
+    assert db.session.get(TeamStats, 1) is None
+
+    assert refresh_team_stats() == 2
+    assert refresh_team_stats() == 0
+    assert db.session.get(TeamStats, 1).form == 'DL'
+    assert TeamStatsMatch.query.count() == 2
+
+    assert rebuild_team_stats() == 2
+    assert db.session.get(TeamStats, 2).goals_scored == 3